@@ -1,24 +1,90 @@
-from typing import Optional
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Optional, Tuple
 
 import click
 
-from .spec import MRSSpec
-from .isa.spec import ISASpec
+from .asl.cache import ParseCache, parse_operations, parse_pseudocode
+from .asl.compiler import DecodeSemantics, OperationSemantics
+from .asl.runtime import ASLException
+from .codegen.backends import BACKENDS
+from .codegen.pipeline import generate as generate_backends, instruction_records
+from .corpus import CorpusSampler, load_frequencies
+from .coverage import encoding_coverage
+from .crosscheck import cross_check, mrs_signatures, xml_signatures
+from .decoder import SHOULD_BE_MODES, Decoder, decoder_snapshot, flat_snapshot
+from .emulator import PAGE_SIZE, Emulator, MemoryFault, SupervisorCall
+from .features import FeatureProfile, load_profile
+from .memory import format_size, memory_report
+from .spec import InstructionGroup, MRSSpec
+from .isa.index import EncodingIndex
+from .isa.spec import ISASpec, load_isa, load_isa_archive
+from .mrs.validate import SpecValidator
+from .server import DEFAULT_SOCKET, DecodeServer
+from .shard import sharded_disassemble
+from .scan import Scanner, compile_pattern
+from .search import PatternIndex, format_pattern, parse_pattern
+from .snapshot import load_snapshot
+from .strategy import (
+    PROFILE,
+    STRATEGIES,
+    ReferenceDecoder,
+    build_decoder,
+    compare_decoders,
+    profile_weights,
+    tree_stats,
+)
+from .table import DecodeTable, write_table
+from .utils.archive import has_member, is_archive, read_member
+from .utils.binary import iter_chunks, map_words
 
+DEFAULT_SPEC = "data/aarchmrs/Instructions.json"
 
-@click.command()
+
+def parse_int(ctx: click.Context, param: click.Parameter, value: Optional[str]) -> Optional[int]:
+    """Parse a decimal or 0x-prefixed hexadecimal option value."""
+    if value is None:
+        return None
+    try:
+        return int(value, 0)
+    except ValueError:
+        raise click.BadParameter(f"invalid integer: {value}")
+
+
+@click.group()
+def main() -> None:
+    """Generate arbitrary language AARCH64 disassemblers from ARMARM spec"""
+
+
+def is_isa_archive(input_file: str) -> bool:
+    """Check whether an input is an ISA XML tarball rather than an MRS one."""
+    return is_archive(input_file) and not has_member(input_file, "Instructions.json")
+
+
+@main.command()
 @click.argument("input_file", type=click.Path(exists=True))
 @click.option("--output", "-o", type=click.Path(), help="Optional path to save the generated disassembler source code")
-def main(input_file: str, output: Optional[str]) -> None:
+@click.option("--profile", help='Target feature profile of XML specs, e.g. "v8.5a + SVE2 - SME"')
+@click.option("--jobs", "-j", type=click.IntRange(min=0), default=0, show_default=True, help="Processes (0: all CPUs)")
+def parse(input_file: str, output: Optional[str], profile: Optional[str], jobs: int) -> None:
     """
     Generate a disassembler from the input JSON ARM64 spec.
 
+    Spec tarballs are read without extracting them.
+
     Args:
-        input_file: Path to the input JSON file
+        input_file: Path to the input JSON file, XML file or tarball
     """
     try:
+        target = FeatureProfile.parse(profile) if profile else None
         if input_file.endswith(".xml"):
-            parsed_result = ISASpec(input_file)
+            parsed_result = ISASpec(input_file, target)
+        elif is_isa_archive(input_file):
+            instructions = load_isa_archive(input_file, target, jobs or None)
+            parsed_result = "\n\n".join(str(instruction) for instruction in instructions)
         else:
             parsed_result = MRSSpec(input_file)
 
@@ -34,5 +100,885 @@ def main(input_file: str, output: Optional[str]) -> None:
         exit(1)
 
 
+@main.command()
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--spec", "spec_file", type=click.Path(exists=True), default=DEFAULT_SPEC, show_default=True, help="MRS spec"
+)
+@click.option("--offset", callback=parse_int, default="0", show_default=True, help="File offset to start at")
+@click.option("--length", callback=parse_int, help="Number of bytes to disassemble (defaults to the rest of the file)")
+@click.option("--base", callback=parse_int, default="0", show_default=True, help="Address of the first word")
+@click.option("--chunk-size", type=click.IntRange(min=1), default=65536, show_default=True, help="Words per chunk")
+@click.option("--jobs", "-j", type=click.IntRange(min=0), default=1, show_default=True, help="Processes (0: all CPUs)")
+@click.option(
+    "--should-be", type=click.Choice(SHOULD_BE_MODES), default="strict", show_default=True, help="SBO/SBZ bit handling"
+)
+@click.option("--profile", help='Target feature profile, e.g. "v8.5a + SVE2 - SME" (default: every feature)')
+@click.option(
+    "--cache-size", type=click.IntRange(min=0), default=0, show_default=True, help="Decode cache words (0: off)"
+)
+@click.option("--strategy", type=click.Choice(STRATEGIES), default="spec", show_default=True, help="Decode tree")
+@click.option(
+    "--sample", type=click.Path(exists=True, dir_okay=False), help="Sample corpus of the profile strategy (raw binary)"
+)
+def disasm(
+    input_file: str,
+    spec_file: str,
+    offset: int,
+    length: Optional[int],
+    base: int,
+    chunk_size: int,
+    jobs: int,
+    should_be: str,
+    profile: Optional[str],
+    cache_size: int,
+    strategy: str,
+    sample: Optional[str],
+) -> None:
+    """
+    Disassemble a raw AARCH64 code blob.
+
+    With more than one job the region is split into chunks that are decoded by a process pool and merged back
+    in address order.
+
+    Args:
+        input_file: Path to the raw binary
+    """
+    try:
+        start = time.perf_counter()
+        count = 0
+        unpredictable = 0
+        counters = None
+        target = load_profile(profile, spec_file) if profile else None
+        snapshot = decoder_snapshot(spec_file, profile=target)
+        weights = None
+        if strategy == "profile":
+            if sample is None:
+                raise ValueError("the profile strategy needs a --sample corpus")
+            with map_words(sample) as words:
+                weights = profile_weights(load_snapshot(snapshot), words)
+        if jobs == 1:
+            decoder = build_decoder(load_snapshot(snapshot), strategy, should_be, cache_size, weights)
+            with map_words(input_file, offset, length) as words:
+                for index, chunk in iter_chunks(words, chunk_size):
+                    lines = decoder.disassemble_words(chunk, base + 4 * index)
+                    sys.stdout.write("\n".join(lines) + "\n")
+                    count += len(lines)
+            unpredictable = decoder.counters["unpredictable"]
+            counters = decoder.counters
+        else:
+            shards = sharded_disassemble(
+                input_file,
+                snapshot,
+                offset,
+                length,
+                base,
+                chunk_size,
+                jobs or None,
+                should_be,
+                cache_size,
+                strategy,
+                weights,
+            )
+            counters = {}
+            for lines, shard_counters in shards:
+                sys.stdout.write("\n".join(lines) + "\n")
+                count += len(lines)
+                for name, value in shard_counters.items():
+                    counters[name] = counters.get(name, 0) + value
+            unpredictable = counters.get("unpredictable", 0)
+        elapsed = time.perf_counter() - start
+
+    except Exception as e:
+        click.echo(f"Error disassembling file: {e}", err=True)
+        exit(1)
+
+    rate = count / elapsed if elapsed else 0
+    click.echo(f"{count} words in {elapsed:.2f}s ({rate:,.0f} words/s)", err=True)
+    if should_be == "report":
+        click.echo(f"{unpredictable} CONSTRAINED UNPREDICTABLE encodings", err=True)
+    if cache_size and counters:
+        lookups = counters["hits"] + counters["misses"]
+        click.echo(
+            f"decode cache: {counters['hits']} hits, {counters['misses']} misses, {counters['evictions']} evictions "
+            f"({counters['hits'] / lookups if lookups else 0:.1%} hit rate)",
+            err=True,
+        )
+
+
+@main.command()
+@click.option(
+    "--spec", "spec_file", type=click.Path(exists=True), default=DEFAULT_SPEC, show_default=True, help="MRS spec"
+)
+@click.option(
+    "--socket", "socket_path", type=click.Path(), default=DEFAULT_SOCKET, show_default=True, help="Unix socket"
+)
+@click.option("--port", type=click.IntRange(1, 65535), help="Serve on localhost TCP instead of a Unix socket")
+@click.option(
+    "--should-be", type=click.Choice(SHOULD_BE_MODES), default="strict", show_default=True, help="SBO/SBZ bit handling"
+)
+@click.option("--profile", help='Target feature profile, e.g. "v8.5a + SVE2 - SME" (default: every feature)')
+@click.option(
+    "--cache-size", type=click.IntRange(min=0), default=65536, show_default=True, help="Decode cache words (0: off)"
+)
+def serve(
+    spec_file: str, socket_path: str, port: Optional[int], should_be: str, profile: Optional[str], cache_size: int
+) -> None:
+    """
+    Serve decode, disassemble and lookup requests from a warm decoder.
+    """
+    try:
+        target = load_profile(profile, spec_file) if profile else None
+        server = DecodeServer(Decoder.load(spec_file, should_be=should_be, profile=target, cache_size=cache_size))
+    except Exception as e:
+        click.echo(f"Error loading decoder: {e}", err=True)
+        exit(1)
+
+    click.echo(f"Listening on {f'127.0.0.1:{port}' if port else socket_path}", err=True)
+    try:
+        asyncio.run(server.serve(socket_path, port=port))
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        click.echo(f"Error serving: {e}", err=True)
+        exit(1)
+
+
+@main.command()
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False), default=DEFAULT_SPEC)
+@click.option(
+    "--backend",
+    "-b",
+    "backends",
+    multiple=True,
+    type=click.Choice(sorted(BACKENDS)),
+    help="Language to generate, may be repeated (default: all)",
+)
+@click.option("--output-dir", "-o", type=click.Path(file_okay=False), default="build", show_default=True)
+@click.option("--set", "instruction_set", default="A64", show_default=True, help="Instruction set")
+@click.option("--profile", help='Target feature profile, e.g. "v8.5a + SVE2 - SME" (default: every feature)')
+@click.option("--jobs", "-j", type=click.IntRange(min=0), default=0, show_default=True, help="Processes (0: all CPUs)")
+def generate(
+    input_file: str,
+    backends: Tuple[str, ...],
+    output_dir: str,
+    instruction_set: str,
+    profile: Optional[str],
+    jobs: int,
+) -> None:
+    """
+    Generate disassembler source for one or more languages from an MRS spec.
+
+    Args:
+        input_file: Path to the MRS Instructions.json or tarball
+    """
+    try:
+        start = time.perf_counter()
+        target = load_profile(profile, input_file) if profile else None
+        records = instruction_records(load_snapshot(flat_snapshot(input_file, instruction_set, target)))
+        context = {"source": Path(input_file).name, "instruction_set": instruction_set}
+        reports = generate_backends(records, list(backends) or sorted(BACKENDS), output_dir, context, jobs or None)
+        elapsed = time.perf_counter() - start
+    except Exception as e:
+        click.echo(f"Error generating disassemblers: {e}", err=True)
+        exit(1)
+
+    for report in reports:
+        click.echo(
+            f"{report.name:<8} {report.path} ({report.instructions} instructions): compile {report.compile_time:.3f}s, "
+            f"emit {report.emit_time:.3f}s, write {report.write_time:.3f}s",
+            err=True,
+        )
+    click.echo(f"{len(reports)} backends in {elapsed:.2f}s", err=True)
+
+
+@main.command()
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False), default=DEFAULT_SPEC)
+@click.option("--output", "-o", type=click.Path(dir_okay=False), default="decode.dtab", show_default=True)
+@click.option("--set", "instruction_set", default="A64", show_default=True, help="Instruction set")
+@click.option("--profile", help='Target feature profile, e.g. "v8.5a + SVE2 - SME" (default: every feature)')
+def table(input_file: str, output: str, instruction_set: str, profile: Optional[str]) -> None:
+    """
+    Write the binary decode table of an MRS spec, for generated disassemblers to map at startup.
+
+    Args:
+        input_file: Path to the MRS Instructions.json or tarball
+    """
+    try:
+        target = load_profile(profile, input_file) if profile else None
+        write_table(load_snapshot(decoder_snapshot(input_file, instruction_set, target)), output)
+        with DecodeTable(output) as written:
+            click.echo(
+                f"{output}: {len(written)} nodes, {written.field_count} fields, {written.cube_count} condition cubes",
+                err=True,
+            )
+    except Exception as e:
+        click.echo(f"Error writing decode table: {e}", err=True)
+        exit(1)
+
+
+@main.command()
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option(
+    "--spec", "spec_file", type=click.Path(exists=True), default=DEFAULT_SPEC, show_default=True, help="MRS spec"
+)
+@click.option("--count", "-n", type=click.IntRange(min=1), default=1000000, show_default=True, help="Words to write")
+@click.option("--seed", type=int, default=0, show_default=True, help="Seed of the generator")
+@click.option(
+    "--weights", type=click.Path(exists=True, dir_okay=False), help="Frequency profile (default: every instruction)"
+)
+@click.option("--set", "instruction_set", default="A64", show_default=True, help="Instruction set")
+@click.option("--profile", help='Target feature profile, e.g. "v8.5a + SVE2 - SME" (default: every feature)')
+def corpus(
+    output: str,
+    spec_file: str,
+    count: int,
+    seed: int,
+    weights: Optional[str],
+    instruction_set: str,
+    profile: Optional[str],
+) -> None:
+    """
+    Write a synthetic corpus of words that decode to valid instructions.
+
+    Instructions are picked uniformly, or by the weights of a frequency profile of ``name count`` lines or a
+    JSON object, and the corpus is written as a raw .bin file or, when OUTPUT ends in .npy, a NumPy array.
+
+    Args:
+        output: Path to the .bin or .npy file to write
+    """
+    try:
+        start = time.perf_counter()
+        target = load_profile(profile, spec_file) if profile else None
+        instructions = load_snapshot(flat_snapshot(spec_file, instruction_set, target))
+        sampler = CorpusSampler(instructions, load_frequencies(weights) if weights else None, seed)
+        sampler.write(output, count)
+        elapsed = time.perf_counter() - start
+    except Exception as e:
+        click.echo(f"Error generating corpus: {e}", err=True)
+        exit(1)
+
+    stats = sampler.stats
+    sampled = stats.weighted - len(stats.unreachable) - len(stats.unsampled)
+    click.echo(f"{count} words of {sampled} instructions in {elapsed:.2f}s", err=True)
+    if stats.unreachable:
+        click.echo(f"{len(stats.unreachable)} unreachable: {', '.join(stats.unreachable)}", err=True)
+    if stats.unsampled:
+        click.echo(f"{len(stats.unsampled)} not found within the search budget: {', '.join(stats.unsampled)}", err=True)
+
+
+@main.command("tree-stats")
+@click.option(
+    "--spec", "spec_file", type=click.Path(exists=True), default=DEFAULT_SPEC, show_default=True, help="MRS spec"
+)
+@click.option(
+    "--corpus", "corpus_file", type=click.Path(exists=True, dir_okay=False), help="Raw binary to measure on"
+)
+@click.option(
+    "--sample", type=click.Path(exists=True, dir_okay=False), help="Sample corpus of the profile strategy (raw binary)"
+)
+@click.option(
+    "--count", type=click.IntRange(min=1), default=100000, show_default=True, help="Words to generate without --corpus"
+)
+@click.option(
+    "--strategy", "strategies", type=click.Choice(STRATEGIES), multiple=True, help="Strategies (default: all)"
+)
+@click.option(
+    "--should-be", type=click.Choice(SHOULD_BE_MODES), default="strict", show_default=True, help="SBO/SBZ bit handling"
+)
+@click.option("--set", "instruction_set", default="A64", show_default=True, help="Instruction set")
+@click.option("--profile", help='Target feature profile, e.g. "v8.5a + SVE2 - SME" (default: every feature)')
+def tree_stats_command(
+    spec_file: str,
+    corpus_file: Optional[str],
+    sample: Optional[str],
+    count: int,
+    strategies: Tuple[str, ...],
+    should_be: str,
+    instruction_set: str,
+    profile: Optional[str],
+) -> None:
+    """
+    Compare the decode trees of every strategy on a corpus.
+
+    Reports the depth and node count of each tree, and the comparisons per word and words per second decoding
+    the corpus takes. Without --corpus a synthetic one is generated, and without --sample the profile strategy
+    is trained on the corpus itself.
+    """
+    try:
+        target = load_profile(profile, spec_file) if profile else None
+        tree = load_snapshot(decoder_snapshot(spec_file, instruction_set, target))
+        if corpus_file:
+            with map_words(corpus_file) as words:
+                corpus_words = list(words)
+        else:
+            instructions = load_snapshot(flat_snapshot(spec_file, instruction_set, target))
+            corpus_words = list(CorpusSampler(instructions).sample(count))
+        strategies = strategies or STRATEGIES
+        weights = None
+        if PROFILE in strategies:
+            if sample:
+                with map_words(sample) as words:
+                    weights = profile_weights(tree, words)
+            else:
+                weights = profile_weights(tree, corpus_words)
+
+        reports = []
+        for strategy in strategies:
+            start = time.perf_counter()
+            decoder = build_decoder(tree, strategy, should_be, weights=weights)
+            elapsed = time.perf_counter() - start
+            reports.append((tree_stats(strategy, decoder, corpus_words), elapsed))
+    except Exception as e:
+        click.echo(f"Error measuring decode trees: {e}", err=True)
+        exit(1)
+
+    click.echo(f"{'strategy':<10} {'build':>8} {'depth':>6} {'nodes':>8} {'comparisons':>12} {'words/s':>12}")
+    for stats, elapsed in reports:
+        click.echo(
+            f"{stats.strategy:<10} {elapsed:>7.2f}s {stats.depth:>6} {stats.nodes:>8} {stats.comparisons:>12.2f} "
+            f"{stats.words_per_second:>12,.0f}"
+        )
+    click.echo(f"{len(corpus_words)} words", err=True)
+
+
+@main.command()
+@click.option(
+    "--spec", "spec_file", type=click.Path(exists=True), default=DEFAULT_SPEC, show_default=True, help="MRS spec"
+)
+@click.option(
+    "--corpus", "corpus_file", type=click.Path(exists=True, dir_okay=False), help="Raw binary to decode"
+)
+@click.option(
+    "--count", type=click.IntRange(min=1), default=100000, show_default=True, help="Words to generate without --corpus"
+)
+@click.option("--seed", type=int, default=0, show_default=True, help="Seed of the generator")
+@click.option(
+    "--weights", type=click.Path(exists=True, dir_okay=False), help="Frequency profile of the generated corpus"
+)
+@click.option(
+    "--sample", type=click.Path(exists=True, dir_okay=False), help="Sample corpus of the profile strategy (raw binary)"
+)
+@click.option(
+    "--strategy", "strategies", type=click.Choice(STRATEGIES), multiple=True, help="Strategies (default: all)"
+)
+@click.option(
+    "--should-be", type=click.Choice(SHOULD_BE_MODES), default="strict", show_default=True, help="SBO/SBZ bit handling"
+)
+@click.option(
+    "--cache-size", type=click.IntRange(min=0), default=0, show_default=True, help="Decode cache words (0: off)"
+)
+@click.option("--set", "instruction_set", default="A64", show_default=True, help="Instruction set")
+@click.option("--profile", help='Target feature profile, e.g. "v8.5a + SVE2 - SME" (default: every feature)')
+def bench(
+    spec_file: str,
+    corpus_file: Optional[str],
+    count: int,
+    seed: int,
+    weights: Optional[str],
+    sample: Optional[str],
+    strategies: Tuple[str, ...],
+    should_be: str,
+    cache_size: int,
+    instruction_set: str,
+    profile: Optional[str],
+) -> None:
+    """
+    Check every decoding strategy against the linear-scan reference decoder.
+
+    Each strategy decodes the same corpus as the reference decoder, which tests the instructions one by one in
+    decode order, and reports its throughput, its speedup and the words it decodes differently. Without
+    --corpus a synthetic corpus is generated. Exits with 1 if any strategy disagrees with the reference.
+    """
+    try:
+        target = load_profile(profile, spec_file) if profile else None
+        tree = load_snapshot(decoder_snapshot(spec_file, instruction_set, target))
+        if corpus_file:
+            with map_words(corpus_file) as words:
+                corpus_words = list(words)
+        else:
+            instructions = load_snapshot(flat_snapshot(spec_file, instruction_set, target))
+            frequencies = load_frequencies(weights) if weights else None
+            corpus_words = list(CorpusSampler(instructions, frequencies, seed).sample(count))
+        strategies = strategies or STRATEGIES
+        trained = None
+        if PROFILE in strategies:
+            if sample:
+                with map_words(sample) as words:
+                    trained = profile_weights(tree, words)
+            else:
+                trained = profile_weights(tree, corpus_words)
+
+        reference = ReferenceDecoder(tree, should_be)
+        decoders = {
+            strategy: build_decoder(tree, strategy, should_be, cache_size, trained) for strategy in strategies
+        }
+        results = compare_decoders(reference, decoders, corpus_words)
+    except Exception as e:
+        click.echo(f"Error benchmarking decoders: {e}", err=True)
+        exit(1)
+
+    click.echo(f"{'decoder':<10} {'words/s':>12} {'speedup':>8} {'agreed':>10} {'disagreed':>10}")
+    for result in results:
+        click.echo(
+            f"{result.name:<10} {result.words_per_second:>12,.0f} {result.speedup:>7.1f}x {result.agreed:>10} "
+            f"{result.disagreed:>10}"
+        )
+    for result in results:
+        for word, expected, got in result.mismatches:
+            click.echo(f"{result.name}: {word:08x} is {expected}, decoded as {got}", err=True)
+    if any(result.disagreed for result in results):
+        exit(1)
+
+
+@main.command()
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False), default=DEFAULT_SPEC)
+@click.option("--set", "instruction_set", default="A64", show_default=True, help="Instruction set")
+@click.option(
+    "--should-be", type=click.Choice(SHOULD_BE_MODES), default="strict", show_default=True, help="SBO/SBZ bit handling"
+)
+@click.option("--profile", help='Target feature profile, e.g. "v8.5a + SVE2 - SME" (default: every feature)')
+@click.option("--depth", type=click.IntRange(min=0), help="Deepest group level to report (default: all)")
+def coverage(
+    input_file: str, instruction_set: str, should_be: str, profile: Optional[str], depth: Optional[int]
+) -> None:
+    """
+    Count the allocated, overlapped, conditional and unallocated encodings of an instruction set and its groups.
+
+    Args:
+        input_file: Path to the MRS Instructions.json
+    """
+    try:
+        start = time.perf_counter()
+        target = load_profile(profile, input_file) if profile else None
+        tree = load_snapshot(decoder_snapshot(input_file, instruction_set, target))
+        report = encoding_coverage(tree, instruction_set, should_be)
+        elapsed = time.perf_counter() - start
+    except Exception as e:
+        click.echo(f"Error computing coverage: {e}", err=True)
+        exit(1)
+
+    columns = ("space", "allocated", "overlapped", "conditional", "unallocated")
+    click.echo(f"{'name':<40} {columns[0]:>13}  " + "  ".join(f"{column:>21}" for column in columns[1:]))
+    for item in report:
+        if depth is None or item.depth <= depth:
+            click.echo(str(item))
+    click.echo(f"{len(report) - 1} groups in {elapsed:.2f}s", err=True)
+
+
+@main.command()
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False), default=DEFAULT_SPEC)
+@click.option("--memory", is_flag=True, help="Report where the memory of the loaded spec goes (traces allocations)")
+@click.option("--set", "instruction_set", default="A64", show_default=True, help="Instruction set of the decode tree")
+@click.option("--top", type=click.IntRange(min=0), default=10, show_default=True, help="Duplicated values to list")
+def stats(input_file: str, memory: bool, instruction_set: str, top: int) -> None:
+    """
+    Count the models of an MRS spec, or with --memory report the memory they hold.
+
+    The memory report breaks the loaded spec down by model type and instruction set, traces the allocations
+    of every loading phase and lists the duplicated strings and dicts that interning would remove.
+
+    Args:
+        input_file: Path to the MRS Instructions.json or tarball
+    """
+    try:
+        start = time.perf_counter()
+        if memory:
+            report = memory_report(input_file, instruction_set, top)
+        else:
+            spec = MRSSpec(input_file)
+        elapsed = time.perf_counter() - start
+    except Exception as e:
+        click.echo(f"Error loading spec: {e}", err=True)
+        exit(1)
+
+    if not memory:
+        for instruction_set_item in spec.instructions.instructions:
+            groups = instructions = 0
+            stack = list(instruction_set_item.children)
+            while stack:
+                item = stack.pop()
+                if isinstance(item, InstructionGroup):
+                    groups += 1
+                    stack.extend(item.children)
+                else:
+                    instructions += 1
+            click.echo(f"{instruction_set_item.name:<12} {groups:>6} groups {instructions:>6} instructions")
+        operations = len(spec.instructions.operations)
+        click.echo(f"{operations} operations, {len(spec.instructions.assembly_rules)} assembly rules")
+        click.echo(f"Loaded in {elapsed:.2f}s", err=True)
+        return
+
+    click.echo(f"{'type':<20} {'objects':>10} {'size':>12} {'share':>7}")
+    for name, usage in sorted(report.by_type.items(), key=lambda item: item[1].size, reverse=True):
+        share = usage.size / report.total if report.total else 0
+        click.echo(f"{name:<20} {usage.objects:>10} {format_size(usage.size):>12} {share:>7.1%}")
+    click.echo(f"{'total':<20} {'':>10} {format_size(report.total):>12}")
+
+    click.echo(f"\n{'instruction set':<20} {'objects':>10} {'size':>12}")
+    for name, usage in report.by_set.items():
+        click.echo(f"{name:<20} {usage.objects:>10} {format_size(usage.size):>12}")
+
+    click.echo(f"\n{'phase':<20} {'time':>8} {'current':>12} {'peak':>12}  largest allocation sites")
+    for phase in report.phases:
+        sites = ", ".join(f"{site} +{format_size(size)}" for site, size in phase.top)
+        click.echo(
+            f"{phase.name:<20} {phase.elapsed:>7.2f}s {format_size(phase.current):>12} {format_size(phase.peak):>12}"
+            f"  {sites}"
+        )
+
+    wasted = ", ".join(f"{format_size(size)} in {kind} copies" for kind, size in report.wasted.items())
+    click.echo(f"\nInterning would free {wasted}")
+    for duplicate in report.duplicates:
+        click.echo(f"{duplicate.kind:<5}{duplicate.copies:>8}x {format_size(duplicate.wasted):>12}  {duplicate.sample}")
+    click.echo(f"Measured in {elapsed:.2f}s", err=True)
+
+
+@main.command()
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False), default=DEFAULT_SPEC)
+@click.option(
+    "--xml", "xml_path", type=click.Path(exists=True), required=True, help="ISA XML file, directory or tarball"
+)
+@click.option("--set", "instruction_set", default="A64", show_default=True, help="Instruction set")
+@click.option("--jobs", "-j", type=click.IntRange(min=0), default=0, show_default=True, help="Processes (0: all CPUs)")
+def crosscheck(input_file: str, xml_path: str, instruction_set: str, jobs: int) -> None:
+    """
+    Cross-check the encodings of an MRS spec against the ISA XML release.
+
+    Reports mismatched fixed bits, field name differences and encodings missing from either side.
+
+    Args:
+        input_file: Path to the MRS Instructions.json or tarball
+    """
+    try:
+        start = time.perf_counter()
+        mrs = mrs_signatures(MRSSpec(input_file), instruction_set)
+        xml = xml_signatures(load_isa(xml_path, jobs=jobs or None))
+        report = cross_check(mrs, xml)
+        elapsed = time.perf_counter() - start
+    except Exception as e:
+        click.echo(f"Error cross-checking specs: {e}", err=True)
+        exit(1)
+
+    for mismatch in report.mismatches:
+        click.echo(str(mismatch))
+    click.echo(
+        f"{report.mrs} MRS and {report.xml} XML encodings, {report.matched} matched, "
+        f"{len(report.mismatches)} mismatches in {elapsed:.2f}s",
+        err=True,
+    )
+    if report.mismatches:
+        exit(1)
+
+
+@main.command()
+@click.argument("patterns", nargs=-1)
+@click.option(
+    "--spec", "spec_file", type=click.Path(exists=True), default=DEFAULT_SPEC, show_default=True, help="MRS spec"
+)
+@click.option(
+    "--file", "pattern_file", type=click.Path(exists=True, dir_okay=False), help="File of patterns, one per line"
+)
+@click.option(
+    "--should-be", type=click.Choice(SHOULD_BE_MODES), default="strict", show_default=True, help="SBO/SBZ bit handling"
+)
+@click.option("--set", "instruction_set", default="A64", show_default=True, help="Instruction set")
+@click.option("--profile", help='Target feature profile, e.g. "v8.5a + SVE2 - SME" (default: every feature)')
+def match(
+    patterns: Tuple[str, ...],
+    spec_file: str,
+    pattern_file: Optional[str],
+    should_be: str,
+    instruction_set: str,
+    profile: Optional[str],
+) -> None:
+    """
+    List the instructions compatible with partially known instruction words.
+
+    A pattern is 0x-prefixed hexadecimal or binary, most significant bit first, where any character but 0 and
+    1 is an unknown bit and _ separates digits, e.g. 0b1101_0101_0000_0011_xxxx_xxxx_xxx1_1111. Should-be bits
+    only count as fixed bits of an instruction with --should-be strict.
+
+    Args:
+        patterns: Ternary instruction patterns
+    """
+    queries = list(patterns)
+    if pattern_file:
+        with open(pattern_file) as f:
+            queries.extend(line.split("#", 1)[0].strip() for line in f)
+        queries = [query for query in queries if query]
+    if not queries:
+        raise click.UsageError("no pattern given")
+    try:
+        parsed = [parse_pattern(query) for query in queries]
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="PATTERNS")
+    try:
+        target = load_profile(profile, spec_file) if profile else None
+        index = PatternIndex(load_snapshot(flat_snapshot(spec_file, instruction_set, target)), should_be == "strict")
+    except Exception as e:
+        click.echo(f"Error indexing instructions: {e}", err=True)
+        exit(1)
+
+    for query, (mask, value) in zip(queries, parsed):
+        found = index.query(mask, value)
+        if not found:
+            click.echo(f"{query}  <none>")
+        for instruction in found:
+            click.echo(
+                f"{query}  {instruction.name:<40} {format_pattern(*index.bits_of(instruction))} {instruction.template}"
+            )
+
+
+@main.command()
+@click.argument("input_files", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--pattern", "-e", "patterns", multiple=True, required=True, help='Pattern, e.g. "ldp Rn=31 ; ret"'
+)
+@click.option(
+    "--spec", "spec_file", type=click.Path(exists=True), default=DEFAULT_SPEC, show_default=True, help="MRS spec"
+)
+@click.option("--offset", callback=parse_int, default="0", show_default=True, help="File offset to start at")
+@click.option("--length", callback=parse_int, help="Number of bytes to scan (defaults to the rest of the file)")
+@click.option(
+    "--should-be", type=click.Choice(SHOULD_BE_MODES), default="strict", show_default=True, help="SBO/SBZ bit handling"
+)
+@click.option("--set", "instruction_set", default="A64", show_default=True, help="Instruction set")
+@click.option("--profile", help='Target feature profile, e.g. "v8.5a + SVE2 - SME" (default: every feature)')
+def grep(
+    input_files: Tuple[str, ...],
+    patterns: Tuple[str, ...],
+    spec_file: str,
+    offset: int,
+    length: Optional[int],
+    should_be: str,
+    instruction_set: str,
+    profile: Optional[str],
+) -> None:
+    """
+    Scan raw AARCH64 code blobs for instruction sequences.
+
+    A pattern is a sequence of instructions separated by ";", each a mnemonic or instruction name followed by
+    optional FIELD=VALUE operand field constraints, or a raw ternary pattern as taken by match. Every match is
+    printed with its file offset and disassembly. Words are compared with NumPy when it is installed.
+
+    Args:
+        input_files: Paths to the raw binaries
+    """
+    try:
+        target = load_profile(profile, spec_file) if profile else None
+        instructions = load_snapshot(flat_snapshot(spec_file, instruction_set, target))
+        compiled = [compile_pattern(pattern, instructions, should_be == "strict") for pattern in patterns]
+        decoder = Decoder.load(spec_file, instruction_set, should_be=should_be, profile=target)
+        scanner = Scanner(compiled, decoder)
+    except Exception as e:
+        click.echo(f"Error compiling patterns: {e}", err=True)
+        exit(1)
+
+    matches = 0
+    try:
+        for input_file in input_files:
+            prefix = f"{input_file}:" if len(input_files) > 1 else ""
+            with map_words(input_file, offset, length) as words:
+                for found in scanner.scan(words):
+                    matches += 1
+                    text = " ; ".join(decoder.disassemble(word) for word in found.words)
+                    click.echo(f"{prefix}{offset + 4 * found.index:#010x}  {text}")
+    except Exception as e:
+        click.echo(f"Error scanning: {e}", err=True)
+        exit(1)
+    click.echo(f"{matches} matches", err=True)
+
+
+@main.command("xml-match")
+@click.argument("xml_path", type=click.Path(exists=True))
+@click.argument("words", nargs=-1, required=True)
+@click.option("--all", "show_all", is_flag=True, help="List every matching encoding, not only the most specific")
+@click.option("--jobs", "-j", type=click.IntRange(min=0), default=0, show_default=True, help="Processes (0: all CPUs)")
+def xml_match(xml_path: str, words: Tuple[str, ...], show_all: bool, jobs: int) -> None:
+    """
+    Match instruction words against the encodings of the ISA XML release.
+
+    Args:
+        xml_path: ISA XML file, directory or tarball
+        words: Instruction words, decimal or 0x-prefixed hexadecimal
+    """
+    try:
+        values = [int(word, 0) for word in words]
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="WORDS")
+    try:
+        start = time.perf_counter()
+        index = EncodingIndex.load(xml_path, jobs=jobs or None)
+        elapsed = time.perf_counter() - start
+    except Exception as e:
+        click.echo(f"Error loading ISA XML: {e}", err=True)
+        exit(1)
+
+    click.echo(f"Indexed {len(index)} encodings under {len(index.masks)} masks in {elapsed:.2f}s", err=True)
+    for word in values:
+        found = index.match(word) if show_all else [index.lookup(word)]
+        if not found or found[0] is None:
+            click.echo(f"{word:08x}  <unallocated>")
+            continue
+        for instruction, encoding in found:
+            click.echo(f"{word:08x}  {encoding.name:<40} {encoding.assembly_template} ({instruction.id})")
+
+
+@main.command()
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False), default=DEFAULT_SPEC)
+@click.option("--sample", type=click.FloatRange(0, 1, min_open=True), help="Fraction of changed subtrees to validate")
+@click.option("--seed", type=int, default=0, show_default=True, help="Seed of the sample")
+@click.option("--engine", type=click.Choice(["compiled", "pydantic"]), default="compiled", show_default=True)
+@click.option("--no-cache", is_flag=True, help="Validate every subtree, even those that passed before")
+def validate(input_file: str, sample: Optional[float], seed: int, engine: str, no_cache: bool) -> None:
+    """
+    Validate the AST subtrees of an MRS JSON spec against the schema models.
+
+    Args:
+        input_file: Path to the input JSON file
+    """
+    try:
+        start = time.perf_counter()
+        if is_archive(input_file):
+            data = json.loads(read_member(input_file, "Instructions.json"))
+        else:
+            with open(input_file) as f:
+                data = json.load(f)
+        report = SpecValidator(engine=engine).validate(data, sample, seed, use_cache=not no_cache)
+        elapsed = time.perf_counter() - start
+    except ImportError as e:
+        click.echo(f"Error validating spec: {e}, the pydantic engine needs disassegen[validate]", err=True)
+        exit(1)
+    except Exception as e:
+        click.echo(f"Error validating spec: {e}", err=True)
+        exit(1)
+
+    for violation in report.violations:
+        click.echo(str(violation))
+    click.echo(
+        f"{report.subtrees} subtrees, {report.unique} unique, {report.cached} cached, {report.skipped} skipped, "
+        f"{report.validated} validated, {len(report.violations)} violations in {elapsed:.2f}s",
+        err=True,
+    )
+    if report.violations:
+        exit(1)
+
+
+@main.command()
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False), default=DEFAULT_SPEC)
+@click.option("--jobs", "-j", type=click.IntRange(min=0), default=0, show_default=True, help="Processes (0: all CPUs)")
+@click.option("--dump", "dump_id", help="Print the parsed trees of an operation as JSON")
+@click.option("--no-cache", is_flag=True, help="Parse every snippet, even those parsed before")
+def asl(input_file: str, jobs: int, dump_id: Optional[str], no_cache: bool) -> None:
+    """
+    Parse the ASL pseudocode of an MRS JSON or ISA XML spec.
+
+    Args:
+        input_file: Path to the input JSON or XML file, or to a spec tarball
+    """
+    try:
+        start = time.perf_counter()
+        cache = ParseCache() if no_cache else ParseCache().load()
+        if input_file.endswith(".xml") or is_isa_archive(input_file):
+            if input_file.endswith(".xml"):
+                instructions = [ISASpec(input_file).instruction]
+            else:
+                instructions = load_isa_archive(input_file, jobs=jobs or None)
+            sections = [
+                section
+                for instruction in instructions
+                for iclass in instruction.instruction_classes
+                for section in iclass.pseudocode
+            ]
+            trees = {
+                f"{section.name}/{section.section_type}": {section.section_type: tree}
+                for section, tree in parse_pseudocode(sections, cache, jobs or None)
+            }
+        else:
+            trees = parse_operations(MRSSpec(input_file).instructions.operations, cache, jobs or None)
+        elapsed = time.perf_counter() - start
+    except Exception as e:
+        click.echo(f"Error parsing pseudocode: {e}", err=True)
+        exit(1)
+
+    if dump_id:
+        if dump_id not in trees:
+            click.echo(f"Unknown operation {dump_id}", err=True)
+            exit(1)
+        click.echo(json.dumps(trees[dump_id], indent=2))
+    failed = [f"{name} {part}" for name, parts in trees.items() for part, tree in parts.items() if tree is None]
+    for name in failed:
+        click.echo(f"Failed to parse {name}", err=True)
+    click.echo(
+        f"{len(trees)} operations, {cache.hits} cached, {cache.misses} parsed, {len(failed)} failed in {elapsed:.2f}s",
+        err=True,
+    )
+
+
+@main.command()
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--spec", "spec_file", type=click.Path(exists=True), default=DEFAULT_SPEC, show_default=True, help="MRS spec"
+)
+@click.option("--base", callback=parse_int, default="0x10000", show_default=True, help="Address to load the blob at")
+@click.option("--entry", callback=parse_int, help="Address to start at (defaults to the base)")
+@click.option("--count", type=click.IntRange(min=1), help="Stop after this many instructions")
+@click.option("--until", callback=parse_int, help="Stop when the PC reaches this address")
+@click.option("--stack", callback=parse_int, default="0x7ff000000000", show_default=True, help="Top of the stack")
+def emulate(
+    input_file: str,
+    spec_file: str,
+    base: int,
+    entry: Optional[int],
+    count: Optional[int],
+    until: Optional[int],
+    stack: int,
+) -> None:
+    """
+    Run a raw AARCH64 code blob in the user-mode emulator.
+
+    Args:
+        input_file: Path to the raw binary
+    """
+    try:
+        # The decode tree and the pseudocode both come from the one loaded spec
+        spec = MRSSpec(spec_file)
+        operations = spec.instructions.operations
+        emulator = Emulator(
+            Decoder.from_spec(spec), DecodeSemantics(operations, jobs=None), OperationSemantics(operations, jobs=None)
+        )
+        with open(input_file, "rb") as f:
+            emulator.memory.load(base, f.read())
+        emulator.memory.map(stack - 16 * PAGE_SIZE, 16 * PAGE_SIZE)
+        emulator.sp = stack
+    except Exception as e:
+        click.echo(f"Error loading emulator: {e}", err=True)
+        exit(1)
+
+    start = time.perf_counter()
+    status = 0
+    try:
+        emulator.run(entry if entry is not None else base, count, until)
+    except SupervisorCall as e:
+        click.echo(f"Stopped at {e} before {emulator.pc:#x}", err=True)
+    except (ASLException, MemoryFault) as e:
+        click.echo(f"Stopped at {emulator.pc:#x}: {e}", err=True)
+        status = 1
+    elapsed = time.perf_counter() - start
+
+    for i in range(0, 31, 2):
+        click.echo("  ".join(f"x{n:<2} {emulator.x[n]:#018x}" for n in range(i, min(i + 2, 31))))
+    click.echo(f"sp  {emulator.sp:#018x}  pc  {emulator.pc:#018x}  nzcv {emulator.nzcv:04b}")
+    counters = emulator.counters
+    click.echo(
+        f"{counters['instructions']} instructions in {elapsed:.2f}s, {counters['translated']} blocks translated, "
+        f"{counters['hits']} block cache hits, {counters['invalidations']} invalidations",
+        err=True,
+    )
+    if status:
+        exit(status)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,197 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from ..snapshot import CACHE_DIR, load_snapshot, save_snapshot
+from .parser import ASLSyntaxError, parse, source_text
+
+# Bump when the shape of the parsed AST changes so stale caches are ignored
+PARSER_VERSION = 2
+
+# Snippets handed to a worker process at once
+BATCH_SIZE = 64
+
+
+def source_hash(source: str) -> str:
+    """Get the cache key of a pseudocode snippet."""
+    return hashlib.sha1(source.encode()).hexdigest()
+
+
+def _parse_batch(sources: List[str]) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    results = []
+    for source in sources:
+        try:
+            results.append((parse(source), None))
+        except ASLSyntaxError as e:
+            results.append((None, str(e)))
+    return results
+
+
+class ParseCache(object):
+    """
+    Memoizing cache of parsed ASL keyed by a hash of the source.
+
+    Identical snippets, such as the decode pseudocode shared by the encodings of an instruction, are parsed
+    once. The cache is stored in the snapshot directory so later runs skip parsing altogether.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        """
+        Prepare a cache.
+
+        Args:
+            path (Optional[Union[str, Path]], optional): Where the cache is stored. Defaults to a file in the
+                snapshot cache directory.
+        """
+        self.path = Path(path) if path else CACHE_DIR / f"asl-{PARSER_VERSION}.snap"
+        self.trees: Dict[str, Dict[str, Any]] = {}
+        self.errors: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+
+    def load(self) -> "ParseCache":
+        """Load the stored cache, if there is a usable one."""
+        try:
+            self.trees, self.errors = load_snapshot(self.path)
+        except (OSError, ValueError):
+            pass
+        return self
+
+    def save(self) -> None:
+        """Store the cache if anything was parsed since it was loaded."""
+        if self._dirty:
+            save_snapshot((self.trees, self.errors), self.path)
+            self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self.trees) + len(self.errors)
+
+    def _store(self, key: str, tree: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        if error is None:
+            self.trees[key] = tree
+        else:
+            self.errors[key] = error
+        self._dirty = True
+
+    def parse(self, source: str) -> Dict[str, Any]:
+        """
+        Parse a snippet, reusing the cached tree of identical source.
+
+        Args:
+            source (str): The pseudocode
+
+        Raises:
+            ASLSyntaxError: If the snippet cannot be parsed
+
+        Returns:
+            Dict[str, Any]: An AST.StatementBlock
+        """
+        key = source_hash(source)
+        if key in self.trees:
+            self.hits += 1
+            return self.trees[key]
+        if key in self.errors:
+            self.hits += 1
+            raise ASLSyntaxError(self.errors[key])
+
+        self.misses += 1
+        try:
+            tree = parse(source)
+        except ASLSyntaxError as e:
+            self._store(key, None, str(e))
+            raise
+        self._store(key, tree, None)
+        return tree
+
+    def parse_all(self, sources: Iterable[str], jobs: Optional[int] = 1) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Parse many snippets, spreading the ones not in the cache over a process pool.
+
+        Args:
+            sources (Iterable[str]): The pseudocode snippets
+            jobs (Optional[int], optional): Number of worker processes, None for one per CPU. Defaults to 1.
+
+        Returns:
+            Dict[str, Optional[Dict[str, Any]]]: The tree of every distinct snippet, or None when it could not
+                be parsed, see ``errors``
+        """
+        unique = {source_hash(source): source for source in sources}
+        missing = [key for key in unique if key not in self.trees and key not in self.errors]
+        self.hits += len(unique) - len(missing)
+        self.misses += len(missing)
+
+        batches = [missing[i : i + BATCH_SIZE] for i in range(0, len(missing), BATCH_SIZE)]
+        jobs = jobs or os.cpu_count() or 1
+        if jobs > 1 and len(batches) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                parsed = pool.map(_parse_batch, [[unique[key] for key in batch] for batch in batches])
+                for batch, results in zip(batches, parsed):
+                    for key, (tree, error) in zip(batch, results):
+                        self._store(key, tree, error)
+        else:
+            for batch in batches:
+                for key, (tree, error) in zip(batch, _parse_batch([unique[key] for key in batch])):
+                    self._store(key, tree, error)
+
+        return {source: self.trees.get(key) for key, source in unique.items()}
+
+
+def parse_operations(
+    operations: Dict[str, Any], cache: Optional[ParseCache] = None, jobs: Optional[int] = 1
+) -> Dict[str, Dict[str, Optional[Dict[str, Any]]]]:
+    """
+    Parse the decode and operation pseudocode of the operations of an MRS spec.
+
+    Args:
+        operations (Dict[str, Any]): The ``operations`` of the spec's Instructions
+        cache (Optional[ParseCache], optional): The parse cache to use. Defaults to the stored cache.
+        jobs (Optional[int], optional): Number of worker processes, None for one per CPU. Defaults to 1.
+
+    Returns:
+        Dict[str, Dict[str, Optional[Dict[str, Any]]]]: The "decode" and "operation" trees of every operation
+            that has pseudocode, None for the snippets that could not be parsed
+    """
+    if cache is None:
+        cache = ParseCache().load()
+
+    sources = {}
+    for operation_id, operation in operations.items():
+        if not hasattr(operation, "operation"):
+            # Aliases point at another operation
+            continue
+        sources[operation_id] = {
+            "decode": source_text(operation.decode),
+            "operation": source_text(operation.operation),
+        }
+
+    trees = cache.parse_all((text for parts in sources.values() for text in parts.values()), jobs)
+    cache.save()
+    return {
+        operation_id: {part: trees[text] for part, text in parts.items()} for operation_id, parts in sources.items()
+    }
+
+
+def parse_pseudocode(
+    sections: Iterable[Any], cache: Optional[ParseCache] = None, jobs: Optional[int] = 1
+) -> List[Tuple[Any, Optional[Dict[str, Any]]]]:
+    """
+    Parse the pseudocode sections of an ISA XML instruction.
+
+    Args:
+        sections (Iterable[Any]): The PseudoCode sections, e.g. of every InstructionClass
+        cache (Optional[ParseCache], optional): The parse cache to use. Defaults to the stored cache.
+        jobs (Optional[int], optional): Number of worker processes, None for one per CPU. Defaults to 1.
+
+    Returns:
+        List[Tuple[Any, Optional[Dict[str, Any]]]]: Every section with its tree, None if it could not be parsed
+    """
+    if cache is None:
+        cache = ParseCache().load()
+
+    sections = list(sections)
+    trees = cache.parse_all((section.code for section in sections), jobs)
+    cache.save()
+    return [(section, trees[section.code]) for section in sections]
@@ -0,0 +1,515 @@
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from ..decoder import parse_value
+from ..features import FeatureProfile
+from . import runtime
+from .cache import ParseCache, parse_operations
+
+# Runtime helpers every compiled function can reach
+HELPERS = {
+    "Bits": runtime.Bits,
+    "Undefined": runtime.Undefined,
+    "Unpredictable": runtime.Unpredictable,
+    "See": runtime.See,
+    "ASLException": runtime.ASLException,
+    "_add": runtime.add,
+    "_sub": runtime.sub,
+    "_and": runtime.and_,
+    "_or": runtime.or_,
+    "_xor": runtime.xor,
+    "_divide": runtime.divide,
+    "_str_concat": runtime.str_concat,
+    "_not": runtime.not_,
+    "_concat": runtime.concat,
+    "_slice": runtime.bit_slice,
+    "_set_slice": runtime.set_slice,
+    "_match": runtime.match,
+    "_unknown": runtime.unknown,
+    "_NO_STATE": runtime.State(),
+}
+
+# Globals of the machine state that are read like variables
+STATE_GLOBALS = {"PC64", "PC"}
+
+# Operators that map directly onto Python
+PYTHON_OPS = {
+    "==": "==",
+    "!=": "!=",
+    "<": "<",
+    ">": ">",
+    "<=": "<=",
+    ">=": ">=",
+    "*": "*",
+    "DIV": "//",
+    "DIVRM": "//",
+    "MOD": "%",
+    "<<": "<<",
+    ">>": ">>",
+    "^": "**",
+    "&&": "and",
+    "||": "or",
+    "<->": "==",
+}
+HELPER_OPS = {
+    "+": "_add",
+    "-": "_sub",
+    "AND": "_and",
+    "OR": "_or",
+    "XOR": "_xor",
+    "/": "_divide",
+    "++": "_str_concat",
+}
+
+
+class ASLCompileError(ValueError):
+    """Raised when pseudocode uses a construct that cannot be compiled."""
+
+
+def _assigned(node: Any, names: Set[str]) -> None:
+    """Collect the names a subtree declares or assigns."""
+    if isinstance(node, list):
+        for item in node:
+            _assigned(item, names)
+        return
+    if not isinstance(node, dict):
+        return
+    kind = node.get("_type")
+    if kind == "AST.Declaration":
+        names.update(node["names"])
+    elif kind == "AST.For":
+        names.add(node["var"])
+    elif kind == "AST.Assignment":
+        targets = [node["var"]]
+        while targets:
+            target = targets.pop()
+            if target.get("_type") == "AST.Identifier" and target["value"] != "-":
+                names.add(target["value"])
+            elif target.get("_type") == "AST.Tuple":
+                targets.extend(target["values"])
+            elif target.get("_type") == "AST.BitSlice":
+                targets.append(target["var"])
+    for key, value in node.items():
+        if key != "_type":
+            _assigned(value, names)
+
+
+def _referenced(node: Any, names: Set[str]) -> None:
+    """Collect the identifiers a subtree reads."""
+    if isinstance(node, list):
+        for item in node:
+            _referenced(item, names)
+    elif isinstance(node, dict):
+        if node.get("_type") == "AST.Identifier" and node["value"] != "-":
+            names.add(node["value"])
+        for key, value in node.items():
+            if key != "_type":
+                _referenced(value, names)
+
+
+class Compiler(object):
+    """Compiles a parsed ASL block into a Python function."""
+
+    def __init__(self, features: Optional[FeatureProfile] = None):
+        """
+        Prepare a compiler.
+
+        Args:
+            features (Optional[FeatureProfile], optional): Profile that answers IsFeatureImplemented, every
+                feature is implemented without one. Defaults to None.
+        """
+        self.features = features
+        self.lines: List[str] = []
+        self.constants: Dict[str, Any] = {}
+        self.temps = 0
+        self.result = "{}"
+        self.locals: Set[str] = set()
+
+    def constant(self, value: Any) -> str:
+        name = f"_k{len(self.constants)}"
+        self.constants[name] = value
+        return name
+
+    def temp(self) -> str:
+        self.temps += 1
+        return f"_t{self.temps}"
+
+    def emit(self, depth: int, line: str) -> None:
+        self.lines.append("    " * depth + line)
+
+    def compile(
+        self, tree: Dict[str, Any], name: str = "decode"
+    ) -> Callable[[Dict[str, Any], runtime.State], Dict[str, Any]]:
+        """
+        Compile a decode or operation block.
+
+        Args:
+            tree (Dict[str, Any]): The AST.StatementBlock from the ASL parser
+            name (str, optional): Name of the operation, used in tracebacks. Defaults to "decode".
+
+        Raises:
+            ASLCompileError: If the block uses a construct that cannot be compiled
+
+        Returns:
+            Callable[[Dict[str, Any], runtime.State], Dict[str, Any]]: A function from the variables in scope,
+                e.g. the encoding fields as Bits, and an optional machine state to the values of every variable
+                the block assigns
+        """
+        assigned: Set[str] = set()
+        referenced: Set[str] = set()
+        _assigned(tree, assigned)
+        _referenced(tree, referenced)
+        self.locals = assigned
+
+        self.result = "{" + ", ".join(f"{v!r}: v_{v}" for v in sorted(assigned)) + "}"
+        self.emit(0, "def _run(fields, _state=_NO_STATE):")
+        # Names that are neither assigned nor fields are enumeration constants such as ShiftType_LSL
+        for v in sorted(assigned | referenced - STATE_GLOBALS):
+            self.emit(1, f"v_{v} = fields.get({v!r}, {'None' if v in assigned else repr(v)})")
+        self.block(tree, 1)
+        self.emit(1, f"return {self.result}")
+
+        namespace = dict(HELPERS)
+        namespace.update({f"f_{fn}": function for fn, function in runtime.FUNCTIONS.items()})
+        namespace.update(self.constants)
+        implements = self.features.implements if self.features is not None else lambda feature: True
+        namespace["f_IsFeatureImplemented"] = namespace["f_HaveFeature"] = implements
+        exec(compile("\n".join(self.lines), f"<asl {name}>", "exec"), namespace)
+        return namespace["_run"]
+
+    # Statements
+
+    def block(self, block: Optional[Dict[str, Any]], depth: int) -> None:
+        statements = block["statements"] if block else []
+        if not statements:
+            self.emit(depth, "pass")
+        for statement in statements:
+            self.statement(statement, depth)
+
+    def statement(self, node: Dict[str, Any], depth: int) -> None:
+        kind = node["_type"]
+
+        if kind == "AST.Declaration":
+            var_type = node.get("type")
+            for v in node["names"]:
+                if node.get("value") is not None:
+                    value = self.expression(node["value"])
+                else:
+                    value = self.default(var_type)
+                self.emit(depth, f"v_{v} = {value}")
+        elif kind == "AST.Assignment":
+            self.assignment(node["var"], self.expression(node["val"]), depth)
+        elif kind == "AST.ProcedureCall":
+            self.emit(depth, self.expression(node["call"]))
+        elif kind == "AST.If":
+            self.emit(depth, f"if {self.expression(node['condition'])}:")
+            self.block(node["then"], depth + 1)
+            otherwise = node.get("else")
+            if otherwise and otherwise["statements"]:
+                self.emit(depth, "else:")
+                self.block(otherwise, depth + 1)
+        elif kind == "AST.Case":
+            subject = self.temp()
+            self.emit(depth, f"{subject} = {self.expression(node['expr'])}")
+            keyword = "if"
+            for when in node["whens"]:
+                test = " or ".join(self.pattern(subject, pattern) for pattern in when["patterns"])
+                if when.get("where") is not None:
+                    test = f"({test}) and {self.expression(when['where'])}"
+                self.emit(depth, f"{keyword} {test}:")
+                self.block(when["body"], depth + 1)
+                keyword = "elif"
+            if node.get("otherwise") is not None:
+                if keyword == "if":
+                    self.block(node["otherwise"], depth)
+                else:
+                    self.emit(depth, "else:")
+                    self.block(node["otherwise"], depth + 1)
+        elif kind == "AST.For":
+            start = self.expression(node["start"])
+            stop = self.expression(node["stop"])
+            span = f"{start}, {stop} + 1" if node["direction"] == "to" else f"{start}, {stop} - 1, -1"
+            self.emit(depth, f"for v_{node['var']} in range({span}):")
+            self.block(node["body"], depth + 1)
+        elif kind == "AST.While":
+            self.emit(depth, f"while {self.expression(node['condition'])}:")
+            self.block(node["body"], depth + 1)
+        elif kind == "AST.Repeat":
+            self.emit(depth, "while True:")
+            self.block(node["body"], depth + 1)
+            self.emit(depth + 1, f"if {self.expression(node['condition'])}:")
+            self.emit(depth + 2, "break")
+        elif kind == "AST.Return":
+            self.emit(depth, f"return {self.result}")
+        elif kind == "AST.Undefined":
+            self.emit(depth, "raise Undefined()")
+        elif kind == "AST.Unpredictable":
+            self.emit(depth, "raise Unpredictable()")
+        elif kind == "AST.See":
+            self.emit(depth, f"raise See({self.expression(node['value'])})")
+        elif kind == "AST.Assert":
+            self.emit(depth, f"assert {self.expression(node['condition'])}")
+        elif kind == "AST.Throw":
+            self.emit(depth, f"raise ASLException({self.expression(node['value'])})")
+        else:
+            raise ASLCompileError(f"unsupported statement {kind}")
+
+    def assignment(self, target: Dict[str, Any], value: str, depth: int) -> None:
+        kind = target["_type"]
+        if kind == "AST.Identifier":
+            self.emit(depth, f"{self.lvalue(target)} = {value}")
+        elif kind == "AST.Tuple":
+            names = []
+            for item in target["values"]:
+                if item["_type"] != "AST.Identifier":
+                    raise ASLCompileError(f"unsupported tuple element {item['_type']}")
+                names.append(self.lvalue(item))
+            self.emit(depth, f"{', '.join(names)} = {value}")
+        elif kind == "AST.SquareOp" and target["var"]["_type"] == "AST.Identifier":
+            name = target["var"]["value"]
+            self.emit(depth, f"_state.write({name!r}, {self.arguments(target['arguments'])}, {value})")
+        elif kind == "AST.DotAtom" and self.global_name(target) is not None:
+            name = self.global_name(target)
+            member = target["values"][-1]
+            if member["_type"] == "AST.Tuple":
+                fields = tuple(item["value"] for item in member["values"])
+            else:
+                fields = (member["value"],)
+            self.emit(depth, f"_state.set_field({name!r}, {fields!r}, {value})")
+        elif kind == "AST.BitSlice" and target["var"]["_type"] == "AST.Identifier" and len(target["arguments"]) == 1:
+            var = self.lvalue(target["var"])
+            hi, lo = self.bounds(target["arguments"][0])
+            self.emit(depth, f"{var} = _set_slice({var}, {hi}, {lo}, {value})")
+        else:
+            raise ASLCompileError(f"unsupported assignment to {kind}")
+
+    def global_name(self, node: Dict[str, Any]) -> Optional[str]:
+        """Get the global of a ``PSTATE.N`` style access, None if the base is a local variable."""
+        values = node["values"]
+        base = values[0]
+        if len(values) != 2 or base["_type"] != "AST.Identifier" or base["value"] in self.locals:
+            return None
+        return base["value"]
+
+    def arguments(self, arguments: List[Dict[str, Any]]) -> str:
+        return f"({''.join(self.expression(argument) + ', ' for argument in arguments)})"
+
+    def lvalue(self, target: Dict[str, Any]) -> str:
+        return "_" if target["value"] == "-" else f"v_{target['value']}"
+
+    def default(self, var_type: Optional[Dict[str, Any]]) -> str:
+        name = (var_type or {}).get("name") or {}
+        if name.get("_type") == "AST.Function" and name.get("name") == "bits":
+            return f"Bits(0, {self.expression(name['arguments'][0])})"
+        if name.get("value") == "integer":
+            return "0"
+        if name.get("value") == "boolean":
+            return "False"
+        return "None"
+
+    def pattern(self, subject: str, pattern: Dict[str, Any]) -> str:
+        kind = pattern["_type"]
+        if kind == "Values.Value":
+            mask, value, width = parse_value(pattern["value"])
+            if mask == (1 << width) - 1:
+                return f"{subject} == {value}"
+            return f"{subject} & {mask} == {value}"
+        if kind == "AST.Slice":
+            return f"{self.expression(pattern['right'])} <= {subject} <= {self.expression(pattern['left'])}"
+        return f"{subject} == {self.expression(pattern)}"
+
+    def bounds(self, node: Dict[str, Any]) -> tuple:
+        if node["_type"] == "AST.Slice":
+            return self.expression(node["left"]), self.expression(node["right"])
+        index = self.expression(node)
+        return index, index
+
+    # Expressions
+
+    def expression(self, node: Dict[str, Any]) -> str:
+        kind = node["_type"]
+
+        if kind == "AST.Identifier":
+            if node["value"] in STATE_GLOBALS:
+                return f"_state.read({node['value']!r}, ())"
+            return f"v_{node['value']}"
+        if kind in ("AST.Integer", "AST.Real"):
+            return repr(node["value"])
+        if kind == "AST.Bool":
+            return repr(bool(node["value"]))
+        if kind == "Types.String":
+            return repr(node["value"])
+        if kind == "Values.Value":
+            _, value, width = parse_value(node["value"])
+            return self.constant(runtime.Bits(value, width))
+
+        if kind == "AST.BinaryOp":
+            op = node["op"]
+            left = node["left"]
+            right = node["right"]
+            if op in ("==", "!=") and right["_type"] == "Values.Value":
+                mask, value, width = parse_value(right["value"])
+                if mask != (1 << width) - 1:
+                    return f"(({self.expression(left)} & {mask} {op} {value}))"
+            if op == "IN":
+                return self.membership(left, right)
+            if op == "-->":
+                return f"(not {self.expression(left)} or {self.expression(right)})"
+            if op in HELPER_OPS:
+                return f"{HELPER_OPS[op]}({self.expression(left)}, {self.expression(right)})"
+            if op in PYTHON_OPS:
+                return f"({self.expression(left)} {PYTHON_OPS[op]} {self.expression(right)})"
+            raise ASLCompileError(f"unsupported operator {op}")
+
+        if kind == "AST.UnaryOp":
+            expr = self.expression(node["expr"])
+            if node["op"] == "!":
+                return f"(not {expr})"
+            if node["op"] == "NOT":
+                return f"_not({expr})"
+            return f"(-{expr})"
+
+        if kind == "AST.Function":
+            # The parameters of ASL 1.0 calls such as "ZeroExtend{64}(imm)" come last, as in "ZeroExtend(imm, 64)"
+            values = node["arguments"] + node.get("parameters", [])
+            arguments = ", ".join(self.expression(argument) for argument in values)
+            name = node["name"]
+            if name in ("IsFeatureImplemented", "HaveFeature") or name in runtime.FUNCTIONS:
+                return f"f_{name}({arguments})"
+            return f"_state.call({name!r}{', ' if arguments else ''}{arguments})"
+
+        if kind == "AST.SquareOp" and node["var"]["_type"] == "AST.Identifier":
+            return f"_state.read({node['var']['value']!r}, {self.arguments(node['arguments'])})"
+        if kind == "AST.DotAtom" and self.global_name(node) is not None:
+            member = node["values"][-1]
+            if member["_type"] != "AST.Identifier":
+                raise ASLCompileError("reading a list of fields is not supported")
+            return f"_state.field({self.global_name(node)!r}, {member['value']!r})"
+
+        if kind == "AST.Conditional":
+            condition = self.expression(node["condition"])
+            return f"({self.expression(node['then'])} if {condition} else {self.expression(node['else'])})"
+        if kind == "AST.Concat":
+            return f"_concat({', '.join(self.expression(value) for value in node['values'])})"
+        if kind == "AST.Tuple":
+            return f"({', '.join(self.expression(value) for value in node['values'])},)"
+        if kind == "AST.BitSlice":
+            var = self.expression(node["var"])
+            slices = [f"_slice({var}, {', '.join(self.bounds(argument))})" for argument in node["arguments"]]
+            return slices[0] if len(slices) == 1 else f"_concat({', '.join(slices)})"
+        if kind == "AST.TypeAnnotation":
+            name = node["type"]["name"]
+            if name.get("_type") == "AST.Function" and name.get("name") == "bits":
+                return f"_unknown({self.expression(name['arguments'][0])})"
+            return "_unknown(None)"
+
+        raise ASLCompileError(f"unsupported expression {kind}")
+
+    def membership(self, left: Dict[str, Any], right: Dict[str, Any]) -> str:
+        values = right["values"] if right["_type"] == "AST.Set" else [right]
+        subject = self.expression(left)
+        if all(value["_type"] == "Values.Value" for value in values):
+            patterns = tuple(parse_value(value["value"])[:2] for value in values)
+            return f"_match({subject}, {self.constant(patterns)})"
+        return f"({subject} in ({', '.join(self.expression(value) for value in values)},))"
+
+
+class Semantics(object):
+    """One part of the pseudocode of every operation of an MRS spec, compiled on first use."""
+
+    # The part of the operations to compile, "decode" or "operation"
+    PART = "decode"
+
+    def __init__(
+        self,
+        operations: Dict[str, Any],
+        cache: Optional[ParseCache] = None,
+        jobs: Optional[int] = 1,
+        features: Optional[FeatureProfile] = None,
+    ):
+        """
+        Parse the pseudocode of the operations.
+
+        Args:
+            operations (Dict[str, Any]): The ``operations`` of the spec's Instructions
+            cache (Optional[ParseCache], optional): The parse cache to use. Defaults to the stored cache.
+            jobs (Optional[int], optional): Number of parser processes, None for one per CPU. Defaults to 1.
+            features (Optional[FeatureProfile], optional): Profile that answers IsFeatureImplemented.
+                Defaults to None.
+        """
+        self.operations = operations
+        self.features = features
+        self.trees = {
+            operation_id: parts[self.PART] for operation_id, parts in parse_operations(operations, cache, jobs).items()
+        }
+        self.functions: Dict[str, Optional[Callable[..., Dict[str, Any]]]] = {}
+        self.errors: Dict[str, str] = {}
+
+    def get(self, operation_id: str) -> Optional[Callable[..., Dict[str, Any]]]:
+        """
+        Get the compiled function of an operation.
+
+        Args:
+            operation_id (str): The operation, aliases are followed
+
+        Returns:
+            Optional[Callable[..., Dict[str, Any]]]: The function, None if its pseudocode could not be parsed
+                or compiled, see ``errors``
+        """
+        try:
+            return self.functions[operation_id]
+        except KeyError:
+            pass
+
+        function = None
+        target = operation_id
+        operation = self.operations.get(target)
+        while operation is not None and not hasattr(operation, "operation"):
+            target = getattr(operation, "operation_id", None)
+            operation = self.operations.get(target)
+
+        tree = self.trees.get(target)
+        if tree is None:
+            self.errors[operation_id] = f"no parsed {self.PART} pseudocode"
+        else:
+            try:
+                function = Compiler(self.features).compile(tree, f"{target} {self.PART}")
+            except ASLCompileError as e:
+                self.errors[operation_id] = str(e)
+        self.functions[operation_id] = function
+        return function
+
+    def __call__(
+        self, operation_id: str, fields: Dict[str, Any], state: Optional[runtime.State] = None
+    ) -> Dict[str, Any]:
+        """
+        Run the pseudocode of an operation.
+
+        Args:
+            operation_id (str): The operation
+            fields (Dict[str, Any]): The variables in scope, e.g. the encoding fields as Bits
+            state (Optional[runtime.State], optional): The machine state. Defaults to none.
+
+        Raises:
+            ASLException: If the pseudocode ends in UNDEFINED, UNPREDICTABLE or SEE, or calls a function the
+                runtime does not implement
+            ValueError: If the operation has no compiled function
+
+        Returns:
+            Dict[str, Any]: The value of every variable the pseudocode assigns
+        """
+        function = self.get(operation_id)
+        if function is None:
+            raise ValueError(f"{operation_id} has no {self.PART} semantics: {self.errors.get(operation_id)}")
+        return function(fields) if state is None else function(fields, state)
+
+
+class DecodeSemantics(Semantics):
+    """The decode pseudocode of every operation, from encoding fields to operand values."""
+
+    PART = "decode"
+
+
+class OperationSemantics(Semantics):
+    """The operation pseudocode of every operation, executed against a machine state."""
+
+    PART = "operation"
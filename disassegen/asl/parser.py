@@ -0,0 +1,662 @@
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+
+TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>[ \t\f]+)
+    |(?P<comment>//.*)
+    |(?P<real>\d+\.\d+)
+    |(?P<int>0x[0-9A-Fa-f_]+|\d[\d_]*)
+    |(?P<bits>'[01xXzZ \t]*')
+    |(?P<string>"[^"]*")
+    |(?P<name>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<op>-->|<->|\+:|-:|::|==|!=|<=|>=|<<|>>|&&|\|\||=>|\.\.|\+\+|[-+*/^!<>=:;,.()\[\]{}?&|])
+    """,
+    re.VERBOSE,
+)
+BLOCK_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+
+KEYWORDS = {
+    "if", "then", "elsif", "else", "end", "case", "of", "when", "otherwise", "where", "for", "to", "downto", "do",
+    "while", "repeat", "until", "return", "constant", "let", "var", "config", "UNDEFINED", "UNPREDICTABLE", "SEE",
+    "assert", "throw", "AND", "OR", "EOR", "XOR", "NOT", "DIV", "DIVRM", "MOD", "IN", "TRUE", "FALSE",
+}  # fmt: skip
+TYPE_NAMES = {"integer", "boolean", "bit", "bits", "real", "string", "array"}
+
+# Binary operators from the loosest to the tightest binding
+BINARY_OPS: List[Set[str]] = [
+    {"-->", "<->"},
+    {"||"},
+    {"&&"},
+    {"==", "!=", "<", ">", "<=", ">=", "IN"},
+    {":", "::", "++"},
+    {"+", "-", "OR", "EOR", "XOR"},
+    {"*", "/", "DIV", "DIVRM", "MOD", "AND", "<<", ">>"},
+    {"^"},
+]
+# Level of the operands of bit slices, which must not swallow their ":" separators
+SLICE_LEVEL = 5
+UNARY_OPS = {"!", "-", "NOT"}
+# Tokens that end a body written on the same line as its header
+BODY_STOPS = {"else", "elsif", "end", "when", "otherwise", "until"}
+
+
+class ASLSyntaxError(ValueError):
+    """Raised when ASL pseudocode cannot be parsed."""
+
+    def __init__(self, message: str, line: int = 0, column: int = 0):
+        super().__init__(f"{message} at {line}:{column}")
+        self.line = line
+        self.column = column
+
+
+@dataclass
+class Token:
+    """Represents a lexical token of ASL source."""
+
+    kind: str
+    value: str
+    line: int
+    column: int
+
+
+def tokenize(source: str) -> List[Token]:
+    """
+    Split ASL source into tokens.
+
+    Blocks are tracked both ways ASL writes them: ASL 1.0 closes them with ``end;`` while the older pseudocode
+    of the XML spec only indents them, so NEWLINE, INDENT and DEDENT tokens are emitted outside of brackets.
+
+    Args:
+        source (str): The pseudocode
+
+    Returns:
+        List[Token]: The tokens, ending with EOF
+    """
+    # Keep the line numbers of code after block comments
+    source = BLOCK_COMMENT_RE.sub(lambda m: "\n" * m.group().count("\n"), source)
+
+    tokens: List[Token] = []
+    indents: List[int] = []
+    depth = 0
+    for lineno, line in enumerate(source.expandtabs(4).splitlines(), 1):
+        line_tokens = []
+        pos = 0
+        while pos < len(line):
+            match = TOKEN_RE.match(line, pos)
+            if match is None:
+                raise ASLSyntaxError(f"unexpected character {line[pos]!r}", lineno, pos + 1)
+            kind = match.lastgroup
+            if kind not in ("ws", "comment"):
+                value = match.group()
+                if kind == "name" and value in KEYWORDS:
+                    kind = "keyword"
+                line_tokens.append(Token(kind, value, lineno, pos + 1))
+                if kind == "op" and value in "([{":
+                    depth += 1
+                elif kind == "op" and value in ")]}":
+                    depth = max(depth - 1, 0)
+            pos = match.end()
+
+        if not line_tokens:
+            continue
+
+        if not tokens or tokens[-1].kind == "newline":
+            indent = len(line) - len(line.lstrip())
+            if not indents:
+                indents.append(indent)
+            elif indent > indents[-1]:
+                indents.append(indent)
+                tokens.append(Token("indent", "", lineno, 1))
+            else:
+                while indent < indents[-1]:
+                    indents.pop()
+                    tokens.append(Token("dedent", "", lineno, 1))
+                if indent > indents[-1]:
+                    # Dedented to a level that was never opened
+                    indents.append(indent)
+                    tokens.append(Token("indent", "", lineno, 1))
+
+        tokens.extend(line_tokens)
+        if depth == 0:
+            tokens.append(Token("newline", "", lineno, len(line) + 1))
+
+    line = tokens[-1].line if tokens else 1
+    if tokens and tokens[-1].kind != "newline":
+        tokens.append(Token("newline", "", line, 1))
+    tokens.extend(Token("dedent", "", line, 1) for _ in indents[1:])
+    tokens.append(Token("eof", "", line, 1))
+    return tokens
+
+
+def _block(statements: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"_type": "AST.StatementBlock", "statements": statements}
+
+
+def _binary(left: Dict[str, Any], op: str, right: Dict[str, Any]) -> Dict[str, Any]:
+    return {"_type": "AST.BinaryOp", "left": left, "op": op, "right": right}
+
+
+def _integer(value: int) -> Dict[str, Any]:
+    return {"_type": "AST.Integer", "value": value}
+
+
+class Parser(object):
+    """Recursive descent parser of ASL pseudocode into MRS style AST dictionaries."""
+
+    def __init__(self, source: str):
+        """
+        Prepare a parser.
+
+        Args:
+            source (str): The pseudocode
+        """
+        self.tokens = tokenize(source)
+        self.pos = 0
+
+    # Token helpers
+
+    def peek(self, offset: int = 0) -> Token:
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def next(self) -> Token:
+        token = self.tokens[self.pos]
+        if token.kind != "eof":
+            self.pos += 1
+        return token
+
+    def at(self, *values: str) -> bool:
+        token = self.peek()
+        return token.kind in ("op", "keyword") and token.value in values
+
+    def accept(self, value: str) -> bool:
+        if self.at(value):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, value: str) -> Token:
+        if not self.at(value):
+            raise self.error(f"expected {value!r}")
+        return self.next()
+
+    def expect_kind(self, kind: str) -> Token:
+        if self.peek().kind != kind:
+            raise self.error(f"expected {kind}")
+        return self.next()
+
+    def error(self, message: str) -> ASLSyntaxError:
+        token = self.peek()
+        found = token.value or token.kind
+        return ASLSyntaxError(f"{message}, found {found!r}", token.line, token.column)
+
+    def skip_newlines(self) -> None:
+        while self.peek().kind == "newline":
+            self.pos += 1
+
+    def skip_newlines_before(self, *values: str) -> bool:
+        """Skip the line breaks before one of the values, e.g. an ``else`` on its own line."""
+        offset = 0
+        while self.peek(offset).kind == "newline":
+            offset += 1
+        token = self.peek(offset)
+        if token.kind in ("op", "keyword") and token.value in values:
+            self.pos += offset
+            return True
+        return False
+
+    # Statements
+
+    def parse(self) -> Dict[str, Any]:
+        """
+        Parse the whole source.
+
+        Returns:
+            Dict[str, Any]: An AST.StatementBlock
+        """
+        statements = self.statements()
+        if self.peek().kind != "eof":
+            raise self.error("unexpected token")
+        return _block(statements)
+
+    def statements(self) -> List[Dict[str, Any]]:
+        statements = []
+        while True:
+            self.skip_newlines()
+            token = self.peek()
+            if token.kind in ("dedent", "eof"):
+                return statements
+            if token.kind == "indent":
+                # Stray indentation, e.g. a continued line outside of brackets
+                self.next()
+                statements.extend(self.statements())
+                self.accept_dedent()
+                continue
+            statements.append(self.statement())
+
+    def accept_dedent(self) -> None:
+        self.skip_newlines()
+        if self.peek().kind == "dedent":
+            self.next()
+
+    def body(self) -> Dict[str, Any]:
+        """Parse the body of a compound statement, either indented on the next lines or on the same line."""
+        if self.peek().kind == "newline":
+            self.skip_newlines()
+            if self.peek().kind != "indent":
+                return _block([])
+            self.next()
+            statements = self.statements()
+            self.expect_kind("dedent")
+            return _block(statements)
+
+        statements = []
+        while self.peek().kind not in ("newline", "dedent", "eof") and not self.at(*BODY_STOPS):
+            statements.append(self.statement())
+        return _block(statements)
+
+    def accept_end(self) -> None:
+        if self.skip_newlines_before("end"):
+            self.expect("end")
+            self.accept(";")
+
+    def statement(self) -> Dict[str, Any]:
+        token = self.peek()
+        if token.kind == "keyword":
+            handler = getattr(self, f"statement_{token.value.lower()}", None)
+            if handler is not None:
+                self.next()
+                return handler()
+
+        if self.at_declaration():
+            return self.declaration("var")
+
+        target = self.expression()
+        if self.accept("="):
+            value = self.expression()
+            self.expect(";")
+            return {"_type": "AST.Assignment", "var": target, "val": value}
+        self.expect(";")
+        if target.get("_type") != "AST.Function":
+            raise ASLSyntaxError("expected an assignment or a call", token.line, token.column)
+        return {"_type": "AST.ProcedureCall", "call": target}
+
+    def statement_if(self) -> Dict[str, Any]:
+        node = {"_type": "AST.If", "condition": self.expression(), "then": None, "else": None}
+        self.expect("then")
+        node["then"] = self.body()
+        tail = node
+        while self.skip_newlines_before("elsif", "else"):
+            if self.accept("elsif"):
+                branch = {"_type": "AST.If", "condition": self.expression(), "then": None, "else": None}
+                self.expect("then")
+                branch["then"] = self.body()
+                tail["else"] = _block([branch])
+                tail = branch
+            else:
+                self.expect("else")
+                tail["else"] = self.body()
+                break
+        self.accept_end()
+        return node
+
+    def statement_case(self) -> Dict[str, Any]:
+        subject = self.expression()
+        self.expect("of")
+        self.skip_newlines()
+        indented = self.peek().kind == "indent"
+        if indented:
+            self.next()
+
+        whens = []
+        otherwise = None
+        while self.skip_newlines_before("when", "otherwise"):
+            if self.accept("when"):
+                patterns = [self.pattern()]
+                while self.accept(","):
+                    patterns.append(self.pattern())
+                guard = self.expression() if self.accept("where") else None
+                self.accept("=>")
+                whens.append({"_type": "AST.CaseWhen", "patterns": patterns, "where": guard, "body": self.body()})
+            else:
+                self.expect("otherwise")
+                self.accept("=>")
+                otherwise = self.body()
+
+        if indented:
+            self.skip_newlines()
+            self.expect_kind("dedent")
+        self.accept_end()
+        return {"_type": "AST.Case", "expr": subject, "whens": whens, "otherwise": otherwise}
+
+    def pattern(self) -> Dict[str, Any]:
+        value = self.expression(SLICE_LEVEL)
+        if self.accept(".."):
+            return {"_type": "AST.Slice", "left": value, "right": self.expression(SLICE_LEVEL)}
+        return value
+
+    def statement_for(self) -> Dict[str, Any]:
+        var = self.expect_kind("name").value
+        self.expect("=")
+        start = self.expression()
+        direction = self.next()
+        if direction.value not in ("to", "downto"):
+            raise ASLSyntaxError("expected 'to' or 'downto'", direction.line, direction.column)
+        stop = self.expression()
+        self.accept("do")
+        body = self.body()
+        self.accept_end()
+        return {
+            "_type": "AST.For",
+            "var": var,
+            "start": start,
+            "direction": direction.value,
+            "stop": stop,
+            "body": body,
+        }
+
+    def statement_while(self) -> Dict[str, Any]:
+        condition = self.expression()
+        self.accept("do")
+        body = self.body()
+        self.accept_end()
+        return {"_type": "AST.While", "condition": condition, "body": body}
+
+    def statement_repeat(self) -> Dict[str, Any]:
+        body = self.body()
+        self.skip_newlines_before("until")
+        self.expect("until")
+        condition = self.expression()
+        self.expect(";")
+        return {"_type": "AST.Repeat", "body": body, "condition": condition}
+
+    def statement_return(self) -> Dict[str, Any]:
+        value = None if self.at(";") else self.expression()
+        self.expect(";")
+        return {"_type": "AST.Return", "value": value}
+
+    def statement_undefined(self) -> Dict[str, Any]:
+        self.expect(";")
+        return {"_type": "AST.Undefined"}
+
+    def statement_unpredictable(self) -> Dict[str, Any]:
+        self.expect(";")
+        return {"_type": "AST.Unpredictable"}
+
+    def statement_see(self) -> Dict[str, Any]:
+        value = self.expression()
+        self.expect(";")
+        return {"_type": "AST.See", "value": value}
+
+    def statement_assert(self) -> Dict[str, Any]:
+        condition = self.expression()
+        self.expect(";")
+        return {"_type": "AST.Assert", "condition": condition}
+
+    def statement_throw(self) -> Dict[str, Any]:
+        value = self.expression()
+        self.expect(";")
+        return {"_type": "AST.Throw", "value": value}
+
+    def statement_constant(self) -> Dict[str, Any]:
+        return self.declaration("constant")
+
+    def statement_let(self) -> Dict[str, Any]:
+        return self.declaration("let")
+
+    def statement_var(self) -> Dict[str, Any]:
+        return self.declaration("var")
+
+    def statement_config(self) -> Dict[str, Any]:
+        return self.declaration("config")
+
+    # Declarations
+
+    def at_declaration(self) -> bool:
+        token = self.peek()
+        if token.kind != "name":
+            return False
+        if token.value in TYPE_NAMES:
+            return True
+        # A named type such as "AccessDescriptor accdesc = ..."
+        following = self.peek(1)
+        return following.kind == "name" and self.peek(2).value in ("=", ";", ",")
+
+    def declaration(self, kind: str) -> Dict[str, Any]:
+        var_type = None
+        if not (self.peek().kind == "name" and self.peek(1).value in (":", "=", ";", ",")):
+            var_type = self.type()
+        names = [self.expect_kind("name").value]
+        if self.accept(":"):
+            var_type = self.type()
+        while self.accept(","):
+            names.append(self.expect_kind("name").value)
+        value = self.expression() if self.accept("=") else None
+        self.expect(";")
+        return {"_type": "AST.Declaration", "kind": kind, "type": var_type, "names": names, "value": value}
+
+    def type(self) -> Dict[str, Any]:
+        token = self.expect_kind("name")
+        if token.value == "array":
+            self.expect("[")
+            index = self.pattern()
+            self.expect("]")
+            self.expect("of")
+            name = {"_type": "AST.Function", "name": "array", "arguments": [index, self.type()]}
+        elif self.at("("):
+            name = {"_type": "AST.Function", "name": token.value, "arguments": self.arguments("(", ")")}
+        else:
+            name = {"_type": "AST.Identifier", "value": token.value}
+        if self.at("{"):
+            # Skip integer constraints such as "integer {8, 16}"
+            depth = 0
+            while True:
+                token = self.next()
+                depth += {"{": 1, "}": -1}.get(token.value, 0) if token.kind == "op" else 0
+                if depth == 0 or token.kind == "eof":
+                    break
+        return {"_type": "AST.Type", "name": name}
+
+    # Expressions
+
+    def expression(self, level: int = 0) -> Dict[str, Any]:
+        if level == len(BINARY_OPS):
+            return self.unary()
+        left = self.expression(level + 1)
+        ops = BINARY_OPS[level]
+        while True:
+            token = self.peek()
+            if token.kind not in ("op", "keyword") or token.value not in ops:
+                return left
+            self.next()
+            right = self.expression(level + 1)
+            if token.value in (":", "::"):
+                # "a : b" in the older syntax, "a :: b" in ASL 1.0
+                values = left["values"] if left.get("_type") == "AST.Concat" else [left]
+                left = {"_type": "AST.Concat", "values": values + [right]}
+            else:
+                op = "XOR" if token.value == "EOR" else token.value
+                left = _binary(left, op, right)
+
+    def unary(self) -> Dict[str, Any]:
+        token = self.peek()
+        if token.kind in ("op", "keyword") and token.value in UNARY_OPS and not self.at_placeholder():
+            self.next()
+            return {"_type": "AST.UnaryOp", "op": token.value, "expr": self.unary()}
+        return self.postfix(self.primary())
+
+    def at_placeholder(self) -> bool:
+        """Check for the "-" that discards an element of a tuple assignment."""
+        return self.at("-") and self.peek(1).value in (",", ")")
+
+    def arguments(self, open_: str, close: str) -> List[Dict[str, Any]]:
+        self.expect(open_)
+        arguments = []
+        if not self.accept(close):
+            while True:
+                arguments.append(self.slice() if open_ == "[" else self.expression())
+                if self.accept(close):
+                    break
+                self.expect(",")
+        return arguments
+
+    def slice(self) -> Dict[str, Any]:
+        low = self.expression(SLICE_LEVEL)
+        if self.accept(":"):
+            return {"_type": "AST.Slice", "left": low, "right": self.expression(SLICE_LEVEL)}
+        if self.accept("+:"):
+            width = self.expression(SLICE_LEVEL)
+            return {"_type": "AST.Slice", "left": _binary(_binary(low, "+", width), "-", _integer(1)), "right": low}
+        if self.accept("-:"):
+            width = self.expression(SLICE_LEVEL)
+            return {"_type": "AST.Slice", "left": low, "right": _binary(_binary(low, "-", width), "+", _integer(1))}
+        return low
+
+    def bit_slice(self) -> Optional[List[Dict[str, Any]]]:
+        """Try to parse ``<hi:lo, ...>``, backtracking when the ``<`` turns out to be a comparison."""
+        start = self.pos
+        try:
+            self.expect("<")
+            slices = [self.slice()]
+            while self.accept(","):
+                slices.append(self.slice())
+            self.expect(">")
+            return slices
+        except ASLSyntaxError:
+            self.pos = start
+            return None
+
+    def primary(self) -> Dict[str, Any]:
+        token = self.next()
+        kind = token.kind
+        value = token.value
+
+        if kind == "int":
+            digits = value.replace("_", "")
+            return _integer(int(digits, 16) if digits.startswith("0x") else int(digits))
+        if kind == "real":
+            return {"_type": "AST.Real", "value": float(value)}
+        if kind == "bits":
+            return {"_type": "Values.Value", "value": value}
+        if kind == "string":
+            return {"_type": "Types.String", "value": value[1:-1]}
+        if value in ("TRUE", "FALSE") and kind == "keyword":
+            return {"_type": "AST.Bool", "value": value == "TRUE"}
+        if value == "if" and kind == "keyword":
+            return self.conditional()
+        if value == "-" and kind == "op":
+            return {"_type": "AST.Identifier", "value": "-"}
+        if value == "(" and kind == "op":
+            values = [self.expression()]
+            while self.accept(","):
+                values.append(self.expression())
+            self.expect(")")
+            return values[0] if len(values) == 1 else {"_type": "AST.Tuple", "values": values}
+        if value == "{" and kind == "op":
+            values = []
+            if not self.accept("}"):
+                while True:
+                    values.append(self.pattern())
+                    if self.accept("}"):
+                        break
+                    self.expect(",")
+            return {"_type": "AST.Set", "values": values}
+        if kind == "name":
+            return self.name(token)
+
+        self.pos -= 1
+        raise self.error("expected an expression")
+
+    def conditional(self) -> Dict[str, Any]:
+        """Parse the rest of an ``if c then a elsif d then b else c`` expression."""
+        condition = self.expression()
+        self.expect("then")
+        then = self.expression()
+        if self.accept("elsif"):
+            otherwise = self.conditional()
+        else:
+            self.expect("else")
+            otherwise = self.expression()
+        return {"_type": "AST.Conditional", "condition": condition, "then": then, "else": otherwise}
+
+    def name(self, token: Token) -> Dict[str, Any]:
+        value = token.value
+        following = self.peek()
+        # "bits(4) UNKNOWN", "integer UNKNOWN" and "UNKNOWN : bits(4)"
+        if value in TYPE_NAMES:
+            start = self.pos
+            self.pos -= 1
+            var_type = self.type()
+            if self.peek().value in ("UNKNOWN", "ARBITRARY"):
+                var = {"_type": "AST.Identifier", "value": self.next().value}
+                return {"_type": "AST.TypeAnnotation", "var": var, "type": var_type}
+            self.pos = start
+        if value in ("UNKNOWN", "ARBITRARY") and following.value == ":":
+            self.next()
+            var = {"_type": "AST.Identifier", "value": value}
+            return {"_type": "AST.TypeAnnotation", "var": var, "type": self.type()}
+        return {"_type": "AST.Identifier", "value": value}
+
+    def postfix(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        while True:
+            if self.at("(", "{") and node["_type"] in ("AST.Identifier", "AST.DotAtom"):
+                name = (
+                    node["value"]
+                    if node["_type"] == "AST.Identifier"
+                    else ".".join(value.get("value", "") for value in node["values"])
+                )
+                # ASL 1.0 passes widths as parameters, e.g. "Zeros{12}" and "ZeroExtend{64}(imm)"
+                parameters = self.arguments("{", "}") if self.at("{") else []
+                arguments = self.arguments("(", ")") if self.at("(") else []
+                node = {"_type": "AST.Function", "name": name, "arguments": arguments}
+                if parameters:
+                    node["parameters"] = parameters
+            elif self.at("["):
+                node = {"_type": "AST.SquareOp", "var": node, "arguments": self.arguments("[", "]")}
+            elif self.at("<"):
+                slices = self.bit_slice()
+                if slices is None:
+                    return node
+                node = {"_type": "AST.BitSlice", "var": node, "arguments": slices}
+            elif self.accept("."):
+                if self.at("<", "["):
+                    # A list of fields such as "PSTATE.<N,Z,C,V>"
+                    member = {"_type": "AST.Tuple", "values": self.field_list(">" if self.at("<") else "]")}
+                else:
+                    member = {"_type": "AST.Identifier", "value": self.expect_kind("name").value}
+                values = node["values"] if node["_type"] == "AST.DotAtom" else [node]
+                node = {"_type": "AST.DotAtom", "values": values + [member]}
+            else:
+                return node
+
+    def field_list(self, close: str) -> List[Dict[str, Any]]:
+        self.next()
+        fields = [{"_type": "AST.Identifier", "value": self.expect_kind("name").value}]
+        while self.accept(","):
+            fields.append({"_type": "AST.Identifier", "value": self.expect_kind("name").value})
+        self.expect(close)
+        return fields
+
+
+def parse(source: str) -> Dict[str, Any]:
+    """
+    Parse ASL pseudocode.
+
+    Args:
+        source (str): The pseudocode, in ASL 1.0, with its ``{N}`` parameters and ``::`` concatenation, or in the
+            older indentation based syntax
+
+    Returns:
+        Dict[str, Any]: An AST.StatementBlock in the same shape as the MRS condition ASTs
+    """
+    return Parser(source).parse()
+
+
+def source_text(value: Any) -> str:
+    """Get the pseudocode of an MRS or ISA XML field, which may be a string or nested lists of lines."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    return "\n".join(source_text(item) for item in value)
@@ -0,0 +1,333 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class Bits(int):
+    """A bitvector: an int that remembers its width."""
+
+    def __new__(cls, value: int, width: int) -> "Bits":
+        obj = int.__new__(cls, value & ((1 << width) - 1))
+        obj.width = width
+        return obj
+
+    def __repr__(self) -> str:
+        return f"'{int(self):0{self.width}b}'" if self.width else "''"
+
+    def __reduce__(self):
+        return (Bits, (int(self), self.width))
+
+
+class ASLException(Exception):
+    """Raised when executing pseudocode ends in an ASL exception."""
+
+
+class Undefined(ASLException):
+    """Raised when pseudocode executes UNDEFINED."""
+
+
+class Unpredictable(ASLException):
+    """Raised when pseudocode executes UNPREDICTABLE."""
+
+
+class See(ASLException):
+    """Raised when pseudocode redirects decoding to another encoding with SEE."""
+
+    def __init__(self, target: Any):
+        super().__init__(f"SEE {target}")
+        self.target = target
+
+
+class Unsupported(ASLException):
+    """Raised when pseudocode calls a function the runtime does not implement."""
+
+
+class State(object):
+    """
+    Machine state seen by compiled pseudocode.
+
+    The base state has no registers or memory, which is all the decode pseudocode needs. Emulators override
+    the accessors.
+    """
+
+    def read(self, name: str, args: Tuple[Any, ...]) -> Any:
+        """Read an accessor such as ``X[n, 64]`` or ``Mem[address, 8, accdesc]``."""
+        raise Unsupported(f"{name}[] is not implemented")
+
+    def write(self, name: str, args: Tuple[Any, ...], value: Any) -> None:
+        """Write an accessor such as ``X[d, 64] = value``."""
+        raise Unsupported(f"{name}[] = is not implemented")
+
+    def field(self, name: str, field: str) -> Any:
+        """Read a field of a global such as ``PSTATE.N``."""
+        raise Unsupported(f"{name}.{field} is not implemented")
+
+    def set_field(self, name: str, fields: Tuple[str, ...], value: Any) -> None:
+        """Write one or more fields of a global such as ``PSTATE.<N,Z,C,V> = nzcv``."""
+        raise Unsupported(f"{name}.{fields} = is not implemented")
+
+    def call(self, name: str, *args: Any) -> Any:
+        """Call a function the pure runtime does not implement."""
+        raise Unsupported(f"{name} is not implemented")
+
+
+def width(x: Any) -> int:
+    if isinstance(x, Bits):
+        return x.width
+    raise Unsupported(f"width of {x!r} is unknown")
+
+
+def _bits_like(a: Any, b: Any, value: int) -> Any:
+    if isinstance(a, Bits):
+        return Bits(value, a.width)
+    if isinstance(b, Bits):
+        return Bits(value, b.width)
+    return value
+
+
+def add(a: Any, b: Any) -> Any:
+    return _bits_like(a, b, a + b)
+
+
+def sub(a: Any, b: Any) -> Any:
+    return _bits_like(a, b, a - b)
+
+
+def and_(a: Any, b: Any) -> Any:
+    if isinstance(a, bool):
+        return a and b
+    return _bits_like(a, b, a & b)
+
+
+def or_(a: Any, b: Any) -> Any:
+    if isinstance(a, bool):
+        return a or b
+    return _bits_like(a, b, a | b)
+
+
+def xor(a: Any, b: Any) -> Any:
+    if isinstance(a, bool):
+        return a != b
+    return _bits_like(a, b, a ^ b)
+
+
+def divide(a: Any, b: Any) -> Any:
+    # Integer division in ASL is exact, real division is not
+    if isinstance(a, float) or isinstance(b, float):
+        return a / b
+    quotient, remainder = divmod(int(a), int(b))
+    if remainder:
+        raise ASLException(f"{a} / {b} is not an integer")
+    return quotient
+
+
+def str_concat(a: Any, b: Any) -> str:
+    if not isinstance(a, str) or not isinstance(b, str):
+        raise ASLException(f"cannot concatenate {a!r} and {b!r} as strings")
+    return a + b
+
+
+def not_(x: Any) -> Any:
+    if isinstance(x, bool):
+        return not x
+    return Bits(~x, width(x))
+
+
+def concat(*values: Any) -> Bits:
+    result = 0
+    total = 0
+    for value in values:
+        w = width(value)
+        result = (result << w) | value
+        total += w
+    return Bits(result, total)
+
+
+def bit_slice(x: Any, hi: int, lo: int) -> Bits:
+    return Bits(x >> lo, hi - lo + 1)
+
+
+def set_slice(x: Any, hi: int, lo: int, value: Any) -> Any:
+    mask = ((1 << (hi - lo + 1)) - 1) << lo
+    result = (x & ~mask) | ((value << lo) & mask)
+    return Bits(result, x.width) if isinstance(x, Bits) else result
+
+
+def match(value: Any, patterns: Tuple[Tuple[int, int], ...]) -> bool:
+    return any(value & mask == bits for mask, bits in patterns)
+
+
+def unknown(w: Optional[int]) -> Any:
+    return 0 if w is None else Bits(0, w)
+
+
+# Library functions
+
+
+def UInt(x: Any) -> int:
+    return int(x)
+
+
+def SInt(x: Any) -> int:
+    w = width(x)
+    return int(x) - (1 << w) if w and x >> (w - 1) else int(x)
+
+
+def ZeroExtend(x: Any, n: int) -> Bits:
+    return Bits(x, n)
+
+
+def SignExtend(x: Any, n: int) -> Bits:
+    return Bits(SInt(x), n)
+
+
+def Zeros(n: int) -> Bits:
+    return Bits(0, n)
+
+
+def Ones(n: int) -> Bits:
+    return Bits(-1, n)
+
+
+def Replicate(x: Any, n: int) -> Bits:
+    return concat(*[x] * n)
+
+
+def IsZero(x: Any) -> bool:
+    return x == 0
+
+
+def IsOnes(x: Any) -> bool:
+    return x == (1 << width(x)) - 1
+
+
+def Len(x: Any) -> int:
+    return width(x)
+
+
+def BitCount(x: Any) -> int:
+    return bin(x).count("1")
+
+
+def HighestSetBit(x: Any) -> int:
+    return int(x).bit_length() - 1
+
+
+def LowestSetBit(x: Any) -> int:
+    return (x & -x).bit_length() - 1 if x else width(x)
+
+
+def CountLeadingZeroBits(x: Any) -> int:
+    return width(x) - 1 - HighestSetBit(x)
+
+
+def Align(x: Any, y: int) -> Any:
+    return _bits_like(x, None, x // y * y)
+
+
+def Min(a: Any, b: Any) -> Any:
+    return min(a, b)
+
+
+def Max(a: Any, b: Any) -> Any:
+    return max(a, b)
+
+
+def Abs(x: Any) -> Any:
+    return abs(x)
+
+
+def LSL(x: Any, n: int) -> Bits:
+    return Bits(x << n, width(x))
+
+
+def LSR(x: Any, n: int) -> Bits:
+    return Bits(x >> n, width(x))
+
+
+def ASR(x: Any, n: int) -> Bits:
+    return Bits(SInt(x) >> n, width(x))
+
+
+def ROR(x: Any, n: int) -> Bits:
+    w = width(x)
+    n %= w
+    return Bits((x >> n) | (x << (w - n)), w)
+
+
+def DecodeBitMasks(immN: Any, imms: Any, immr: Any, immediate: bool, M: int) -> Tuple[Bits, Bits]:
+    length = HighestSetBit(concat(immN, not_(imms)))
+    if length < 1:
+        raise Undefined()
+    levels = (1 << length) - 1
+    if immediate and imms & levels == levels:
+        raise Undefined()
+    s = imms & levels
+    r = immr & levels
+    diff = (s - r) & levels
+    esize = 1 << length
+    welem = Bits((1 << (s + 1)) - 1, esize)
+    telem = Bits((1 << ((diff & levels) + 1)) - 1, esize)
+    wmask = Replicate(ROR(welem, r), M // esize)
+    tmask = Replicate(telem, M // esize)
+    return wmask, tmask
+
+
+def AddWithCarry(x: Any, y: Any, carry_in: Any) -> Tuple[Bits, Bits]:
+    n = width(x)
+    unsigned_sum = int(x) + int(y) + int(carry_in)
+    signed_sum = SInt(x) + SInt(y) + int(carry_in)
+    result = Bits(unsigned_sum, n)
+    negative = result >> (n - 1)
+    zero = int(result == 0)
+    carry = int(int(result) != unsigned_sum)
+    overflow = int(SInt(result) != signed_sum)
+    return result, Bits((negative << 3) | (zero << 2) | (carry << 1) | overflow, 4)
+
+
+def DecodeShift(op: Any) -> str:
+    return ("ShiftType_LSL", "ShiftType_LSR", "ShiftType_ASR", "ShiftType_ROR")[op]
+
+
+def DecodeRegExtend(op: Any) -> str:
+    return (
+        "ExtendType_UXTB",
+        "ExtendType_UXTH",
+        "ExtendType_UXTW",
+        "ExtendType_UXTX",
+        "ExtendType_SXTB",
+        "ExtendType_SXTH",
+        "ExtendType_SXTW",
+        "ExtendType_SXTX",
+    )[op]
+
+
+FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    function.__name__: function
+    for function in (
+        UInt,
+        SInt,
+        ZeroExtend,
+        SignExtend,
+        Zeros,
+        Ones,
+        Replicate,
+        IsZero,
+        IsOnes,
+        Len,
+        BitCount,
+        HighestSetBit,
+        LowestSetBit,
+        CountLeadingZeroBits,
+        Align,
+        Min,
+        Max,
+        Abs,
+        LSL,
+        LSR,
+        ASR,
+        ROR,
+        DecodeBitMasks,
+        AddWithCarry,
+        DecodeShift,
+        DecodeRegExtend,
+    )
+}
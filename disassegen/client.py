@@ -0,0 +1,111 @@
+import json
+import socket
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from .server import BASE, DEFAULT_SOCKET, HEADER, OP_DECODE, OP_DISASM, OP_LOOKUP, STATUS_OK, pack_words
+
+
+class DecodeError(Exception):
+    """Raised when the decode service rejects a request."""
+
+
+class DecodeClient(object):
+    """Client for a running ``disassegen serve`` decode service."""
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, host: str = "127.0.0.1", port: Optional[int] = None):
+        """
+        Connect to a decode service.
+
+        Args:
+            path (Optional[Union[str, Path]], optional): Unix socket of the service. Defaults to DEFAULT_SOCKET.
+            host (str, optional): Address of the service when using TCP. Defaults to "127.0.0.1".
+            port (Optional[int], optional): TCP port of the service instead of a Unix socket. Defaults to None.
+        """
+        if port is not None:
+            self.sock = socket.create_connection((host, port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(str(path or DEFAULT_SOCKET))
+
+    def __enter__(self) -> "DecodeClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the connection."""
+        self.sock.close()
+
+    def _recv_exactly(self, size: int) -> bytes:
+        buf = bytearray()
+        while len(buf) < size:
+            chunk = self.sock.recv(size - len(buf))
+            if not chunk:
+                raise ConnectionError("decode service closed the connection")
+            buf += chunk
+        return bytes(buf)
+
+    def request(self, op: int, payload: bytes) -> bytes:
+        """
+        Send a single request frame and wait for its response.
+
+        Args:
+            op (int): The request op
+            payload (bytes): The request payload
+
+        Returns:
+            bytes: The response payload
+        """
+        self.sock.sendall(HEADER.pack(op, len(payload)) + payload)
+        status, length = HEADER.unpack(self._recv_exactly(HEADER.size))
+        response = self._recv_exactly(length)
+        if status != STATUS_OK:
+            raise DecodeError(response.decode())
+        return response
+
+    def decode(self, words: Iterable[int]) -> List[Optional[str]]:
+        """
+        Decode a batch of instruction words.
+
+        Args:
+            words (Iterable[int]): The 32-bit instruction words
+
+        Returns:
+            List[Optional[str]]: The instruction name of each word, or None when it is unallocated
+        """
+        words = list(words)
+        if not words:
+            return []
+        names = self.request(OP_DECODE, pack_words(words)).decode().split("\n")
+        return [name or None for name in names]
+
+    def disassemble(self, words: Iterable[int], base: int = 0) -> List[str]:
+        """
+        Disassemble a batch of instruction words.
+
+        Args:
+            words (Iterable[int]): The 32-bit instruction words
+            base (int, optional): Address of the first word. Defaults to 0.
+
+        Returns:
+            List[str]: One objdump-style line per word
+        """
+        words = list(words)
+        if not words:
+            return []
+        return self.request(OP_DISASM, BASE.pack(base) + pack_words(words)).decode().split("\n")
+
+    def lookup(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up an instruction by name.
+
+        Args:
+            name (str): The instruction name, e.g. "ADD_64_addsub_imm"
+
+        Returns:
+            Optional[Dict[str, Any]]: The instruction's mask, value, fields, template and operation_id
+        """
+        return json.loads(self.request(OP_LOOKUP, name.encode()))
@@ -0,0 +1,294 @@
+import json
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, ClassVar, Dict, List, Optional, Tuple, Type
+
+from .template import Template
+
+# Backend class of every registered language
+BACKENDS: Dict[str, Type["Backend"]] = {}
+
+
+@dataclass
+class InstructionRecord:
+    """Represents an instruction of the decode tree flattened for code generation."""
+
+    name: str
+    # Bits of the word fixed by the instruction and all of its groups, including should-be bits
+    mask: int
+    value: int
+    fields: Tuple[Tuple[str, int, int], ...]
+    template: str
+    operation_id: Optional[str]
+    # Cubes (mask, value) of the words the condition may accept, one of which the word must match, None if the
+    # instruction is unconditional
+    cubes: Optional[Tuple[Tuple[int, int], ...]] = None
+
+
+class Backend(ABC):
+    """
+    A target language of generated disassemblers.
+
+    Subclasses register themselves under their NAME and provide three templates: the header and footer of the
+    generated file, rendered once, and a fragment rendered for every instruction. Templates are compiled when
+    the backend is instantiated, which the pipeline does once per process. A backend must implement every
+    abstract method before it can be registered.
+    """
+
+    NAME: ClassVar[Optional[str]] = None
+    FILENAME: ClassVar[str] = ""
+    HEADER: ClassVar[str] = ""
+    INSTRUCTION: ClassVar[str] = ""
+    FOOTER: ClassVar[str] = ""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.NAME is not None:
+            # ABCMeta only computes the abstract methods once the class is created, so they are found here
+            missing = sorted(
+                name for name in dir(cls) if getattr(getattr(cls, name, None), "__isabstractmethod__", False)
+            )
+            if missing:
+                raise TypeError(f"backend {cls.NAME} does not implement {', '.join(missing)}")
+            BACKENDS[cls.NAME] = cls
+
+    def __init__(self):
+        self.header = Template(self.HEADER, f"{self.NAME}.header")
+        self.instruction = Template(self.INSTRUCTION, f"{self.NAME}.instruction")
+        self.footer = Template(self.FOOTER, f"{self.NAME}.footer")
+
+    def quote(self, text: str) -> str:
+        """Quote a string literal of the target language."""
+        return json.dumps(text)
+
+    @abstractmethod
+    def fields(self, fields: Tuple[Tuple[str, int, int], ...]) -> str:
+        """Format the operand field layout of an instruction."""
+
+    @abstractmethod
+    def cubes(self, cubes: Tuple[Tuple[int, int], ...]) -> str:
+        """Format the condition cubes of an instruction."""
+
+    def context(self, record: InstructionRecord) -> Dict[str, Any]:
+        """Get the values the instruction template is rendered with."""
+        return {
+            "name": record.name,
+            "name_literal": self.quote(record.name),
+            "mask": record.mask,
+            "value": record.value,
+            "template_literal": self.quote(record.template or record.name),
+            "fields": self.fields(record.fields),
+            "field_count": len(record.fields),
+            "cubes": self.cubes(record.cubes or ()),
+            "cube_count": len(record.cubes or ()),
+            "conditional": record.cubes is not None,
+        }
+
+    def emit(self, records: List[InstructionRecord]) -> str:
+        """Render the fragments of a run of instructions."""
+        render = self.instruction.render
+        context = self.context
+        return "".join(render(context(record)) for record in records)
+
+
+class CBackend(Backend):
+    """C99 table and linear decoder."""
+
+    NAME = "c"
+    FILENAME = "disassembler.c"
+    HEADER = """\
+/* Generated by disassegen from {source} ({instruction_set}, {count} instructions). Do not edit. */
+#include <stddef.h>
+#include <stdint.h>
+
+typedef struct {{
+    const char *name;
+    uint8_t start;
+    uint8_t width;
+}} dsg_field_t;
+
+typedef struct {{
+    uint32_t mask;
+    uint32_t value;
+}} dsg_cube_t;
+
+typedef struct {{
+    uint32_t mask;
+    uint32_t value;
+    const char *name;
+    const char *template;
+    const dsg_field_t *fields;
+    size_t field_count;
+    /* A conditional instruction only matches words that match one of its cubes */
+    const dsg_cube_t *cubes;
+    size_t cube_count;
+    int conditional;
+}} dsg_instruction_t;
+
+static const dsg_instruction_t dsg_instructions[] = {{
+"""
+    INSTRUCTION = """\
+    {{0x{mask:08x}, 0x{value:08x}, {name_literal}, {template_literal}, {fields}, {field_count},
+     {cubes}, {cube_count}, {conditional:d}}},
+"""
+    FOOTER = """\
+}};
+
+static int dsg_condition_holds(const dsg_instruction_t *instruction, uint32_t word) {{
+    if (!instruction->conditional) {{
+        return 1;
+    }}
+    for (size_t i = 0; i < instruction->cube_count; i++) {{
+        if ((word & instruction->cubes[i].mask) == instruction->cubes[i].value) {{
+            return 1;
+        }}
+    }}
+    return 0;
+}}
+
+const dsg_instruction_t *dsg_decode(uint32_t word) {{
+    for (size_t i = 0; i < sizeof(dsg_instructions) / sizeof(dsg_instructions[0]); i++) {{
+        if ((word & dsg_instructions[i].mask) == dsg_instructions[i].value
+            && dsg_condition_holds(&dsg_instructions[i], word)) {{
+            return &dsg_instructions[i];
+        }}
+    }}
+    return NULL;
+}}
+"""
+
+    def fields(self, fields: Tuple[Tuple[str, int, int], ...]) -> str:
+        if not fields:
+            return "NULL"
+        items = ", ".join(f"{{{self.quote(name)}, {start}, {width}}}" for name, start, width in fields)
+        return f"(const dsg_field_t[]){{{items}}}"
+
+    def cubes(self, cubes: Tuple[Tuple[int, int], ...]) -> str:
+        if not cubes:
+            return "NULL"
+        items = ", ".join(f"{{0x{mask:08x}, 0x{value:08x}}}" for mask, value in cubes)
+        return f"(const dsg_cube_t[]){{{items}}}"
+
+
+class PythonBackend(Backend):
+    """Python table and linear decoder."""
+
+    NAME = "python"
+    FILENAME = "disassembler.py"
+    HEADER = """\
+# Generated by disassegen from {source} ({instruction_set}, {count} instructions). Do not edit.
+
+# (mask, value, name, template, ((field, start, width), ...), ((cube mask, cube value), ...) or None)
+# A conditional instruction only matches words that match one of its cubes
+INSTRUCTIONS = [
+"""
+    INSTRUCTION = """\
+    (0x{mask:08x}, 0x{value:08x}, {name_literal}, {template_literal}, {fields}, {cubes}),
+"""
+    FOOTER = """\
+]
+
+
+def decode(word):
+    for instruction in INSTRUCTIONS:
+        cubes = instruction[5]
+        if word & instruction[0] == instruction[1] and (
+            cubes is None or any(word & mask == value for mask, value in cubes)
+        ):
+            return instruction
+    return None
+"""
+
+    def fields(self, fields: Tuple[Tuple[str, int, int], ...]) -> str:
+        items = "".join(f"({self.quote(name)}, {start}, {width}), " for name, start, width in fields)
+        return f"({items.rstrip()})"
+
+    def cubes(self, cubes: Tuple[Tuple[int, int], ...]) -> str:
+        items = "".join(f"(0x{mask:08x}, 0x{value:08x}), " for mask, value in cubes)
+        return f"({items.rstrip()})"
+
+    def context(self, record: InstructionRecord) -> Dict[str, Any]:
+        context = super().context(record)
+        if record.cubes is None:
+            context["cubes"] = "None"
+        return context
+
+
+class GoBackend(Backend):
+    """Go table and linear decoder."""
+
+    NAME = "go"
+    FILENAME = "disassembler.go"
+    HEADER = """\
+// Code generated by disassegen from {source} ({instruction_set}, {count} instructions). DO NOT EDIT.
+
+package disassembler
+
+type Field struct {{
+	Name  string
+	Start uint8
+	Width uint8
+}}
+
+type Cube struct {{
+	Mask  uint32
+	Value uint32
+}}
+
+type Instruction struct {{
+	Mask     uint32
+	Value    uint32
+	Name     string
+	Template string
+	Fields   []Field
+	// A conditional instruction only matches words that match one of its cubes
+	Cubes       []Cube
+	Conditional bool
+}}
+
+var Instructions = []Instruction{{
+"""
+    INSTRUCTION = """\
+	{{0x{mask:08x}, 0x{value:08x}, {name_literal}, {template_literal}, {fields}, {cubes}, {conditional}}},
+"""
+    FOOTER = """\
+}}
+
+func (instruction *Instruction) conditionHolds(word uint32) bool {{
+	if !instruction.Conditional {{
+		return true
+	}}
+	for _, cube := range instruction.Cubes {{
+		if word&cube.Mask == cube.Value {{
+			return true
+		}}
+	}}
+	return false
+}}
+
+func Decode(word uint32) *Instruction {{
+	for i := range Instructions {{
+		if word&Instructions[i].Mask == Instructions[i].Value && Instructions[i].conditionHolds(word) {{
+			return &Instructions[i]
+		}}
+	}}
+	return nil
+}}
+"""
+
+    def fields(self, fields: Tuple[Tuple[str, int, int], ...]) -> str:
+        if not fields:
+            return "nil"
+        items = ", ".join(f"{{{self.quote(name)}, {start}, {width}}}" for name, start, width in fields)
+        return f"[]Field{{{items}}}"
+
+    def cubes(self, cubes: Tuple[Tuple[int, int], ...]) -> str:
+        if not cubes:
+            return "nil"
+        items = ", ".join(f"{{0x{mask:08x}, 0x{value:08x}}}" for mask, value in cubes)
+        return f"[]Cube{{{items}}}"
+
+    def context(self, record: InstructionRecord) -> Dict[str, Any]:
+        context = super().context(record)
+        context["conditional"] = "true" if record.cubes is not None else "false"
+        return context
@@ -0,0 +1,161 @@
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from ..coverage import ANY, condition_cubes
+from ..decoder import FlatInstruction
+from .backends import BACKENDS, Backend, InstructionRecord
+
+# Instructions rendered by a worker process at once
+BATCH_SIZE = 256
+
+# Records and compiled backends of the current worker process
+_records: List[InstructionRecord] = []
+_backends: Dict[str, Backend] = {}
+
+
+def instruction_records(instructions: List[FlatInstruction]) -> List[InstructionRecord]:
+    """
+    Convert flattened instructions into code generation records.
+
+    Args:
+        instructions (List[FlatInstruction]): The instructions in decode order, see ``flat_snapshot``
+
+    Returns:
+        List[InstructionRecord]: Every instruction with the bits fixed by it and all of its groups, and the
+            cubes of the words its condition may accept as in the binary decode table
+    """
+    records = []
+    for instruction in instructions:
+        cubes = None
+        if instruction.condition is not None:
+            fields = {name: (start, width) for name, start, width in instruction.fields}
+            may = condition_cubes(instruction.condition, fields)[1]
+            if may != [ANY]:
+                cubes = tuple(may)
+        records.append(
+            InstructionRecord(
+                instruction.name,
+                instruction.fixed_mask,
+                instruction.fixed_value,
+                instruction.fields,
+                instruction.template,
+                instruction.operation_id,
+                cubes,
+            )
+        )
+    return records
+
+
+def _backend(name: str) -> Backend:
+    if name not in _backends:
+        _backends[name] = BACKENDS[name]()
+    return _backends[name]
+
+
+def _init_worker(records: List[InstructionRecord]) -> None:
+    global _records
+    _records = records
+
+
+def _emit_batch(name: str, start: int, end: int) -> Tuple[str, float]:
+    began = time.perf_counter()
+    text = _backend(name).emit(_records[start:end])
+    return text, time.perf_counter() - began
+
+
+@dataclass
+class BackendReport:
+    """Represents the output of one backend of a generation run and where its time went."""
+
+    name: str
+    path: Path
+    instructions: int
+    # Seconds spent compiling the templates, rendering fragments summed over workers, and writing the file
+    compile_time: float = 0.0
+    emit_time: float = 0.0
+    write_time: float = 0.0
+
+
+def generate(
+    records: List[InstructionRecord],
+    backends: List[str],
+    output_dir: Union[str, Path],
+    context: Optional[Dict[str, str]] = None,
+    jobs: Optional[int] = None,
+    batch_size: int = BATCH_SIZE,
+) -> List[BackendReport]:
+    """
+    Generate disassembler source for several languages at once.
+
+    The records are handed to every worker process once. The fragments of each backend are then rendered in
+    batches spread over the pool and concatenated in decode order, so the output does not depend on which
+    worker finishes first.
+
+    Args:
+        records (List[InstructionRecord]): The instructions, see ``instruction_records``
+        backends (List[str]): Names of the registered backends to run
+        output_dir (Union[str, Path]): Directory the generated files are written to
+        context (Optional[Dict[str, str]], optional): Extra values for the header and footer templates.
+            Defaults to None.
+        jobs (Optional[int], optional): Number of worker processes. Defaults to the CPU count.
+        batch_size (int, optional): Instructions rendered per task. Defaults to 256.
+
+    Raises:
+        ValueError: If a backend is not registered
+
+    Returns:
+        List[BackendReport]: The file written by every backend and its timing
+    """
+    unknown = [name for name in backends if name not in BACKENDS]
+    if unknown:
+        raise ValueError(f"unknown backends {', '.join(unknown)}, expected some of {', '.join(sorted(BACKENDS))}")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    values = {"source": "", "instruction_set": "", **(context or {}), "count": len(records)}
+    batches = [(start, min(start + batch_size, len(records))) for start in range(0, len(records), batch_size)]
+    jobs = jobs or os.cpu_count() or 1
+
+    reports = []
+    compiled = {}
+    for name in backends:
+        began = time.perf_counter()
+        compiled[name] = BACKENDS[name]()
+        reports.append(BackendReport(name, output_dir / BACKENDS[name].FILENAME, len(records)))
+        reports[-1].compile_time = time.perf_counter() - began
+
+    fragments: Dict[str, List[str]] = {name: [] for name in backends}
+    emit_times: Dict[str, float] = {name: 0.0 for name in backends}
+    if jobs == 1 or len(batches) < 2:
+        _init_worker(records)
+        _backends.update(compiled)
+        for name in backends:
+            for start, end in batches:
+                text, elapsed = _emit_batch(name, start, end)
+                fragments[name].append(text)
+                emit_times[name] += elapsed
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(records,)) as pool:
+            futures: Dict[str, List[Future]] = {
+                name: [pool.submit(_emit_batch, name, start, end) for start, end in batches] for name in backends
+            }
+            for name in backends:
+                for future in futures[name]:
+                    text, elapsed = future.result()
+                    fragments[name].append(text)
+                    emit_times[name] += elapsed
+
+    for report in reports:
+        backend = compiled[report.name]
+        report.emit_time = emit_times[report.name]
+        began = time.perf_counter()
+        with report.path.open("w") as f:
+            f.write(backend.header(values))
+            f.writelines(fragments[report.name])
+            f.write(backend.footer(values))
+        report.write_time = time.perf_counter() - began
+    return reports
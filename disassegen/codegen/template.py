@@ -0,0 +1,60 @@
+from string import Formatter
+from typing import Any, Callable, Dict, List
+
+# Functions applied by the !r, !s and !a conversions
+CONVERSIONS = {"r": "repr", "s": "str", "a": "ascii"}
+
+
+class TemplateError(ValueError):
+    """Raised when a template cannot be compiled."""
+
+
+class Template(object):
+    """
+    Text template with ``{name}`` and ``{name:spec}`` placeholders, compiled once into a Python function.
+
+    Literal braces are written ``{{`` and ``}}`` as with ``str.format``, but unlike ``str.format`` the template
+    is only parsed when it is compiled, so rendering it for thousands of instructions is a single call each.
+    """
+
+    def __init__(self, source: str, name: str = "template"):
+        """
+        Compile a template.
+
+        Args:
+            source (str): The template text
+            name (str, optional): Name shown in tracebacks of the compiled function. Defaults to "template".
+
+        Raises:
+            TemplateError: If a placeholder is not a plain identifier
+        """
+        self.source = source
+        self.name = name
+        self.names: List[str] = []
+
+        pieces = []
+        try:
+            parsed = list(Formatter().parse(source))
+        except ValueError as e:
+            raise TemplateError(f"{name}: {e}") from None
+        for literal, field, spec, conversion in parsed:
+            if literal:
+                pieces.append(repr(literal))
+            if field is None:
+                continue
+            if not field.isidentifier() or "{" in (spec or ""):
+                raise TemplateError(f"{name}: unsupported placeholder {{{field}}}")
+            self.names.append(field)
+            value = f"v[{field!r}]"
+            if conversion:
+                value = f"{CONVERSIONS[conversion]}({value})"
+            pieces.append(f"format({value}, {spec!r})" if spec else f"str({value})")
+
+        code = f"def render(v):\n    return {' + '.join(pieces) or repr('')}\n"
+        namespace: Dict[str, Any] = {}
+        exec(compile(code, f"<{name}>", "exec"), namespace)
+        self.render: Callable[[Dict[str, Any]], str] = namespace["render"]
+
+    def __call__(self, values: Dict[str, Any]) -> str:
+        """Render the template with a value for every placeholder."""
+        return self.render(values)
@@ -0,0 +1,322 @@
+import json
+import random
+import struct
+import sys
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from .coverage import Cube, condition_cubes, intersect, intersect_all, subtract
+from .decoder import UNKNOWN, Check, FlatInstruction, compile_condition
+
+# Candidate words drawn for an instruction before searching for one that decodes to it
+ATTEMPTS = 64
+
+# Cubes the witness search of an instruction visits before giving up
+SEARCH_BUDGET = 1 << 16
+
+# Words generated and written at once
+CHUNK_WORDS = 1 << 20
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+
+
+def load_frequencies(file_path: Union[str, Path]) -> Dict[str, float]:
+    """
+    Load a frequency profile.
+
+    The profile is either a JSON object or a text file of ``name count`` lines, where a name is an instruction
+    name or an operation_id and ``#`` starts a comment. Counts are relative weights.
+
+    Args:
+        file_path (Union[str, Path]): Path to the profile
+
+    Raises:
+        ValueError: If a line or a weight is malformed
+
+    Returns:
+        Dict[str, float]: The weight of every name
+    """
+    text = Path(file_path).read_text()
+    if text.lstrip().startswith("{"):
+        weights = {str(name): float(weight) for name, weight in json.loads(text).items()}
+    else:
+        weights = {}
+        for number, line in enumerate(text.splitlines(), 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split()
+            if len(parts) != 2:
+                raise ValueError(f"{file_path}:{number}: expected 'name count', got {line!r}")
+            weights[parts[0]] = float(parts[1])
+    for name, weight in weights.items():
+        if weight < 0:
+            raise ValueError(f"{file_path}: negative weight {weight} for {name}")
+    return weights
+
+
+def npy_header(count: int) -> bytes:
+    """Get the NPY format 1.0 header of a one-dimensional little-endian uint32 array."""
+    header = f"{{'descr': '<u4', 'fortran_order': False, 'shape': ({count},), }}"
+    # The magic, the version and the header length take 10 bytes, and the data starts 64-byte aligned
+    padding = -(len(NPY_MAGIC) + 2 + len(header) + 1) % 64
+    header += " " * padding + "\n"
+    return NPY_MAGIC + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+def shadowing(instructions: List[FlatInstruction], bits: int = 32) -> List[List[int]]:
+    """
+    Find, for every instruction, the instructions before it in decode order whose encodings overlap its own.
+
+    Decoding is first match, so a word with the fixed bits of an instruction decodes to it unless one of these
+    matches first. For every bit and value, a bitset holds the instructions that do not fix the bit to the
+    other value, so the instructions that overlap one are the intersection of the bitsets of its fixed bits.
+
+    Args:
+        instructions (List[FlatInstruction]): The instructions in decode order
+        bits (int, optional): Width of the instruction word. Defaults to 32.
+
+    Returns:
+        List[List[int]]: The indexes of the overlapping earlier instructions of every instruction
+    """
+    everyone = (1 << len(instructions)) - 1
+    compatible = [[everyone, everyone] for _ in range(bits)]
+    for index, instruction in enumerate(instructions):
+        for bit in range(bits):
+            if instruction.fixed_mask >> bit & 1:
+                compatible[bit][1 - (instruction.fixed_value >> bit & 1)] &= ~(1 << index)
+
+    result = []
+    for index, instruction in enumerate(instructions):
+        overlapping = (1 << index) - 1
+        for bit in range(bits):
+            if instruction.fixed_mask >> bit & 1:
+                overlapping &= compatible[bit][instruction.fixed_value >> bit & 1]
+        earlier = []
+        while overlapping:
+            low = overlapping & -overlapping
+            earlier.append(low.bit_length() - 1)
+            overlapping ^= low
+        result.append(earlier)
+    return result
+
+
+def find_witness(
+    region: List[Cube], shadows: List[List[Cube]], budget: int = SEARCH_BUDGET
+) -> Tuple[Optional[Cube], bool]:
+    """
+    Search for words of a region that none of a list of other regions holds.
+
+    The region is split around the first shadowing region that intersects it, depth first, and the pieces are
+    checked against the following ones, so the search ends at the first piece that escapes every shadow.
+
+    Args:
+        region (List[Cube]): The words to search, e.g. those an instruction and its condition accept
+        shadows (List[List[Cube]]): The regions to avoid, e.g. those of the earlier overlapping encodings
+        budget (int, optional): Cubes to visit before giving up. Defaults to 64K.
+
+    Returns:
+        Tuple[Optional[Cube], bool]: A cube of words outside every shadow, or None, and whether the search was
+            exhaustive, so that None means there are no such words
+    """
+    stack = [(cube, 0) for cube in reversed(region)]
+    while stack:
+        budget -= 1
+        if budget < 0:
+            return None, False
+        cube, start = stack.pop()
+        for n in range(start, len(shadows)):
+            hits = [shadow for shadow in shadows[n] if intersect(cube, shadow) is not None]
+            if hits:
+                pieces = [cube]
+                for shadow in hits:
+                    pieces = [piece for rest in pieces for piece in subtract(rest, shadow)]
+                stack.extend((piece, n + 1) for piece in reversed(pieces))
+                break
+        else:
+            return cube, True
+    return None, True
+
+
+def _region(instruction: FlatInstruction) -> List[Cube]:
+    # The words that have the fixed bits of an instruction and may pass its condition, which like the decoder
+    # assumes the parts that do not depend on the word hold
+    fields = {name: (start, width) for name, start, width in instruction.fields}
+    may = condition_cubes(instruction.condition, fields)[1]
+    return intersect_all([(instruction.fixed_mask, instruction.fixed_value)], may)
+
+
+def _check(instruction: FlatInstruction) -> Union[bool, Check, None]:
+    fields = {name: (start, width) for name, start, width in instruction.fields}
+    check = compile_condition(instruction.condition, fields)
+    # Like the decoder, conditions that do not depend on the word are assumed to hold
+    return None if check is True or check is UNKNOWN else check
+
+
+@dataclass
+class _Plan:
+    mask: int
+    value: int
+    check: Optional[Check]
+    shadows: List[Tuple[int, int, Optional[Check]]]
+    # A word known to decode to the instruction
+    witness: int = 0
+    # Words that all decode to the instruction, found by search when random draws failed
+    cube: Optional[Cube] = None
+
+
+@dataclass
+class CorpusStats:
+    """Represents what a corpus sampler can draw from."""
+
+    instructions: int
+    # Instructions with a weight that no word decodes to, e.g. because earlier encodings cover them
+    unreachable: List[str] = field(default_factory=list)
+    # Instructions with a weight for which neither random draws nor the search budget found a word
+    unsampled: List[str] = field(default_factory=list)
+    # Instructions with a non-zero weight
+    weighted: int = 0
+
+
+class CorpusSampler(object):
+    """
+    Draws instruction words that decode to chosen instructions.
+
+    An instruction is picked uniformly, or in proportion to its weight in a frequency profile, and a word is
+    made of its fixed bits and random free bits. Candidates that break its condition or that an earlier
+    overlapping encoding would decode first are redrawn, so every word decodes to the instruction it was drawn
+    for, with should-be bits honoured. Instructions that random draws keep missing are searched for among the
+    cubes of their encoding and condition, so that only those no word decodes to are left out. The same seed
+    draws the same words.
+    """
+
+    def __init__(
+        self, instructions: List[FlatInstruction], weights: Optional[Dict[str, float]] = None, seed: int = 0
+    ):
+        """
+        Prepare a sampler.
+
+        Args:
+            instructions (List[FlatInstruction]): The instructions in decode order, see ``flat_snapshot``
+            weights (Optional[Dict[str, float]], optional): Weight of instruction names or operation_ids, see
+                ``load_frequencies``. Instructions without one are left out. Defaults to None, every instruction
+                weighing the same.
+            seed (int, optional): Seed of the generator. Defaults to 0.
+
+        Raises:
+            ValueError: If no word decodes to any instruction of non-zero weight
+        """
+        self.instructions = instructions
+        self.random = random.Random(seed)
+        self.stats = CorpusStats(len(instructions))
+        checks = [_check(instruction) for instruction in instructions]
+        shadows = shadowing(instructions)
+        regions: Dict[int, List[Cube]] = {}
+
+        def region(index: int) -> List[Cube]:
+            if index not in regions:
+                regions[index] = _region(instructions[index])
+            return regions[index]
+
+        self.plans: List[_Plan] = []
+        self.indexes: List[int] = []
+        cumulative: List[float] = []
+        total = 0.0
+        for index, instruction in enumerate(instructions):
+            if weights is None:
+                weight = 1.0
+            else:
+                weight = weights.get(instruction.name, weights.get(instruction.operation_id or "", 0.0))
+            if weight <= 0:
+                self.plans.append(_Plan(0, 0, None, []))
+                continue
+            self.stats.weighted += 1
+            plan = _Plan(
+                instruction.fixed_mask,
+                instruction.fixed_value,
+                checks[index],
+                [
+                    (instructions[other].fixed_mask, instructions[other].fixed_value, checks[other])
+                    for other in shadows[index]
+                    if checks[other] is not False
+                ],
+            )
+            self.plans.append(plan)
+            if plan.check is False:
+                self.stats.unreachable.append(instruction.name)
+                continue
+            witness = self._draw(plan)
+            if witness is None:
+                others = [region(other) for other in shadows[index] if checks[other] is not False]
+                plan.cube, exhaustive = find_witness(region(index), others)
+                if plan.cube is None:
+                    (self.stats.unreachable if exhaustive else self.stats.unsampled).append(instruction.name)
+                    continue
+                witness = plan.cube[1]
+            plan.witness = witness
+            total += weight
+            self.indexes.append(index)
+            cumulative.append(total)
+        if not self.indexes:
+            raise ValueError("no instruction with a non-zero weight can be sampled")
+        self.cumulative = cumulative
+
+    def _draw(self, plan: _Plan) -> Optional[int]:
+        getrandbits = self.random.getrandbits
+        free = ~plan.mask & 0xFFFFFFFF
+        for _ in range(ATTEMPTS):
+            word = getrandbits(32) & free | plan.value
+            if plan.check is not None and not plan.check(word):
+                continue
+            for mask, value, check in plan.shadows:
+                if word & mask == value and (check is None or check(word)):
+                    break
+            else:
+                return word
+        return None
+
+    def sample(self, count: int) -> array:
+        """
+        Draw instruction words.
+
+        Args:
+            count (int): Number of words
+
+        Returns:
+            array: The words as ``uint32`` in host byte order
+        """
+        picks = self.random.choices(self.indexes, cum_weights=self.cumulative, k=count)
+        words = array("I", bytes(4 * count))
+        plans = self.plans
+        getrandbits = self.random.getrandbits
+        for n, index in enumerate(picks):
+            plan = plans[index]
+            if plan.cube is not None:
+                words[n] = getrandbits(32) & ~plan.cube[0] | plan.cube[1]
+            elif plan.check is None and not plan.shadows:
+                words[n] = getrandbits(32) & ~plan.mask | plan.value
+            else:
+                word = self._draw(plan)
+                words[n] = plan.witness if word is None else word
+        return words
+
+    def write(self, file_path: Union[str, Path], count: int, chunk_words: int = CHUNK_WORDS) -> None:
+        """
+        Write a corpus of little-endian words to a raw ``.bin`` file, or to a ``.npy`` array without numpy.
+
+        Args:
+            file_path (Union[str, Path]): The output, whose suffix picks the format
+            count (int): Number of words
+            chunk_words (int, optional): Words generated and written at once. Defaults to 1M.
+        """
+        path = Path(file_path)
+        with path.open("wb") as f:
+            if path.suffix == ".npy":
+                f.write(npy_header(count))
+            for start in range(0, count, chunk_words):
+                words = self.sample(min(chunk_words, count - start))
+                if sys.byteorder != "little":
+                    words.byteswap()
+                f.write(words.tobytes())
@@ -0,0 +1,294 @@
+"""
+Encoding-space coverage of a decode tree.
+
+Every node of the decode tree selects a ternary pattern of the instruction word: a cube made of the bits in its
+mask, the other bits being free. Conditions over encoding fields are turned into unions of cubes as well, so
+the encodings an instruction set uses can be counted by keeping lists of disjoint cubes and summing their
+sizes, without ever enumerating words.
+
+Conditions that do not only depend on encoding bits, such as feature tests that no profile folded, make the
+words they guard conditional: they may or may not decode depending on the target.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from .decoder import STRICT, DecodeNode, parse_value
+
+# A ternary pattern: the words where word & mask == value
+Cube = Tuple[int, int]
+
+WORD_BITS = 32
+ANY: Cube = (0, 0)
+
+
+def cube_size(cube: Cube, bits: int = WORD_BITS) -> int:
+    """Get the number of words a cube holds."""
+    return 1 << (bits - bin(cube[0]).count("1"))
+
+
+def intersect(a: Cube, b: Cube) -> Optional[Cube]:
+    """Intersect two cubes, None when they are disjoint."""
+    if (a[1] ^ b[1]) & a[0] & b[0]:
+        return None
+    return a[0] | b[0], a[1] | b[1]
+
+
+def subtract(a: Cube, b: Cube) -> List[Cube]:
+    """
+    Remove a cube from another.
+
+    Args:
+        a (Cube): The cube to remove from
+        b (Cube): The cube to remove
+
+    Returns:
+        List[Cube]: Disjoint cubes covering the words of a that are not in b
+    """
+    if intersect(a, b) is None:
+        return [a]
+    pieces = []
+    mask, value = a
+    # Split a on each bit b fixes and a leaves free: the half that disagrees with b is kept
+    free = b[0] & ~a[0]
+    while free:
+        bit = free & -free
+        free ^= bit
+        pieces.append((mask | bit, value | (~b[1] & bit)))
+        mask |= bit
+        value |= b[1] & bit
+    return pieces
+
+
+def intersect_all(a: List[Cube], b: List[Cube]) -> List[Cube]:
+    """Intersect two unions of cubes, keeping the result disjoint when both are."""
+    result = []
+    for x in a:
+        for y in b:
+            cube = intersect(x, y)
+            if cube is not None:
+                result.append(cube)
+    return result
+
+
+def complement(cubes: List[Cube]) -> List[Cube]:
+    """Get disjoint cubes covering every word outside a union of cubes."""
+    result = [ANY]
+    for cube in cubes:
+        result = [piece for rest in result for piece in subtract(rest, cube)]
+    return result
+
+
+def disjoint(cubes: List[Cube]) -> List[Cube]:
+    """Rewrite a union of cubes as disjoint cubes."""
+    result: List[Cube] = []
+    for cube in cubes:
+        result.extend(_insert(result, cube)[0])
+    return result
+
+
+def _insert(union: List[Cube], cube: Cube) -> Tuple[List[Cube], List[Cube]]:
+    """Split a cube into the disjoint pieces that are new to a disjoint union and those already in it."""
+    new = [cube]
+    seen = []
+    for other in union:
+        common = intersect(cube, other)
+        if common is None:
+            continue
+        seen.append(common)
+        new = [piece for rest in new for piece in subtract(rest, other)]
+        if not new:
+            break
+    return new, seen
+
+
+def condition_cubes(
+    condition: Optional[Dict[str, Any]], fields: Dict[str, Tuple[int, int]]
+) -> Tuple[List[Cube], List[Cube]]:
+    """
+    Turn a raw MRS condition AST into the words it accepts.
+
+    Conditions that cannot be decided from the encoding bits, such as feature tests, may or may not hold, so
+    the result is a pair of bounds rather than a single union.
+
+    Args:
+        condition (Optional[Dict[str, Any]]): The raw condition AST
+        fields (Dict[str, Tuple[int, int]]): The (start, width) of every encoding field in scope
+
+    Returns:
+        Tuple[List[Cube], List[Cube]]: The cubes of the words the condition surely accepts and of those it
+            may accept
+    """
+    if condition is None:
+        return [ANY], [ANY]
+
+    kind = condition.get("_type")
+
+    if kind == "AST.Bool":
+        cubes = [ANY] if condition["value"] else []
+        return cubes, cubes
+
+    if kind == "AST.UnaryOp" and condition.get("op") in ("!", "NOT"):
+        must, may = condition_cubes(condition["expr"], fields)
+        return complement(may), complement(must)
+
+    if kind == "AST.BinaryOp":
+        op = condition.get("op")
+        if op in ("&&", "||"):
+            left_must, left_may = condition_cubes(condition["left"], fields)
+            right_must, right_may = condition_cubes(condition["right"], fields)
+            if op == "&&":
+                return intersect_all(left_must, right_must), intersect_all(left_may, right_may)
+            return disjoint(left_must + right_must), disjoint(left_may + right_may)
+
+        if op in ("==", "!=", "IN"):
+            cubes = _compare_cubes(condition, fields)
+            if cubes is not None:
+                if op == "!=":
+                    cubes = complement(cubes)
+                return cubes, cubes
+
+    # Depends on more than the encoding bits
+    return [], [ANY]
+
+
+def _compare_cubes(condition: Dict[str, Any], fields: Dict[str, Tuple[int, int]]) -> Optional[List[Cube]]:
+    left = condition.get("left") or {}
+    right = condition.get("right") or {}
+    if left.get("_type") != "AST.Identifier" or left.get("value") not in fields:
+        return None
+    start, width = fields[left["value"]]
+    bits = (1 << width) - 1
+
+    cubes = []
+    for item in right.get("values", []) if right.get("_type") == "AST.Set" else [right]:
+        if item.get("_type") == "Values.Value":
+            pattern = (item.get("value") or "").strip()
+            negated = pattern.startswith("!")
+            m, v, _ = parse_value(pattern.lstrip("! "))
+        elif item.get("_type") == "AST.Integer":
+            negated = False
+            m, v = bits, item["value"]
+        else:
+            return None
+        cube = ((m & bits) << start, (v & m & bits) << start)
+        cubes.extend(complement([cube]) if negated else [cube])
+    return disjoint(cubes)
+
+
+@dataclass
+class Coverage:
+    """Represents how the encodings of an instruction set or group are used."""
+
+    name: str
+    depth: int
+    # Words selected by the encoding bits of the node, before conditions
+    space: int
+    # Words that decode to exactly one instruction
+    allocated: int = 0
+    # Words that decode to more than one instruction, the first in spec order wins
+    overlapped: int = 0
+    # Words that decode to an instruction or not depending on conditions the encoding bits cannot decide
+    conditional: int = 0
+    # Words that decode to no instruction
+    unallocated: int = 0
+
+    def __str__(self) -> str:
+        def share(count: int) -> str:
+            return f"{count:>13,} {100 * count / self.space:6.2f}%" if self.space else f"{count:>21,}"
+
+        return (
+            f"{'  ' * self.depth + self.name:<40} {self.space:>13,}  {share(self.allocated)}  "
+            f"{share(self.overlapped)}  {share(self.conditional)}  {share(self.unallocated)}"
+        )
+
+
+@dataclass
+class _Region:
+    """Represents the disjoint cubes of the words a subtree surely decodes once, twice or more, and may decode."""
+
+    once: List[Cube]
+    twice: List[Cube]
+    may: List[Cube]
+
+    def merge(self, other: "_Region") -> None:
+        for cube in other.once:
+            new, seen = _insert(self.once, cube)
+            self.once.extend(new)
+            for common in seen:
+                self.twice.extend(_insert(self.twice, common)[0])
+        for cube in other.twice:
+            self.twice.extend(_insert(self.twice, cube)[0])
+        for cube in other.may:
+            self.may.extend(_insert(self.may, cube)[0])
+
+
+def encoding_coverage(
+    tree: List[DecodeNode], name: str = "A64", should_be: str = STRICT, bits: int = WORD_BITS
+) -> List[Coverage]:
+    """
+    Count the allocated, overlapped, conditional and unallocated encodings of an instruction set.
+
+    Args:
+        tree (List[DecodeNode]): The decode tree, see ``build_decode_tree``
+        name (str, optional): Name of the instruction set. Defaults to "A64".
+        should_be (str, optional): With "strict", words that break the should-be bits of an instruction do not
+            decode to it. Defaults to "strict".
+        bits (int, optional): Width of the instruction word. Defaults to 32.
+
+    Returns:
+        List[Coverage]: The coverage of the instruction set followed by that of every group, in spec order
+    """
+    report = [Coverage(name, 0, 1 << bits)]
+
+    def visit(node: DecodeNode, path: Cube, must: List[Cube], may: List[Cube], depth: int) -> _Region:
+        mask, value = node.mask, node.value
+        if should_be == STRICT:
+            mask |= node.sbo | node.sbz
+            value |= node.sbo
+        cube = intersect(path, (mask, value))
+        if cube is None:
+            return _Region([], [], [])
+        scope = {field: (start, width) for field, start, width in node.fields}
+        condition_must, condition_may = condition_cubes(node.condition, scope)
+        must = intersect_all(intersect_all(must, [cube]), condition_must)
+        may = intersect_all(intersect_all(may, [cube]), condition_may)
+
+        if node.leaf:
+            return _Region(disjoint(must), [], disjoint(may))
+
+        coverage = Coverage(node.name, depth, cube_size(cube, bits))
+        report.append(coverage)
+        region = gather(node.children, cube, must, may, depth + 1)
+        count(coverage, region)
+        return region
+
+    def gather(children: List[DecodeNode], path: Cube, must: List[Cube], may: List[Cube], depth: int) -> _Region:
+        region = _Region([], [], [])
+        seen: List[Cube] = []
+        for child in children:
+            child_cube = intersect(path, (child.mask, child.value))
+            if child_cube is None:
+                continue
+            part = visit(child, path, must, may, depth)
+            if all(intersect(child_cube, other) is None for other in seen):
+                # Siblings told apart by their encoding bits cannot overlap
+                region.once.extend(part.once)
+                region.twice.extend(part.twice)
+                region.may.extend(part.may)
+            else:
+                region.merge(part)
+            seen.append(child_cube)
+        return region
+
+    def count(coverage: Coverage, region: _Region) -> None:
+        once = sum(cube_size(cube, bits) for cube in region.once)
+        twice = sum(cube_size(cube, bits) for cube in region.twice)
+        may = sum(cube_size(cube, bits) for cube in region.may)
+        coverage.overlapped = twice
+        coverage.allocated = once - twice
+        coverage.conditional = may - once
+        coverage.unallocated = coverage.space - may
+
+    count(report[0], gather(tree, ANY, [ANY], [ANY], 1))
+    return report
@@ -0,0 +1,165 @@
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Tuple, Union
+
+from .decoder import encodeset_bits
+from .isa.spec import Instruction as XMLInstruction
+from .spec import Instruction, InstructionGroup, InstructionSet, MRSSpec
+
+BITS = "bits"
+FIELDS = "fields"
+MISSING_XML = "missing-xml"
+MISSING_MRS = "missing-mrs"
+RENAMED = "renamed"
+
+
+@dataclass
+class EncodingSignature:
+    """Represents the fixed bits and operand field names of an encoding on one side of the cross-check."""
+
+    name: str
+    # Fixed bits, should-be bits included
+    mask: int
+    value: int
+    fields: FrozenSet[str]
+    # Where the encoding is described, e.g. the XML file or the MRS group path
+    source: str = ""
+
+
+@dataclass
+class Mismatch:
+    """Represents a difference between the MRS and XML descriptions of an encoding."""
+
+    kind: str
+    name: str
+    detail: str
+
+    def __str__(self) -> str:
+        return f"{self.kind:<12} {self.name}: {self.detail}"
+
+
+@dataclass
+class CrossCheckReport:
+    """Represents the outcome of a cross-check."""
+
+    mrs: int
+    xml: int
+    matched: int = 0
+    mismatches: List[Mismatch] = field(default_factory=list)
+
+
+def mrs_signatures(spec: MRSSpec, instruction_set: str = "A64") -> Dict[str, EncodingSignature]:
+    """
+    Index the encodings of an MRS instruction set by name.
+
+    Args:
+        spec (MRSSpec): The loaded spec
+        instruction_set (str, optional): Name of the InstructionSet. Defaults to "A64".
+
+    Returns:
+        Dict[str, EncodingSignature]: The fixed bits of every instruction, those of its groups included, and
+            the names of the fields of its own encoding
+    """
+    index: Dict[str, EncodingSignature] = {}
+
+    def visit(item: Union[InstructionSet, InstructionGroup, Instruction], mask: int, value: int, path: str) -> None:
+        m, v, fields, _ = encodeset_bits(item.encoding)
+        mask |= m
+        value |= v
+        if isinstance(item, Instruction):
+            index[item.name] = EncodingSignature(
+                item.name, mask, value, frozenset(name for name, _, _ in fields), path
+            )
+            return
+        for child in item.children:
+            visit(child, mask, value, f"{path}/{child.name}" if isinstance(child, InstructionGroup) else path)
+
+    for item in spec.instructions.instructions:
+        if item.name == instruction_set:
+            visit(item, 0, 0, item.name)
+            return index
+    raise ValueError(f"instruction set {instruction_set} not found in {spec.file_path}")
+
+
+def xml_signatures(instructions: Iterable[XMLInstruction]) -> Dict[str, EncodingSignature]:
+    """
+    Index the encodings of ISA XML instructions by name.
+
+    Args:
+        instructions (Iterable[XMLInstruction]): The parsed XML instructions, see ``isa.spec.load_isa``
+
+    Returns:
+        Dict[str, EncodingSignature]: The fixed bits of every encoding, bit differences applied, and the names
+            of the named fields of its register diagram
+    """
+    index: Dict[str, EncodingSignature] = {}
+    for instruction in instructions:
+        for iclass in instruction.instruction_classes:
+            for encoding in iclass.encodings:
+                diagram = encoding.reg_diagram
+                fields = [box.name for box in diagram.boxes if box.use_name and box.name] if diagram else []
+                index[encoding.name] = EncodingSignature(
+                    encoding.name, encoding.fixed_mask, encoding.fixed_value, frozenset(fields), instruction.id
+                )
+    return index
+
+
+def _bit_detail(mrs: EncodingSignature, xml: EncodingSignature) -> str:
+    def pattern(signature: EncodingSignature) -> str:
+        return "".join(
+            ("1" if signature.value >> bit & 1 else "0") if signature.mask >> bit & 1 else "x"
+            for bit in range(31, -1, -1)
+        )
+
+    return f"MRS {pattern(mrs)} XML {pattern(xml)}"
+
+
+def cross_check(mrs: Dict[str, EncodingSignature], xml: Dict[str, EncodingSignature]) -> CrossCheckReport:
+    """
+    Join the MRS and XML encoding indexes and report where they disagree.
+
+    Encodings are joined by name. Those missing on one side are looked up on the other by their fixed bits,
+    so an encoding that was only renamed is reported as such. Every lookup is a hash lookup, so the check is
+    linear in the number of encodings.
+
+    Args:
+        mrs (Dict[str, EncodingSignature]): The MRS index, see ``mrs_signatures``
+        xml (Dict[str, EncodingSignature]): The XML index, see ``xml_signatures``
+
+    Returns:
+        CrossCheckReport: The matched count and every mismatch
+    """
+    report = CrossCheckReport(len(mrs), len(xml))
+    by_bits: Dict[Tuple[int, int], List[EncodingSignature]] = {}
+    for signature in xml.values():
+        if signature.name not in mrs:
+            by_bits.setdefault((signature.mask, signature.value), []).append(signature)
+
+    for name, ours in mrs.items():
+        theirs = xml.get(name)
+        if theirs is None:
+            candidates = by_bits.get((ours.mask, ours.value))
+            if candidates:
+                other = candidates.pop(0)
+                report.mismatches.append(Mismatch(RENAMED, name, f"XML calls it {other.name} ({other.source})"))
+            else:
+                report.mismatches.append(Mismatch(MISSING_XML, name, f"no XML encoding ({ours.source})"))
+            continue
+
+        matched = True
+        if (ours.mask, ours.value) != (theirs.mask, theirs.value):
+            report.mismatches.append(Mismatch(BITS, name, _bit_detail(ours, theirs)))
+            matched = False
+        if ours.fields != theirs.fields:
+            detail = []
+            if ours.fields - theirs.fields:
+                detail.append(f"only in MRS: {', '.join(sorted(ours.fields - theirs.fields))}")
+            if theirs.fields - ours.fields:
+                detail.append(f"only in XML: {', '.join(sorted(theirs.fields - ours.fields))}")
+            report.mismatches.append(Mismatch(FIELDS, name, "; ".join(detail)))
+            matched = False
+        report.matched += matched
+
+    for candidates in by_bits.values():
+        for other in candidates:
+            report.mismatches.append(Mismatch(MISSING_MRS, other.name, f"no MRS instruction ({other.source})"))
+    return report
@@ -0,0 +1,692 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .features import FeatureProfile, fold_condition
+from .mrs.node import EncodesetField, unwrap
+from .snapshot import load_snapshot, save_snapshot, snapshot_path
+from .spec import Encodeset, Instruction, InstructionGroup, InstructionSet, MRSSpec
+
+# Sentinel for conditions that cannot be evaluated from the encoding alone
+UNKNOWN = object()
+
+Check = Callable[[int], bool]
+
+
+def parse_value(value: Optional[str]) -> Tuple[int, int, int]:
+    """
+    Parse an MRS Values.Value bit pattern such as ``'10x1'``, ``0b10x1`` or ``0xf``.
+
+    Args:
+        value (Optional[str]): The raw pattern string
+
+    Returns:
+        Tuple[int, int, int]: The (mask, value, width) of the pattern, where ``x`` bits are left out of the mask
+    """
+    if not value:
+        return 0, 0, 0
+
+    s = value.strip()
+    if s.startswith("!"):
+        # Negative constraints are not fixed bits
+        return 0, 0, 0
+    if s.startswith("0x"):
+        width = 4 * (len(s) - 2)
+        return (1 << width) - 1, int(s, 16), width
+    if s.startswith("0b"):
+        bits = s[2:]
+    else:
+        bits = s.strip("'")
+
+    mask = 0
+    val = 0
+    width = 0
+    for ch in bits:
+        if ch in " ()":
+            continue
+        mask <<= 1
+        val <<= 1
+        width += 1
+        if ch == "0":
+            mask |= 1
+        elif ch == "1":
+            mask |= 1
+            val |= 1
+    return mask, val, width
+
+
+def encodeset_bits(encoding: Encodeset) -> Tuple[int, int, List[Tuple[str, int, int]], int]:
+    """
+    Fold the values of an Encodeset into a single mask/value pair.
+
+    Args:
+        encoding (Encodeset): The encoding to fold
+
+    Returns:
+        Tuple[int, int, List[Tuple[str, int, int]], int]: The fixed bit mask, their value, the (name, start, width)
+            of every named field and the mask of the fixed bits that are only should-be (SBO/SBZ) bits
+    """
+    mask = 0
+    value = 0
+    should = 0
+    fields = []
+    for item in encoding.values:
+        start = item.range.start
+        width = item.range.width
+        bits = (1 << width) - 1
+        m, v, _ = parse_value(item.value.value)
+        mask |= (m & bits) << start
+        value |= (v & bits) << start
+        should_be_mask = item.get("should_be_mask")
+        if should_be_mask is not None:
+            _, sb, _ = parse_value(should_be_mask.value)
+            should |= (sb & bits) << start
+        if isinstance(item, EncodesetField):
+            fields.append((item.name, start, width))
+    return mask, value & mask, fields, should & mask
+
+
+def _field_getter(start: int, width: int) -> Callable[[int], int]:
+    bits = (1 << width) - 1
+    return lambda word: (word >> start) & bits
+
+
+def compile_condition(
+    condition: Optional[Dict[str, Any]], fields: Dict[str, Tuple[int, int]]
+) -> Union[bool, Check, object]:
+    """
+    Compile a raw MRS condition AST into a predicate over the instruction word.
+
+    Terms that cannot be decided from the encoding, such as feature tests like ``IsFeatureImplemented(FEAT_X)``,
+    may or may not hold, negated or not, so they never reject a word; see ``fold_condition`` to fold feature
+    tests for a profile instead.
+
+    Args:
+        condition (Optional[Dict[str, Any]]): The raw condition AST
+        fields (Dict[str, Tuple[int, int]]): The (start, width) of every encoding field in scope
+
+    Returns:
+        Union[bool, Check, object]: A constant bool, a callable taking the word and telling whether the
+            condition may hold, or UNKNOWN when it may hold for every word
+    """
+    must, may = _compile_bounds(condition, fields)
+    if must is True or may is False:
+        return must is True
+    return UNKNOWN if may is True else may
+
+
+def _not(check: Union[bool, Check]) -> Union[bool, Check]:
+    if isinstance(check, bool):
+        return not check
+    return lambda word: not check(word)
+
+
+def _and(left: Union[bool, Check], right: Union[bool, Check]) -> Union[bool, Check]:
+    if left is False or right is False:
+        return False
+    if left is True:
+        return right
+    if right is True:
+        return left
+    return lambda word: left(word) and right(word)
+
+
+def _or(left: Union[bool, Check], right: Union[bool, Check]) -> Union[bool, Check]:
+    if left is True or right is True:
+        return True
+    if left is False:
+        return right
+    if right is False:
+        return left
+    return lambda word: left(word) or right(word)
+
+
+def _compile_bounds(
+    condition: Optional[Dict[str, Any]], fields: Dict[str, Tuple[int, int]]
+) -> Tuple[Union[bool, Check], Union[bool, Check]]:
+    # Predicates telling whether the condition surely holds and whether it may hold, as condition_cubes does
+    if condition is None:
+        return True, True
+
+    kind = condition.get("_type")
+
+    if kind == "AST.Bool":
+        return bool(condition["value"]), bool(condition["value"])
+
+    if kind == "AST.UnaryOp" and condition.get("op") in ("!", "NOT"):
+        must, may = _compile_bounds(condition["expr"], fields)
+        return _not(may), _not(must)
+
+    if kind == "AST.BinaryOp":
+        op = condition.get("op")
+        if op in ("&&", "||"):
+            left_must, left_may = _compile_bounds(condition["left"], fields)
+            right_must, right_may = _compile_bounds(condition["right"], fields)
+            join = _and if op == "&&" else _or
+            return join(left_must, right_must), join(left_may, right_may)
+
+        if op in ("==", "!=", "IN"):
+            check = _compile_compare(condition, op, fields)
+            if check is not UNKNOWN:
+                return check, check
+
+    # Function calls such as feature tests, and comparisons of anything but encoding fields
+    return False, True
+
+
+def _compile_compare(
+    condition: Dict[str, Any], op: str, fields: Dict[str, Tuple[int, int]]
+) -> Union[Check, object]:
+    left = condition.get("left") or {}
+    right = condition.get("right") or {}
+    if left.get("_type") != "AST.Identifier" or left.get("value") not in fields:
+        return UNKNOWN
+    get = _field_getter(*fields[left["value"]])
+
+    patterns = []
+    for item in right.get("values", []) if right.get("_type") == "AST.Set" else [right]:
+        if item.get("_type") == "Values.Value":
+            # A pattern such as !'000' matches the values the rest of it does not
+            text = (item.get("value") or "").strip()
+            negated = text.startswith("!")
+            m, v, _ = parse_value(text.lstrip("! "))
+        elif item.get("_type") == "AST.Integer":
+            negated = False
+            m, v = -1, item["value"]
+        else:
+            return UNKNOWN
+        patterns.append((m, v & m, negated))
+
+    if len(patterns) == 1:
+        m, v, negated = patterns[0]
+        if (op == "!=") != negated:
+            return lambda word: get(word) & m != v
+        return lambda word: get(word) & m == v
+
+    if op == "!=":
+        return lambda word: all((get(word) & m == v) == negated for m, v, negated in patterns)
+    return lambda word: any((get(word) & m == v) != negated for m, v, negated in patterns)
+
+
+@dataclass
+class DecodeNode:
+    """Represents a node of the decode tree built from the MRS instruction hierarchy."""
+
+    name: str
+    mask: int
+    value: int
+    fields: Tuple[Tuple[str, int, int], ...]
+    # Should-be-one and should-be-zero bits of this node and its ancestors
+    sbo: int = 0
+    sbz: int = 0
+    condition: Optional[Dict[str, Any]] = None
+    children: List["DecodeNode"] = field(default_factory=list)
+    leaf: bool = False
+    template: str = ""
+    operation_id: Optional[str] = None
+
+    def walk(self) -> Iterator["DecodeNode"]:
+        """Iterate this node and all of its descendants in spec order."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def build_decode_tree(
+    spec: MRSSpec, instruction_set: str = "A64", profile: Optional[FeatureProfile] = None
+) -> List[DecodeNode]:
+    """
+    Build the decode tree of an instruction set from a loaded MRS spec.
+
+    With a profile, feature tests are folded ahead of time and the subtrees of features the profile does not
+    implement are left out of the tree entirely.
+
+    Args:
+        spec (MRSSpec): The loaded spec
+        instruction_set (str, optional): Name of the InstructionSet to decode. Defaults to "A64".
+        profile (Optional[FeatureProfile], optional): The target feature profile. Defaults to None.
+
+    Returns:
+        List[DecodeNode]: The top level nodes of the instruction set in spec order
+    """
+
+    def build(
+        item: Union[InstructionSet, InstructionGroup, Instruction],
+        scope: Dict[str, Tuple[int, int]],
+        sbo: int,
+        sbz: int,
+    ) -> Optional[DecodeNode]:
+        condition = unwrap(item.condition)
+        if profile is not None:
+            condition = fold_condition(condition, profile)
+            if condition is False:
+                return None
+            if condition is True:
+                condition = None
+
+        mask, value, own_fields, should = encodeset_bits(item.encoding)
+        # Should-be bits are checked separately from the bits that select the encoding
+        sbo |= should & value
+        sbz |= should & ~value
+        mask &= ~should
+        value &= mask
+        scope = dict(scope)
+        for name, start, width in own_fields:
+            scope[name] = (start, width)
+
+        node = DecodeNode(
+            name=item.name,
+            mask=mask,
+            value=value,
+            fields=tuple((name, start, width) for name, (start, width) in scope.items()),
+            sbo=sbo,
+            sbz=sbz,
+            condition=condition,
+            operation_id=item.operation_id,
+        )
+        if isinstance(item, Instruction):
+            node.leaf = True
+            node.template = spec.format_assembly(item.assembly)
+        else:
+            children = (build(child, scope, sbo, sbz) for child in item.children)
+            node.children = [child for child in children if child is not None]
+        return node
+
+    for instruction_set_item in spec.instructions.instructions:
+        if instruction_set_item.name == instruction_set:
+            root = build(instruction_set_item, {}, 0, 0)
+            return root.children if root is not None else []
+
+    raise ValueError(f"instruction set {instruction_set} not found in {spec.file_path}")
+
+
+def decoder_snapshot(
+    spec_file: Union[str, Path], instruction_set: str = "A64", profile: Optional[FeatureProfile] = None
+) -> Path:
+    """
+    Get the snapshot of the decode tree of a spec, building it on first use.
+
+    Args:
+        spec_file (Union[str, Path]): Path to the MRS Instructions.json
+        instruction_set (str, optional): Name of the InstructionSet to decode. Defaults to "A64".
+        profile (Optional[FeatureProfile], optional): The target feature profile. Defaults to None.
+
+    Returns:
+        Path: Location of the snapshot holding the decode tree
+    """
+    kind = f"decoder-{instruction_set}" if profile is None else f"decoder-{instruction_set}-{profile.key()}"
+    path = snapshot_path(spec_file, kind)
+    if not path.exists():
+        save_snapshot(build_decode_tree(MRSSpec(spec_file), instruction_set, profile), path)
+    return path
+
+
+@dataclass
+class FlatInstruction:
+    """Represents a leaf instruction with the encodings and conditions of its instruction set and groups folded in."""
+
+    name: str
+    # Names of the instruction set and groups above the instruction, outermost first
+    path: Tuple[str, ...]
+    # Bits that select the instruction, should-be bits excluded
+    mask: int
+    value: int
+    sbo: int
+    sbz: int
+    fields: Tuple[Tuple[str, int, int], ...]
+    # Conjunction of the conditions of the instruction and its ancestors, None if none of them has one
+    condition: Optional[Dict[str, Any]] = None
+    template: str = ""
+    operation_id: Optional[str] = None
+
+    @property
+    def fixed_mask(self) -> int:
+        """Bits of the word the instruction fixes, should-be bits included."""
+        return self.mask | self.sbo | self.sbz
+
+    @property
+    def fixed_value(self) -> int:
+        """Value of the fixed bits, should-be bits included."""
+        return self.value | self.sbo
+
+
+def conjunction(conditions: Iterable[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Join raw condition ASTs with ``&&``, or get None if there are none."""
+    result = None
+    for condition in conditions:
+        if result is None:
+            result = condition
+        else:
+            result = {"_type": "AST.BinaryOp", "left": result, "op": "&&", "right": condition}
+    return result
+
+
+def flatten_tree(tree: List[DecodeNode], instruction_set: str = "A64") -> List[FlatInstruction]:
+    """
+    Flatten the leaves of a decode tree into self-contained instruction records.
+
+    The tree is walked with an explicit stack, so deep trees cannot hit the recursion limit, and the records
+    come out in decode order.
+
+    Args:
+        tree (List[DecodeNode]): The decode tree, see ``build_decode_tree``
+        instruction_set (str, optional): Name of the InstructionSet the tree was built from. Defaults to "A64".
+
+    Returns:
+        List[FlatInstruction]: One record per instruction
+    """
+    records = []
+    root = (instruction_set,)
+    stack: List[Tuple[DecodeNode, Tuple[str, ...], int, int, Tuple[Dict[str, Any], ...]]] = [
+        (node, root, 0, 0, ()) for node in reversed(tree)
+    ]
+    while stack:
+        node, path, mask, value, conditions = stack.pop()
+        mask |= node.mask
+        value |= node.value
+        if node.condition is not None:
+            conditions += (node.condition,)
+        if node.leaf:
+            records.append(
+                FlatInstruction(
+                    node.name,
+                    path,
+                    mask,
+                    value,
+                    node.sbo,
+                    node.sbz,
+                    node.fields,
+                    conjunction(conditions),
+                    node.template,
+                    node.operation_id,
+                )
+            )
+            continue
+        path += (node.name,)
+        stack.extend((child, path, mask, value, conditions) for child in reversed(node.children))
+    return records
+
+
+def flat_snapshot(
+    spec_file: Union[str, Path], instruction_set: str = "A64", profile: Optional[FeatureProfile] = None
+) -> Path:
+    """
+    Get the snapshot of the flattened instructions of a spec, building it on first use.
+
+    Args:
+        spec_file (Union[str, Path]): Path to the MRS Instructions.json or tarball
+        instruction_set (str, optional): Name of the InstructionSet to flatten. Defaults to "A64".
+        profile (Optional[FeatureProfile], optional): The target feature profile. Defaults to None.
+
+    Returns:
+        Path: Location of the snapshot holding the list of FlatInstruction
+    """
+    kind = f"flat-{instruction_set}" if profile is None else f"flat-{instruction_set}-{profile.key()}"
+    path = snapshot_path(spec_file, kind)
+    if not path.exists():
+        tree = load_snapshot(decoder_snapshot(spec_file, instruction_set, profile))
+        save_snapshot(flatten_tree(tree, instruction_set), path)
+    return path
+
+
+# How should-be (SBO/SBZ) bits are treated while decoding
+STRICT = "strict"
+PERMISSIVE = "permissive"
+REPORT = "report"
+SHOULD_BE_MODES = (STRICT, PERMISSIVE, REPORT)
+
+
+@dataclass
+class DecodedWord:
+    """Represents an instruction word held by the decode cache."""
+
+    leaf: Optional[DecodeNode]
+    fields: Dict[str, int]
+    text: str
+
+
+class Decoder(object):
+    """Spec-driven instruction decoder."""
+
+    def __init__(
+        self,
+        tree: List[DecodeNode],
+        should_be: str = STRICT,
+        semantics: Optional[Callable] = None,
+        cache_size: int = 0,
+    ):
+        """
+        Prepare a decoder.
+
+        Args:
+            tree (List[DecodeNode]): The decode tree, see ``build_decode_tree``
+            should_be (str, optional): How to treat should-be bits: "strict" rejects words that break them,
+                "permissive" ignores them and "report" accepts such words but counts and marks them as
+                CONSTRAINED UNPREDICTABLE. Defaults to "strict".
+            semantics (Optional[Callable], optional): The compiled decode pseudocode used by ``operands``, see
+                ``asl.compiler.DecodeSemantics``. Defaults to None.
+            cache_size (int, optional): Number of decoded words kept in a least recently used cache in front
+                of the decode tree, 0 to disable it. Defaults to 0.
+        """
+        if should_be not in SHOULD_BE_MODES:
+            raise ValueError(f"unknown should-be mode {should_be}")
+        if cache_size < 0:
+            raise ValueError(f"negative decode cache size {cache_size}")
+        self.tree = tree
+        self.should_be = should_be
+        self.semantics = semantics
+        self.cache_size = cache_size
+        self.cache: Optional[OrderedDict] = OrderedDict() if cache_size else None
+        self.counters: Dict[str, int] = {
+            "words": 0,
+            "undefined": 0,
+            "unpredictable": 0,
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+        }
+        self._roots = self._compile(tree)
+
+    @classmethod
+    def from_spec(
+        cls,
+        spec: MRSSpec,
+        instruction_set: str = "A64",
+        should_be: str = STRICT,
+        profile: Optional[FeatureProfile] = None,
+        cache_size: int = 0,
+    ) -> "Decoder":
+        """Build a decoder for an instruction set of a loaded MRS spec."""
+        return cls(build_decode_tree(spec, instruction_set, profile), should_be, cache_size=cache_size)
+
+    @classmethod
+    def load(
+        cls,
+        spec_file: Union[str, Path],
+        instruction_set: str = "A64",
+        should_be: str = STRICT,
+        profile: Optional[FeatureProfile] = None,
+        cache_size: int = 0,
+    ) -> "Decoder":
+        """Build a decoder for an instruction set of an MRS spec file, reusing its cached snapshot."""
+        tree = load_snapshot(decoder_snapshot(spec_file, instruction_set, profile))
+        return cls(tree, should_be, cache_size=cache_size)
+
+    def _compile(self, nodes: List[DecodeNode]) -> tuple:
+        compiled = []
+        for node in nodes:
+            check = compile_condition(node.condition, {name: (start, width) for name, start, width in node.fields})
+            if check is False:
+                # Never matches
+                continue
+            if check is True or check is UNKNOWN:
+                check = None
+            children = () if node.leaf else self._compile(node.children)
+            mask, value = node.mask, node.value
+            if self.should_be == STRICT:
+                mask |= node.sbo | node.sbz
+                value |= node.sbo
+            compiled.append((mask, value, check, children, node if node.leaf else None))
+        return tuple(compiled)
+
+    def _walk(self, word: int, nodes: tuple) -> Optional[DecodeNode]:
+        for mask, value, check, children, leaf in nodes:
+            if word & mask == value and (check is None or check(word)):
+                if leaf is not None:
+                    return leaf
+                found = self._walk(word, children)
+                if found is not None:
+                    return found
+        return None
+
+    def comparisons(self, word: int) -> int:
+        """Count the mask tests and condition checks decoding a word takes."""
+        count = 0
+
+        def walk(nodes: tuple) -> bool:
+            nonlocal count
+            for mask, value, check, children, leaf in nodes:
+                count += 1
+                if word & mask != value:
+                    continue
+                if check is not None:
+                    count += 1
+                    if not check(word):
+                        continue
+                if leaf is not None or walk(children):
+                    return True
+            return False
+
+        walk(self._roots)
+        return count
+
+    def decode(self, word: int) -> Optional[DecodeNode]:
+        """
+        Decode a single instruction word.
+
+        Args:
+            word (int): The 32-bit instruction word
+
+        Returns:
+            Optional[DecodeNode]: The matching instruction, or None if the word is unallocated
+        """
+        if self.cache is not None:
+            return self.lookup(word).leaf
+        leaf = self._walk(word, self._roots)
+        self._count(word, leaf)
+        return leaf
+
+    def lookup(self, word: int) -> DecodedWord:
+        """
+        Decode a single instruction word through the decode cache.
+
+        Words seen recently are answered from the cache without walking the decode tree. Once the cache holds
+        ``cache_size`` words the least recently used one is evicted.
+
+        Args:
+            word (int): The 32-bit instruction word
+
+        Returns:
+            DecodedWord: The matching instruction with its operand fields and rendered text
+        """
+        cache = self.cache
+        entry = cache.get(word) if cache is not None else None
+        if entry is not None:
+            cache.move_to_end(word)
+            self.counters["hits"] += 1
+        else:
+            leaf = self._walk(word, self._roots)
+            entry = DecodedWord(leaf, self.fields(word, leaf) if leaf else {}, self.render(word, leaf))
+            if cache is not None:
+                self.counters["misses"] += 1
+                cache[word] = entry
+                if len(cache) > self.cache_size:
+                    cache.popitem(last=False)
+                    self.counters["evictions"] += 1
+        self._count(word, entry.leaf)
+        return entry
+
+    def _count(self, word: int, leaf: Optional[DecodeNode]) -> None:
+        self.counters["words"] += 1
+        if leaf is None:
+            self.counters["undefined"] += 1
+        elif self.should_be == REPORT and word & (leaf.sbo | leaf.sbz) != leaf.sbo:
+            self.counters["unpredictable"] += 1
+
+    def hit_rate(self) -> float:
+        """Get the share of decode cache lookups answered from the cache."""
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return self.counters["hits"] / lookups if lookups else 0.0
+
+    def unpredictable(self, word: int, leaf: DecodeNode) -> bool:
+        """Check whether a decoded word breaks the should-be bits of its instruction."""
+        return word & (leaf.sbo | leaf.sbz) != leaf.sbo
+
+    def fields(self, word: int, leaf: DecodeNode) -> Dict[str, int]:
+        """Extract the operand fields of a decoded instruction word."""
+        return {name: (word >> start) & ((1 << width) - 1) for name, start, width in leaf.fields}
+
+    def operands(self, word: int, leaf: DecodeNode) -> Dict[str, Any]:
+        """
+        Run the decode pseudocode of a decoded instruction word.
+
+        Args:
+            word (int): The 32-bit instruction word
+            leaf (DecodeNode): The instruction it decoded to
+
+        Returns:
+            Dict[str, Any]: The register numbers, immediates, datasize and other values the pseudocode assigns
+        """
+        if self.semantics is None:
+            raise ValueError("decoder has no decode semantics")
+
+        from .asl.runtime import Bits
+
+        fields = {name: Bits(word >> start, width) for name, start, width in leaf.fields}
+        return self.semantics(leaf.operation_id, fields)
+
+    def render(self, word: int, leaf: Optional[DecodeNode]) -> str:
+        """
+        Render the text of a decoded instruction word.
+
+        Args:
+            word (int): The 32-bit instruction word
+            leaf (Optional[DecodeNode]): The instruction it decoded to
+
+        Returns:
+            str: The assembly template followed by the instruction name and its field values
+        """
+        if leaf is None:
+            return f".inst\t{word:#010x}\t// undefined"
+        operands = " ".join(f"{name}={value:#x}" for name, value in self.fields(word, leaf).items())
+        text = f"{leaf.template or leaf.name}\t// {leaf.name} {operands}".rstrip()
+        if self.should_be == REPORT and self.unpredictable(word, leaf):
+            text += " CONSTRAINED UNPREDICTABLE"
+        return text
+
+    def disassemble(self, word: int) -> str:
+        """Decode and render a single instruction word."""
+        if self.cache is not None:
+            return self.lookup(word).text
+        return self.render(word, self.decode(word))
+
+    def disassemble_words(self, words: Iterable[int], base: int = 0) -> List[str]:
+        """
+        Disassemble a run of instruction words into objdump-style lines.
+
+        Args:
+            words (Iterable[int]): The instruction words, e.g. a ``memoryview`` cast to ``uint32``
+            base (int, optional): Address of the first word. Defaults to 0.
+
+        Returns:
+            List[str]: One ``address: word text`` line per word
+        """
+        if self.cache is not None:
+            lookup = self.lookup
+            return [f"{base + 4 * i:>8x}:\t{word:08x}\t{lookup(word).text}" for i, word in enumerate(words)]
+        decode = self.decode
+        render = self.render
+        return [
+            f"{base + 4 * i:>8x}:\t{word:08x}\t{render(word, decode(word))}" for i, word in enumerate(words)
+        ]
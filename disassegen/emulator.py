@@ -0,0 +1,323 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .asl.compiler import DecodeSemantics, OperationSemantics
+from .asl.runtime import ASLException, Bits, State, Undefined
+from .decoder import DecodeNode, Decoder
+
+PAGE_SHIFT = 12
+PAGE_SIZE = 1 << PAGE_SHIFT
+PAGE_MASK = PAGE_SIZE - 1
+
+# Longest run of instructions translated into one block
+MAX_BLOCK = 64
+
+# Functions whose call ends a basic block
+BRANCH_FUNCTIONS = ("BranchTo", "BranchToAddr", "BranchXToCapability")
+
+MASK64 = (1 << 64) - 1
+
+
+class MemoryFault(Exception):
+    """Raised when the emulated program touches unmapped memory."""
+
+
+class SupervisorCall(Exception):
+    """Raised when the emulated program executes SVC, for the host to service."""
+
+    def __init__(self, imm: int):
+        super().__init__(f"svc #{imm:#x}")
+        self.imm = imm
+
+
+class Memory(object):
+    """Sparse little-endian memory made of pages allocated on map."""
+
+    def __init__(self):
+        self.pages: Dict[int, bytearray] = {}
+        # Pages holding translated code, reported to on_write when written
+        self.watched: Set[int] = set()
+        self.on_write: Optional[Callable[[int], None]] = None
+
+    def map(self, address: int, size: int) -> None:
+        """Map zeroed pages covering a range, keeping pages that are already mapped."""
+        for page in range(address >> PAGE_SHIFT, (address + size + PAGE_MASK) >> PAGE_SHIFT):
+            self.pages.setdefault(page, bytearray(PAGE_SIZE))
+
+    def load(self, address: int, data: bytes) -> None:
+        """Map a range and copy data into it."""
+        self.map(address, len(data))
+        self.write_bytes(address, data)
+
+    def _page(self, page: int) -> bytearray:
+        try:
+            return self.pages[page]
+        except KeyError:
+            raise MemoryFault(f"unmapped address {page << PAGE_SHIFT:#x}") from None
+
+    def read_bytes(self, address: int, size: int) -> bytes:
+        offset = address & PAGE_MASK
+        if offset + size <= PAGE_SIZE:
+            return bytes(self._page(address >> PAGE_SHIFT)[offset : offset + size])
+        head = PAGE_SIZE - offset
+        return self.read_bytes(address, head) + self.read_bytes(address + head, size - head)
+
+    def write_bytes(self, address: int, data: bytes) -> None:
+        offset = address & PAGE_MASK
+        page = address >> PAGE_SHIFT
+        head = min(len(data), PAGE_SIZE - offset)
+        self._page(page)[offset : offset + head] = data[:head]
+        if page in self.watched and self.on_write is not None:
+            self.on_write(page)
+        if head < len(data):
+            self.write_bytes(address + head, data[head:])
+
+    def read(self, address: int, size: int) -> int:
+        """Read a little-endian value of size bytes."""
+        return int.from_bytes(self.read_bytes(address, size), "little")
+
+    def write(self, address: int, size: int, value: int) -> None:
+        """Write a little-endian value of size bytes."""
+        self.write_bytes(address, (value & ((1 << (8 * size)) - 1)).to_bytes(size, "little"))
+
+
+@dataclass
+class Translated:
+    """Represents an instruction of a translated block with its decode step already run."""
+
+    pc: int
+    word: int
+    leaf: Optional[DecodeNode]
+    execute: Optional[Callable[..., Any]]
+    # The decode results and fields the operation pseudocode starts from
+    env: Dict[str, Any]
+    # Exception raised while decoding, re-raised when the instruction is executed
+    error: Optional[Exception] = None
+
+
+@dataclass
+class Block:
+    """Represents a basic block of translated instructions."""
+
+    start: int
+    instructions: List[Translated] = field(default_factory=list)
+
+
+def _ends_block(tree: Any) -> bool:
+    """Check whether operation pseudocode may branch."""
+    if isinstance(tree, dict):
+        if tree.get("_type") == "AST.Function" and tree.get("name") in BRANCH_FUNCTIONS:
+            return True
+        return any(_ends_block(value) for value in tree.values())
+    if isinstance(tree, list):
+        return any(_ends_block(item) for item in tree)
+    return False
+
+
+class Emulator(State):
+    """Minimal AArch64 user-mode interpreter driven by the spec's decode tree and operation pseudocode."""
+
+    def __init__(
+        self,
+        decoder: Decoder,
+        decode: DecodeSemantics,
+        operation: OperationSemantics,
+        memory: Optional[Memory] = None,
+    ):
+        """
+        Prepare an emulator.
+
+        Args:
+            decoder (Decoder): The spec-driven decoder
+            decode (DecodeSemantics): The compiled decode pseudocode
+            operation (OperationSemantics): The compiled operation pseudocode
+            memory (Optional[Memory], optional): The address space. Defaults to an empty one.
+        """
+        self.decoder = decoder
+        self.decode = decode
+        self.operation = operation
+        self.memory = memory or Memory()
+        self.memory.on_write = self.invalidate
+
+        self.x = [0] * 31
+        self.sp = 0
+        self.pc = 0
+        self.nzcv = 0
+        self.branched = False
+
+        self.blocks: Dict[int, Block] = {}
+        self.page_blocks: Dict[int, Set[int]] = {}
+        self._ends_block: Dict[str, bool] = {}
+        self._invalidated = False
+        self.counters: Dict[str, int] = {"instructions": 0, "translated": 0, "hits": 0, "invalidations": 0}
+
+    # Translation
+
+    def translate(self, pc: int) -> Block:
+        """
+        Decode the basic block starting at an address and cache it.
+
+        Args:
+            pc (int): Address of the first instruction
+
+        Returns:
+            Block: The translated block
+        """
+        block = Block(pc)
+        page = pc >> PAGE_SHIFT
+        address = pc
+        while len(block.instructions) < MAX_BLOCK and address >> PAGE_SHIFT == page:
+            word = self.memory.read(address, 4)
+            translated = self._translate_word(address, word)
+            block.instructions.append(translated)
+            address += 4
+            if translated.execute is None or self._branches(translated.leaf.operation_id):
+                break
+
+        self.blocks[pc] = block
+        self.page_blocks.setdefault(page, set()).add(pc)
+        self.memory.watched.add(page)
+        self.counters["translated"] += 1
+        return block
+
+    def _translate_word(self, pc: int, word: int) -> Translated:
+        leaf = self.decoder.decode(word)
+        if leaf is None:
+            return Translated(pc, word, None, None, {}, Undefined(f"undefined instruction {word:#010x}"))
+        fields = {name: Bits(word >> start, width) for name, start, width in leaf.fields}
+        try:
+            env = dict(fields)
+            if self.decode.get(leaf.operation_id) is not None:
+                env.update(self.decode(leaf.operation_id, fields))
+            execute = self.operation.get(leaf.operation_id)
+            if execute is None:
+                raise ASLException(f"{leaf.name}: {self.operation.errors.get(leaf.operation_id)}")
+        except ASLException as e:
+            return Translated(pc, word, leaf, None, {}, e)
+        return Translated(pc, word, leaf, execute, env)
+
+    def _branches(self, operation_id: str) -> bool:
+        if operation_id not in self._ends_block:
+            self._ends_block[operation_id] = _ends_block(self.operation.trees.get(operation_id))
+        return self._ends_block[operation_id]
+
+    def invalidate(self, page: int) -> None:
+        """Drop the translated blocks of a code page that was written to."""
+        for start in self.page_blocks.pop(page, ()):
+            self.blocks.pop(start, None)
+        self.memory.watched.discard(page)
+        self.counters["invalidations"] += 1
+        self._invalidated = True
+
+    # Execution
+
+    def run(self, start: Optional[int] = None, count: Optional[int] = None, until: Optional[int] = None) -> int:
+        """
+        Run the fetch-decode-execute loop.
+
+        Args:
+            start (Optional[int], optional): Address to start at. Defaults to the current PC.
+            count (Optional[int], optional): Stop after this many instructions. Defaults to no limit.
+            until (Optional[int], optional): Stop when the PC reaches this address. Defaults to None.
+
+        Raises:
+            ASLException: If an instruction is undefined or uses unsupported pseudocode
+            MemoryFault: If the program touches unmapped memory
+            SupervisorCall: If the program executes SVC, with the PC on the next instruction
+
+        Returns:
+            int: Number of instructions executed
+        """
+        if start is not None:
+            self.pc = start
+        executed = 0
+        blocks = self.blocks
+        while (count is None or executed < count) and self.pc != until:
+            block = blocks.get(self.pc)
+            if block is None:
+                block = self.translate(self.pc)
+            else:
+                self.counters["hits"] += 1
+
+            self._invalidated = False
+            for insn in block.instructions:
+                if insn.execute is None:
+                    self.pc = insn.pc
+                    raise insn.error
+                self.pc = insn.pc
+                self.branched = False
+                try:
+                    insn.execute(insn.env, self)
+                except SupervisorCall:
+                    self.pc = insn.pc + 4
+                    raise
+                finally:
+                    executed += 1
+                    self.counters["instructions"] += 1
+                if self.branched:
+                    break
+                self.pc = insn.pc + 4
+                if self._invalidated or executed == count or self.pc == until:
+                    break
+        return executed
+
+    # Machine state accessors
+
+    def read(self, name: str, args: Tuple[Any, ...]) -> Any:
+        if name == "X":
+            n = args[0]
+            width = args[1] if len(args) > 1 else 64
+            return Bits(0 if n == 31 else self.x[n], width)
+        if name == "SP":
+            return Bits(self.sp, args[0] if args else 64)
+        if name in ("PC", "PC64"):
+            return Bits(self.pc, 64)
+        if name == "Mem":
+            address, size = int(args[0]), int(args[1])
+            return Bits(self.memory.read(address, size), 8 * size)
+        return super().read(name, args)
+
+    def write(self, name: str, args: Tuple[Any, ...], value: Any) -> None:
+        if name == "X":
+            if args[0] != 31:
+                # Writes to W registers clear the upper half
+                self.x[args[0]] = int(value) & MASK64
+        elif name == "SP":
+            self.sp = int(value) & MASK64
+        elif name == "Mem":
+            self.memory.write(int(args[0]), int(args[1]), int(value))
+        else:
+            super().write(name, args, value)
+
+    def field(self, name: str, field: str) -> Any:
+        if name == "PSTATE" and field in "NZCV":
+            return Bits(self.nzcv >> (3 - "NZCV".index(field)), 1)
+        return super().field(name, field)
+
+    def set_field(self, name: str, fields: Tuple[str, ...], value: Any) -> None:
+        if name == "PSTATE" and all(f in "NZCV" for f in fields):
+            for i, f in enumerate(fields):
+                bit = 3 - "NZCV".index(f)
+                value_bit = (int(value) >> (len(fields) - 1 - i)) & 1
+                self.nzcv = (self.nzcv & ~(1 << bit)) | (value_bit << bit)
+        else:
+            super().set_field(name, fields, value)
+
+    def call(self, name: str, *args: Any) -> Any:
+        if name in BRANCH_FUNCTIONS:
+            self.pc = int(args[0]) & MASK64
+            self.branched = True
+            return None
+        if name == "ConditionHolds":
+            return self.condition_holds(int(args[0]))
+        if name in ("CallSupervisor", "AArch64.CallSupervisor"):
+            raise SupervisorCall(int(args[0]))
+        if name.startswith("CreateAccDesc") or name in ("CheckSPAlignment", "Hint_Branch", "BranchNotTaken"):
+            return None
+        return super().call(name, *args)
+
+    def condition_holds(self, cond: int) -> bool:
+        """Evaluate an A64 condition code against NZCV."""
+        n, z, c, v = (self.nzcv >> 3) & 1, (self.nzcv >> 2) & 1, (self.nzcv >> 1) & 1, self.nzcv & 1
+        result = (z == 1, c == 1, n == 1, v == 1, c == 1 and z == 0, n == v, n == v and z == 0, True)[cond >> 1]
+        return not result if cond & 1 and cond != 0b1111 else result
@@ -0,0 +1,303 @@
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set, Tuple, Union
+
+from .utils.archive import is_archive, read_member
+
+VERSION_RE = re.compile(r"^(?:arm)?v?(\d+)(?:\.(\d+))?-?a$", re.IGNORECASE)
+ARCH_VERSION_RE = re.compile(r"^v(\d+)Ap(\d+)$")
+VARIANT_VERSION_RE = re.compile(r"^ARMv(\d+)(?:\.(\d+))?", re.IGNORECASE)
+
+FEATURE_FUNCTIONS = ("IsFeatureImplemented", "HaveFeature")
+
+
+def version_ordinal(major: int, minor: int) -> int:
+    """Order architecture versions on a single line, where v9.x is a superset of v8.(x+5)."""
+    return minor if major <= 8 else minor + 5 * (major - 8)
+
+
+def version_implies(version: Tuple[int, int], required: Tuple[int, int]) -> bool:
+    """
+    Check whether an architecture version includes what another one requires.
+
+    A version includes the earlier minor versions of its own major version and, as v9.x is a superset of
+    v8.(x+5), those of earlier major versions up to that point. A major version never includes a later one,
+    so v8.7 does not include v9.0 even though it comes after v8.5.
+
+    Args:
+        version (Tuple[int, int]): The (major, minor) version of the profile
+        required (Tuple[int, int]): The (major, minor) version a feature requires
+
+    Returns:
+        bool: Whether the version includes the required one
+    """
+    return required[0] <= version[0] and version_ordinal(*required) <= version_ordinal(*version)
+
+
+def feature_name(name: str) -> str:
+    """Normalize a feature name such as "SVE2" to its FEAT_ identifier."""
+    name = name.strip()
+    if ARCH_VERSION_RE.match(name) or name.upper().startswith("FEAT_"):
+        return name if not name.upper().startswith("FEAT_") else "FEAT_" + name[5:]
+    return f"FEAT_{name.upper()}"
+
+
+def load_feature_requirements(file_path: Union[str, Path]) -> Dict[str, Set[str]]:
+    """
+    Load what every feature requires from an MRS Features.json.
+
+    Only implications of the form ``FEAT_X --> A && B`` are used.
+
+    Args:
+        file_path (Union[str, Path]): Path to Features.json, or to an MRS tarball holding it
+
+    Returns:
+        Dict[str, Set[str]]: The features and architecture versions each feature requires
+    """
+    if is_archive(file_path):
+        data = json.loads(read_member(file_path, "Features.json"))
+    else:
+        with Path(file_path).open("r") as f:
+            data = json.load(f)
+
+    def conjuncts(node: Dict[str, Any]) -> Iterable[str]:
+        if node.get("_type") == "AST.Identifier":
+            yield node["value"]
+        elif node.get("_type") == "AST.BinaryOp" and node.get("op") == "&&":
+            yield from conjuncts(node["left"])
+            yield from conjuncts(node["right"])
+
+    requirements: Dict[str, Set[str]] = {}
+    for parameter in data.get("parameters", []):
+        name = parameter.get("name", "")
+        for constraint in parameter.get("constraints", []) or []:
+            if (
+                constraint.get("_type") == "AST.BinaryOp"
+                and constraint.get("op") == "-->"
+                and constraint["left"].get("_type") == "AST.Identifier"
+                and constraint["left"].get("value") == name
+            ):
+                requirements.setdefault(name, set()).update(conjuncts(constraint["right"]))
+    return requirements
+
+
+class FeatureProfile(object):
+    """The architecture version and features implemented by a target CPU."""
+
+    def __init__(
+        self,
+        version: Optional[Tuple[int, int]] = None,
+        enabled: Iterable[str] = (),
+        disabled: Iterable[str] = (),
+        requirements: Optional[Dict[str, Set[str]]] = None,
+    ):
+        """
+        Prepare a profile.
+
+        Args:
+            version (Optional[Tuple[int, int]], optional): The (major, minor) architecture version. Defaults to
+                no version limit.
+            enabled (Iterable[str], optional): Features that are implemented. Defaults to ().
+            disabled (Iterable[str], optional): Features that are not implemented. Defaults to ().
+            requirements (Optional[Dict[str, Set[str]]], optional): What each feature requires, see
+                ``load_feature_requirements``. Defaults to None.
+        """
+        self.version = version
+        self.enabled = {feature_name(f) for f in enabled}
+        self.disabled = {feature_name(f) for f in disabled}
+        self.requirements = requirements or {}
+        self._cache: Dict[str, Optional[bool]] = {}
+
+    @classmethod
+    def parse(cls, text: str, requirements: Optional[Dict[str, Set[str]]] = None) -> "FeatureProfile":
+        """
+        Parse a profile such as "v8.5a + SVE2 - SME".
+
+        Args:
+            text (str): An optional leading architecture version followed by features to add with "+" or
+                remove with "-"
+            requirements (Optional[Dict[str, Set[str]]], optional): What each feature requires. Defaults to None.
+
+        Returns:
+            FeatureProfile: The parsed profile
+        """
+        version = None
+        enabled = []
+        disabled = []
+        tokens = re.findall(r"[+-]|[^\s+-]+(?:-a)?", text)
+        sign = "+"
+        for i, token in enumerate(tokens):
+            if token in "+-":
+                sign = token
+                continue
+            match = VERSION_RE.match(token)
+            if i == 0 and match:
+                version = (int(match.group(1)), int(match.group(2) or 0))
+            elif sign == "+":
+                enabled.append(token)
+            else:
+                disabled.append(token)
+        return cls(version, enabled, disabled, requirements)
+
+    def __str__(self) -> str:
+        parts = [f"v{self.version[0]}.{self.version[1]}a"] if self.version else []
+        parts += [f"+{f}" for f in sorted(self.enabled)] + [f"-{f}" for f in sorted(self.disabled)]
+        return " ".join(parts)
+
+    def key(self) -> str:
+        """A stable key of the profile, including the requirements it was built with."""
+        requirements = sorted((name, sorted(deps)) for name, deps in self.requirements.items())
+        return hashlib.sha1(json.dumps([str(self), requirements]).encode()).hexdigest()[:16]
+
+    def status(self, feature: str) -> Optional[bool]:
+        """
+        Tell whether a feature is implemented under this profile.
+
+        A feature is implemented when it is enabled or is an architecture version the profile includes, and
+        ruled out when it is disabled, is a later architecture version or needs a feature that is ruled out.
+        Whether any other feature is implemented is unknown.
+
+        Args:
+            feature (str): A FEAT_ identifier or an architecture version such as "v8Ap5"
+
+        Returns:
+            Optional[bool]: True if the feature is implemented, False if it is ruled out, None if unknown
+        """
+        if feature in self._cache:
+            return self._cache[feature]
+        # Guard against cyclic requirements
+        self._cache[feature] = None
+
+        result: Optional[bool] = None
+        if feature in self.disabled:
+            result = False
+        elif feature in self.enabled:
+            result = True
+        else:
+            match = ARCH_VERSION_RE.match(feature)
+            if match:
+                required = (int(match.group(1)), int(match.group(2)))
+                result = None if self.version is None else version_implies(self.version, required)
+            elif any(self.status(dep) is False for dep in self.requirements.get(feature, ())):
+                result = False
+
+        self._cache[feature] = result
+        return result
+
+    def implements(self, feature: str) -> bool:
+        """Check whether a feature can be implemented under this profile, that is whether it is not ruled out."""
+        return self.status(feature) is not False
+
+    def allows(self, expression: str) -> bool:
+        """
+        Check an ISA XML architecture variant feature expression such as "FEAT_A && !FEAT_B || FEAT_C".
+
+        Args:
+            expression (str): The expression, empty when the variant has no feature
+
+        Returns:
+            bool: Whether the expression can hold under this profile
+        """
+        if not expression.strip():
+            return True
+        for alternative in expression.split("||"):
+            terms = [term.strip().strip("()") for term in alternative.split("&&")]
+            if all(
+                (self.status(feature_name(term[1:])) is not True if term.startswith("!") else self.implements(term))
+                for term in terms
+                if term
+            ):
+                return True
+        return False
+
+    def allows_variant(self, name: str, feature: str) -> bool:
+        """
+        Check an ISA XML architecture variant such as ``<arch_variant name="ARMv8.5" feature="FEAT_MTE"/>``.
+
+        Args:
+            name (str): The architecture version the variant was introduced in, may be empty
+            feature (str): The feature expression of the variant, may be empty
+
+        Returns:
+            bool: Whether the variant can be implemented under this profile
+        """
+        match = VARIANT_VERSION_RE.match(name)
+        if match and not self.implements(f"v{match.group(1)}Ap{match.group(2) or 0}"):
+            return False
+        return self.allows(feature)
+
+
+def load_profile(text: str, spec_file: Optional[Union[str, Path]] = None) -> FeatureProfile:
+    """
+    Parse a profile, using the Features.json next to an MRS spec to learn what each feature requires.
+
+    Args:
+        text (str): The profile, e.g. "v8.5a + SVE2 - SME"
+        spec_file (Optional[Union[str, Path]], optional): Path to the MRS Instructions.json or tarball. Defaults
+            to None.
+
+    Returns:
+        FeatureProfile: The parsed profile
+    """
+    requirements = None
+    if spec_file is not None and is_archive(spec_file):
+        try:
+            requirements = load_feature_requirements(spec_file)
+        except FileNotFoundError:
+            pass
+    elif spec_file is not None:
+        features_file = Path(spec_file).with_name("Features.json")
+        if features_file.exists():
+            requirements = load_feature_requirements(features_file)
+    return FeatureProfile.parse(text, requirements)
+
+
+def fold_condition(condition: Optional[Dict[str, Any]], profile: FeatureProfile) -> Union[bool, Dict[str, Any]]:
+    """
+    Constant-fold the feature tests of a raw MRS condition.
+
+    Only the tests of features the profile implements or rules out are folded. The others are kept, since
+    negating "may be implemented" does not make "is not implemented".
+
+    Args:
+        condition (Optional[Dict[str, Any]]): The raw condition AST
+        profile (FeatureProfile): The target profile
+
+    Returns:
+        Union[bool, Dict[str, Any]]: True or False when the condition only depends on features the profile
+            decides, otherwise the condition with the feature tests it decides folded away
+    """
+    if condition is None:
+        return True
+
+    kind = condition.get("_type")
+
+    if kind == "AST.Bool":
+        return bool(condition["value"])
+
+    if kind == "AST.Function" and condition.get("name") in FEATURE_FUNCTIONS:
+        arguments = condition.get("arguments") or []
+        if len(arguments) == 1 and arguments[0].get("_type") == "AST.Identifier":
+            status = profile.status(arguments[0]["value"])
+            if status is not None:
+                return status
+        return condition
+
+    if kind == "AST.UnaryOp" and condition.get("op") in ("!", "NOT"):
+        expr = fold_condition(condition["expr"], profile)
+        if isinstance(expr, bool):
+            return not expr
+        return {**condition, "expr": expr}
+
+    if kind == "AST.BinaryOp" and condition.get("op") in ("&&", "||"):
+        left = fold_condition(condition["left"], profile)
+        right = fold_condition(condition["right"], profile)
+        absorbing = condition["op"] == "||"
+        for side, other in ((left, right), (right, left)):
+            if isinstance(side, bool):
+                return absorbing if side is absorbing else other
+        return {**condition, "left": left, "right": right}
+
+    return condition
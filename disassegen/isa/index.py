@@ -0,0 +1,65 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from ..features import FeatureProfile
+from .spec import Encoding, Instruction, load_isa
+
+
+class EncodingIndex(object):
+    """
+    Index of the encodings of a set of ISA XML instructions by their fixed bits.
+
+    Encodings are bucketed by fixed mask and, within a bucket, hashed by fixed value, so matching a word costs
+    one dict lookup per distinct mask rather than one comparison per encoding. Masks are kept most specific
+    first, so the first match is the encoding that fixes the most bits.
+    """
+
+    def __init__(self, instructions: Iterable[Instruction]):
+        """
+        Index parsed instructions.
+
+        Args:
+            instructions (Iterable[Instruction]): The parsed XML instructions, see ``load_isa``
+        """
+        self.buckets: Dict[int, Dict[int, List[Tuple[Instruction, Encoding]]]] = {}
+        self.count = 0
+        for instruction in instructions:
+            for iclass in instruction.instruction_classes:
+                for encoding in iclass.encodings:
+                    bucket = self.buckets.setdefault(encoding.fixed_mask, {})
+                    bucket.setdefault(encoding.fixed_value, []).append((instruction, encoding))
+                    self.count += 1
+        self.masks = sorted(self.buckets, key=lambda mask: (-bin(mask).count("1"), mask))
+
+    @classmethod
+    def load(
+        cls, path: Union[str, Path], profile: Optional[FeatureProfile] = None, jobs: Optional[int] = None
+    ) -> "EncodingIndex":
+        """Index an XML file, a directory of XML files or an XML release tarball, see ``load_isa``."""
+        return cls(load_isa(path, profile, jobs))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def match(self, word: int) -> List[Tuple[Instruction, Encoding]]:
+        """
+        Find every encoding whose fixed bits a word has.
+
+        Args:
+            word (int): The instruction word
+
+        Returns:
+            List[Tuple[Instruction, Encoding]]: The matching encodings and their instructions, most specific first
+        """
+        found = []
+        for mask in self.masks:
+            found.extend(self.buckets[mask].get(word & mask, ()))
+        return found
+
+    def lookup(self, word: int) -> Optional[Tuple[Instruction, Encoding]]:
+        """Find the most specific encoding of a word, or None if no encoding matches it."""
+        for mask in self.masks:
+            candidates = self.buckets[mask].get(word & mask)
+            if candidates:
+                return candidates[0]
+        return None
@@ -1,11 +1,24 @@
+import os
+import re
 import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Deque, Dict, Iterable, List, Optional, Tuple, Union
+from ..features import FeatureProfile
+from ..snapshot import load_snapshot, save_snapshot, snapshot_path
+from ..utils.archive import is_archive, iter_members
 from ..utils.bits import Field, Bitfield
 
+# Sections of the XML release that describe instructions, rather than shared pseudocode or indexes
+INSTRUCTION_SECTIONS = ("instruction", "alias")
 
-@dataclass
+# Archive members handed to a worker process at once
+BATCH_SIZE = 32
+
+
+@dataclass(frozen=True)
 class Box:
     """Represents a bit field box in the instruction encoding."""
 
@@ -15,17 +28,19 @@ class Box:
     settings: Optional[str]
     use_name: bool
     ps_bits: Optional[str]
-    constants: List[str]
+    constants: Tuple[str, ...]
 
 
-@dataclass
+@dataclass(frozen=True)
 class RegDiagram:
     """Represents the register diagram of an instruction encoding."""
 
     form: str
     ps_name: str
-    boxes: List[Box]
-    _mask: int = 0
+    boxes: Tuple[Box, ...]
+    # Bits fixed by the constants of the diagram, computed once when it is parsed
+    fixed_mask: int = 0
+    fixed_value: int = 0
 
     def __str__(self) -> str:
         """Format a register diagram as a visual ASCII representation."""
@@ -38,13 +53,6 @@ class RegDiagram:
         fields = []
 
         for box in boxes:
-            if "_" not in box.constants[0]:
-                # print(
-                #     f"bits: {"".join([x.strip("()") for x in box.constants])}, int: {int(''.join([x.strip("()") for x in box.constants]), 2)}"
-                # )
-                rng = int("".join([x.strip("()") for x in box.constants]), 2)
-                if rng > 0:
-                    self._mask |= rng << (box.high_bit - box.width + 1)
             if box.use_name:
                 fields.append(
                     Field(
@@ -66,7 +74,7 @@ class RegDiagram:
                     )
                 )
 
-        return Bitfield(fields).diagram(self._mask)
+        return Bitfield(fields).diagram(self.fixed_value)
 
 
 @dataclass
@@ -95,7 +103,7 @@ class ArchitectureVariant:
     feature: str
 
 
-@dataclass
+@dataclass(frozen=True)
 class Encoding:
     """Represents an instruction encoding."""
 
@@ -106,6 +114,13 @@ class Encoding:
     bit_diffs: str
     assembly_template: str
     reg_diagram: Optional[RegDiagram]
+    # Bits that select the encoding: those of its diagram, its own boxes and its bit differences
+    fixed_mask: int = 0
+    fixed_value: int = 0
+
+    def matches(self, word: int) -> bool:
+        """Check whether an instruction word has the fixed bits of the encoding."""
+        return word & self.fixed_mask == self.fixed_value
 
 
 @dataclass
@@ -163,8 +178,7 @@ class Instruction:
                 output.append(f"\n    * {encoding.mnemonic}: {encoding.assembly_template}")
                 if encoding.reg_diagram:
                     output.append(f"\n{str(encoding.reg_diagram)}")
-                    if encoding.reg_diagram._mask:
-                        output.append(f"    Mask: {encoding.reg_diagram._mask:#x}")
+                    output.append(f"    Mask: {encoding.fixed_mask:#010x} Value: {encoding.fixed_value:#010x}")
             output.append("\n  Pseudocode:")
             for ps in iclass.pseudocode:
                 output.append(f"    Section: {ps.section_type}")
@@ -182,14 +196,105 @@ class Instruction:
         return "\n".join(output)
 
 
+BIT_DIFF_RE = re.compile(r"^\s*(\w+)(?:<(\d+)(?::(\d+))?>)?\s*==\s*'?([01]+)'?\s*$")
+
+
+def box_bits(box: Box) -> Tuple[int, int]:
+    """
+    Get the fixed bits of a register diagram box.
+
+    Constants are ``0`` and ``1``, or ``(0)`` and ``(1)`` for should-be bits, which are counted as fixed too.
+    Fields, ``x`` bits and constraints such as ``!= 000`` leave their bits free.
+
+    Args:
+        box (Box): The box
+
+    Returns:
+        Tuple[int, int]: The (mask, value) of the fixed bits of the box within the 32-bit word
+    """
+    constants = [constant.strip("()") for constant in box.constants]
+    if len(constants) == 1 and len(constants[0]) == box.width and box.width > 1:
+        # A single constant spanning the box
+        constants = list(constants[0])
+    if len(constants) != box.width:
+        return 0, 0
+
+    mask = 0
+    value = 0
+    for i, constant in enumerate(constants):
+        bit = 1 << (box.high_bit - i)
+        if constant in ("0", "1"):
+            mask |= bit
+            if constant == "1":
+                value |= bit
+    return mask, value
+
+
+def boxes_bits(boxes: Iterable[Box]) -> Tuple[int, int]:
+    """Get the fixed bits of a run of register diagram boxes."""
+    mask = 0
+    value = 0
+    for box in boxes:
+        m, v = box_bits(box)
+        mask |= m
+        value |= v
+    return mask, value
+
+
+def apply_bit_diffs(boxes: Iterable[Box], bit_diffs: str, mask: int = 0, value: int = 0) -> Tuple[int, int]:
+    """
+    Fix the bits an encoding's bit differences select on top of those of its register diagram.
+
+    Args:
+        boxes (Iterable[Box]): The boxes of the register diagram, which the differences refer to by name
+        bit_diffs (str): The ``bitdiffs`` of the encoding, e.g. ``"sf == 1 && sh == 0"``
+        mask (int, optional): The fixed bit mask to start from. Defaults to 0.
+        value (int, optional): The fixed bit values to start from. Defaults to 0.
+
+    Raises:
+        ValueError: If a bit difference names no box or does not fit it
+
+    Returns:
+        Tuple[int, int]: The (mask, value) of the fixed bits
+    """
+    named = {box.name: box for box in boxes if box.name}
+    for term in filter(None, (term.strip() for term in bit_diffs.split("&&"))):
+        match = BIT_DIFF_RE.match(term)
+        if match is None or match.group(1) not in named:
+            raise ValueError(f"unsupported bit difference {term!r}")
+        box = named[match.group(1)]
+        low = box.high_bit - box.width + 1
+        if match.group(2) is not None:
+            high = low + int(match.group(2))
+            low = low + int(match.group(3) if match.group(3) is not None else match.group(2))
+        else:
+            high = box.high_bit
+        bits = match.group(4)
+        if len(bits) != high - low + 1:
+            raise ValueError(f"bit difference {term!r} does not fit {box.name}")
+        field_mask = ((1 << len(bits)) - 1) << low
+        mask |= field_mask
+        value = (value & ~field_mask) | (int(bits, 2) << low)
+    return mask, value
+
+
 class ISASpec:
     """Parser for ARM instruction XML format."""
 
-    def __init__(self, file_path: Union[str, Path]):
-        """Initialize parser with XML file."""
+    def __init__(
+        self, file_path: Union[str, Path], profile: Optional[FeatureProfile] = None, root: Optional[ET.Element] = None
+    ):
+        """
+        Initialize parser with XML file, leaving out instruction classes the feature profile cannot implement.
+
+        The root element can be passed in when the XML was already parsed, e.g. from an archive member.
+        """
         self.file_path = file_path
-        xml_content = open(self.file_path, "r").read()
-        self.root = ET.fromstring(xml_content)
+        self.profile = profile
+        if root is None:
+            xml_content = open(self.file_path, "r").read()
+            root = ET.fromstring(xml_content)
+        self.root = root
         self.instruction = self.parse()
 
     def parse_box(self, box_elem: ET.Element) -> Box:
@@ -210,7 +315,7 @@ class ISASpec:
             settings=box_elem.get("settings"),
             use_name=box_elem.get("usename") == "1",
             ps_bits=box_elem.get("psbits"),
-            constants=constants,
+            constants=tuple(constants),
         )
 
     def parse_reg_diagram(self, diagram_elem: ET.Element) -> RegDiagram:
@@ -218,11 +323,16 @@ class ISASpec:
         if diagram_elem is None:
             return None
 
-        boxes = []
-        for box_elem in diagram_elem.findall("./box"):
-            boxes.append(self.parse_box(box_elem))
+        boxes = tuple(self.parse_box(box_elem) for box_elem in diagram_elem.findall("./box"))
 
-        return RegDiagram(form=diagram_elem.get("form", ""), ps_name=diagram_elem.get("psname", ""), boxes=boxes)
+        mask, value = boxes_bits(boxes)
+        return RegDiagram(
+            form=diagram_elem.get("form", ""),
+            ps_name=diagram_elem.get("psname", ""),
+            boxes=boxes,
+            fixed_mask=mask,
+            fixed_value=value,
+        )
 
     def parse_pseudocode(self, ps_elem: ET.Element) -> List[PseudoCode]:
         """Parse pseudocode sections."""
@@ -275,14 +385,29 @@ class ISASpec:
         asm_template = encoding_elem.find(".//asmtemplate")
         template_text = "".join(asm_template.itertext()) if asm_template is not None else ""
 
+        # Boxes of the encoding fix the bits its diagram leaves to the encodings, as its bit differences do
+        bit_diffs = encoding_elem.get("bitdiffs", "")
+        boxes = [self.parse_box(box_elem) for box_elem in encoding_elem.findall("./box")]
+        mask, value = boxes_bits(boxes)
+        if parent_reg_diagram is not None:
+            value |= parent_reg_diagram.fixed_value & ~mask
+            mask |= parent_reg_diagram.fixed_mask
+            try:
+                mask, value = apply_bit_diffs(parent_reg_diagram.boxes, bit_diffs, mask, value)
+            except ValueError as e:
+                if not boxes:
+                    raise ValueError(f"{self.file_path}: {encoding_elem.get('name')}: {e}") from None
+
         return Encoding(
             name=encoding_elem.get("name", ""),
             label=encoding_elem.get("label", ""),
             mnemonic=docvar_dict.get("mnemonic", ""),
             instruction_class=docvar_dict.get("instr-class", ""),
-            bit_diffs=encoding_elem.get("bitdiffs", ""),
+            bit_diffs=bit_diffs,
             assembly_template=template_text,
             reg_diagram=parent_reg_diagram,
+            fixed_mask=mask,
+            fixed_value=value,
         )
 
     def parse_instruction_class(self, iclass_elem: ET.Element) -> InstructionClass:
@@ -324,6 +449,10 @@ class ISASpec:
         # Parse instruction classes
         instruction_classes = []
         for iclass_elem in self.root.findall(".//iclass"):
+            if self.profile is not None:
+                variants = self.parse_arch_variants(iclass_elem)
+                if variants and not any(self.profile.allows_variant(v.name, v.feature) for v in variants):
+                    continue
             instruction_classes.append(self.parse_instruction_class(iclass_elem))
 
         # Parse explanations
@@ -361,3 +490,95 @@ class ISASpec:
 
     def __str__(self) -> str:
         return str(self.instruction)
+
+
+def _parse_members(members: List[Tuple[str, bytes]], profile: Optional[FeatureProfile]) -> List[Instruction]:
+    instructions = []
+    for name, data in members:
+        root = ET.fromstring(data)
+        if root.tag == "instructionsection" and root.get("type") in INSTRUCTION_SECTIONS:
+            instructions.append(ISASpec(name, profile, root).instruction)
+    return instructions
+
+
+def _parse_stream(
+    members: Iterable[Tuple[str, bytes]], profile: Optional[FeatureProfile], jobs: Optional[int]
+) -> List[Instruction]:
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        return _parse_members(list(members), profile)
+
+    instructions: List[Instruction] = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending: Deque[Future] = deque()
+        batch: List[Tuple[str, bytes]] = []
+        for member in members:
+            batch.append(member)
+            if len(batch) == BATCH_SIZE:
+                pending.append(pool.submit(_parse_members, batch, profile))
+                batch = []
+                # Keep a bounded amount of XML in flight while the files are read
+                while len(pending) > jobs * 2:
+                    instructions.extend(pending.popleft().result())
+        if batch:
+            pending.append(pool.submit(_parse_members, batch, profile))
+        for future in pending:
+            instructions.extend(future.result())
+    return instructions
+
+
+def load_isa_archive(
+    file_path: Union[str, Path], profile: Optional[FeatureProfile] = None, jobs: Optional[int] = None
+) -> List[Instruction]:
+    """
+    Parse every instruction of an ``ISA_A64_xml_*.tar.gz`` release without extracting it.
+
+    Members are streamed out of the archive in a single pass while a process pool parses them. The result is
+    stored in a snapshot keyed by the checksum of the archive, so later runs skip parsing altogether.
+
+    Args:
+        file_path (Union[str, Path]): Path to the tarball
+        profile (Optional[FeatureProfile], optional): The target feature profile. Defaults to None.
+        jobs (Optional[int], optional): Number of worker processes. Defaults to the CPU count.
+
+    Returns:
+        List[Instruction]: The instructions and aliases of the release in archive order
+    """
+    path = snapshot_path(file_path, "isa" if profile is None else f"isa-{profile.key()}")
+    try:
+        return load_snapshot(path)
+    except (OSError, ValueError):
+        pass
+
+    instructions = _parse_stream(iter_members(file_path, lambda name: name.endswith(".xml")), profile, jobs)
+    save_snapshot(instructions, path)
+    return instructions
+
+
+def load_isa_directory(
+    directory: Union[str, Path], profile: Optional[FeatureProfile] = None, jobs: Optional[int] = None
+) -> List[Instruction]:
+    """
+    Parse every instruction of an extracted ISA XML release on a process pool.
+
+    Args:
+        directory (Union[str, Path]): The directory holding the XML files
+        profile (Optional[FeatureProfile], optional): The target feature profile. Defaults to None.
+        jobs (Optional[int], optional): Number of worker processes. Defaults to the CPU count.
+
+    Returns:
+        List[Instruction]: The instructions and aliases of the release in file name order
+    """
+    files = sorted(Path(directory).glob("*.xml"))
+    return _parse_stream(((str(path), path.read_bytes()) for path in files), profile, jobs)
+
+
+def load_isa(
+    file_path: Union[str, Path], profile: Optional[FeatureProfile] = None, jobs: Optional[int] = None
+) -> List[Instruction]:
+    """Parse the instructions of a single ISA XML file, an extracted release directory or a release tarball."""
+    if Path(file_path).is_dir():
+        return load_isa_directory(file_path, profile, jobs)
+    if is_archive(file_path):
+        return load_isa_archive(file_path, profile, jobs)
+    return [ISASpec(file_path, profile).instruction]
@@ -0,0 +1,343 @@
+import json
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from .decoder import DecodeNode, build_decode_tree
+from .spec import Instruction, MRSSpec
+from .utils.archive import is_archive, read_member
+
+# Objects reached through attributes that are not part of the data
+_OPAQUE = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+
+# Marks a container that cannot be interned, e.g. one holding views or one that is part of a cycle
+_UNIQUE = object()
+
+
+def format_size(size: int) -> str:
+    """Format a byte count with a binary unit."""
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _attributes(obj: Any) -> Iterator[Tuple[str, Any]]:
+    attributes = getattr(obj, "__dict__", None)
+    if attributes is not None:
+        yield "__dict__", attributes
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get("__slots__", ())
+        for slot in (slots,) if isinstance(slots, str) else slots:
+            if slot not in ("__dict__", "__weakref__"):
+                try:
+                    yield slot, object.__getattribute__(obj, slot)
+                except AttributeError:
+                    pass
+
+
+def _referents(obj: Any) -> Iterator[Any]:
+    if isinstance(obj, dict):
+        yield from obj.keys()
+        yield from obj.values()
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        yield from obj
+    elif not isinstance(obj, (str, bytes, int, float, bool)):
+        for _, value in _attributes(obj):
+            yield value
+
+
+def deep_size(obj: Any, seen: Optional[Set[int]] = None) -> Tuple[int, int]:
+    """
+    Measure an object and everything it references.
+
+    Args:
+        obj (Any): The object to measure
+        seen (Optional[Set[int]], optional): Ids of objects already accounted for, which are skipped and
+            extended, so that measuring several objects with the same set counts shared objects once.
+            Defaults to None.
+
+    Returns:
+        Tuple[int, int]: The size in bytes and the number of objects measured
+    """
+    seen = set() if seen is None else seen
+    size = 0
+    count = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if item is None or id(item) in seen or isinstance(item, _OPAQUE):
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        count += 1
+        stack.extend(_referents(item))
+    return size, count
+
+
+@dataclass
+class Usage:
+    """Represents the memory held by a group of objects."""
+
+    objects: int = 0
+    size: int = 0
+
+    def add(self, size: int, objects: int) -> None:
+        self.size += size
+        self.objects += objects
+
+
+@dataclass
+class PhaseUsage:
+    """Represents the traced memory at the end of a loading phase."""
+
+    name: str
+    elapsed: float
+    # Bytes allocated at the end of the phase and at its peak
+    current: int
+    peak: int
+    # Source lines whose allocations grew the most during the phase, with the growth in bytes
+    top: List[Tuple[str, int]] = field(default_factory=list)
+
+
+@dataclass
+class Duplicate:
+    """Represents a value stored several times over that interning would store once."""
+
+    kind: str
+    sample: str
+    copies: int
+    # Bytes of the copies interning would free, nested values that are duplicates themselves excluded
+    wasted: int
+
+
+@dataclass
+class MemoryReport:
+    """Represents where the memory of a loaded spec goes."""
+
+    total: int
+    by_type: Dict[str, Usage]
+    by_set: Dict[str, Usage]
+    phases: List[PhaseUsage]
+    duplicates: List[Duplicate]
+    # Bytes interning would free, by kind of value
+    wasted: Dict[str, int]
+
+
+def load_phases(
+    file_path: Union[str, Path], instruction_set: str = "A64", frames: int = 1
+) -> Tuple[MRSSpec, List[DecodeNode], List[PhaseUsage]]:
+    """
+    Load a spec and build its decode tree while tracing the allocations of each phase.
+
+    Args:
+        file_path (Union[str, Path]): Path to the MRS Instructions.json or tarball
+        instruction_set (str, optional): Name of the InstructionSet to build the decode tree of. Defaults to "A64".
+        frames (int, optional): Stack frames recorded per allocation. Defaults to 1.
+
+    Returns:
+        Tuple[MRSSpec, List[DecodeNode], List[PhaseUsage]]: The spec, the decode tree and the memory after the
+            file is read, its JSON decoded, the models built and the decode tree built
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start(frames)
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+    phases: List[PhaseUsage] = []
+    previous = tracemalloc.take_snapshot().filter_traces(ignore)
+    began = time.perf_counter()
+
+    def phase(name: str) -> None:
+        nonlocal previous, began
+        elapsed = time.perf_counter() - began
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(ignore)
+        top = [
+            (str(stat.traceback[0]), stat.size_diff)
+            for stat in snapshot.compare_to(previous, "lineno")[:3]
+            if stat.size_diff > 0
+        ]
+        phases.append(PhaseUsage(name, elapsed, current, peak, top))
+        previous = snapshot
+        tracemalloc.reset_peak()
+        began = time.perf_counter()
+
+    try:
+        raw = read_member(file_path, "Instructions.json") if is_archive(file_path) else Path(file_path).read_bytes()
+        phase("read")
+        data = json.loads(raw)
+        del raw
+        phase("decode JSON")
+        spec = MRSSpec.from_dict(data, file_path)
+        del data
+        phase("build models")
+        tree = build_decode_tree(spec, instruction_set)
+        phase("build decode tree")
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return spec, tree, phases
+
+
+def spec_usage(spec: MRSSpec, tree: Optional[List[DecodeNode]] = None) -> Tuple[Dict[str, Usage], Dict[str, Usage]]:
+    """
+    Account the memory of a loaded spec by model type and by instruction set.
+
+    Objects are counted once, under the first part of the spec that references them: encodesets, conditions,
+    assembly and the ASL trees of every instruction come first, then the instruction models themselves, then
+    the shared assembly rules, operations and metadata, and finally the decode tree.
+
+    Args:
+        spec (MRSSpec): The loaded spec
+        tree (Optional[List[DecodeNode]], optional): A decode tree built from it. Defaults to None.
+
+    Returns:
+        Tuple[Dict[str, Usage], Dict[str, Usage]]: The memory by type and by instruction set
+    """
+    seen: Set[int] = set()
+    by_type: Dict[str, Usage] = {}
+    by_set: Dict[str, Usage] = {}
+
+    def add(kind: str, obj: Any, usage: Optional[Usage] = None) -> None:
+        size, count = deep_size(obj, seen)
+        by_type.setdefault(kind, Usage()).add(size, count)
+        if usage is not None:
+            usage.add(size, count)
+
+    for instruction_set in spec.instructions.instructions:
+        usage = by_set[instruction_set.name] = Usage()
+        items = []
+        stack = [instruction_set]
+        while stack:
+            item = stack.pop()
+            items.append(item)
+            if not isinstance(item, Instruction):
+                stack.extend(reversed(item.children))
+        for item in items:
+            add("Encodeset", item.encoding, usage)
+            add("condition", item.condition, usage)
+            if isinstance(item, Instruction):
+                add("assembly", item.assembly, usage)
+                for tree_part in (item.assemble, item.disassemble, item.assertions):
+                    add("ASL", tree_part, usage)
+        # Children before their parents, so that every model only counts what is left of its own
+        for item in reversed(items):
+            add(type(item).__name__, item, usage)
+
+    add("assembly_rules", spec.instructions.assembly_rules)
+    add("operations", spec.instructions.operations)
+    add("meta", spec.instructions.meta)
+    add("Instructions", spec.instructions)
+    if tree is not None:
+        add("DecodeNode", tree)
+    return by_type, by_set
+
+
+def find_duplicates(root: Any, limit: int = 10) -> Tuple[List[Duplicate], Dict[str, int]]:
+    """
+    Find the strings, dicts and lists reachable from an object that are stored more than once.
+
+    Containers are compared by structure, bottom-up, so two dicts are duplicates when their keys and the
+    (interned) values of their keys are equal. Only the container itself is charged for a duplicate, as its
+    nested values are charged separately, so the wasted bytes of all duplicates add up.
+
+    Args:
+        root (Any): The object to search
+        limit (int, optional): Number of duplicates to return. Defaults to 10.
+
+    Returns:
+        Tuple[List[Duplicate], Dict[str, int]]: The duplicates that waste the most memory, and the bytes
+            interning would free by kind
+    """
+    seen: Set[int] = set()
+    strings: Dict[str, int] = {}
+    # Canonical number of every JSON container, and copies, shallow size and a sample of every number
+    keys: Dict[int, Any] = {}
+    canon: Dict[Tuple, int] = {}
+    copies: Dict[int, List[Any]] = {}
+
+    def token(value: Any) -> Any:
+        if isinstance(value, str):
+            return value
+        if isinstance(value, (dict, list)):
+            return keys.get(id(value), _UNIQUE)
+        if value is None or isinstance(value, (bool, int, float)):
+            return (type(value), value)
+        return _UNIQUE
+
+    # Containers are visited, then finished once their values are. Private attributes, such as the namespace
+    # of an object or the cache of a view, are state rather than data and are visited without being interned.
+    visit, finish, private = range(3)
+    stack: List[Tuple[Any, int]] = [(root, visit)]
+    while stack:
+        obj, state = stack.pop()
+        if state == finish:
+            if isinstance(obj, dict):
+                parts = tuple((k, token(v)) for k, v in obj.items())
+                unique = any(part[1] is _UNIQUE for part in parts)
+            else:
+                parts = tuple(token(v) for v in obj)
+                unique = any(part is _UNIQUE for part in parts)
+            if unique:
+                keys[id(obj)] = _UNIQUE
+                continue
+            number = canon.setdefault((type(obj), parts), len(canon))
+            keys[id(obj)] = number
+            record = copies.setdefault(number, [0, sys.getsizeof(obj), obj])
+            record[0] += 1
+            continue
+        if obj is None or id(obj) in seen or isinstance(obj, _OPAQUE):
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, str):
+            strings[obj] = strings.get(obj, 0) + 1
+        elif isinstance(obj, (dict, list)):
+            if state == private:
+                keys[id(obj)] = _UNIQUE
+            else:
+                stack.append((obj, finish))
+            stack.extend((child, visit) for child in _referents(obj))
+        elif isinstance(obj, (tuple, set, frozenset)):
+            stack.extend((child, visit) for child in obj)
+        else:
+            stack.extend((value, private if name.startswith("_") else visit) for name, value in _attributes(obj))
+
+    duplicates = [
+        Duplicate("str", repr(value[:60]), count, (count - 1) * sys.getsizeof(value))
+        for value, count in strings.items()
+        if count > 1
+    ]
+    duplicates.extend(
+        Duplicate(type(sample).__name__, repr(sample)[:60], count, (count - 1) * size)
+        for count, size, sample in copies.values()
+        if count > 1
+    )
+    wasted: Dict[str, int] = {"str": 0, "dict": 0, "list": 0}
+    for duplicate in duplicates:
+        wasted[duplicate.kind] += duplicate.wasted
+    duplicates.sort(key=lambda duplicate: duplicate.wasted, reverse=True)
+    return duplicates[:limit], wasted
+
+
+def memory_report(file_path: Union[str, Path], instruction_set: str = "A64", limit: int = 10) -> MemoryReport:
+    """
+    Report where the memory of a spec goes once it is loaded.
+
+    Args:
+        file_path (Union[str, Path]): Path to the MRS Instructions.json or tarball
+        instruction_set (str, optional): Name of the InstructionSet to build the decode tree of. Defaults to "A64".
+        limit (int, optional): Number of duplicated values to report. Defaults to 10.
+
+    Returns:
+        MemoryReport: Memory by type, by instruction set and by loading phase, and the largest duplicates
+    """
+    spec, tree, phases = load_phases(file_path, instruction_set)
+    by_type, by_set = spec_usage(spec, tree)
+    duplicates, wasted = find_duplicates((spec.instructions, tree), limit)
+    total = sum(usage.size for usage in by_type.values())
+    return MemoryReport(total, by_type, by_set, phases, duplicates, wasted)
@@ -0,0 +1,462 @@
+from collections.abc import Sequence
+from typing import Any, ClassVar, Dict, Iterator, List, Optional, Type, Union
+
+# View class of every registered _type tag
+REGISTRY: Dict[str, Type["Node"]] = {}
+
+
+def wrap(value: Any) -> Any:
+    """
+    Wrap a raw JSON value in its typed view.
+
+    Args:
+        value (Any): A raw JSON value
+
+    Returns:
+        Any: A Node for objects, a NodeList for arrays and the value itself for scalars
+    """
+    if isinstance(value, dict):
+        return REGISTRY.get(value.get("_type"), Node)(value)
+    if isinstance(value, list):
+        return NodeList(value)
+    return value
+
+
+def unwrap(value: Any) -> Any:
+    """Get the raw JSON value behind a view."""
+    if isinstance(value, (Node, NodeList)):
+        return value.raw
+    return value
+
+
+class Node(object):
+    """
+    Lazy typed view over a raw MRS JSON object.
+
+    Attributes are wrapped on first access and cached, so building a view costs nothing until it is used.
+    Indexing works like the raw dict, with nested values wrapped the same way.
+    """
+
+    __slots__ = ("raw", "_cache")
+
+    TYPE: ClassVar[Optional[str]] = None
+    # Name of the strict pydantic model in mrs.ast.binary_op
+    MODEL: ClassVar[Optional[str]] = None
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.raw = raw
+        self._cache: Dict[str, Any] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.TYPE is not None:
+            REGISTRY[cls.TYPE] = cls
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("__"):
+            raise AttributeError(name)
+        cache = self._cache
+        if name in cache:
+            return cache[name]
+        try:
+            value = wrap(self.raw[name])
+        except KeyError:
+            raise AttributeError(f"{type(self).__name__} has no attribute {name!r}") from None
+        cache[name] = value
+        return value
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self.__getattr__(key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.raw
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get an attribute like ``dict.get``."""
+        return self[key] if key in self.raw else default
+
+    def __eq__(self, other: Any) -> bool:
+        return self.raw == unwrap(other)
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (wrap, (self.raw,))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.raw!r})"
+
+    def to_model(self):
+        """
+        Convert the view to its strict pydantic model, validating it on the way.
+
+        Returns:
+            pydantic.BaseModel: The model from mrs.ast.binary_op
+        """
+        if self.MODEL is None:
+            raise TypeError(f"{self.raw.get('_type')} has no schema model")
+
+        from .ast import binary_op
+
+        return getattr(binary_op, self.MODEL).parse_obj(self.raw)
+
+
+class NodeList(Sequence):
+    """Lazy view over a raw JSON array whose items are wrapped on first access."""
+
+    __slots__ = ("raw", "_items")
+
+    def __init__(self, raw: List[Any]):
+        self.raw = raw
+        self._items: List[Any] = [None] * len(raw)
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return NodeList(self.raw[index])
+        item = self._items[index]
+        if item is None:
+            item = self._items[index] = wrap(self.raw[index])
+        return item
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(len(self.raw)):
+            yield self[i]
+
+    def __eq__(self, other: Any) -> bool:
+        return self.raw == unwrap(other)
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return (NodeList, (self.raw,))
+
+    def __repr__(self) -> str:
+        return f"NodeList({self.raw!r})"
+
+
+# Encodesets
+
+
+class Range(Node):
+    __slots__ = ()
+    TYPE = "Range"
+    MODEL = "Range"
+    start: int
+    width: int
+
+
+class Value(Node):
+    __slots__ = ()
+    TYPE = "Values.Value"
+    MODEL = "Value"
+    value: str
+    meaning: Optional[str]
+
+
+class EncodesetField(Node):
+    __slots__ = ()
+    TYPE = "Instruction.Encodeset.Field"
+    range: Range
+    name: str
+    value: Value
+    should_be_mask: Value
+
+
+class EncodesetBits(Node):
+    __slots__ = ()
+    TYPE = "Instruction.Encodeset.Bits"
+    range: Range
+    value: Value
+    should_be_mask: Value
+
+
+# Assembly
+
+
+class AssemblyLiteral(Node):
+    __slots__ = ()
+    TYPE = "Instruction.Symbols.Literal"
+    value: str
+
+
+class AssemblyRuleReference(Node):
+    __slots__ = ()
+    TYPE = "Instruction.Symbols.RuleReference"
+    rule_id: str
+
+
+class Assembly(Node):
+    __slots__ = ()
+    TYPE = "Instruction.Assembly"
+    symbols: NodeList
+
+
+class AssemblyRuleChoice(Node):
+    __slots__ = ()
+    TYPE = "Instruction.Rules.Choice"
+    choices: NodeList
+    display: Optional[str]
+
+
+class AssemblyRuleRule(Node):
+    __slots__ = ()
+    TYPE = "Instruction.Rules.Rule"
+    display: Optional[str]
+
+
+class AssemblyRuleToken(Node):
+    __slots__ = ()
+    TYPE = "Instruction.Rules.Token"
+    pattern: str
+    default: Optional[str]
+
+
+# AST
+
+
+class Identifier(Node):
+    __slots__ = ()
+    TYPE = "AST.Identifier"
+    MODEL = "Identifier"
+    value: str
+
+
+class DotAtom(Node):
+    __slots__ = ()
+    TYPE = "AST.DotAtom"
+    MODEL = "DotAtom"
+    values: NodeList
+
+
+class BinaryOp(Node):
+    __slots__ = ()
+    TYPE = "AST.BinaryOp"
+    MODEL = "BinaryOp"
+    left: Node
+    op: str
+    right: Node
+
+
+class UnaryOp(Node):
+    __slots__ = ()
+    TYPE = "AST.UnaryOp"
+    MODEL = "UnaryOp"
+    op: str
+    expr: Node
+
+
+class Function(Node):
+    __slots__ = ()
+    TYPE = "AST.Function"
+    MODEL = "Function"
+    name: str
+    arguments: NodeList
+
+
+class Bool(Node):
+    __slots__ = ()
+    TYPE = "AST.Bool"
+    MODEL = "Bool"
+    value: bool
+
+
+class Integer(Node):
+    __slots__ = ()
+    TYPE = "AST.Integer"
+    MODEL = "Integer"
+    value: int
+
+
+class Real(Node):
+    __slots__ = ()
+    TYPE = "AST.Real"
+    MODEL = "Real"
+    value: float
+
+
+class String(Node):
+    __slots__ = ()
+    TYPE = "Types.String"
+    MODEL = "String"
+    value: str
+
+
+class Set(Node):
+    __slots__ = ()
+    TYPE = "AST.Set"
+    MODEL = "Set"
+    values: NodeList
+
+
+class Slice(Node):
+    __slots__ = ()
+    TYPE = "AST.Slice"
+    MODEL = "Slice"
+    left: Node
+    right: Node
+
+
+class SquareOp(Node):
+    __slots__ = ()
+    TYPE = "AST.SquareOp"
+    MODEL = "SquareOp"
+    var: Node
+    arguments: NodeList
+
+
+class Concat(Node):
+    __slots__ = ()
+    TYPE = "AST.Concat"
+    MODEL = "Concat"
+    values: NodeList
+
+
+class Tuple(Node):
+    __slots__ = ()
+    TYPE = "AST.Tuple"
+    MODEL = "Tuple"
+    values: NodeList
+
+
+class TypeAnnotation(Node):
+    __slots__ = ()
+    TYPE = "AST.TypeAnnotation"
+    MODEL = "TypeAnnotation"
+
+
+class Assignment(Node):
+    __slots__ = ()
+    TYPE = "AST.Assignment"
+    var: Node
+    val: Node
+
+
+class StatementBlock(Node):
+    __slots__ = ()
+    TYPE = "AST.StatementBlock"
+    statements: NodeList
+
+
+# ASL statements and expressions produced by the pseudocode parser
+
+
+class Type(Node):
+    __slots__ = ()
+    TYPE = "AST.Type"
+    name: Node
+
+
+class BitSlice(Node):
+    __slots__ = ()
+    TYPE = "AST.BitSlice"
+    var: Node
+    arguments: NodeList
+
+
+class Conditional(Node):
+    __slots__ = ()
+    TYPE = "AST.Conditional"
+    condition: Node
+    then: Node
+
+
+class Declaration(Node):
+    __slots__ = ()
+    TYPE = "AST.Declaration"
+    kind: str
+    type: Optional[Type]
+    names: NodeList
+    value: Optional[Node]
+
+
+class ProcedureCall(Node):
+    __slots__ = ()
+    TYPE = "AST.ProcedureCall"
+    call: Function
+
+
+class If(Node):
+    __slots__ = ()
+    TYPE = "AST.If"
+    condition: Node
+    then: StatementBlock
+
+
+class CaseWhen(Node):
+    __slots__ = ()
+    TYPE = "AST.CaseWhen"
+    patterns: NodeList
+    where: Optional[Node]
+    body: StatementBlock
+
+
+class Case(Node):
+    __slots__ = ()
+    TYPE = "AST.Case"
+    expr: Node
+    whens: NodeList
+    otherwise: Optional[StatementBlock]
+
+
+class For(Node):
+    __slots__ = ()
+    TYPE = "AST.For"
+    var: str
+    start: Node
+    direction: str
+    stop: Node
+    body: StatementBlock
+
+
+class While(Node):
+    __slots__ = ()
+    TYPE = "AST.While"
+    condition: Node
+    body: StatementBlock
+
+
+class Repeat(Node):
+    __slots__ = ()
+    TYPE = "AST.Repeat"
+    body: StatementBlock
+    condition: Node
+
+
+class Return(Node):
+    __slots__ = ()
+    TYPE = "AST.Return"
+    value: Optional[Node]
+
+
+class Undefined(Node):
+    __slots__ = ()
+    TYPE = "AST.Undefined"
+
+
+class Unpredictable(Node):
+    __slots__ = ()
+    TYPE = "AST.Unpredictable"
+
+
+class See(Node):
+    __slots__ = ()
+    TYPE = "AST.See"
+    value: Node
+
+
+class Assert(Node):
+    __slots__ = ()
+    TYPE = "AST.Assert"
+    condition: Node
+
+
+class Throw(Node):
+    __slots__ = ()
+    TYPE = "AST.Throw"
+    value: Node
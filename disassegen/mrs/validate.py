@@ -0,0 +1,415 @@
+import hashlib
+import json
+import random
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from ..snapshot import CACHE_DIR
+
+SCHEMA_FILE = Path(__file__).with_name("schema.json")
+
+# A compiled check appends a Violation for every problem it finds in a value
+Validator = Callable[[Any, str, List["Violation"]], None]
+
+JSON_TYPES = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+@dataclass
+class Violation:
+    """Represents a schema violation inside the spec."""
+
+    path: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.message}"
+
+
+@dataclass
+class ValidationReport:
+    """Represents the outcome of validating a spec."""
+
+    subtrees: int = 0
+    unique: int = 0
+    cached: int = 0
+    skipped: int = 0
+    validated: int = 0
+    violations: List[Violation] = field(default_factory=list)
+
+
+class SchemaCompiler(object):
+    """Compiles a JSON Schema, such as the one of a pydantic model, into plain-Python validators."""
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self.definitions: Dict[str, Dict[str, Any]] = schema.get("definitions", {})
+        self._compiled: Dict[str, Validator] = {}
+        self.root = self.compile(schema)
+
+    def definition(self, name: str) -> Validator:
+        """Get the validator of a named definition, compiling it on first use."""
+        if name not in self._compiled:
+            self._compiled[name] = self.compile(self.definitions[name])
+        return self._compiled[name]
+
+    def tags(self, schema: Optional[Dict[str, Any]] = None) -> Set[str]:
+        """
+        Collect the ``_type`` tags of the models a schema accepts.
+
+        Args:
+            schema (Optional[Dict[str, Any]], optional): The schema to inspect. Defaults to the root schema.
+
+        Returns:
+            Set[str]: The tags, following references and unions
+        """
+        schema = self._resolve(self.schema if schema is None else schema)
+        tag = schema.get("properties", {}).get("_type")
+        if tag is not None:
+            return set(self._resolve(tag).get("enum", []))
+        tags = set()
+        for sub in schema.get("anyOf", []) + schema.get("oneOf", []):
+            tags |= self.tags(sub)
+        return tags
+
+    def _resolve(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        while "$ref" in schema:
+            schema = self.definitions[schema["$ref"].rsplit("/", 1)[-1]]
+        return schema
+
+    def compile(self, schema: Dict[str, Any]) -> Validator:
+        """
+        Compile a schema into a validator.
+
+        Args:
+            schema (Dict[str, Any]): The schema, whose ``$ref`` are resolved against the root definitions
+
+        Returns:
+            Validator: The compiled check
+        """
+        if "$ref" in schema:
+            name = schema["$ref"].rsplit("/", 1)[-1]
+            return lambda value, path, errors: self.definition(name)(value, path, errors)
+
+        checks: List[Validator] = []
+
+        if "anyOf" in schema or "oneOf" in schema:
+            checks.append(self._compile_any_of(schema.get("anyOf") or schema["oneOf"]))
+        for sub in schema.get("allOf", []):
+            checks.append(self.compile(sub))
+
+        if "enum" in schema:
+            allowed = schema["enum"]
+            checks.append(
+                lambda value, path, errors: (
+                    None if value in allowed else errors.append(Violation(path, f"{value!r} is not one of {allowed}"))
+                )
+            )
+
+        kind = schema.get("type")
+        if kind is not None:
+            kinds = kind if isinstance(kind, list) else [kind]
+            tests = [JSON_TYPES[k] for k in kinds]
+            expected = " or ".join(kinds)
+
+            def check_type(value, path, errors, tests=tests, expected=expected):
+                if not any(test(value) for test in tests):
+                    errors.append(Violation(path, f"expected {expected}, got {type(value).__name__}"))
+                    return False
+                return True
+
+        else:
+            check_type = None
+
+        if "pattern" in schema:
+            regex = re.compile(schema["pattern"])
+            checks.append(
+                lambda value, path, errors: (
+                    None
+                    if not isinstance(value, str) or regex.match(value)
+                    else errors.append(Violation(path, f"{value!r} does not match {regex.pattern}"))
+                )
+            )
+        for key, test, message in (
+            ("minimum", lambda v, n: v >= n, "less than"),
+            ("exclusiveMinimum", lambda v, n: v > n, "not greater than"),
+            ("maximum", lambda v, n: v <= n, "greater than"),
+            ("exclusiveMaximum", lambda v, n: v < n, "not less than"),
+        ):
+            if key in schema:
+                bound = schema[key]
+                checks.append(
+                    lambda value, path, errors, bound=bound, test=test, message=message: (
+                        None
+                        if isinstance(value, bool) or not isinstance(value, (int, float)) or test(value, bound)
+                        else errors.append(Violation(path, f"{value} is {message} {bound}"))
+                    )
+                )
+
+        if "properties" in schema or "required" in schema or schema.get("additionalProperties") is False:
+            checks.append(self._compile_object(schema))
+        if "items" in schema:
+            checks.append(self._compile_items(schema["items"]))
+        if "minItems" in schema or "maxItems" in schema or schema.get("uniqueItems"):
+            checks.append(self._compile_array_bounds(schema))
+
+        def validate(value, path, errors):
+            if check_type is not None and not check_type(value, path, errors):
+                return
+            for check in checks:
+                check(value, path, errors)
+
+        return validate
+
+    def _compile_object(self, schema: Dict[str, Any]) -> Validator:
+        properties = {name: self.compile(sub) for name, sub in schema.get("properties", {}).items()}
+        required = schema.get("required", [])
+        closed = schema.get("additionalProperties") is False
+
+        def validate(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(Violation(path, f"missing required property {name!r}"))
+            for name, item in value.items():
+                check = properties.get(name)
+                if check is None:
+                    if closed:
+                        errors.append(Violation(path, f"unexpected property {name!r}"))
+                elif item is not None or name in required:
+                    # Optional pydantic fields accept None
+                    check(item, f"{path}.{name}", errors)
+
+        return validate
+
+    def _compile_array_bounds(self, schema: Dict[str, Any]) -> Validator:
+        low = schema.get("minItems", 0)
+        high = schema.get("maxItems")
+        unique = schema.get("uniqueItems", False)
+
+        def validate(value, path, errors):
+            if not isinstance(value, list):
+                return
+            if len(value) < low:
+                errors.append(Violation(path, f"expected at least {low} items, got {len(value)}"))
+            if high is not None and len(value) > high:
+                errors.append(Violation(path, f"expected at most {high} items, got {len(value)}"))
+            if unique and len({json.dumps(item, sort_keys=True) for item in value}) != len(value):
+                errors.append(Violation(path, "items are not unique"))
+
+        return validate
+
+    def _compile_items(self, schema: Union[Dict[str, Any], List[Dict[str, Any]]]) -> Validator:
+        if isinstance(schema, list):
+            checks = [self.compile(sub) for sub in schema]
+
+            def validate(value, path, errors):
+                if isinstance(value, list):
+                    for i, (item, check) in enumerate(zip(value, checks)):
+                        check(item, f"{path}[{i}]", errors)
+
+            return validate
+
+        check = self.compile(schema)
+
+        def validate(value, path, errors):
+            if isinstance(value, list):
+                for i, item in enumerate(value):
+                    check(item, f"{path}[{i}]", errors)
+
+        return validate
+
+    def _compile_any_of(self, branches: List[Dict[str, Any]]) -> Validator:
+        checks = [self.compile(sub) for sub in branches]
+
+        # Dispatch tagged models on their _type instead of trying every branch
+        tagged: Dict[str, List[Validator]] = {}
+        for sub, check in zip(branches, checks):
+            for tag in self.tags(sub):
+                tagged.setdefault(tag, []).append(check)
+        names = [self._resolve(sub).get("title", "?") for sub in branches]
+
+        def validate(value, path, errors):
+            candidates = checks
+            if isinstance(value, dict) and value.get("_type") in tagged:
+                candidates = tagged[value["_type"]]
+                if len(candidates) == 1:
+                    candidates[0](value, path, errors)
+                    return
+            best: Optional[List[Violation]] = None
+            for check in candidates:
+                trial: List[Violation] = []
+                check(value, path, trial)
+                if not trial:
+                    return
+                if best is None or len(trial) < len(best):
+                    best = trial
+            if candidates is checks:
+                errors.append(Violation(path, f"does not match any of {', '.join(names)}"))
+            else:
+                errors.extend(best)
+
+        return validate
+
+
+def load_schema() -> Dict[str, Any]:
+    """
+    Get the JSON Schema of the MRS AST pydantic models.
+
+    The schema ships as ``schema.json``, exported from the models with ``Expression.schema()`` under pydantic
+    v1, so the compiled engine does not need pydantic. Re-export it whenever the models are regenerated.
+
+    Returns:
+        Dict[str, Any]: The schema of ``Expression`` with the definitions of every model it references
+    """
+    return json.loads(SCHEMA_FILE.read_text())
+
+
+def subtree_hash(node: Any) -> str:
+    """Hash a JSON subtree by its canonical encoding."""
+    return hashlib.sha1(json.dumps(node, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def format_loc(loc: Tuple[Union[int, str], ...]) -> str:
+    """Format a pydantic error location as a JSON path suffix."""
+    return "".join(f"[{p}]" if isinstance(p, int) else f".{p}" for p in loc if p != "__root__")
+
+
+def iter_subtrees(data: Any, tags: Set[str], path: str = "$") -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Find the outermost subtrees of the spec that a schema model covers.
+
+    Args:
+        data (Any): The raw spec JSON or a part of it
+        tags (Set[str]): The ``_type`` tags that have a model
+        path (str, optional): JSON path of ``data``. Defaults to "$".
+
+    Yields:
+        Tuple[str, Dict[str, Any]]: The JSON path and contents of every covered subtree
+    """
+    stack = [(path, data)]
+    while stack:
+        path, node = stack.pop()
+        if isinstance(node, dict):
+            if node.get("_type") in tags:
+                yield path, node
+                continue
+            stack.extend((f"{path}.{key}", value) for key, value in reversed(node.items()))
+        elif isinstance(node, list):
+            stack.extend((f"{path}[{i}]", value) for i, value in reversed(list(enumerate(node))))
+
+
+class SpecValidator(object):
+    """Validates the AST subtrees of an MRS spec against the schema models."""
+
+    def __init__(self, schema: Optional[Dict[str, Any]] = None, engine: str = "compiled"):
+        """
+        Prepare a validator.
+
+        Args:
+            schema (Optional[Dict[str, Any]], optional): The models' JSON Schema. Defaults to ``load_schema()``.
+            engine (str, optional): "compiled" for the plain-Python validators, "pydantic" to parse every
+                subtree with the pydantic models themselves. Defaults to "compiled".
+        """
+        self.schema = schema if schema is not None else load_schema()
+        self.engine = engine
+        self.compiler = SchemaCompiler(self.schema)
+        self.tags = self.compiler.tags()
+        self.fingerprint = subtree_hash([self.schema, engine])
+
+    def cache_path(self) -> Path:
+        """Location of the cache of subtrees known to be valid under this schema."""
+        return CACHE_DIR / f"validate-{self.fingerprint}.json"
+
+    def check(self, node: Dict[str, Any], path: str) -> List[Violation]:
+        """
+        Validate a single subtree.
+
+        Args:
+            node (Dict[str, Any]): The subtree
+            path (str): JSON path of the subtree, used in the violations
+
+        Returns:
+            List[Violation]: Every violation found
+        """
+        if self.engine == "pydantic":
+            # The models need pydantic v1, an optional dependency
+            from pydantic import ValidationError
+
+            from .ast.binary_op import Expression
+
+            try:
+                Expression.parse_obj(node)
+            except ValidationError as e:
+                return [Violation(path + format_loc(err["loc"]), err["msg"]) for err in e.errors()]
+            return []
+
+        errors: List[Violation] = []
+        self.compiler.root(node, path, errors)
+        return errors
+
+    def validate(
+        self, data: Dict[str, Any], sample: Optional[float] = None, seed: int = 0, use_cache: bool = True
+    ) -> ValidationReport:
+        """
+        Validate the AST subtrees of a raw MRS spec.
+
+        Identical subtrees are validated once, and subtrees that passed in an earlier run are skipped, so only
+        changed subtrees cost anything.
+
+        Args:
+            data (Dict[str, Any]): The raw spec JSON
+            sample (Optional[float], optional): Fraction of the changed subtrees to validate. Defaults to all.
+            seed (int, optional): Seed of the sample. Defaults to 0.
+            use_cache (bool, optional): Read and update the cache of valid subtrees. Defaults to True.
+
+        Returns:
+            ValidationReport: Counts of what was validated and every violation found
+        """
+        report = ValidationReport()
+
+        groups: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        for path, node in iter_subtrees(data, self.tags):
+            report.subtrees += 1
+            groups.setdefault(subtree_hash(node), []).append((path, node))
+        report.unique = len(groups)
+
+        known = set()
+        cache = self.cache_path()
+        if use_cache and cache.exists():
+            known = set(json.loads(cache.read_text()))
+
+        pending = [key for key in groups if key not in known]
+        report.cached = len(groups) - len(pending)
+        if sample is not None and sample < 1:
+            count = max(1, round(len(pending) * sample)) if pending else 0
+            chosen = set(random.Random(seed).sample(pending, count))
+            report.skipped = len(pending) - count
+            pending = [key for key in pending if key in chosen]
+
+        for key in pending:
+            first_path, node = groups[key][0]
+            violations = self.check(node, first_path)
+            report.validated += 1
+            if not violations:
+                known.add(key)
+                continue
+            # Report the violations at every location of the subtree
+            for path, _ in groups[key]:
+                report.violations.extend(Violation(path + v.path[len(first_path) :], v.message) for v in violations)
+
+        if use_cache and report.validated:
+            cache.parent.mkdir(parents=True, exist_ok=True)
+            cache.write_text(json.dumps(sorted(known)))
+
+        return report
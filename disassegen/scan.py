@@ -0,0 +1,214 @@
+"""
+Instruction-pattern scanning over code blobs.
+
+A pattern is a sequence of elements separated by ``;``, each a mnemonic or instruction name optionally
+followed by ``FIELD=VALUE`` operand constraints, e.g. ``ldp Rn=31 ; ret``, or a raw ternary pattern, see
+``search.parse_pattern``. Elements are compiled to the fixed bits of the encodings they allow, the words of a
+blob are compared against them vectorized with NumPy when it is installed, and the few candidates are then
+confirmed by decoding them, so encodings that an earlier one shadows do not match.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .decoder import Decoder, FlatInstruction
+from .search import parse_pattern
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Words compared at once, about 64 MiB of uint32
+SCAN_CHUNK = 1 << 24
+
+
+@dataclass
+class ScanElement:
+    """Represents the instructions one word of a pattern can be."""
+
+    text: str
+    # Values of the fixed bits the word can have, by mask
+    alternatives: Dict[int, FrozenSet[int]] = field(default_factory=dict)
+    # Names of the instructions the word must decode to, None for a raw ternary pattern
+    names: Optional[FrozenSet[str]] = None
+
+    def matches(self, word: int) -> bool:
+        """Check whether a word has the fixed bits of one of the alternatives."""
+        return any(word & mask in values for mask, values in self.alternatives.items())
+
+
+@dataclass
+class ScanPattern:
+    """Represents a sequence of consecutive instructions to scan for."""
+
+    text: str
+    elements: List[ScanElement]
+
+
+@dataclass
+class ScanMatch:
+    """Represents a place where a pattern occurs."""
+
+    pattern: ScanPattern
+    # Index of the first word of the match
+    index: int
+    words: Tuple[int, ...]
+
+
+def mnemonic(instruction: FlatInstruction) -> str:
+    """Get the mnemonic of an instruction from its assembly template, or its name if it has none."""
+    parts = instruction.template.split()
+    return parts[0].lower() if parts else instruction.name.lower()
+
+
+def compile_element(text: str, instructions: List[FlatInstruction], strict: bool = True) -> ScanElement:
+    """
+    Compile one element of a pattern.
+
+    Args:
+        text (str): A raw ternary pattern, or a mnemonic or instruction name with ``FIELD=VALUE`` constraints
+        instructions (List[FlatInstruction]): The instructions of the spec, see ``flat_snapshot``
+        strict (bool, optional): Whether should-be bits count as fixed bits. Defaults to True.
+
+    Raises:
+        ValueError: If a constraint is malformed, or no instruction can satisfy the element
+
+    Returns:
+        ScanElement: The element
+    """
+    text = text.strip()
+    parts = text.split()
+    if len(parts) == 1 and (text.startswith(("0x", "0b")) or len(text.replace("_", "")) == 32):
+        mask, value = parse_pattern(text)
+        return ScanElement(text, {mask: frozenset((value,))})
+
+    constraints = []
+    for part in parts[1:]:
+        name, sep, value = part.partition("=")
+        if not sep:
+            raise ValueError(f"expected FIELD=VALUE, got {part!r} in {text!r}")
+        constraints.append((name, int(value, 0)))
+
+    alternatives: Dict[int, Set[int]] = {}
+    names = set()
+    wanted = parts[0].lower() if parts else ""
+    for instruction in instructions:
+        if wanted not in (mnemonic(instruction), instruction.name.lower()):
+            continue
+        if strict:
+            mask, value = instruction.fixed_mask, instruction.fixed_value
+        else:
+            mask, value = instruction.mask, instruction.value
+        fields = {name: (start, width) for name, start, width in instruction.fields}
+        for name, constant in constraints:
+            if name not in fields:
+                break
+            start, width = fields[name]
+            bits = ((1 << width) - 1) << start
+            if constant >> width or (value ^ constant << start) & mask & bits:
+                break
+            mask |= bits
+            value |= constant << start
+        else:
+            alternatives.setdefault(mask, set()).add(value)
+            names.add(instruction.name)
+    if not names:
+        raise ValueError(f"no instruction matches {text!r}")
+    return ScanElement(text, {mask: frozenset(values) for mask, values in alternatives.items()}, frozenset(names))
+
+
+def compile_pattern(text: str, instructions: List[FlatInstruction], strict: bool = True) -> ScanPattern:
+    """Compile a ``;``-separated sequence of elements, see ``compile_element``."""
+    elements = [compile_element(part, instructions, strict) for part in text.split(";") if part.strip()]
+    if not elements:
+        raise ValueError(f"empty pattern {text!r}")
+    return ScanPattern(text, elements)
+
+
+def _element_hits(words, element: ScanElement):
+    hits = None
+    for mask, values in element.alternatives.items():
+        masked = words & mask
+        if len(values) == 1:
+            found = masked == next(iter(values))
+        else:
+            found = numpy.isin(masked, numpy.fromiter(values, dtype=numpy.uint32, count=len(values)))
+        hits = found if hits is None else hits | found
+    return hits
+
+
+def _candidates(words: Sequence[int], pattern: ScanPattern, count: int) -> Iterator[int]:
+    # Indexes below count at which every element matches the word it lines up with
+    if numpy is None:
+        first = pattern.elements[0]
+        for index in range(count):
+            if first.matches(words[index]) and all(
+                element.matches(words[index + offset]) for offset, element in enumerate(pattern.elements[1:], 1)
+            ):
+                yield index
+        return
+    array = numpy.asarray(words, dtype=numpy.uint32)
+    hits = numpy.ones(count, dtype=bool)
+    for offset, element in enumerate(pattern.elements):
+        hits &= _element_hits(array[offset : offset + count], element)
+    yield from numpy.flatnonzero(hits).tolist()
+
+
+class Scanner(object):
+    """Finds the occurrences of instruction patterns in runs of words."""
+
+    def __init__(self, patterns: List[ScanPattern], decoder: Optional[Decoder] = None, chunk_words: int = SCAN_CHUNK):
+        """
+        Prepare a scanner.
+
+        Args:
+            patterns (List[ScanPattern]): The patterns, see ``compile_pattern``
+            decoder (Optional[Decoder], optional): Decoder confirming that the words of mnemonic elements decode
+                to one of their instructions. Defaults to None, trusting the fixed bits alone.
+            chunk_words (int, optional): Words compared at once. Defaults to 16M.
+        """
+        self.patterns = patterns
+        self.decoder = decoder
+        self.chunk_words = chunk_words
+
+    def _confirmed(self, pattern: ScanPattern, words: Tuple[int, ...]) -> bool:
+        if self.decoder is None:
+            return True
+        for element, word in zip(pattern.elements, words):
+            if element.names is not None:
+                leaf = self.decoder.decode(word)
+                if leaf is None or leaf.name not in element.names:
+                    return False
+        return True
+
+    def scan(self, words: Sequence[int]) -> Iterator[ScanMatch]:
+        """
+        Scan words for every pattern.
+
+        Chunks overlap by the length of the longest pattern, so sequences straddling two chunks are found.
+
+        Args:
+            words (Sequence[int]): The words, e.g. as returned by ``utils.binary.map_words``
+
+        Yields:
+            ScanMatch: The matches, by position and then in pattern order
+        """
+        longest = max((len(pattern.elements) for pattern in self.patterns), default=1)
+        for start in range(0, len(words), self.chunk_words):
+            chunk = words[start : start + self.chunk_words + longest - 1]
+            try:
+                found = []
+                for number, pattern in enumerate(self.patterns):
+                    length = len(pattern.elements)
+                    count = min(self.chunk_words, len(chunk) - length + 1)
+                    for index in _candidates(chunk, pattern, max(count, 0)):
+                        matched = tuple(chunk[index : index + length])
+                        if self._confirmed(pattern, matched):
+                            found.append((index, number, matched))
+                found.sort(key=lambda item: item[:2])
+                for index, number, matched in found:
+                    yield ScanMatch(self.patterns[number], start + index, matched)
+            finally:
+                if isinstance(chunk, memoryview):
+                    chunk.release()
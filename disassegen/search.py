@@ -0,0 +1,114 @@
+from typing import Iterator, List, Tuple
+
+from .decoder import FlatInstruction, parse_value
+
+
+def parse_pattern(pattern: str, bits: int = 32) -> Tuple[int, int]:
+    """
+    Parse a ternary instruction pattern.
+
+    The pattern is either hexadecimal, e.g. ``0xd503201f``, which fixes every bit, or binary, most significant
+    bit first, with an optional ``0b`` prefix. In a binary pattern ``0`` and ``1`` are fixed bits, any other
+    character such as ``x``, ``?`` or ``.`` is a bit that can take either value, and ``_`` and spaces are
+    ignored.
+
+    Args:
+        pattern (str): The pattern, e.g. ``0b1101_0101_0000_0011_xxxx_xxxx_xxx1_1111``
+        bits (int, optional): Width of the instruction word. Defaults to 32.
+
+    Raises:
+        ValueError: If the pattern is not as wide as the instruction word
+
+    Returns:
+        Tuple[int, int]: The mask of the fixed bits and their value
+    """
+    text = pattern.strip().replace("_", "")
+    if text.startswith("0x"):
+        mask, value, width = parse_value(text)
+    else:
+        digits = text[2:] if text.startswith("0b") else text
+        mask, value, width = parse_value("0b" + "".join(ch if ch in "01 " else "x" for ch in digits))
+    if width != bits:
+        raise ValueError(f"pattern {pattern!r} has {width} bits, expected {bits}")
+    return mask, value
+
+
+def format_pattern(mask: int, value: int, bits: int = 32) -> str:
+    """Format fixed bits as a ternary pattern, most significant bit first and ``x`` for the other bits."""
+    return "".join(
+        ("1" if value >> bit & 1 else "0") if mask >> bit & 1 else "x" for bit in range(bits - 1, -1, -1)
+    )
+
+
+def _members(bitset: int) -> Iterator[int]:
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset ^= low
+
+
+class PatternIndex(object):
+    """
+    Index of the flattened instructions of a spec by the value they fix every bit to.
+
+    For every bit position and value a bitset holds the instructions that do not fix the bit to the other
+    value. The instructions compatible with a pattern, that is those some word matching the pattern has the
+    fixed bits of, are the intersection of the bitsets of the fixed bits of the pattern, so a query takes at
+    most one AND per bit whatever the number of instructions. Conditions and decode order are not taken into
+    account, so an instruction is listed even when its condition or an earlier encoding rules it out.
+    """
+
+    def __init__(self, instructions: List[FlatInstruction], strict: bool = True, bits: int = 32):
+        """
+        Index flattened instructions.
+
+        Args:
+            instructions (List[FlatInstruction]): The instructions, see ``flat_snapshot``
+            strict (bool, optional): Whether should-be bits count as fixed bits. Defaults to True.
+            bits (int, optional): Width of the instruction word. Defaults to 32.
+        """
+        self.instructions = instructions
+        self.strict = strict
+        self.bits = bits
+        self.everyone = (1 << len(instructions)) - 1
+        ones = [0] * bits
+        zeros = [0] * bits
+        for index, instruction in enumerate(instructions):
+            mask, value = self.bits_of(instruction)
+            for bit in _members(mask):
+                if value >> bit & 1:
+                    ones[bit] |= 1 << index
+                else:
+                    zeros[bit] |= 1 << index
+        self.compatible = [(self.everyone & ~ones[bit], self.everyone & ~zeros[bit]) for bit in range(bits)]
+
+    def __len__(self) -> int:
+        return len(self.instructions)
+
+    def bits_of(self, instruction: FlatInstruction) -> Tuple[int, int]:
+        """Get the mask and value an instruction is indexed by."""
+        if self.strict:
+            return instruction.fixed_mask, instruction.fixed_value
+        return instruction.mask, instruction.value
+
+    def query(self, mask: int, value: int) -> List[FlatInstruction]:
+        """
+        Find the instructions compatible with fixed bits.
+
+        Args:
+            mask (int): The fixed bits of the pattern
+            value (int): Their value
+
+        Returns:
+            List[FlatInstruction]: The compatible instructions, in decode order
+        """
+        found = self.everyone
+        for bit in _members(mask):
+            found &= self.compatible[bit][value >> bit & 1]
+            if not found:
+                return []
+        return [self.instructions[index] for index in _members(found)]
+
+    def match(self, pattern: str) -> List[FlatInstruction]:
+        """Find the instructions compatible with a ternary pattern, see ``parse_pattern``."""
+        return self.query(*parse_pattern(pattern, self.bits))
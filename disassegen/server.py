@@ -0,0 +1,173 @@
+"""
+Warm decode service.
+
+The server loads the decode tree once and answers requests over a Unix socket or localhost TCP. Every message,
+in both directions, is a frame made of a 5 byte header followed by its payload:
+
+    u8   op (request) or status (response, 0 = ok, 1 = error)
+    u32  payload length, little-endian
+
+Requests:
+
+    DECODE   payload is a batch of little-endian uint32 words, the response holds one instruction name per word
+             ("" when unallocated) separated by newlines
+    DISASM   payload is a little-endian u64 base address followed by the words, the response holds one
+             objdump-style line per word separated by newlines
+    LOOKUP   payload is a UTF-8 instruction name, the response is its JSON description ("null" when unknown)
+
+Error responses carry a UTF-8 message. Frames on a connection are answered in order. Requests are decoded on a
+worker thread, one at a time, so a large batch does not keep the event loop from serving other clients.
+"""
+
+import asyncio
+import json
+import os
+import stat
+import struct
+import sys
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from .decoder import DecodeNode, Decoder
+from .snapshot import CACHE_DIR
+
+OP_DECODE = 1
+OP_DISASM = 2
+OP_LOOKUP = 3
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+HEADER = struct.Struct("<BI")
+BASE = struct.Struct("<Q")
+MAX_PAYLOAD = 64 << 20
+
+# A per-user directory, so that other users cannot plant or take over the socket
+DEFAULT_SOCKET = str(Path(os.environ.get("XDG_RUNTIME_DIR") or CACHE_DIR) / "disassegen.sock")
+
+
+def unpack_words(payload: bytes) -> array:
+    """Unpack a batch of little-endian uint32 words."""
+    if len(payload) % 4:
+        raise ValueError(f"word batch of {len(payload)} bytes is not a multiple of 4")
+    words = array("I", payload)
+    if sys.byteorder != "little":
+        words.byteswap()
+    return words
+
+
+def pack_words(words) -> bytes:
+    """Pack a batch of words as little-endian uint32."""
+    return struct.pack(f"<{len(words)}I", *words)
+
+
+class DecodeServer(object):
+    """Serves decode requests from a warm Decoder."""
+
+    def __init__(self, decoder: Decoder):
+        self.decoder = decoder
+        # The decoder and its cache are not thread-safe, so requests are decoded one at a time
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.index: Dict[str, DecodeNode] = {
+            node.name: node for root in decoder.tree for node in root.walk() if node.leaf
+        }
+
+    def handle_request(self, op: int, payload: bytes) -> bytes:
+        """
+        Answer a single request.
+
+        Args:
+            op (int): The request op
+            payload (bytes): The request payload
+
+        Returns:
+            bytes: The response payload
+        """
+        if op == OP_DECODE:
+            decode = self.decoder.decode
+            names = []
+            for word in unpack_words(payload):
+                leaf = decode(word)
+                names.append(leaf.name if leaf is not None else "")
+            return "\n".join(names).encode()
+
+        if op == OP_DISASM:
+            (base,) = BASE.unpack_from(payload)
+            return "\n".join(self.decoder.disassemble_words(unpack_words(payload[BASE.size :]), base)).encode()
+
+        if op == OP_LOOKUP:
+            node = self.index.get(payload.decode())
+            if node is None:
+                return b"null"
+            return json.dumps(
+                {
+                    "name": node.name,
+                    "mask": node.mask,
+                    "value": node.value,
+                    "fields": node.fields,
+                    "template": node.template,
+                    "operation_id": node.operation_id,
+                }
+            ).encode()
+
+        raise ValueError(f"unknown op {op}")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer frames from a client until it disconnects."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    op, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+                except asyncio.IncompleteReadError:
+                    break
+                if length > MAX_PAYLOAD:
+                    writer.write(self._frame(STATUS_ERROR, f"payload of {length} bytes is too large".encode()))
+                    break
+                payload = await reader.readexactly(length)
+                try:
+                    response = await loop.run_in_executor(self.executor, self.handle_request, op, payload)
+                    writer.write(self._frame(STATUS_OK, response))
+                except Exception as e:
+                    writer.write(self._frame(STATUS_ERROR, str(e).encode()))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _frame(status: int, payload: bytes) -> bytes:
+        return HEADER.pack(status, len(payload)) + payload
+
+    async def serve(self, path: Optional[Union[str, Path]] = None, host: str = "127.0.0.1", port: Optional[int] = None):
+        """
+        Serve requests until cancelled.
+
+        Args:
+            path (Optional[Union[str, Path]], optional): Unix socket to listen on. Defaults to DEFAULT_SOCKET.
+            host (str, optional): Address to listen on when serving TCP. Defaults to "127.0.0.1".
+            port (Optional[int], optional): TCP port to listen on instead of a Unix socket. Defaults to None.
+
+        Raises:
+            FileExistsError: If the socket path exists and is not a socket
+        """
+        if port is not None:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        else:
+            path = str(path or DEFAULT_SOCKET)
+            try:
+                mode = os.lstat(path).st_mode
+            except FileNotFoundError:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+            else:
+                # Only a stale socket of an earlier server is replaced, never a file the path happens to name
+                if not stat.S_ISSOCK(mode):
+                    raise FileExistsError(f"{path} exists and is not a socket")
+                os.unlink(path)
+            server = await asyncio.start_unix_server(self.handle_connection, path)
+
+        async with server:
+            await server.serve_forever()
@@ -0,0 +1,103 @@
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+from .decoder import STRICT, Decoder
+from .snapshot import load_snapshot
+from .strategy import SPEC, build_decoder
+from .utils.binary import map_words
+
+# Decoder of the current worker process, loaded once from the shared snapshot. The mapped snapshot pages are
+# shared through the page cache, but the tree unpickled from them is private to the worker: the decoders are
+# built from Python objects, which cannot live in shared memory, and the binary decode table only keeps the
+# condition cubes, not the condition trees the strategies compile.
+_decoder: Optional[Decoder] = None
+
+
+def _init_worker(
+    snapshot: str, should_be: str, cache_size: int, strategy: str, weights: Optional[Dict[str, float]]
+) -> None:
+    global _decoder
+    _decoder = build_decoder(load_snapshot(snapshot), strategy, should_be, cache_size, weights)
+
+
+def _disassemble_shard(input_file: str, offset: int, length: int, base: int) -> Tuple[List[str], Dict[str, int]]:
+    before = dict(_decoder.counters)
+    with map_words(input_file, offset, length) as words:
+        lines = _decoder.disassemble_words(words, base)
+    # The worker decoder counts across all its shards, so only what this shard added is sent back
+    return lines, {name: count - before[name] for name, count in _decoder.counters.items()}
+
+
+def plan_shards(
+    size: int, offset: int = 0, length: Optional[int] = None, base: int = 0, shard_words: int = 1 << 18
+) -> List[Tuple[int, int, int]]:
+    """
+    Split a code region into fixed-size shards.
+
+    Args:
+        size (int): Size of the file holding the region
+        offset (int, optional): File offset of the region. Defaults to 0.
+        length (Optional[int], optional): Size of the region in bytes. Defaults to the rest of the file.
+        base (int, optional): Address of the first word of the region. Defaults to 0.
+        shard_words (int, optional): Number of words per shard. Defaults to 262144.
+
+    Returns:
+        List[Tuple[int, int, int]]: The (offset, length, base) of every shard in address order
+    """
+    end = size if length is None else min(size, offset + length)
+    end -= (end - offset) % 4
+    step = shard_words * 4
+    return [(start, min(step, end - start), base + start - offset) for start in range(offset, end, step)]
+
+
+def sharded_disassemble(
+    input_file: Union[str, Path],
+    snapshot: Union[str, Path],
+    offset: int = 0,
+    length: Optional[int] = None,
+    base: int = 0,
+    shard_words: int = 1 << 18,
+    jobs: Optional[int] = None,
+    should_be: str = STRICT,
+    cache_size: int = 0,
+    strategy: str = SPEC,
+    weights: Optional[Dict[str, float]] = None,
+) -> Iterator[Tuple[List[str], Dict[str, int]]]:
+    """
+    Disassemble a code region across a pool of worker processes.
+
+    Each worker maps the input file itself and loads the decode tree from the snapshot file, so only shard
+    bounds, rendered lines and decoder counters cross process boundaries. Results are yielded in address order
+    regardless of which worker finishes first, and at most a few shards per worker are kept in flight.
+
+    Args:
+        input_file (Union[str, Path]): Path to the raw binary
+        snapshot (Union[str, Path]): Decode tree snapshot, see ``decoder_snapshot``
+        offset (int, optional): File offset of the region. Defaults to 0.
+        length (Optional[int], optional): Size of the region in bytes. Defaults to the rest of the file.
+        base (int, optional): Address of the first word of the region. Defaults to 0.
+        shard_words (int, optional): Number of words per shard. Defaults to 262144.
+        jobs (Optional[int], optional): Number of worker processes. Defaults to the CPU count.
+        should_be (str, optional): How the decoder treats should-be bits. Defaults to "strict".
+        cache_size (int, optional): Size of the decode cache of every worker, 0 to disable it. Defaults to 0.
+        strategy (str, optional): Decode-tree strategy of the workers, see ``build_decoder``. Defaults to "spec".
+        weights (Optional[Dict[str, float]], optional): Instruction frequencies of the "profile" strategy.
+            Defaults to None.
+
+    Yields:
+        Tuple[List[str], Dict[str, int]]: The objdump-style lines of each shard and what decoding it added to the
+            decoder counters, see ``Decoder.counters``
+    """
+    jobs = jobs or os.cpu_count() or 1
+    shards = deque(plan_shards(os.path.getsize(input_file), offset, length, base, shard_words))
+    pending: Deque[Future] = deque()
+
+    initargs = (str(snapshot), should_be, cache_size, strategy, weights)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs) as pool:
+        while shards or pending:
+            while shards and len(pending) < jobs * 2:
+                pending.append(pool.submit(_disassemble_shard, str(input_file), *shards.popleft()))
+            yield pending.popleft().result()
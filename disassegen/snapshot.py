@@ -0,0 +1,79 @@
+import hashlib
+import mmap
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any, Union
+
+from .utils.archive import archive_checksum, is_archive
+
+SNAPSHOT_MAGIC = b"DSGSNAP"
+SNAPSHOT_VERSION = 4
+
+CACHE_DIR = Path(os.environ.get("DISASSEGEN_CACHE", Path.home() / ".cache" / "disassegen"))
+
+
+def snapshot_path(source: Union[str, Path], kind: str) -> Path:
+    """
+    Get the cache path of a snapshot derived from a spec file.
+
+    The key covers the resolved path, size and modification time of the source, so editing or replacing the
+    spec invalidates its snapshots. Snapshots of a spec tarball are keyed by the checksum of the archive
+    instead, so every copy of the same release shares them.
+
+    Args:
+        source (Union[str, Path]): The spec file the snapshot is derived from
+        kind (str): What the snapshot holds, e.g. "decoder-A64"
+
+    Returns:
+        Path: Location of the snapshot file
+    """
+    if is_archive(source):
+        key = f"{archive_checksum(source)}:{kind}:{SNAPSHOT_VERSION}"
+    else:
+        path = Path(source).resolve()
+        stat = path.stat()
+        key = f"{path}:{stat.st_size}:{stat.st_mtime_ns}:{kind}:{SNAPSHOT_VERSION}"
+    return CACHE_DIR / f"{kind}-{hashlib.sha1(key.encode()).hexdigest()}.snap"
+
+
+def save_snapshot(obj: Any, path: Union[str, Path]) -> None:
+    """
+    Atomically write a snapshot file.
+
+    Args:
+        obj (Any): The picklable object to store
+        path (Union[str, Path]): Where to write the snapshot
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(SNAPSHOT_MAGIC + bytes([SNAPSHOT_VERSION]))
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_snapshot(path: Union[str, Path]) -> Any:
+    """
+    Load a snapshot file.
+
+    The file is memory-mapped so concurrent readers share the same page cache pages.
+
+    Args:
+        path (Union[str, Path]): The snapshot to read
+
+    Returns:
+        Any: The stored object
+    """
+    header = len(SNAPSHOT_MAGIC) + 1
+    with Path(path).open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if mm[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC or mm[len(SNAPSHOT_MAGIC)] != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} snapshot")
+        with memoryview(mm)[header:] as payload:
+            return pickle.loads(payload)
@@ -3,43 +3,24 @@ from typing import List, Optional, Union, Dict, Any
 import json
 from pathlib import Path
 
+from .features import FeatureProfile
+from .mrs import node
+from .mrs.node import Node, NodeList, unwrap, wrap
+from .utils.archive import is_archive, read_member
 
-@dataclass
-class Range:
-    _type: str = "Range"
-    start: int = 0
-    width: int = 0
-
-
-@dataclass
-class ValuesValue:
-    _type: str = "Values.Value"
-    value: str = ""
-    meaning: Optional[str] = None
 
-
-@dataclass
-class EncodingField:
-    _type: str = "Instruction.Encodeset.Field"
-    range: Range = field(default_factory=Range)
-    name: str = ""
-    value: ValuesValue = field(default_factory=ValuesValue)
-    should_be_mask: ValuesValue = field(default_factory=ValuesValue)
-
-
-@dataclass
-class EncodingBits:
-    _type: str = "Instruction.Encodeset.Bits"
-    range: Range = field(default_factory=Range)
-    value: ValuesValue = field(default_factory=ValuesValue)
-    should_be_mask: ValuesValue = field(default_factory=ValuesValue)
+# Encodeset Schemas
+Range = node.Range
+ValuesValue = node.Value
+EncodingField = node.EncodesetField
+EncodingBits = node.EncodesetBits
 
 
 @dataclass
 class Encodeset:
     _type: str = "Instruction.Encodeset.Encodeset"
     width: int = 32
-    values: List[Union[EncodingField, EncodingBits]] = field(default_factory=list)
+    values: Union[NodeList, List[Union[EncodingField, EncodingBits]]] = field(default_factory=list)
 
     def __str__(self, indent: int = 0) -> str:
         """
@@ -61,33 +42,24 @@ class Encodeset:
             output.append(f"Encoding Width: {self.width} bits")
 
         for value in self.values:
-            if value["_type"] == "Instruction.Encodeset.Field":
-                line = f"{indent_str}- \033[1m\033[94m{value['name']}\033[0m"
-                if value["range"]["start"] != 0 or value["range"]["width"] != 32:
-                    line += f" range={value['range']['start']+value['range']['width']-1}:{value['range']['start']}"
-                if value["value"]["value"]:
-                    line += f" value={value['value']['value']}"
-                    if value["value"]["meaning"]:
-                        line += f" (meaning={value['value']['meaning']})"
-                if value["should_be_mask"]["value"] and "1" in value["should_be_mask"]["value"]:
-                    line += f" should_be_mask={value['should_be_mask']['value']}"
-                    if value["should_be_mask"]["meaning"]:
-                        line += f" (meaning={value['should_be_mask']['meaning']})"
-                output.append(line)
-
-            elif value["_type"] == "Instruction.Encodeset.Bits":
+            if isinstance(value, EncodingField):
+                line = f"{indent_str}- \033[1m\033[94m{value.name}\033[0m"
+            elif isinstance(value, EncodingBits):
                 line = f"{indent_str}- \033[1;32mBITS:\033[0m"
-                if value["range"]["start"] != 0 or value["range"]["width"] != 32:
-                    line += f" range={value['range']['start']+value['range']['width']-1}:{value['range']['start']}"
-                if value["value"]["value"]:
-                    line += f" value={value['value']['value']}"
-                    if value["value"]["meaning"]:
-                        line += f" (meaning={value['value']['meaning']})"
-                if value["should_be_mask"]["value"] and "1" in value["should_be_mask"]["value"]:
-                    line += f" should_be_mask={value['should_be_mask']['value']}"
-                    if value["should_be_mask"]["meaning"]:
-                        line += f"(meaning={value['should_be_mask']['meaning']})"
-                output.append(line)
+            else:
+                continue
+
+            if value.range.start != 0 or value.range.width != 32:
+                line += f" range={value.range.start+value.range.width-1}:{value.range.start}"
+            if value.value.value:
+                line += f" value={value.value.value}"
+                if value.value.meaning:
+                    line += f" (meaning={value.value.meaning})"
+            if value.should_be_mask.value and "1" in value.should_be_mask.value:
+                line += f" should_be_mask={value.should_be_mask.value}"
+                if value.should_be_mask.meaning:
+                    line += f" (meaning={value.should_be_mask.meaning})"
+            output.append(line)
 
         return "\n".join(output)
 
@@ -102,76 +74,32 @@ class Encodeset:
 
 
 # AST Schemas
-@dataclass
-class ASTIdentifier:
-    _type: str = "AST.Identifier"
-    value: str = ""
-
-
-@dataclass
-class ASTDotAtom:
-    _type: str = "AST.DotAtom"
-    values: List[Union[ASTIdentifier, Dict[str, Any]]] = field(default_factory=list)
-
-
-@dataclass
-class ASTBinaryOp:
-    _type: str = "AST.BinaryOp"
-    left: Union[ASTIdentifier, ASTDotAtom, Dict[str, Any]] = field(default_factory=dict)
-    op: str = ""
-    right: Union[ASTIdentifier, Dict[str, Any]] = field(default_factory=dict)
-
-
-@dataclass
-class ASTAssignment:
-    _type: str = "AST.Assignment"
-    var: Union[ASTIdentifier, ASTDotAtom, Dict[str, Any]] = field(default_factory=dict)
-    val: Union[ASTIdentifier, ASTDotAtom, Dict[str, Any]] = field(default_factory=dict)
-
-
-@dataclass
-class ASTFunction:
-    _type: str = "AST.Function"
-    name: str = ""
-    arguments: List[Dict[str, Any]] = field(default_factory=list)
-
-
-@dataclass
-class ASTBool:
-    _type: str = "AST.Bool"
-    value: bool = True
-
-
-@dataclass
-class ASTInteger:
-    _type: str = "AST.Integer"
-    value: int = 0
-
-
-@dataclass
-class ASTSet:
-    _type: str = "AST.Set"
-    values: List[Union[ASTIdentifier, ASTInteger, Dict[str, Any]]] = field(default_factory=list)
-
-
-@dataclass
-class ASTStatementBlock:
-    _type: str = "AST.StatementBlock"
-    statements: List[Dict[str, Any]] = field(default_factory=list)
-
-
-@dataclass
-class ASTUnaryOp:
-    _type: str = "AST.UnaryOp"
-    op: str = ""
-    expr: Union[ASTBool, ASTInteger, ASTBinaryOp, ASTIdentifier, Dict[str, Any]] = field(default_factory=dict)
+ASTIdentifier = node.Identifier
+ASTDotAtom = node.DotAtom
+ASTBinaryOp = node.BinaryOp
+ASTAssignment = node.Assignment
+ASTFunction = node.Function
+ASTBool = node.Bool
+ASTInteger = node.Integer
+ASTSet = node.Set
+ASTStatementBlock = node.StatementBlock
+ASTUnaryOp = node.UnaryOp
+
+
+# Assembly Schemas
+AssemblySymbol = node.AssemblyLiteral
+AssemblyRuleReference = node.AssemblyRuleReference
+Assembly = node.Assembly
+AssemblyRuleChoice = node.AssemblyRuleChoice
+AssemblyRuleRule = node.AssemblyRuleRule
+AssemblyRuleToken = node.AssemblyRuleToken
 
 
 # Traits Schemas
 @dataclass
 class HasCondition:
     _type: str = "Traits.HasCondition"
-    condition: Optional[Union[ASTFunction, ASTBool, ASTBinaryOp, ASTUnaryOp, Dict[str, Any]]] = None
+    condition: Optional[Node] = None
 
 
 @dataclass
@@ -179,12 +107,12 @@ class Instruction:
     _type: str = "Instruction.Instruction"
     name: str = ""
     encoding: Encodeset = field(default_factory=Encodeset)
-    condition: Optional[Union[ASTFunction, ASTBool, ASTBinaryOp, ASTUnaryOp, Dict[str, Any]]] = None
+    condition: Optional[Node] = None
     operation_id: Optional[str] = None
-    assembly: Optional[Dict[str, Any]] = None
-    assemble: Optional[Dict[str, Any]] = None
-    disassemble: Optional[Dict[str, Any]] = None
-    assertions: Optional[Dict[str, Any]] = None
+    assembly: Optional[Assembly] = None
+    assemble: Optional[Node] = None
+    disassemble: Optional[Node] = None
+    assertions: Optional[Node] = None
 
 
 @dataclass
@@ -193,7 +121,7 @@ class InstructionGroup:
     name: str = ""
     title: Optional[str] = None
     encoding: Encodeset = field(default_factory=Encodeset)
-    condition: Optional[Union[ASTFunction, ASTBool, ASTBinaryOp, ASTUnaryOp, Dict[str, Any]]] = None
+    condition: Optional[Node] = None
     children: List[Union["InstructionGroup", Instruction]] = field(default_factory=list)
     operation_id: Optional[str] = None
 
@@ -204,55 +132,11 @@ class InstructionSet:
     name: str = ""
     read_width: int = 32
     encoding: Encodeset = field(default_factory=Encodeset)
-    condition: Optional[Union[ASTFunction, ASTBool, ASTBinaryOp, ASTUnaryOp, Dict[str, Any]]] = None
+    condition: Optional[Node] = None
     operation_id: Optional[str] = None
     children: List[Union[InstructionGroup, Instruction]] = field(default_factory=list)
 
 
-@dataclass
-class AssemblySymbol:
-    _type: str = "Instruction.Symbols.Literal"
-    value: str = ""
-
-
-@dataclass
-class AssemblyRuleReference:
-    _type: str = "Instruction.Symbols.RuleReference"
-    rule_id: str = ""
-
-
-@dataclass
-class Assembly:
-    _type: str = "Instruction.Assembly"
-    symbols: List[Union[AssemblySymbol, AssemblyRuleReference]] = field(default_factory=list)
-
-
-@dataclass
-class AssemblyRuleChoice:
-    _type: str = "Instruction.Rules.Choice"
-    choices: List[Union[Assembly, None]] = field(default_factory=list)
-    display: Optional[str] = None
-    description: Optional[Dict[str, Any]] = None
-
-
-@dataclass
-class AssemblyRuleRule:
-    _type: str = "Instruction.Rules.Rule"
-    assemble: Optional[ASTStatementBlock] = None
-    disassemble: Optional[ASTStatementBlock] = None
-    symbols: Optional[Union[Assembly, None]] = None
-    display: Optional[str] = None
-    description: Optional[Dict[str, Any]] = None
-    condition: Optional[Union[ASTFunction, ASTBool, ASTBinaryOp, ASTUnaryOp, Dict[str, Any]]] = None
-
-
-@dataclass
-class AssemblyRuleToken:
-    _type: str = "Instruction.Rules.Token"
-    pattern: str = ""
-    default: Optional[str] = None
-
-
 @dataclass
 class Operation:
     _type: str = "Instruction.Operation"
@@ -300,7 +184,9 @@ class MetaSchema:
 class Instructions:
     _type: str = "Instruction.Instructions"
     meta: MetaSchema = field(default_factory=MetaSchema)
-    assembly_rules: Union[str, AssemblyRuleChoice, AssemblyRuleRule, AssemblyRuleToken] = field(default_factory=dict)
+    assembly_rules: Dict[str, Union[AssemblyRuleChoice, AssemblyRuleRule, AssemblyRuleToken, Node]] = field(
+        default_factory=dict
+    )
     instructions: List[InstructionSet] = field(default_factory=list)
     operations: Dict[str, Union[Operation, OperationAlias]] = field(default_factory=dict)
 
@@ -310,9 +196,11 @@ class InstructionAlias:
     _type: str = "Instruction.InstructionAlias"
     name: str = ""
     operation_id: str = ""
-    assembly: Optional[Assembly] = field(default_factory=Assembly)
-    preferred: Optional[Union[ASTFunction, ASTBool]] = field(default_factory=lambda: ASTBool(value=False))
-    condition: Optional[Union[ASTFunction, ASTBool, ASTBinaryOp, ASTUnaryOp, Dict[str, Any]]] = None
+    assembly: Optional[Assembly] = field(default_factory=lambda: Assembly({"_type": Assembly.TYPE, "symbols": []}))
+    preferred: Optional[Union[ASTFunction, ASTBool]] = field(
+        default_factory=lambda: ASTBool({"_type": ASTBool.TYPE, "value": False})
+    )
+    condition: Optional[Node] = None
 
 
 @dataclass
@@ -320,7 +208,7 @@ class InstructionInstance:
     _type: str = "Instruction.InstructionInstance"
     name: str = ""
     properties: Optional[Dict[str, Any]] = field(default_factory=dict)
-    condition: Optional[Union[ASTFunction, ASTBool, ASTBinaryOp, ASTUnaryOp, Dict[str, Any]]] = None
+    condition: Optional[Node] = None
     children: Optional[List["InstructionInstance"]] = field(default_factory=list)
 
 
@@ -330,16 +218,37 @@ class MRSSpec(object):
         self.file_path = file_path
         self.instructions = self.load_instruction_schema_from_json(file_path)
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], file_path: Union[str, Path] = "") -> "MRSSpec":
+        """
+        Build a spec from already decoded Instructions.json data.
+
+        Args:
+            data (Dict[str, Any]): The decoded JSON document
+            file_path (Union[str, Path], optional): Where the data was read from, used in messages. Defaults to "".
+
+        Returns:
+            MRSSpec: The loaded spec
+        """
+        spec = cls.__new__(cls)
+        spec.file_path = file_path
+        spec.instructions = spec.parse_instructions(data)
+        return spec
+
     def load_instruction_schema_from_json(self, file_path: Union[str, Path]) -> Instructions:
         """
         Load an Instructions object from a JSON file.
 
         Args:
-            file_path (Union[str, Path]): Path to the JSON file to load
+            file_path (Union[str, Path]): Path to the JSON file to load, or to an ``AARCHMRS_BSD_*.tar.gz``
+                whose Instructions.json is read without extracting the archive
 
         Returns:
             Instructions: Parsed Instructions object
         """
+        if is_archive(file_path):
+            return self.parse_instructions(json.loads(read_member(file_path, "Instructions.json")))
+
         # Convert to Path object if it's a string
         path = Path(file_path)
 
@@ -364,18 +273,7 @@ class MRSSpec(object):
         meta = MetaSchema(**data.get("_meta", {}))
 
         # Parse assembly rules
-        assembly_rules = {
-            k: (
-                AssemblyRuleToken(**v)
-                if v.get("_type") == "Instruction.Rules.Token"
-                else (
-                    AssemblyRuleChoice(**v)
-                    if v.get("_type") == "Instruction.Rules.Choice"
-                    else AssemblyRuleRule(**v) if v.get("_type") == "Instruction.Rules.Rule" else v
-                )
-            )
-            for k, v in data.get("assembly_rules", {}).items()
-        }
+        assembly_rules = {k: wrap(v) for k, v in data.get("assembly_rules", {}).items()}
 
         # Parse instructions
         instructions = [self.parse_instruction_set(inst_data) for inst_data in data.get("instructions", [])]
@@ -392,6 +290,18 @@ class MRSSpec(object):
 
         return Instructions(meta=meta, assembly_rules=assembly_rules, instructions=instructions, operations=operations)
 
+    def parse_encodeset(self, data: Dict[str, Any]) -> Encodeset:
+        """
+        Parse a dictionary into an Encodeset object.
+
+        Args:
+            data (Dict[str, Any]): Dictionary representation of Encodeset
+
+        Returns:
+            Encodeset: Parsed Encodeset object whose values are wrapped lazily
+        """
+        return Encodeset(width=data.get("width", 32), values=NodeList(data.get("values", [])))
+
     def parse_instruction_set(self, data: Dict[str, Any]) -> InstructionSet:
         """
         Parse a dictionary into an InstructionSet object.
@@ -403,7 +313,7 @@ class MRSSpec(object):
             InstructionSet: Parsed InstructionSet object
         """
         # Parse encoding
-        encoding = Encodeset(**data.get("encoding", {}))
+        encoding = self.parse_encodeset(data.get("encoding", {}))
 
         # Parse children
         children = []
@@ -414,17 +324,7 @@ class MRSSpec(object):
                 children.append(self.parse_instruction(child_data))
 
         # Parse condition
-        condition = None
-        if "condition" in data:
-            condition_data = data["condition"]
-            if condition_data.get("_type") == "AST.Function":
-                condition = ASTFunction(**condition_data)
-            elif condition_data.get("_type") == "AST.Bool":
-                condition = ASTBool(**condition_data)
-            elif condition_data.get("_type") == "AST.BinaryOp":
-                condition = ASTBinaryOp(**condition_data)
-            elif condition_data.get("_type") == "AST.UnaryOp":
-                condition = ASTUnaryOp(**condition_data)
+        condition = wrap(data.get("condition"))
 
         return InstructionSet(
             name=data.get("name", ""),
@@ -446,7 +346,7 @@ class MRSSpec(object):
             InstructionGroup: Parsed InstructionGroup object
         """
         # Parse encoding
-        encoding = Encodeset(**data.get("encoding", {}))
+        encoding = self.parse_encodeset(data.get("encoding", {}))
 
         # Parse children
         children = []
@@ -457,15 +357,7 @@ class MRSSpec(object):
                 children.append(self.parse_instruction(child_data))
 
         # Parse condition
-        condition = None
-        if "condition" in data:
-            condition_data = data["condition"]
-            if condition_data.get("_type") == "AST.Function":
-                condition = ASTFunction(**condition_data)
-            elif condition_data.get("_type") == "AST.Bool":
-                condition = ASTBool(**condition_data)
-            elif condition_data.get("_type") == "AST.BinaryOp":
-                condition = ASTBinaryOp(**condition_data)
+        condition = wrap(data.get("condition"))
 
         return InstructionGroup(
             name=data.get("name", ""),
@@ -487,33 +379,20 @@ class MRSSpec(object):
             Instruction: Parsed Instruction object
         """
         # Parse encoding
-        encoding = Encodeset(**data.get("encoding", {}))
+        encoding = self.parse_encodeset(data.get("encoding", {}))
 
         # Parse condition
-        condition = None
-        if "condition" in data:
-            condition_data = data["condition"]
-            if condition_data.get("_type") == "AST.Function":
-                condition = ASTFunction(**condition_data)
-            elif condition_data.get("_type") == "AST.Bool":
-                condition = ASTBool(**condition_data)
-            elif condition_data.get("_type") == "AST.BinaryOp":
-                condition = ASTBinaryOp(**condition_data)
-            elif condition_data.get("_type") == "AST.UnaryOp":
-                condition = ASTUnaryOp(**condition_data)
-            else:
-                condition = condition_data
-                print("🙀🙀🙀🙀🙀🙀🙀🙀🙀🙀🙀🙀")
+        condition = wrap(data.get("condition"))
 
         return Instruction(
             name=data.get("name", ""),
             encoding=encoding,
             operation_id=data.get("operation_id"),
-            assembly=data.get("assembly"),
+            assembly=wrap(data.get("assembly")),
             condition=condition,
-            assemble=data.get("assemble"),
-            disassemble=data.get("disassemble"),
-            assertions=data.get("assertions"),
+            assemble=wrap(data.get("assemble")),
+            disassemble=wrap(data.get("disassemble")),
+            assertions=wrap(data.get("assertions")),
         )
 
     def save_instructions_to_json(self, instructions: Instructions, file_path: Union[str, Path]) -> None:
@@ -529,17 +408,30 @@ class MRSSpec(object):
 
         # Write to file
         with Path(file_path).open("w") as f:
-            json.dump(data, f, indent=2)
+            json.dump(data, f, indent=2, default=unwrap)
+
+    def save_decode_table(
+        self, file_path: Union[str, Path], instruction_set: str = "A64", profile: Optional[FeatureProfile] = None
+    ) -> None:
+        """
+        Flatten the decode tree of an instruction set into a binary decode-table file.
 
-    def format_condition(
-        self, condition: Optional[Union[ASTFunction, ASTBool, ASTBinaryOp, ASTUnaryOp, Dict[str, Any]]]
-    ) -> str:
+        Args:
+            file_path (Union[str, Path]): Path to save the table, see ``table`` for its format
+            instruction_set (str, optional): Name of the InstructionSet to flatten. Defaults to "A64".
+            profile (Optional[FeatureProfile], optional): The target feature profile. Defaults to None.
+        """
+        from .decoder import build_decode_tree
+        from .table import write_table
+
+        write_table(build_decode_tree(self, instruction_set, profile), file_path)
+
+    def format_condition(self, condition: Optional[Union[Node, Dict[str, Any]]]) -> str:
         """
         Create a human-readable representation of an Instruction's condition.
 
         Args:
-            condition (Optional[Union[ASTFunction, ASTBool, ASTBinaryOp, ASTUnaryOp, Dict[str, Any]]]):
-                The condition to format
+            condition (Optional[Union[Node, Dict[str, Any]]]): The condition to format
 
         Returns:
             str: A formatted, human-readable string representation of the condition
@@ -550,44 +442,26 @@ class MRSSpec(object):
 
         # Normalize condition if it's a dictionary
         if isinstance(condition, dict):
-            type_map = {
-                "AST.Identifier": ASTIdentifier,
-                "AST.DotAtom": ASTDotAtom,
-                "AST.Function": ASTFunction,
-                "AST.Bool": ASTBool,
-                "AST.BinaryOp": ASTBinaryOp,
-                "AST.UnaryOp": ASTUnaryOp,
-                "AST.Set": ASTSet,
-                "Values.Value": ValuesValue,
-            }
-            condition_type = condition.get("_type")
-            if condition_type in type_map:
-                condition = type_map[condition_type](**condition)
+            condition = wrap(condition)
 
         # Handle different condition types
-        if isinstance(condition, ASTBool):
-            return f"{condition.value}"
-
-        elif isinstance(condition, ValuesValue):
-            return f"{condition.value}"
-
-        elif isinstance(condition, ASTIdentifier):
+        if isinstance(condition, (ASTBool, ValuesValue, ASTIdentifier)):
             return f"{condition.value}"
 
         elif isinstance(condition, ASTDotAtom):
-            return f"{condition.value}"
+            return ".".join(self.format_condition(value) for value in condition.values)
 
         elif isinstance(condition, ASTSet):
             if len(condition.values) == 1:
-                return f"{condition.values[0]['value']}"
+                return f"{condition.values[0].value}"
             else:
-                values_str = ", ".join([str(value["value"]) for value in condition.values])
+                values_str = ", ".join([str(value.value) for value in condition.values])
                 return f"[{values_str}]"
 
         elif isinstance(condition, ASTFunction):
             # Format function arguments as strings
             args_str = ", ".join(
-                [str(arg.get("value", arg)) if isinstance(arg, dict) else str(arg) for arg in condition.arguments]
+                [str(arg.get("value", arg)) if isinstance(arg, Node) else str(arg) for arg in condition.arguments]
             )
             return f"{condition.name}({args_str})"
 
@@ -613,6 +487,34 @@ class MRSSpec(object):
         # Fallback for unexpected types
         return f"{str(condition)}"
 
+    def format_assembly(self, assembly: Optional[Assembly]) -> str:
+        """
+        Create the assembly template of an Instruction from its symbols.
+
+        Args:
+            assembly (Optional[Assembly]): The Instruction.Assembly of an Instruction
+
+        Returns:
+            str: The assembly template with rule references replaced by their default or display text
+        """
+        if not assembly:
+            return ""
+
+        asm = ""
+        for symbol in assembly.symbols:
+            if isinstance(symbol, AssemblySymbol):
+                asm += symbol.value
+            elif isinstance(symbol, AssemblyRuleReference):
+                rule = self.instructions.assembly_rules.get(symbol.rule_id)
+                if rule:
+                    if getattr(rule, "default", None) is not None:
+                        asm += rule.default
+                    elif getattr(rule, "display", None) is not None:
+                        asm += rule.display
+                    else:
+                        asm += f"({symbol.rule_id})"
+        return asm
+
     def __str__(self) -> str:
         """
         Provide a human-readable string representation of the ArmSpec.
@@ -642,21 +544,7 @@ class MRSSpec(object):
                 if hasattr(item, "name"):
                     asm = ""
                     if hasattr(item, "assembly"):
-                        asm = ""
-                        for symbol in item.assembly["symbols"]:
-                            if symbol["_type"] == "Instruction.Symbols.Literal":
-                                asm += symbol["value"]
-                            elif symbol["_type"] == "Instruction.Symbols.RuleReference":
-                                if self.instructions.assembly_rules.get(symbol["rule_id"]):
-                                    if hasattr(self.instructions.assembly_rules[symbol["rule_id"]], "default"):
-                                        asm += self.instructions.assembly_rules[symbol["rule_id"]].default
-                                    elif (
-                                        hasattr(self.instructions.assembly_rules[symbol["rule_id"]], "display")
-                                        and self.instructions.assembly_rules[symbol["rule_id"]].display is not None
-                                    ):
-                                        asm += self.instructions.assembly_rules[symbol["rule_id"]].display
-                                    else:
-                                        asm += f"({symbol['rule_id']})"
+                        asm = self.format_assembly(item.assembly)
                     output.append(f"{indent_str}- \033[1;35m{item.name}\033[0m \033[1;36m{asm}\033[0m")
                     condition_str = self.format_condition(item.condition)
                     if len(condition_str) > 0 and condition_str != "True":
@@ -0,0 +1,551 @@
+"""
+Decode-tree construction strategies.
+
+``spec`` walks ARM's own hierarchy of instruction groups, as ``Decoder`` does. ``entropy`` rebuilds the tree
+from the flattened instructions, greedily switching on the bits that carry the most information about which
+instruction a word is, every instruction weighing the same. ``profile`` does the same with every instruction
+weighted by how often it occurs in a sample corpus, so that frequent instructions are told apart first.
+
+``ReferenceDecoder`` scans the instructions one by one, interpreting their raw conditions, and is the oracle
+every strategy is checked against, see ``compare_decoders``.
+"""
+
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .decoder import (
+    STRICT,
+    UNKNOWN,
+    Check,
+    DecodeNode,
+    Decoder,
+    FlatInstruction,
+    compile_condition,
+    flatten_tree,
+)
+
+SPEC = "spec"
+ENTROPY = "entropy"
+PROFILE = "profile"
+STRATEGIES = (SPEC, ENTROPY, PROFILE)
+
+# Bits a switch node dispatches on at most, so its table has at most 16 entries
+MAX_SWITCH_BITS = 4
+# Candidates left to a linear scan rather than split further
+LEAF_SIZE = 4
+# Switch nodes on the path to a leaf at most
+MAX_DEPTH = 12
+# Candidates placed in all the children of all switch nodes at most, per instruction
+PLACEMENT_BUDGET = 32
+
+
+class _Switch(object):
+    """Switch node of a split tree, dispatching on a group of bits of the word."""
+
+    __slots__ = ("bits", "extract", "children")
+
+    def __init__(self, bits: Tuple[int, ...], children: list):
+        self.bits = bits
+        self.extract = _extractor(bits)
+        self.children = children
+
+
+def _extractor(bits: Tuple[int, ...]) -> Callable[[int], int]:
+    # Bit i of the table index is bits[i], gathered run by run into a single expression
+    runs: List[List[int]] = []
+    for i, bit in enumerate(bits):
+        if runs and runs[-1][0] + runs[-1][1] == bit and runs[-1][2] + runs[-1][1] == i:
+            runs[-1][1] += 1
+        else:
+            runs.append([bit, 1, i])
+    terms = []
+    for shift, width, dest in runs:
+        term = f"((word >> {shift}) & {(1 << width) - 1})"
+        terms.append(f"({term} << {dest})" if dest else term)
+    return eval(f"lambda word: {' | '.join(terms)}")
+
+
+def _xlogx(x: float) -> float:
+    return x * math.log2(x) if x > 0 else 0.0
+
+
+def _gains(
+    groups: List[List[int]], masks: List[int], values: List[int], weights: List[float], bits: int
+) -> List[float]:
+    """Information gained about the instruction by learning each bit, summed over candidate groups."""
+    gains = [0.0] * bits
+    total = sum(weights[i] for group in groups for i in group)
+    for group in groups:
+        weight = sum(weights[i] for i in group)
+        if len(group) < 2 or weight <= 0:
+            continue
+        before = math.log2(weight) - sum(_xlogx(weights[i]) for i in group) / weight
+        # Instructions that leave a bit free go both ways, with half of their words each
+        half = sum(_xlogx(weights[i] / 2) for i in group)
+        fixed_weight = ([0.0] * bits, [0.0] * bits)
+        fixed_xlogx = ([0.0] * bits, [0.0] * bits)
+        fixed_half = [0.0] * bits
+        for i in group:
+            w = weights[i]
+            wl = _xlogx(w)
+            hl = _xlogx(w / 2)
+            mask = masks[i]
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                bit = low.bit_length() - 1
+                side = 1 if values[i] & low else 0
+                fixed_weight[side][bit] += w
+                fixed_xlogx[side][bit] += wl
+                fixed_half[bit] += hl
+        for bit in range(bits):
+            free_weight = weight - fixed_weight[0][bit] - fixed_weight[1][bit]
+            free_xlogx = half - fixed_half[bit]
+            after = 0.0
+            for side in (0, 1):
+                side_weight = fixed_weight[side][bit] + free_weight / 2
+                if side_weight > 0:
+                    entropy = math.log2(side_weight) - (fixed_xlogx[side][bit] + free_xlogx) / side_weight
+                    after += side_weight / weight * entropy
+            gains[bit] += weight / total * (before - after)
+    return gains
+
+
+def _scan_entries(
+    nodes: List[DecodeNode], should_be: str
+) -> Tuple[List[FlatInstruction], List[Optional[Tuple[int, int, Optional[Check], DecodeNode]]]]:
+    # The flattened instructions in decode order, each with the mask, value and check a scan tests and the leaf
+    # it decodes to. Instructions whose condition never holds get no entry, as the spec walk skips them.
+    flat = flatten_tree(nodes)
+    leaves = [node for root in nodes for node in root.walk() if node.leaf]
+    strict = should_be == STRICT
+    entries: List[Optional[Tuple[int, int, Optional[Check], DecodeNode]]] = []
+    for record, leaf in zip(flat, leaves):
+        check = compile_condition(record.condition, {name: (start, width) for name, start, width in record.fields})
+        if check is True or check is UNKNOWN:
+            check = None
+        mask, value = (record.fixed_mask, record.fixed_value) if strict else (record.mask, record.value)
+        entries.append(None if check is False else (mask, value, check, leaf))
+    return flat, entries
+
+
+def _pattern_matches(text: str, value: int) -> bool:
+    # Whether a field value matches a pattern such as '10x1' or !'000', its last character being bit 0
+    text = text.strip()
+    if text.startswith("!"):
+        return not _pattern_matches(text[1:], value)
+    if text.startswith("0x"):
+        return value == int(text, 16)
+    digits = [ch for ch in text.removeprefix("0b").strip("'") if ch not in " ()"]
+    return all(ch not in "01" or value >> bit & 1 == int(ch) for bit, ch in enumerate(reversed(digits)))
+
+
+def evaluate_condition(
+    condition: Optional[Dict[str, Any]], word: int, fields: Dict[str, Tuple[int, int]]
+) -> Optional[bool]:
+    """
+    Evaluate a raw MRS condition AST on an instruction word.
+
+    The AST is interpreted as is, with three-valued logic: terms that do not only depend on the encoding fields,
+    such as feature tests, are unknown, and so are the expressions they leave undecided.
+
+    Args:
+        condition (Optional[Dict[str, Any]]): The raw condition AST
+        word (int): The instruction word
+        fields (Dict[str, Tuple[int, int]]): The (start, width) of every encoding field in scope
+
+    Returns:
+        Optional[bool]: Whether the condition holds, None if it depends on more than the word
+    """
+    if condition is None:
+        return True
+
+    kind = condition.get("_type")
+
+    if kind == "AST.Bool":
+        return bool(condition["value"])
+
+    if kind == "AST.UnaryOp" and condition.get("op") in ("!", "NOT"):
+        result = evaluate_condition(condition["expr"], word, fields)
+        return None if result is None else not result
+
+    if kind == "AST.BinaryOp":
+        op = condition.get("op")
+        if op in ("&&", "||"):
+            left = evaluate_condition(condition["left"], word, fields)
+            right = evaluate_condition(condition["right"], word, fields)
+            # False decides a conjunction and True a disjunction, whatever the other side is
+            decisive = op == "||"
+            if left is decisive or right is decisive:
+                return decisive
+            if left is None or right is None:
+                return None
+            return not decisive
+
+        left = condition.get("left") or {}
+        right = condition.get("right") or {}
+        if op in ("==", "!=", "IN") and left.get("_type") == "AST.Identifier" and left.get("value") in fields:
+            start, width = fields[left["value"]]
+            value = word >> start & ((1 << width) - 1)
+            matched = False
+            for item in right.get("values", []) if right.get("_type") == "AST.Set" else [right]:
+                if item.get("_type") == "Values.Value":
+                    matched = matched or _pattern_matches(item.get("value") or "", value)
+                elif item.get("_type") == "AST.Integer":
+                    matched = matched or value == item["value"]
+                else:
+                    return None
+            return matched != (op == "!=")
+
+    return None
+
+
+class ReferenceDecoder(Decoder):
+    """
+    Decoder that tests every instruction in decode order until one matches.
+
+    It is deliberately naive and shares nothing with the decoders it checks but the decode tree: the tree is
+    walked down to every instruction here, one mask test is made per instruction, and the raw conditions of the
+    instruction and its groups are interpreted with ``evaluate_condition`` rather than compiled. An instruction
+    matches unless one of them surely fails.
+    """
+
+    def _compile(self, nodes: List[DecodeNode]) -> tuple:
+        strict = self.should_be == STRICT
+        entries = []
+        stack: List[Tuple[DecodeNode, int, int, tuple]] = [(node, 0, 0, ()) for node in reversed(nodes)]
+        while stack:
+            node, mask, value, conditions = stack.pop()
+            mask |= node.mask
+            value |= node.value
+            if node.condition is not None:
+                scope = {name: (start, width) for name, start, width in node.fields}
+                conditions += ((node.condition, scope),)
+            if node.leaf:
+                if strict:
+                    mask, value = mask | node.sbo | node.sbz, value | node.sbo
+                entries.append((mask, value, conditions, node))
+            else:
+                stack.extend((child, mask, value, conditions) for child in reversed(node.children))
+        return tuple(entries)
+
+    def _holds(self, word: int, conditions: tuple) -> bool:
+        return all(evaluate_condition(condition, word, scope) is not False for condition, scope in conditions)
+
+    def _walk(self, word: int, entries: tuple) -> Optional[DecodeNode]:
+        for mask, value, conditions, leaf in entries:
+            if word & mask == value and self._holds(word, conditions):
+                return leaf
+        return None
+
+    def comparisons(self, word: int) -> int:
+        """Count the mask tests and condition checks decoding a word takes."""
+        count = 0
+        for mask, value, conditions, _ in self._roots:
+            count += 1
+            if word & mask == value:
+                if not conditions:
+                    return count
+                count += 1
+                if self._holds(word, conditions):
+                    return count
+        return count
+
+
+class SplitDecoder(Decoder):
+    """
+    Decoder over a tree of switch nodes built from the flattened instructions.
+
+    Every switch node indexes a table of children by a few bits of the word, chosen greedily by information
+    gain. Leaves hold the few instructions that agree with the bits switched on so far, in decode order, and
+    are scanned like the spec hierarchy is, so both decode every word to the same instruction.
+    """
+
+    def __init__(
+        self,
+        tree: List[DecodeNode],
+        should_be: str = STRICT,
+        semantics: Optional[Callable] = None,
+        cache_size: int = 0,
+        weights: Optional[Dict[str, float]] = None,
+        bits: int = 32,
+    ):
+        """
+        Build the split tree.
+
+        Args:
+            tree (List[DecodeNode]): The decode tree, see ``build_decode_tree``
+            should_be (str, optional): How to treat should-be bits, see ``Decoder``. Defaults to "strict".
+            semantics (Optional[Callable], optional): The compiled decode pseudocode. Defaults to None.
+            cache_size (int, optional): Size of the decode cache, 0 to disable it. Defaults to 0.
+            weights (Optional[Dict[str, float]], optional): How often each instruction occurs, by name, see
+                ``profile_weights``. Defaults to None, every instruction weighing the same.
+            bits (int, optional): Width of the instruction word. Defaults to 32.
+        """
+        self.weights = weights
+        self.bits = bits
+        self.nodes = 0
+        self.depth = 0
+        # Candidates copied into the children of switch nodes so far
+        self.placed = 0
+        super().__init__(tree, should_be, semantics, cache_size)
+
+    def _compile(self, nodes: List[DecodeNode]) -> object:
+        flat, entries = _scan_entries(nodes, self.should_be)
+        strict = self.should_be == STRICT
+        masks = [record.fixed_mask if strict else record.mask for record in flat]
+        values = [record.fixed_value if strict else record.value for record in flat]
+        candidates = [i for i, entry in enumerate(entries) if entry is not None]
+        # Unseen instructions keep a small weight, so that they are still told apart
+        if self.weights is None:
+            weights = [1.0] * len(flat)
+        else:
+            weights = [self.weights.get(record.name, 0.0) + 0.5 for record in flat]
+
+        memo: Dict[Tuple[Tuple[int, ...], int], object] = {}
+        budget = PLACEMENT_BUDGET * max(len(candidates), 1)
+
+        def prune(group: Tuple[int, ...], known: int) -> Tuple[int, ...]:
+            # An unconditional candidate whose fixed bits are all known matches every word that gets this far,
+            # so the candidates after it can never be decoded to
+            for n, i in enumerate(group):
+                if masks[i] & ~known == 0 and entries[i][2] is None:
+                    return group[: n + 1]
+            return group
+
+        def choose(group: Tuple[int, ...]) -> List[int]:
+            chosen: List[int] = []
+            groups = [list(group)]
+            while len(chosen) < MAX_SWITCH_BITS:
+                gains = _gains(groups, masks, values, weights, self.bits)
+                size = sum(len(g) for g in groups)
+                best = None
+                for bit in range(self.bits):
+                    if bit in chosen or gains[bit] <= 1e-9:
+                        continue
+                    split = [
+                        [i for i in g if not masks[i] >> bit & 1 or values[i] >> bit & 1 == side]
+                        for g in groups
+                        for side in (0, 1)
+                    ]
+                    # Instructions that leave the bit free are copied to both sides, so the gain is weighed
+                    # against the growth of the candidate lists
+                    score = gains[bit] * size / sum(len(g) for g in split)
+                    if best is None or score > best[0]:
+                        best = score, bit, split
+                if best is None:
+                    break
+                chosen.append(best[1])
+                groups = best[2]
+            # Splitting only pays off if every child has fewer candidates to tell apart
+            if chosen and max(len(g) for g in groups) >= len(group):
+                return []
+            return sorted(chosen)
+
+        # The tree is built breadth-first, so that if the budget runs out it is the deepest levels that are
+        # left to linear scans
+        root: List[object] = [None]
+        queue = deque([(root, 0, prune(tuple(candidates), 0), 0, 0)])
+        while queue:
+            holder, slot, group, depth, known = queue.popleft()
+            if (group, known) not in memo:
+                self.nodes += 1
+                self.depth = max(self.depth, depth)
+                splittable = len(group) > LEAF_SIZE and depth < MAX_DEPTH and self.placed < budget
+                chosen = choose(group) if splittable else []
+                if not chosen:
+                    memo[group, known] = tuple(entries[i] for i in group)
+                else:
+                    node = memo[group, known] = _Switch(tuple(chosen), [None] * (1 << len(chosen)))
+                    fixed = sum(1 << bit for bit in chosen)
+                    for index in range(1 << len(chosen)):
+                        word = sum((index >> i & 1) << bit for i, bit in enumerate(chosen))
+                        child = tuple(i for i in group if (word ^ values[i]) & masks[i] & fixed == 0)
+                        child = prune(child, known | fixed)
+                        self.placed += len(child)
+                        queue.append((node.children, index, child, depth + 1, known | fixed))
+            holder[slot] = memo[group, known]
+        return root[0]
+
+    def _walk(self, word: int, node: object) -> Optional[DecodeNode]:
+        while type(node) is _Switch:
+            node = node.children[node.extract(word)]
+        for mask, value, check, leaf in node:
+            if word & mask == value and (check is None or check(word)):
+                return leaf
+        return None
+
+    def comparisons(self, word: int) -> int:
+        """Count the switch lookups, mask tests and condition checks decoding a word takes."""
+        count = 0
+        node = self._roots
+        while type(node) is _Switch:
+            node = node.children[node.extract(word)]
+            count += 1
+        for mask, value, check, leaf in node:
+            count += 1
+            if word & mask == value:
+                if check is None:
+                    return count
+                count += 1
+                if check(word):
+                    return count
+        return count
+
+
+def profile_weights(tree: List[DecodeNode], words: Sequence[int]) -> Dict[str, float]:
+    """
+    Count how often each instruction occurs in a sample corpus.
+
+    Args:
+        tree (List[DecodeNode]): The decode tree, see ``build_decode_tree``
+        words (Sequence[int]): The sample instruction words
+
+    Returns:
+        Dict[str, float]: The number of words that decode to every instruction, by name
+    """
+    decoder = Decoder(tree)
+    counts: Dict[str, float] = {}
+    for word in words:
+        leaf = decoder.decode(word)
+        if leaf is not None:
+            counts[leaf.name] = counts.get(leaf.name, 0) + 1
+    return counts
+
+
+def build_decoder(
+    tree: List[DecodeNode],
+    strategy: str = SPEC,
+    should_be: str = STRICT,
+    cache_size: int = 0,
+    weights: Optional[Dict[str, float]] = None,
+) -> Decoder:
+    """
+    Build a decoder with a decode-tree strategy.
+
+    Args:
+        tree (List[DecodeNode]): The decode tree, see ``build_decode_tree``
+        strategy (str, optional): "spec", "entropy" or "profile". Defaults to "spec".
+        should_be (str, optional): How to treat should-be bits, see ``Decoder``. Defaults to "strict".
+        cache_size (int, optional): Size of the decode cache, 0 to disable it. Defaults to 0.
+        weights (Optional[Dict[str, float]], optional): Instruction frequencies of the "profile" strategy, see
+            ``profile_weights``. Defaults to None.
+
+    Raises:
+        ValueError: If the strategy is unknown, or "profile" has no weights
+
+    Returns:
+        Decoder: The decoder
+    """
+    if strategy == SPEC:
+        return Decoder(tree, should_be, cache_size=cache_size)
+    if strategy == ENTROPY:
+        return SplitDecoder(tree, should_be, cache_size=cache_size)
+    if strategy == PROFILE:
+        if weights is None:
+            raise ValueError("the profile strategy needs instruction frequencies from a sample corpus")
+        return SplitDecoder(tree, should_be, cache_size=cache_size, weights=weights)
+    raise ValueError(f"unknown decode-tree strategy {strategy}, expected one of {', '.join(STRATEGIES)}")
+
+
+@dataclass
+class TreeStats:
+    """Represents the shape of a decode tree and the work decoding a corpus with it takes."""
+
+    strategy: str
+    depth: int
+    nodes: int
+    # Mean switch lookups, mask tests and condition checks per word
+    comparisons: float
+    words_per_second: float = 0.0
+
+
+def tree_shape(decoder: Decoder) -> Tuple[int, int]:
+    """Get the depth and node count of the tree of a decoder."""
+    if isinstance(decoder, SplitDecoder):
+        return decoder.depth + 1, decoder.nodes
+    depth = 0
+    nodes = 0
+    stack = [(root, 1) for root in decoder.tree]
+    while stack:
+        node, level = stack.pop()
+        depth = max(depth, level)
+        nodes += 1
+        stack.extend((child, level + 1) for child in node.children)
+    return depth, nodes
+
+
+def tree_stats(strategy: str, decoder: Decoder, words: Sequence[int]) -> TreeStats:
+    """
+    Measure the tree of a decoder on a corpus.
+
+    Args:
+        strategy (str): Name of the strategy the decoder was built with
+        decoder (Decoder): The decoder
+        words (Sequence[int]): The corpus
+
+    Returns:
+        TreeStats: The depth and size of the tree, and the comparisons per word and throughput on the corpus
+    """
+    depth, nodes = tree_shape(decoder)
+    comparisons = sum(decoder.comparisons(word) for word in words) / len(words) if len(words) else 0.0
+    return TreeStats(strategy, depth, nodes, comparisons, throughput(decoder, words)[1])
+
+
+def throughput(decoder: Decoder, words: Sequence[int]) -> Tuple[List[Optional[DecodeNode]], float]:
+    """Decode a corpus, getting the instruction of every word and the words decoded per second."""
+    decode = decoder.decode
+    start = time.perf_counter()
+    leaves = [decode(word) for word in words]
+    elapsed = time.perf_counter() - start
+    return leaves, len(words) / elapsed if elapsed else 0.0
+
+
+@dataclass
+class Agreement:
+    """Represents how a decoder fares against the reference decoder on a corpus."""
+
+    name: str
+    words_per_second: float
+    # Throughput relative to the reference decoder
+    speedup: float
+    agreed: int
+    disagreed: int = 0
+    # The first words decoded differently, with the instructions of the reference and of the decoder
+    mismatches: List[Tuple[int, str, str]] = field(default_factory=list)
+
+
+def compare_decoders(
+    reference: Decoder, decoders: Dict[str, Decoder], words: Sequence[int], limit: int = 10
+) -> List[Agreement]:
+    """
+    Check decoders against a reference decoder on a corpus and measure their throughput.
+
+    Args:
+        reference (Decoder): The oracle, see ``ReferenceDecoder``
+        decoders (Dict[str, Decoder]): The decoders to check, by name
+        words (Sequence[int]): The corpus
+        limit (int, optional): Mismatching words kept per decoder. Defaults to 10.
+
+    Returns:
+        List[Agreement]: The reference decoder first, then every decoder in order
+    """
+    expected, base = throughput(reference, words)
+    results = [Agreement("reference", base, 1.0, len(words))]
+    for name, decoder in decoders.items():
+        leaves, rate = throughput(decoder, words)
+        result = Agreement(name, rate, rate / base if base else 0.0, 0)
+        for word, ours, theirs in zip(words, expected, leaves):
+            if ours is theirs:
+                result.agreed += 1
+                continue
+            result.disagreed += 1
+            if len(result.mismatches) < limit:
+                result.mismatches.append(
+                    (word, ours.name if ours else "undefined", theirs.name if theirs else "undefined")
+                )
+        results.append(result)
+    return results
@@ -0,0 +1,339 @@
+"""
+Binary decode-table format.
+
+A decode table holds a flattened decode tree in a single file that readers in any language can memory-map and
+walk in place. All integers are little-endian and every section is aligned to 8 bytes.
+
+Header (48 bytes):
+
+    8s   magic "DSGTABLE"
+    u16  format version
+    u16  width of the instruction word in bits
+    u32  number of nodes, u32 offset of the node table
+    u32  number of fields, u32 offset of the field table
+    u32  number of cubes, u32 offset of the cube table
+    u32  size of the string table, u32 offset of the string table
+    u32  reserved
+
+Node table, one 48 byte record per decode tree node in pre-order:
+
+    u32  mask, u32 value    bits the node selects, should-be bits excluded
+    u32  sbo, u32 sbz       should-be-one and should-be-zero bits of the node and its ancestors
+    u32  skip               index of the node after this subtree, so the children of node i are i+1 .. skip-1
+                            and its next sibling is skip
+    u32  first field        index in the field table of the operand fields in scope
+    u32  first cube         index in the cube table of the node's condition
+    u16  field count
+    u16  cube count
+    u16  flags              bit 0: leaf, bit 1: the word must also match one of the condition cubes
+    u16  reserved
+    u32  name, u32 assembly template, u32 operation id    string table offsets
+
+Field table, one 8 byte record per operand field: u32 name offset, u8 start bit, u8 width, 2 reserved bytes.
+
+Cube table, one 8 byte record per ternary pattern: u32 mask, u32 value. A conditional node only matches words
+that match one of its cubes, those of the words its condition may accept: parts of a condition that do not
+depend on the encoding bits, such as feature tests, negated or not, never reject a word, as in the Python
+decoder.
+
+String table: NUL-terminated UTF-8 strings. Offset 0 is the empty string.
+
+Decoding walks the roots, nodes 0 .. node count - 1, in order: a node matches when ``word & mask == value`` (with
+``mask | sbo | sbz`` and ``value | sbo`` when should-be bits are enforced) and its condition holds. A matching
+leaf is the result, a matching group is searched recursively and decoding moves on to the next sibling when
+nothing in it matches.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from .coverage import condition_cubes
+from .decoder import DecodeNode, decoder_snapshot
+from .features import FeatureProfile
+from .snapshot import load_snapshot, snapshot_path
+
+TABLE_MAGIC = b"DSGTABLE"
+TABLE_VERSION = 1
+
+HEADER = struct.Struct("<8sHH9I")
+NODE = struct.Struct("<7I4H3I")
+FIELD = struct.Struct("<IBB2x")
+CUBE = struct.Struct("<II")
+
+FLAG_LEAF = 1
+FLAG_CONDITION = 2
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+class _Strings(object):
+    """Deduplicating string table builder."""
+
+    def __init__(self):
+        self.data = bytearray(b"\0")
+        self.offsets: Dict[str, int] = {"": 0}
+
+    def add(self, text: Optional[str]) -> int:
+        text = text or ""
+        if text not in self.offsets:
+            self.offsets[text] = len(self.data)
+            self.data += text.encode() + b"\0"
+        return self.offsets[text]
+
+
+def encode_table(tree: List[DecodeNode], bits: int = 32) -> bytes:
+    """
+    Serialize a decode tree in the binary decode-table format.
+
+    Args:
+        tree (List[DecodeNode]): The decode tree, see ``build_decode_tree``
+        bits (int, optional): Width of the instruction word. Defaults to 32.
+
+    Returns:
+        bytes: The table file content
+    """
+    strings = _Strings()
+    nodes: List[Tuple] = []
+    fields = bytearray()
+    cubes = bytearray()
+    field_count = 0
+    cube_count = 0
+
+    def visit(node: DecodeNode) -> None:
+        nonlocal field_count, cube_count
+        index = len(nodes)
+        nodes.append(())
+
+        first_field = field_count
+        for name, start, width in node.fields:
+            fields.extend(FIELD.pack(strings.add(name), start, width))
+        field_count += len(node.fields)
+
+        flags = FLAG_LEAF if node.leaf else 0
+        first_cube = cube_count
+        count = 0
+        if node.condition is not None:
+            _, may = condition_cubes(node.condition, {name: (start, width) for name, start, width in node.fields})
+            if may != [(0, 0)]:
+                flags |= FLAG_CONDITION
+                for mask, value in may:
+                    cubes.extend(CUBE.pack(mask, value))
+                count = len(may)
+                cube_count += count
+
+        for child in node.children:
+            visit(child)
+        nodes[index] = (
+            node.mask,
+            node.value,
+            node.sbo,
+            node.sbz,
+            len(nodes),
+            first_field,
+            first_cube,
+            len(node.fields),
+            count,
+            flags,
+            0,
+            strings.add(node.name),
+            strings.add(node.template),
+            strings.add(node.operation_id),
+        )
+
+    for root in tree:
+        visit(root)
+
+    node_offset = _align(HEADER.size)
+    field_offset = node_offset + _align(len(nodes) * NODE.size)
+    cube_offset = field_offset + _align(len(fields))
+    string_offset = cube_offset + _align(len(cubes))
+
+    out = bytearray(string_offset + len(strings.data))
+    HEADER.pack_into(
+        out,
+        0,
+        TABLE_MAGIC,
+        TABLE_VERSION,
+        bits,
+        len(nodes),
+        node_offset,
+        field_count,
+        field_offset,
+        cube_count,
+        cube_offset,
+        len(strings.data),
+        string_offset,
+        0,
+    )
+    for i, record in enumerate(nodes):
+        NODE.pack_into(out, node_offset + i * NODE.size, *record)
+    out[field_offset : field_offset + len(fields)] = fields
+    out[cube_offset : cube_offset + len(cubes)] = cubes
+    out[string_offset:] = strings.data
+    return bytes(out)
+
+
+def write_table(tree: List[DecodeNode], path: Union[str, Path], bits: int = 32) -> None:
+    """Atomically write a decode tree to a binary decode-table file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(encode_table(tree, bits))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def decode_table(
+    spec_file: Union[str, Path], instruction_set: str = "A64", profile: Optional[FeatureProfile] = None
+) -> Path:
+    """
+    Get the binary decode table of a spec, building it on first use.
+
+    Args:
+        spec_file (Union[str, Path]): Path to the MRS Instructions.json or tarball
+        instruction_set (str, optional): Name of the InstructionSet to decode. Defaults to "A64".
+        profile (Optional[FeatureProfile], optional): The target feature profile. Defaults to None.
+
+    Returns:
+        Path: Location of the table file
+    """
+    kind = f"table-{instruction_set}" if profile is None else f"table-{instruction_set}-{profile.key()}"
+    path = snapshot_path(spec_file, kind).with_suffix(".dtab")
+    if not path.exists():
+        write_table(load_snapshot(decoder_snapshot(spec_file, instruction_set, profile)), path)
+    return path
+
+
+class DecodeTable(object):
+    """
+    Zero-copy reader of a binary decode-table file.
+
+    The file is memory-mapped and records are unpacked in place on demand, so processes that open the same
+    table share its pages.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Map a table file.
+
+        Args:
+            path (Union[str, Path]): The table to read
+
+        Raises:
+            ValueError: If the file is not a decode table of a supported version
+        """
+        self.path = Path(path)
+        with self.path.open("rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self._mmap)
+        if len(self.buffer) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not a decode table")
+        (
+            magic,
+            version,
+            self.bits,
+            self.node_count,
+            self._nodes,
+            self.field_count,
+            self._fields,
+            self.cube_count,
+            self._cubes,
+            _,
+            self._strings,
+            _,
+        ) = HEADER.unpack_from(self.buffer)
+        if magic != TABLE_MAGIC or version != TABLE_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {TABLE_VERSION} decode table")
+
+    def close(self) -> None:
+        """Unmap the file."""
+        self.buffer.release()
+        self._mmap.close()
+
+    def __enter__(self) -> "DecodeTable":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.node_count
+
+    def node(self, index: int) -> Tuple[int, ...]:
+        """Unpack the raw record of a node, see the module documentation for its layout."""
+        return NODE.unpack_from(self.buffer, self._nodes + index * NODE.size)
+
+    def string(self, offset: int) -> str:
+        """Read a string of the string table."""
+        start = self._strings + offset
+        end = self._mmap.find(b"\0", start)
+        return str(self.buffer[start:end], "utf-8")
+
+    def name(self, index: int) -> str:
+        """Get the name of a node."""
+        return self.string(self.node(index)[11])
+
+    def template(self, index: int) -> str:
+        """Get the assembly template of a node."""
+        return self.string(self.node(index)[12])
+
+    def fields(self, index: int) -> List[Tuple[str, int, int]]:
+        """Get the (name, start, width) of every operand field in scope of a node."""
+        record = self.node(index)
+        first, count = record[5], record[7]
+        result = []
+        for i in range(first, first + count):
+            name, start, width = FIELD.unpack_from(self.buffer, self._fields + i * FIELD.size)
+            result.append((self.string(name), start, width))
+        return result
+
+    def decode(self, word: int, strict: bool = True) -> Optional[int]:
+        """
+        Decode a single instruction word.
+
+        Args:
+            word (int): The instruction word
+            strict (bool, optional): Whether words that break should-be bits are rejected. Defaults to True.
+
+        Returns:
+            Optional[int]: Index of the matching leaf node, or None if the word is unallocated
+        """
+        return self._walk(word, 0, self.node_count, strict)
+
+    def _walk(self, word: int, index: int, end: int, strict: bool) -> Optional[int]:
+        buffer = self.buffer
+        unpack = NODE.unpack_from
+        while index < end:
+            mask, value, sbo, sbz, skip, _, first_cube, _, cube_count, flags, _, _, _, _ = unpack(
+                buffer, self._nodes + index * NODE.size
+            )
+            if strict:
+                mask |= sbo | sbz
+                value |= sbo
+            if word & mask == value and (not flags & FLAG_CONDITION or self._holds(word, first_cube, cube_count)):
+                if flags & FLAG_LEAF:
+                    return index
+                found = self._walk(word, index + 1, skip, strict)
+                if found is not None:
+                    return found
+            index = skip
+        return None
+
+    def _holds(self, word: int, first: int, count: int) -> bool:
+        for i in range(first, first + count):
+            mask, value = CUBE.unpack_from(self.buffer, self._cubes + i * CUBE.size)
+            if word & mask == value:
+                return True
+        return False
@@ -0,0 +1,87 @@
+import hashlib
+import tarfile
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Tuple, Union
+
+ARCHIVE_SUFFIXES = (".tar.gz", ".tgz", ".tar.bz2", ".tar.xz", ".tar")
+
+# Checksums already computed in this process, keyed by (path, size, mtime)
+_checksums: Dict[Tuple[str, int, int], str] = {}
+
+
+def is_archive(file_path: Union[str, Path]) -> bool:
+    """Check whether a spec path is a tarball rather than an extracted file."""
+    return str(file_path).endswith(ARCHIVE_SUFFIXES)
+
+
+def archive_checksum(file_path: Union[str, Path]) -> str:
+    """
+    Get the SHA-256 of an archive, reading it at most once per process.
+
+    Args:
+        file_path (Union[str, Path]): Path to the archive
+
+    Returns:
+        str: The hex digest
+    """
+    path = Path(file_path).resolve()
+    stat = path.stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _checksums:
+        digest = hashlib.sha256()
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        _checksums[key] = digest.hexdigest()
+    return _checksums[key]
+
+
+def iter_members(
+    file_path: Union[str, Path], select: Optional[Callable[[str], bool]] = None
+) -> Iterator[Tuple[str, bytes]]:
+    """
+    Stream the regular files of an archive without extracting it.
+
+    The archive is read front to back in a single pass, so compressed tarballs are only decompressed once.
+
+    Args:
+        file_path (Union[str, Path]): Path to the archive
+        select (Optional[Callable[[str], bool]], optional): Filter on member names. Defaults to every file.
+
+    Yields:
+        Tuple[str, bytes]: The name and content of every selected member
+    """
+    with tarfile.open(file_path, "r|*") as tar:
+        for member in tar:
+            if not member.isfile() or (select is not None and not select(member.name)):
+                continue
+            f = tar.extractfile(member)
+            if f is not None:
+                yield member.name, f.read()
+
+
+def read_member(file_path: Union[str, Path], name: str) -> bytes:
+    """
+    Read a single file of an archive, e.g. ``Instructions.json``.
+
+    Args:
+        file_path (Union[str, Path]): Path to the archive
+        name (str): The member name, matched against the last components of member paths
+
+    Raises:
+        FileNotFoundError: If the archive has no such member
+
+    Returns:
+        bytes: Its content
+    """
+    suffix = "/" + name.lstrip("/")
+    for _, data in iter_members(file_path, lambda member: member == name or member.endswith(suffix)):
+        return data
+    raise FileNotFoundError(f"{name} not found in {file_path}")
+
+
+def has_member(file_path: Union[str, Path], name: str) -> bool:
+    """Check whether an archive holds a file, without reading any member content."""
+    suffix = "/" + name.lstrip("/")
+    with tarfile.open(file_path, "r|*") as tar:
+        return any(member.name == name or member.name.endswith(suffix) for member in tar)
@@ -0,0 +1,72 @@
+import mmap
+import sys
+from array import array
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Sequence, Union
+
+
+@contextmanager
+def map_words(
+    file_path: Union[str, Path], offset: int = 0, length: Optional[int] = None
+) -> Iterator[Sequence[int]]:
+    """
+    Memory-map a raw code blob and view it as little-endian ``uint32`` words.
+
+    On little-endian hosts the words are a zero-copy ``memoryview`` over the mapping, so nothing is read until
+    it is touched. Trailing bytes that do not make up a whole word are ignored.
+
+    Args:
+        file_path (Union[str, Path]): Path to the raw binary
+        offset (int, optional): Byte offset of the first word. Defaults to 0.
+        length (Optional[int], optional): Number of bytes to map. Defaults to the rest of the file.
+
+    Yields:
+        Sequence[int]: The instruction words
+    """
+    with Path(file_path).open("rb") as f:
+        size = f.seek(0, 2)
+        if offset < 0 or offset > size:
+            raise ValueError(f"offset {offset:#x} is outside of {file_path} ({size:#x} bytes)")
+        end = size if length is None else min(size, offset + length)
+        end -= (end - offset) % 4
+
+        if end == offset:
+            yield memoryview(b"").cast("I")
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            raw = view[offset:end]
+            words = raw.cast("I")
+            try:
+                if sys.byteorder == "little":
+                    yield words
+                else:
+                    swapped = array("I", words)
+                    swapped.byteswap()
+                    yield swapped
+            finally:
+                words.release()
+                raw.release()
+                view.release()
+
+
+def iter_chunks(words: Sequence[int], size: int) -> Iterator[tuple[int, Sequence[int]]]:
+    """
+    Split a run of words into fixed-size chunks without copying them.
+
+    Args:
+        words (Sequence[int]): The words to split, e.g. as returned by ``map_words``
+        size (int): Number of words per chunk
+
+    Yields:
+        tuple[int, Sequence[int]]: The index of the first word of each chunk and the chunk itself
+    """
+    for start in range(0, len(words), size):
+        chunk = words[start : start + size]
+        try:
+            yield start, chunk
+        finally:
+            if isinstance(chunk, memoryview):
+                chunk.release()
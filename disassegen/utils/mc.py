@@ -1,85 +1,260 @@
 import os
 import re
+import shutil
+import sqlite3
 import subprocess
 import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Union
 
 import click
 
+from ..snapshot import CACHE_DIR
+
+HOMEBREW_LLVM_MC = "/opt/homebrew/opt/llvm/bin/llvm-mc"
+
+DEFAULT_MC_CACHE = CACHE_DIR / "llvm-mc.sqlite"
+
+# Inputs handed to one llvm-mc process, and keys bound to one cache query
+MC_BATCH = 1 << 16
+SQL_BATCH = 500
+
+_INVALID_ENCODING = re.compile(r"^<stdin>:(\d+):\d+: warning: invalid instruction encoding", re.MULTILINE)
+_ASSEMBLY_ERROR = re.compile(r"^<stdin>:(\d+):\d+: error:", re.MULTILINE)
+
+
+def find_llvm_mc() -> str:
+    """Locate llvm-mc: $LLVM_MC, then Homebrew's LLVM, then the PATH."""
+    if os.environ.get("LLVM_MC"):
+        return os.environ["LLVM_MC"]
+    if os.path.exists(HOMEBREW_LLVM_MC):
+        return HOMEBREW_LLVM_MC
+    return shutil.which("llvm-mc") or HOMEBREW_LLVM_MC
+
+
+class MCCache(object):
+    """
+    Persistent cache of llvm-mc results in an SQLite database.
+
+    Results are keyed by the llvm-mc version, the ``-mattr`` features and the input word or line, so upgrading
+    llvm-mc or changing the features never returns stale results. Lookups and inserts take whole batches.
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_MC_CACHE):
+        """
+        Open or create a cache.
+
+        Args:
+            path (Union[str, Path], optional): The database file. Defaults to llvm-mc.sqlite in the cache directory.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path))
+        self.connection.executescript(
+            """
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS disassembly (
+                version TEXT, mattr TEXT, word INTEGER, text TEXT, PRIMARY KEY (version, mattr, word)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS assembly (
+                version TEXT, mattr TEXT, line TEXT, word INTEGER, PRIMARY KEY (version, mattr, line)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def _lookup(self, table: str, column: str, result: str, version: str, mattr: str, keys: List) -> Dict:
+        found = {}
+        for start in range(0, len(keys), SQL_BATCH):
+            batch = keys[start : start + SQL_BATCH]
+            rows = self.connection.execute(
+                f"SELECT {column}, {result} FROM {table} WHERE version = ? AND mattr = ? "
+                f"AND {column} IN ({', '.join('?' * len(batch))})",
+                [version, mattr, *batch],
+            )
+            found.update(rows)
+        return found
+
+    def _insert(self, table: str, version: str, mattr: str, results: Dict) -> None:
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?)",
+                ((version, mattr, key, value) for key, value in results.items()),
+            )
+
+    def lookup_disassembly(self, version: str, mattr: str, words: Iterable[int]) -> Dict[int, str]:
+        """Get the cached disassembly of the words that have one, "" for invalid encodings."""
+        return self._lookup("disassembly", "word", "text", version, mattr, list(words))
+
+    def insert_disassembly(self, version: str, mattr: str, results: Dict[int, str]) -> None:
+        """Store the disassembly of words in one transaction."""
+        self._insert("disassembly", version, mattr, results)
+
+    def lookup_assembly(self, version: str, mattr: str, lines: Iterable[str]) -> Dict[str, Optional[int]]:
+        """Get the cached encoding of the lines that have one, None for lines llvm-mc rejects."""
+        return self._lookup("assembly", "line", "word", version, mattr, list(lines))
+
+    def insert_assembly(self, version: str, mattr: str, results: Dict[str, Optional[int]]) -> None:
+        """Store the encoding of lines in one transaction."""
+        self._insert("assembly", version, mattr, results)
+
+    def close(self) -> None:
+        self.connection.close()
+
 
 class MC:
+    """
+    Front end to llvm-mc.
+
+    With a cache, words and lines llvm-mc has seen before are answered without running it, and the rest are
+    handed to it in batches of one process per ``MC_BATCH`` inputs.
+    """
+
+    def __init__(self, mattr: str = "v9.5a", cache: Optional[MCCache] = None, llvm_mc: Optional[str] = None):
+        """
+        Prepare the front end.
 
-    def __init__(self):
+        Args:
+            mattr (str, optional): Target features passed as -mattr. Defaults to "v9.5a".
+            cache (Optional[MCCache], optional): The result cache. Defaults to None, always running llvm-mc.
+            llvm_mc (Optional[str], optional): Path to llvm-mc. Defaults to the one ``find_llvm_mc`` finds.
+        """
         super().__init__()
+        self.mattr = mattr
+        self.cache = cache
+        self.llvm_mc = llvm_mc or find_llvm_mc()
+        self._version: Optional[str] = None
+
+    @property
+    def version(self) -> str:
+        """The version line of llvm-mc, part of every cache key."""
+        if self._version is None:
+            output = subprocess.run([self.llvm_mc, "--version"], capture_output=True, text=True, check=True).stdout
+            self._version = next((line.strip() for line in output.splitlines() if "version" in line), output.strip())
+        return self._version
+
+    def _run(self, flag: str, text: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [self.llvm_mc, "-arch=arm64", f"-mattr={self.mattr}", flag],
+            input=text,
+            capture_output=True,
+            text=True,
+        )
+
+    def _disassemble_batch(self, words: List[int]) -> Dict[int, str]:
+        lines = [" ".join(f"0x{word >> (8 * i) & 0xFF:02x}" for i in range(4)) for word in words]
+        process = self._run("-disassemble", "\n".join(lines) + "\n")
+        if process.returncode != 0:
+            raise Exception(f"Failed to disassemble: {process.stderr}")
+        # Invalid encodings only get a warning, so the output has one line per other word, after the section
+        invalid: Set[int] = {int(number) - 1 for number in _INVALID_ENCODING.findall(process.stderr)}
+        texts = iter(line.strip() for line in process.stdout.splitlines()[1:] if line.strip())
+        return {word: "" if index in invalid else next(texts, "") for index, word in enumerate(words)}
+
+    def _assemble_batch(self, lines: List[str]) -> Dict[str, Optional[int]]:
+        process = self._run("-show-encoding", "\n".join(lines) + "\n")
+        rejected: Set[int] = {int(number) - 1 for number in _ASSEMBLY_ERROR.findall(process.stderr)}
+        if process.returncode != 0 and not rejected:
+            raise Exception(f"Failed to assemble: {process.stderr}")
+        # ... ; encoding: [0x1f,0x23,0x03,0xd5]
+        encodings = iter(
+            sum(int(byte, 16) << (8 * i) for i, byte in enumerate(re.findall(r"0x[0-9a-fA-F]+", line)))
+            for line in process.stdout.splitlines()
+            if "encoding:" in line
+        )
+        return {line: None if index in rejected else next(encodings, None) for index, line in enumerate(lines)}
+
+    def disassemble_many(self, words: Iterable[int]) -> Dict[int, str]:
+        """
+        Disassemble words, running llvm-mc only for those not in the cache.
+
+        Args:
+            words (Iterable[int]): The instruction words
+
+        Returns:
+            Dict[int, str]: The text of every distinct word, "" if llvm-mc finds its encoding invalid
+        """
+        pending = list(dict.fromkeys(words))
+        results: Dict[int, str] = {}
+        if self.cache is not None:
+            results = self.cache.lookup_disassembly(self.version, self.mattr, pending)
+            pending = [word for word in pending if word not in results]
+        for start in range(0, len(pending), MC_BATCH):
+            batch = self._disassemble_batch(pending[start : start + MC_BATCH])
+            if self.cache is not None:
+                self.cache.insert_disassembly(self.version, self.mattr, batch)
+            results.update(batch)
+        return results
+
+    def assemble_many(self, lines: Iterable[str]) -> Dict[str, Optional[int]]:
+        """
+        Assemble lines of one instruction each, running llvm-mc only for those not in the cache.
+
+        Args:
+            lines (Iterable[str]): The instructions
+
+        Returns:
+            Dict[str, Optional[int]]: The encoding of every distinct line, None if llvm-mc rejects it
+        """
+        pending = list(dict.fromkeys(line.strip() for line in lines))
+        results: Dict[str, Optional[int]] = {}
+        if self.cache is not None:
+            results = self.cache.lookup_assembly(self.version, self.mattr, pending)
+            pending = [line for line in pending if line not in results]
+        for start in range(0, len(pending), MC_BATCH):
+            batch = self._assemble_batch(pending[start : start + MC_BATCH])
+            if self.cache is not None:
+                self.cache.insert_assembly(self.version, self.mattr, batch)
+            results.update(batch)
+        return results
 
     def assemble(self, str) -> int:
-        try:
-            process = subprocess.Popen(
-                ["/opt/homebrew/opt/llvm/bin/llvm-mc", "-arch=arm64", "-mattr=v9.5a", "-show-encoding"],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-            )
-            stdout, stderr = process.communicate(input=str)
-            if process.returncode != 0:
-                raise Exception(f"Failed to assemble: {stderr}")
-            #  .section\t__TEXT,__text,regular,pure_instructions
-            #     hint    #24                             ; encoding: [0x1f,0x23,0x03,0xd5]
-            hex_numbers = re.findall(r"0x[0-9a-fA-F]+", stdout)
-            result = 0
-            for i, hex_number in enumerate(hex_numbers):
-                result |= int(hex_number, 16) << (i * 8)
-            return result
-        except Exception as e:
-            raise e
+        lines = [line.strip() for line in str.splitlines() if line.strip()]
+        encodings = self.assemble_many(lines)
+        result = 0
+        for i, line in enumerate(lines):
+            if encodings[line] is None:
+                raise Exception(f"Failed to assemble: {line}")
+            result |= encodings[line] << (i * 32)
+        return result
 
     def disassemble(self, int) -> str:
-        try:
-            process = subprocess.Popen(
-                ["/opt/homebrew/opt/llvm/bin/llvm-mc", "-arch=arm64", "-mattr=v9.5a", "-disassemble"],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-            )
-            hex_bytes = [f"{(int >> (8 * i)) & 0xFF:02x}" for i in range(4)]
-            stdout, stderr = process.communicate(input="0x" + " 0x".join(hex_bytes))
-            if process.returncode != 0:
-                raise Exception(f"Failed to disassemble: {stderr}")
-            # Skip the first line of stdout
-            lines = stdout.splitlines()
-            if lines:
-                return "\n".join([line.strip() for line in lines[1:]])
-            else:
-                return ""
-        except Exception as e:
-            raise e
+        return self.disassemble_many([int])[int]
 
 
 @click.group()
-def cli():
+@click.option(
+    "--cache", type=click.Path(dir_okay=False), default=str(DEFAULT_MC_CACHE), show_default=True, help="Result cache"
+)
+@click.option("--no-cache", is_flag=True, help="Always run llvm-mc")
+@click.option("--mattr", default="v9.5a", show_default=True, help="Target features")
+@click.pass_context
+def cli(ctx: click.Context, cache: str, no_cache: bool, mattr: str):
     """LLVM Machine Code Playground"""
-    if not os.path.exists("/opt/homebrew/opt/llvm/bin/llvm-mc"):
+    llvm_mc = find_llvm_mc()
+    if not os.path.exists(llvm_mc):
         print("'llvm-mc' tool not found. Please run `brew install llvm` to install it.")
         sys.exit()
+    ctx.obj = MC(mattr, None if no_cache else MCCache(cache), llvm_mc)
 
 
 @cli.command()
 @click.argument("instructions", type=str)
-def assemble(instructions: str):
+@click.pass_obj
+def assemble(mc: MC, instructions: str):
     """Assemble ARM64 instructions"""
-    print(hex(MC().assemble(instructions)))
+    print(hex(mc.assemble(instructions)))
 
 
 @cli.command()
-@click.argument("uint32", type=str)
-def disassemble(uint32: str):
+@click.argument("uint32", type=str, nargs=-1, required=True)
+@click.pass_obj
+def disassemble(mc: MC, uint32: List[str]):
     """Disassemble ARM64 instructions"""
-    if uint32.startswith("0x"):
-        uint32 = int(uint32, 16)
-    else:
-        uint32 = int(uint32)
-    print(MC().disassemble(uint32))
+    words = [int(word, 16) if word.startswith("0x") else int(word) for word in uint32]
+    texts = mc.disassemble_many(words)
+    for word in words:
+        print(texts[word] if len(words) == 1 else f"{word:08x}  {texts[word]}")
 
 
 if __name__ == "__main__":
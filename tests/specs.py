@@ -0,0 +1,212 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .trees import both, feature_test, negate, pattern, rn_test
+
+
+def value(bits: str) -> Dict[str, Any]:
+    """Build a Values.Value of a quoted bit pattern."""
+    return {"_type": "Values.Value", "value": f"'{bits}'", "meaning": None}
+
+
+def fixed(start: int, bits: str, should_be: Optional[str] = None) -> Dict[str, Any]:
+    """Build the encoding bits from ``start`` up that ``bits`` fixes, most significant first."""
+    width = len(bits)
+    return {
+        "_type": "Instruction.Encodeset.Bits",
+        "range": {"_type": "Range", "start": start, "width": width},
+        "value": value(bits),
+        "should_be_mask": value(should_be or "0" * width),
+    }
+
+
+def field(name: str, start: int, width: int, bits: Optional[str] = None) -> Dict[str, Any]:
+    """Build an operand field of the encoding, free unless ``bits`` fixes it."""
+    return {
+        "_type": "Instruction.Encodeset.Field",
+        "name": name,
+        "range": {"_type": "Range", "start": start, "width": width},
+        "value": value(bits or "x" * width),
+        "should_be_mask": value("0" * width),
+    }
+
+
+def encoding(*values: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a 32-bit Encodeset."""
+    return {"_type": "Instruction.Encodeset.Encodeset", "width": 32, "values": list(values)}
+
+
+def instruction(
+    name: str, encodeset: Dict[str, Any], text: str, operation_id: str, condition: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Build an instruction whose assembly is the literal ``text``."""
+    data = {
+        "_type": "Instruction.Instruction",
+        "name": name,
+        "encoding": encodeset,
+        "operation_id": operation_id,
+        "assembly": {
+            "_type": "Instruction.Assembly",
+            "symbols": [{"_type": "Instruction.Symbols.Literal", "value": text}],
+        },
+    }
+    if condition is not None:
+        data["condition"] = condition
+    return data
+
+
+def document(children: List[Dict[str, Any]], operations: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Build an Instructions.json document holding the A64 instruction set."""
+    return {
+        "_meta": {"license": {"copyright": "", "info": ""}, "version": {"architecture": "v9Ap6", "build": "0"}},
+        "assembly_rules": {},
+        "instructions": [
+            {
+                "_type": "Instruction.InstructionSet",
+                "name": "A64",
+                "read_width": 32,
+                "encoding": encoding(),
+                "children": children,
+            }
+        ],
+        "operations": operations or {},
+    }
+
+
+def feature_spec() -> Dict[str, Any]:
+    """The spec of ``trees.feature_tree``."""
+    foo = encoding(fixed(16, "1101010100010000"), field("Rn", 5, 5), field("Rd", 0, 5))
+    bar = encoding(fixed(16, "1101010100100000"), field("Rn", 5, 5), field("Rd", 0, 5))
+    foo_new = both(negate(feature_test("FEAT_X")), rn_test("!=", pattern("11111")))
+    return document(
+        [
+            instruction("FOO_new", foo, "FOO", "FOO", foo_new),
+            instruction("FOO_old", foo, "FOO", "FOO"),
+            instruction("BAR", bar, "BAR", "BAR", feature_test("FEAT_X")),
+        ]
+    )
+
+
+IMMEDIATE_DECODE = """constant integer d = UInt(Rd);
+constant integer n = UInt(Rn);
+constant integer datasize = 32 << UInt(sf);
+bits(datasize) imm;
+case sh of
+    when '0' => imm = ZeroExtend(imm12, datasize);
+    when '1' => imm = ZeroExtend(imm12:Zeros(12), datasize);
+end;"""
+
+IMMEDIATE_OPERATION = """constant bits(datasize) operand1 = if n == 31 then SP[]<datasize-1:0> else X[n, datasize];
+bits(datasize) result;
+(result, -) = AddWithCarry(operand1, {operand2}, '{carry}');
+if d == 31 then
+    SP[] = ZeroExtend(result, 64);
+else
+    X[d, datasize] = result;
+end;"""
+
+CBNZ_DECODE = """constant integer t = UInt(Rt);
+constant integer datasize = 32 << UInt(sf);
+constant boolean iszero = (op == '0');
+constant bits(64) offset = SignExtend(imm19:'00', 64);"""
+
+CBNZ_OPERATION = """constant bits(datasize) operand1 = X[t, datasize];
+if IsZero(operand1) == iszero then
+    BranchTo(PC64 + offset, BranchType_DIR, TRUE);
+end;"""
+
+STR_DECODE = """constant integer t = UInt(Rt);
+constant integer n = UInt(Rn);
+constant bits(64) offset = LSL(ZeroExtend(imm12, 64), 3);"""
+
+STR_OPERATION = """bits(64) address = if n == 31 then SP[] else X[n, 64];
+address = address + offset;
+Mem[address, 8, CreateAccDescGPR(MemOp_STORE, FALSE, FALSE, FALSE)] = X[t, 64];"""
+
+
+def operation(title: str, decode: str, execute: str) -> Dict[str, Any]:
+    """Build the pseudocode of an operation."""
+    return {
+        "_type": "Instruction.Operation",
+        "title": title,
+        "brief": "",
+        "description": "",
+        "decode": decode,
+        "operation": execute,
+    }
+
+
+def emulator_spec() -> Dict[str, Any]:
+    """The spec of ADD, SUB, CBNZ and STR on 64-bit registers and NOP, with their pseudocode."""
+
+    def immediate(op: str) -> Dict[str, Any]:
+        return encoding(
+            field("sf", 31, 1, "1"),
+            fixed(29, op + "0"),
+            fixed(23, "100010"),
+            field("sh", 22, 1),
+            field("imm12", 10, 12),
+            field("Rn", 5, 5),
+            field("Rd", 0, 5),
+        )
+
+    cbnz = encoding(
+        field("sf", 31, 1, "1"), fixed(25, "011010"), field("op", 24, 1, "1"), field("imm19", 5, 19), field("Rt", 0, 5)
+    )
+    store = encoding(fixed(22, "1111100100"), field("imm12", 10, 12), field("Rn", 5, 5), field("Rt", 0, 5))
+    nop = encoding(fixed(0, "11010101000000110010000000011111"))
+    return document(
+        [
+            instruction("ADD_64_addsub_imm", immediate("0"), "ADD", "ADD_addsub_imm"),
+            instruction("SUB_64_addsub_imm", immediate("1"), "SUB", "SUB_addsub_imm"),
+            instruction("CBNZ_64_compbranch", cbnz, "CBNZ", "CBNZ"),
+            instruction("STR_64_ldst_pos", store, "STR", "STR_imm"),
+            instruction("NOP_HI_hints", nop, "NOP", "NOP"),
+        ],
+        {
+            "ADD_addsub_imm": operation("ADD", IMMEDIATE_DECODE, IMMEDIATE_OPERATION.format(operand2="imm", carry=0)),
+            "SUB_addsub_imm": operation(
+                "SUB", IMMEDIATE_DECODE, IMMEDIATE_OPERATION.format(operand2="NOT(imm)", carry=1)
+            ),
+            "CBNZ": operation("CBNZ", CBNZ_DECODE, CBNZ_OPERATION),
+            "STR_imm": operation("STR", STR_DECODE, STR_OPERATION),
+            "NOP": operation("NOP", "", "// do nothing"),
+        },
+    )
+
+
+# ADD (immediate): sf op S 100010 sh imm12 Rn Rd, with one encoding per sf
+ADD_XML = """
+<instructionsection id="ADD_addsub_imm" title="ADD (immediate)" type="instruction">
+  <classes>
+    <iclass name="Not setting the condition flags" id="iclass_general" no_encodings="2">
+      <regdiagram form="32" psname="ADD_addsub_imm">
+        <box hibit="31" name="sf" usename="1"><c></c></box>
+        <box hibit="30" name="op" settings="1"><c>0</c></box>
+        <box hibit="29" name="S" settings="1"><c>0</c></box>
+        <box hibit="28" width="6" settings="6"><c>1</c><c>0</c><c>0</c><c>0</c><c>1</c><c>0</c></box>
+        <box hibit="22" name="sh" usename="1"><c></c></box>
+        <box hibit="21" width="12" name="imm12" usename="1"><c colspan="12"></c></box>
+        <box hibit="9" width="5" name="Rn" usename="1"><c colspan="5"></c></box>
+        <box hibit="4" width="5" name="Rd" usename="1"><c colspan="5"></c></box>
+      </regdiagram>
+      <encoding name="ADD_32_addsub_imm" label="32-bit" bitdiffs="sf == 0">
+        <docvars><docvar key="mnemonic" value="ADD" /></docvars>
+        <asmtemplate>ADD  &lt;Wd|WSP&gt;, &lt;Wn|WSP&gt;, #&lt;imm&gt;</asmtemplate>
+      </encoding>
+      <encoding name="ADD_64_addsub_imm" label="64-bit" bitdiffs="sf == 1">
+        <docvars><docvar key="mnemonic" value="ADD" /></docvars>
+        <asmtemplate>ADD  &lt;Xd|SP&gt;, &lt;Xn|SP&gt;, #&lt;imm&gt;</asmtemplate>
+      </encoding>
+    </iclass>
+  </classes>
+</instructionsection>
+"""
+
+
+def write_spec(directory: Path, data: Dict[str, Any]) -> Path:
+    """Write a spec document to Instructions.json in a directory."""
+    path = directory / "Instructions.json"
+    path.write_text(json.dumps(data))
+    return path
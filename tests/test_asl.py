@@ -0,0 +1,105 @@
+import pytest
+
+from disassegen.asl.cache import ParseCache
+from disassegen.asl.compiler import Compiler
+from disassegen.asl.parser import ASLSyntaxError, parse
+from disassegen.asl.runtime import ASLException, Bits
+
+
+def identifier(name):
+    return {"_type": "AST.Identifier", "value": name}
+
+
+def integer(value):
+    return {"_type": "AST.Integer", "value": value}
+
+
+def value_of(source):
+    """Parse a single assignment and get the expression it assigns."""
+    (statement,) = parse(source)["statements"]
+    assert statement["_type"] == "AST.Assignment"
+    return statement["val"]
+
+
+def run(source, **fields):
+    return Compiler().compile(parse(source))(fields)
+
+
+def test_parameters():
+    assert value_of("x = Zeros{12};") == {
+        "_type": "AST.Function",
+        "name": "Zeros",
+        "arguments": [],
+        "parameters": [integer(12)],
+    }
+    assert value_of("x = ZeroExtend{64}(imm);") == {
+        "_type": "AST.Function",
+        "name": "ZeroExtend",
+        "arguments": [identifier("imm")],
+        "parameters": [integer(64)],
+    }
+
+
+@pytest.mark.parametrize("source", ["x = a :: b :: c;", "x = a : b : c;"])
+def test_concatenation(source):
+    assert value_of(source) == {"_type": "AST.Concat", "values": [identifier(n) for n in "abc"]}
+
+
+def test_parameters_are_passed_last():
+    result = run("x = ZeroExtend{16}(imm :: Zeros{4});\ny = Ones{3};", imm=Bits(0b101, 3))
+    assert (result["x"], result["x"].width) == (0b1010000, 16)
+    assert (result["y"], result["y"].width) == (0b111, 3)
+
+
+def test_division_is_exact():
+    assert run("x = a / b;", a=12, b=4)["x"] == 3
+    assert run("x = a DIVRM b;\ny = a MOD b;", a=-7, b=2) == {"x": -4, "y": 1}
+    with pytest.raises(ASLException):
+        run("x = a / b;", a=7, b=2)
+
+
+def test_string_concatenation():
+    assert run('x = "FEAT_" ++ name;', name="SVE")["x"] == "FEAT_SVE"
+    with pytest.raises(ASLException):
+        run("x = a ++ b;", a=1, b=2)
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        # ASL 1.0 closes blocks with "end"
+        "if n == 31 then\n    x = 1;\nelse\n    x = 2;\nend;",
+        # The older pseudocode only indents them
+        "if n == 31 then\n    x = 1;\nelse\n    x = 2;",
+        "x = if n == 31 then 1 else 2;",
+    ],
+)
+def test_block_styles(source):
+    assert run(source, n=31)["x"] == 1
+    assert run(source, n=0)["x"] == 2
+
+
+def test_case():
+    source = "case op of\n    when '0x' => x = 1;\n    when '10' => x = 2;\n    otherwise => x = 3;\nend;"
+    assert [run(source, op=Bits(op, 2))["x"] for op in range(4)] == [1, 1, 2, 3]
+
+
+@pytest.mark.parametrize("source", ["x = ;", "x = (1;", "x = a ::;", "x = 1"])
+def test_syntax_errors(source):
+    with pytest.raises(ASLSyntaxError):
+        parse(source)
+
+
+def test_parse_cache(tmp_path):
+    cache = ParseCache(tmp_path / "asl.snap")
+    trees = cache.parse_all(["x = 1;", "x = 1;", "x = ;"])
+    assert trees["x = 1;"] == parse("x = 1;")
+    assert trees["x = ;"] is None and len(cache.errors) == 1
+    assert (cache.hits, cache.misses) == (0, 2)
+    cache.save()
+
+    cache = ParseCache(tmp_path / "asl.snap").load()
+    assert cache.parse("x = 1;") == parse("x = 1;")
+    with pytest.raises(ASLSyntaxError):
+        cache.parse("x = ;")
+    assert (cache.hits, cache.misses) == (2, 0)
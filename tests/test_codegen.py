@@ -0,0 +1,65 @@
+import shutil
+import subprocess
+
+import pytest
+
+from disassegen.codegen.pipeline import generate, instruction_records
+from disassegen.decoder import Decoder, flatten_tree
+
+from .trees import feature_tree, sample_words, synthetic_tree
+
+C_MAIN = """
+#include <stdio.h>
+
+int main(void) {
+    unsigned int word;
+    while (scanf("%x", &word) == 1) {
+        const dsg_instruction_t *instruction = dsg_decode(word);
+        puts(instruction ? instruction->name : "-");
+    }
+    return 0;
+}
+"""
+
+
+def expected_names(tree, words):
+    decoder = Decoder(tree)
+    return [leaf.name if leaf else None for leaf in map(decoder.decode, words)]
+
+
+def load_python(tree, tmp_path):
+    generate(instruction_records(flatten_tree(tree)), ["python"], tmp_path, jobs=1)
+    namespace = {}
+    exec((tmp_path / "disassembler.py").read_text(), namespace)
+    return namespace["decode"]
+
+
+def test_conditions_are_emitted(tmp_path):
+    records = instruction_records(flatten_tree(feature_tree()))
+    # FOO_new only holds where Rn is not 31, FOO_old is unconditional and BAR only depends on a feature
+    assert [record.cubes is None for record in records] == [False, True, True]
+    decode = load_python(feature_tree(), tmp_path)
+    assert [decode(word)[2] for word in (0xD5100061, 0xD51003E1, 0xD5200000)] == ["FOO_new", "FOO_old", "BAR"]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_python_backend_agrees_with_decoder(tmp_path, seed):
+    tree = synthetic_tree(seed)
+    words = sample_words(tree, seed, 1000)
+    decode = load_python(tree, tmp_path)
+    names = [instruction[2] if instruction else None for instruction in map(decode, words)]
+    assert names == expected_names(tree, words)
+
+
+@pytest.mark.skipif(shutil.which("cc") is None, reason="needs a C compiler")
+def test_c_backend_agrees_with_decoder(tmp_path):
+    tree = synthetic_tree(0)
+    words = sample_words(tree, 0, 1000)
+    generate(instruction_records(flatten_tree(tree)), ["c"], tmp_path, jobs=1)
+    source = tmp_path / "main.c"
+    source.write_text((tmp_path / "disassembler.c").read_text() + C_MAIN)
+    subprocess.run(["cc", "-std=c99", "-o", str(tmp_path / "main"), str(source)], check=True)
+    output = subprocess.run(
+        [str(tmp_path / "main")], input="".join(f"{word:x}\n" for word in words), capture_output=True, text=True
+    ).stdout
+    assert [None if name == "-" else name for name in output.split()] == expected_names(tree, words)
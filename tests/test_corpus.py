@@ -0,0 +1,63 @@
+import pytest
+
+from disassegen.corpus import CorpusSampler, find_witness
+from disassegen.decoder import DecodeNode, flatten_tree
+from disassegen.strategy import ReferenceDecoder
+
+from .trees import FIELDS, synthetic_tree
+
+TOP = 1 << 31
+
+
+def leaf(name, mask, value, condition=None):
+    return DecodeNode(name, mask, value, FIELDS, condition=condition, leaf=True)
+
+
+def field_is(name, pattern):
+    return {
+        "_type": "AST.BinaryOp",
+        "op": "==",
+        "left": {"_type": "AST.Identifier", "value": name},
+        "right": {"_type": "Values.Value", "value": f"'{pattern}'"},
+    }
+
+
+# Holds for one word in 1024, so random draws almost never find it
+RARE = {"_type": "AST.BinaryOp", "op": "&&", "left": field_is("Rn", "10101"), "right": field_is("Rd", "01010")}
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_every_word_decodes_to_its_instruction(seed):
+    tree = synthetic_tree(seed)
+    instructions = flatten_tree(tree)
+    sampler = CorpusSampler(instructions, seed=seed)
+    reference = ReferenceDecoder(tree)
+    names = {instruction.name for instruction in instructions}
+    for word in sampler.sample(2000):
+        leaf = reference.decode(word)
+        assert leaf is not None and leaf.name in names
+    assert not sampler.stats.unsampled
+
+
+def test_narrow_instruction_is_found_by_search():
+    # Only the words with the top 20 bits clear and both fields set reach NARROW
+    tree = [
+        leaf("WIDE", TOP, TOP),
+        leaf("MOST", 0xFFFFF000, 0x00000000, {"_type": "AST.UnaryOp", "op": "!", "expr": RARE}),
+        leaf("NARROW", 0xFFFFF000, 0x00000000, RARE),
+        leaf("COVERED", TOP, TOP),
+    ]
+    sampler = CorpusSampler(flatten_tree(tree), seed=0)
+    assert sampler.stats.unreachable == ["COVERED"]
+    assert sampler.stats.unsampled == []
+    assert sampler.plans[2].cube is not None
+    reference = ReferenceDecoder(tree)
+    decoded = {reference.decode(word).name for word in sampler.sample(1000)}
+    assert decoded == {"WIDE", "MOST", "NARROW"}
+
+
+def test_find_witness():
+    region = [(TOP, 0)]
+    assert find_witness(region, [[(TOP | 1, 0)]]) == ((TOP | 1, 1), True)
+    assert find_witness(region, [[(TOP | 1, 0)], [(1, 1)]]) == (None, True)
+    assert find_witness(region, [[(TOP | 1, 0)], [(1, 1)]], budget=1) == (None, False)
@@ -0,0 +1,62 @@
+import xml.etree.ElementTree as ET
+
+from disassegen.crosscheck import (
+    BITS,
+    FIELDS,
+    MISSING_MRS,
+    MISSING_XML,
+    RENAMED,
+    EncodingSignature,
+    cross_check,
+    mrs_signatures,
+    xml_signatures,
+)
+from disassegen.isa.spec import ISASpec
+from disassegen.spec import MRSSpec
+
+from .specs import ADD_XML, emulator_spec
+
+ADD_FIELDS = frozenset({"sf", "sh", "imm12", "Rn", "Rd"})
+
+
+def kinds(report):
+    return sorted((mismatch.kind, mismatch.name) for mismatch in report.mismatches)
+
+
+def test_spec_signatures():
+    mrs = mrs_signatures(MRSSpec.from_dict(emulator_spec()))
+    xml = xml_signatures([ISASpec("ADD_addsub_imm.xml", root=ET.fromstring(ADD_XML)).instruction])
+    assert (mrs["ADD_64_addsub_imm"].mask, mrs["ADD_64_addsub_imm"].value) == (0xFF800000, 0x91000000)
+    assert mrs["ADD_64_addsub_imm"].fields == xml["ADD_64_addsub_imm"].fields == ADD_FIELDS
+
+    report = cross_check(mrs, xml)
+    assert (report.mrs, report.xml, report.matched) == (5, 2, 1)
+    assert kinds(report) == [
+        (MISSING_MRS, "ADD_32_addsub_imm"),
+        (MISSING_XML, "CBNZ_64_compbranch"),
+        (MISSING_XML, "NOP_HI_hints"),
+        (MISSING_XML, "STR_64_ldst_pos"),
+        (MISSING_XML, "SUB_64_addsub_imm"),
+    ]
+
+
+def test_mismatches():
+    mrs = {
+        "SAME": EncodingSignature("SAME", 0xFF000000, 0x11000000, ADD_FIELDS),
+        "BITS": EncodingSignature("BITS", 0xFF000000, 0x12000000, ADD_FIELDS),
+        "FIELDS": EncodingSignature("FIELDS", 0xFF000000, 0x13000000, frozenset({"Rn", "Rd"})),
+        "NEW_NAME": EncodingSignature("NEW_NAME", 0xFF000000, 0x14000000, ADD_FIELDS),
+    }
+    xml = {
+        "SAME": EncodingSignature("SAME", 0xFF000000, 0x11000000, ADD_FIELDS),
+        "BITS": EncodingSignature("BITS", 0xFF800000, 0x12000000, ADD_FIELDS),
+        "FIELDS": EncodingSignature("FIELDS", 0xFF000000, 0x13000000, frozenset({"Rn", "Rt"})),
+        "OLD_NAME": EncodingSignature("OLD_NAME", 0xFF000000, 0x14000000, ADD_FIELDS, "old.xml"),
+    }
+    report = cross_check(mrs, xml)
+    assert report.matched == 1
+    assert kinds(report) == [(BITS, "BITS"), (FIELDS, "FIELDS"), (RENAMED, "NEW_NAME")]
+    details = {mismatch.name: mismatch.detail for mismatch in report.mismatches}
+    assert details["FIELDS"] == "only in MRS: Rd; only in XML: Rt"
+    assert details["NEW_NAME"] == "XML calls it OLD_NAME (old.xml)"
+    assert details["BITS"].split() == ["MRS", "00010010" + "x" * 24, "XML", "000100100" + "x" * 23]
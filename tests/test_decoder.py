@@ -0,0 +1,86 @@
+import pytest
+
+from disassegen.decoder import PERMISSIVE, REPORT, STRICT, UNKNOWN, DecodeNode, Decoder, compile_condition
+
+from .trees import FIELDS, both, feature_test, feature_tree, negate, pattern, rn_test
+
+SCOPE = {name: (start, width) for name, start, width in FIELDS}
+# Rn is 3, then 31
+WORDS = (0xD5100061, 0xD51003E1)
+
+
+@pytest.mark.parametrize(
+    "word, expected",
+    [(0xD5100061, "FOO_new"), (0xD51003E1, "FOO_old"), (0xD5200000, "BAR"), (0xD5300000, None)],
+)
+def test_feature_tests_never_reject(word, expected):
+    leaf = Decoder(feature_tree()).decode(word)
+    assert (leaf and leaf.name) == expected
+
+
+@pytest.mark.parametrize(
+    "condition",
+    [
+        feature_test("FEAT_X"),
+        negate(feature_test("FEAT_X")),
+        negate(negate(feature_test("FEAT_X"))),
+        # Whether Rn is 31 or not, the feature may be missing
+        negate(both(feature_test("FEAT_X"), rn_test("==", pattern("11111")))),
+    ],
+)
+def test_undecided_conditions_are_unknown(condition):
+    assert compile_condition(condition, SCOPE) is UNKNOWN
+
+
+def test_feature_test_and_field():
+    check = compile_condition(both(negate(feature_test("FEAT_X")), rn_test("!=", pattern("11111"))), SCOPE)
+    assert [check(word) for word in WORDS] == [True, False]
+    check = compile_condition(negate(both(negate(feature_test("FEAT_X")), rn_test("!=", pattern("11111")))), SCOPE)
+    assert check is UNKNOWN
+
+
+def test_constant_conditions():
+    true = {"_type": "AST.Bool", "value": True}
+    assert compile_condition(None, SCOPE) is True
+    assert compile_condition(true, SCOPE) is True
+    assert compile_condition(negate(true), SCOPE) is False
+    assert compile_condition(both(feature_test("FEAT_X"), negate(true)), SCOPE) is False
+
+
+def should_be_tree():
+    # Bit 15 should be one and Rd should be zero
+    return [DecodeNode("HINT", 0xFFFF0000, 0xD5000000, FIELDS, sbo=0x8000, sbz=0x1F, leaf=True)]
+
+
+@pytest.mark.parametrize(
+    "should_be, expected, unpredictable",
+    [(STRICT, ["HINT", None, None], 0), (PERMISSIVE, ["HINT", "HINT", "HINT"], 0), (REPORT, ["HINT"] * 3, 2)],
+)
+def test_should_be_modes(should_be, expected, unpredictable):
+    decoder = Decoder(should_be_tree(), should_be)
+    # Keeping both should-be bits, breaking the SBO bit and breaking an SBZ bit
+    words = [0xD5008000, 0xD5000000, 0xD5008001]
+    assert [(leaf and leaf.name) for leaf in map(decoder.decode, words)] == expected
+    assert decoder.counters["unpredictable"] == unpredictable
+    assert decoder.counters["undefined"] == expected.count(None)
+    texts = [decoder.disassemble(word) for word in words]
+    assert sum(text.endswith("CONSTRAINED UNPREDICTABLE") for text in texts) == unpredictable
+
+
+def test_cache_evicts_least_recently_used():
+    decoder = Decoder(feature_tree(), cache_size=2)
+    uncached = Decoder(feature_tree())
+    # The second lookup of the first word makes the second one the least recently used
+    words = [0xD5100061, 0xD51003E1, 0xD5100061, 0xD5200000, 0xD51003E1]
+    assert [decoder.disassemble(word) for word in words] == [uncached.disassemble(word) for word in words]
+    assert list(decoder.cache) == [0xD5200000, 0xD51003E1]
+    counters = decoder.counters
+    assert (counters["hits"], counters["misses"], counters["evictions"], counters["words"]) == (1, 4, 2, 5)
+    assert decoder.hit_rate() == 0.2
+
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        Decoder(feature_tree(), "lenient")
+    with pytest.raises(ValueError):
+        Decoder(feature_tree(), cache_size=-1)
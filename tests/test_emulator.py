@@ -0,0 +1,75 @@
+import pytest
+
+from disassegen.asl.compiler import DecodeSemantics, OperationSemantics
+from disassegen.asl.runtime import ASLException
+from disassegen.decoder import Decoder
+from disassegen.emulator import Emulator
+from disassegen.spec import MRSSpec
+
+from .specs import emulator_spec
+
+BASE = 0x10000
+
+# x1 -= 1; x0 += 2; loop while x1 != 0
+LOOP = [0xD1000421, 0x91000800, 0xB5FFFFC1]
+
+ADD_X0_1 = 0x91000400
+ADD_X0_5 = 0x91001400
+NOP = 0xD503201F
+# str x2, [x3]
+STORE = 0xF9000062
+
+
+@pytest.fixture(scope="module")
+def spec():
+    return MRSSpec.from_dict(emulator_spec())
+
+
+def emulator(spec, words):
+    operations = spec.instructions.operations
+    machine = Emulator(
+        Decoder.from_spec(spec), DecodeSemantics(operations, jobs=1), OperationSemantics(operations, jobs=1)
+    )
+    machine.memory.load(BASE, b"".join(word.to_bytes(4, "little") for word in words))
+    return machine
+
+
+def test_loop_reuses_its_block(spec):
+    machine = emulator(spec, LOOP)
+    machine.x[1] = 3
+    assert machine.run(BASE, until=BASE + 12) == 9
+    assert (machine.x[0], machine.x[1], machine.pc) == (6, 0, BASE + 12)
+    # The loop body is one block ending at CBNZ, translated once and then found in the cache
+    assert list(machine.blocks) == [BASE]
+    assert [insn.leaf.name for insn in machine.blocks[BASE].instructions] == [
+        "SUB_64_addsub_imm",
+        "ADD_64_addsub_imm",
+        "CBNZ_64_compbranch",
+    ]
+    assert machine.counters == {"instructions": 9, "translated": 1, "hits": 2, "invalidations": 0}
+
+
+def test_count_stops_inside_a_block(spec):
+    machine = emulator(spec, LOOP)
+    machine.x[1] = 3
+    assert machine.run(BASE, count=4) == 4
+    assert (machine.x[0], machine.x[1], machine.pc) == (2, 1, BASE + 4)
+
+
+def test_code_writes_invalidate_blocks(spec):
+    # The store overwrites the second ADD with one adding 5, after its block was translated
+    machine = emulator(spec, [STORE, ADD_X0_1, ADD_X0_1, NOP])
+    machine.x[2] = NOP << 32 | ADD_X0_5
+    machine.x[3] = BASE + 8
+    machine.run(BASE, until=BASE + 16)
+    assert machine.x[0] == 6
+    assert machine.counters["invalidations"] == 1
+    assert machine.counters["translated"] == 2
+    assert machine.memory.read(BASE + 8, 4) == ADD_X0_5
+
+
+def test_undefined_words_stop_at_their_address(spec):
+    machine = emulator(spec, [ADD_X0_1, 0])
+    with pytest.raises(ASLException):
+        machine.run(BASE)
+    assert (machine.x[0], machine.pc) == (1, BASE + 4)
@@ -0,0 +1,82 @@
+import pytest
+
+from disassegen.decoder import Decoder, build_decode_tree
+from disassegen.features import FeatureProfile, fold_condition, version_implies
+from disassegen.spec import MRSSpec
+
+from .specs import feature_spec
+from .trees import feature_test, negate
+
+
+@pytest.mark.parametrize(
+    "profile, feature, expected",
+    [
+        ("v8.5a", "v8Ap5", True),
+        ("v8.5a", "v8Ap6", False),
+        # v8.x never includes v9, even where it comes after the v8 version v9.0 is a superset of
+        ("v8.5a", "v9Ap0", False),
+        ("v8.7a", "v9Ap0", False),
+        ("v9.0a", "v8Ap5", True),
+        ("v9.0a", "v8Ap6", False),
+        ("v9.2a", "v8Ap7", True),
+        ("v9.2a", "v9Ap3", False),
+    ],
+)
+def test_version_requirements(profile, feature, expected):
+    assert FeatureProfile.parse(profile).implements(feature) is expected
+
+
+def test_version_implies():
+    assert version_implies((9, 0), (8, 5))
+    assert not version_implies((8, 5), (9, 0))
+    assert not version_implies((8, 9), (9, 0))
+
+
+def test_features_follow_their_version_requirements():
+    profile = FeatureProfile.parse("v8.5a - SME", {"FEAT_X": {"v9Ap0"}, "FEAT_Y": {"v8Ap2"}})
+    assert not profile.implements("FEAT_X")
+    assert profile.implements("FEAT_Y")
+    assert not profile.implements("FEAT_SME")
+
+
+@pytest.mark.parametrize(
+    "profile, expected",
+    [("v8.5a", None), ("v8.5a + X", True), ("v8.5a - X", False), ("", None)],
+)
+def test_feature_status(profile, expected):
+    assert FeatureProfile.parse(profile).status("FEAT_X") is expected
+
+
+@pytest.mark.parametrize("profile, expected", [("v8.5a", None), ("v8.5a + X", False), ("v8.5a - X", True)])
+def test_negated_feature_tests_fold_only_when_decided(profile, expected):
+    condition = negate(feature_test("FEAT_X"))
+    folded = fold_condition(condition, FeatureProfile.parse(profile))
+    assert folded == (condition if expected is None else expected)
+
+
+@pytest.mark.parametrize(
+    "profile, expected",
+    [
+        ("v8.5a", ["FOO_new", "FOO_old", "BAR"]),
+        ("v8.5a + X", ["FOO_old", "BAR"]),
+        ("v8.5a - X", ["FOO_new", "FOO_old"]),
+    ],
+)
+def test_pruning_keeps_undecided_encodings(profile, expected):
+    tree = build_decode_tree(MRSSpec.from_dict(feature_spec()), profile=FeatureProfile.parse(profile))
+    assert [node.name for node in tree] == expected
+    assert Decoder(tree).decode(0xD5100061).name == expected[0]
+
+
+@pytest.mark.parametrize(
+    "profile, expression, expected",
+    [
+        ("v8.5a", "!FEAT_X", True),
+        ("v8.5a + X", "!FEAT_X", False),
+        ("v8.5a - X", "!FEAT_X", True),
+        ("v8.5a - X", "FEAT_X", False),
+        ("v8.5a + X", "FEAT_Y && !FEAT_X || FEAT_X", True),
+    ],
+)
+def test_allows(profile, expression, expected):
+    assert FeatureProfile.parse(profile).allows(expression) is expected
@@ -0,0 +1,32 @@
+import dataclasses
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from disassegen.isa.spec import ISASpec
+
+from .specs import ADD_XML
+
+
+@pytest.fixture
+def encodings():
+    (iclass,) = ISASpec("ADD_addsub_imm.xml", root=ET.fromstring(ADD_XML)).instruction.instruction_classes
+    return iclass.encodings
+
+
+def test_signatures(encodings):
+    assert [(e.name, e.fixed_mask, e.fixed_value) for e in encodings] == [
+        ("ADD_32_addsub_imm", 0xFF800000, 0x11000000),
+        ("ADD_64_addsub_imm", 0xFF800000, 0x91000000),
+    ]
+    assert encodings[1].matches(0x91000400) and not encodings[0].matches(0x91000400)
+    assert encodings[0].reg_diagram.fixed_mask == 0x7F800000
+
+
+def test_encodings_are_hashable(encodings):
+    # Both encodings share the register diagram of their class
+    assert len({encoding.reg_diagram for encoding in encodings}) == 1
+    assert len(set(encodings)) == 2
+    assert {encodings[0]: "32-bit"}[dataclasses.replace(encodings[0])] == "32-bit"
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        encodings[0].reg_diagram.boxes[0].width = 2
@@ -0,0 +1,84 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("click")
+
+from disassegen.utils import mc
+from disassegen.utils.mc import MC, MCCache
+
+INVALID = {0x00000000, 0xFFFFFFFF}
+
+# Stands in for llvm-mc: one line per valid word after the section directive, warnings for invalid ones
+FAKE_LLVM_MC = """
+import sys
+
+with open({log!r}, "a") as log:
+    log.write(" ".join(sys.argv[1:]) + "\\n")
+if "--version" in sys.argv:
+    print("Fake LLVM version 1.0")
+    sys.exit()
+print("\\t.text")
+for number, line in enumerate(sys.stdin, 1):
+    if "-disassemble" in sys.argv:
+        word = sum(int(byte, 16) << 8 * i for i, byte in enumerate(line.split()))
+        if word in {invalid}:
+            print(f"<stdin>:{{number}}:1: warning: invalid instruction encoding", file=sys.stderr)
+        else:
+            print(f"\\tinsn\\t#{{word:#x}}")
+    elif line.strip() == "nop":
+        print("\\tnop\\t; encoding: [0x1f,0x20,0x03,0xd5]")
+    else:
+        print(f"<stdin>:{{number}}:1: error: invalid instruction", file=sys.stderr)
+"""
+
+
+@pytest.fixture
+def llvm_mc(tmp_path):
+    """Path of the fake llvm-mc, whose command lines are logged to runs.log."""
+    path = tmp_path / "llvm-mc"
+    path.write_text(f"#!{sys.executable}\n" + FAKE_LLVM_MC.format(log=str(tmp_path / "runs.log"), invalid=INVALID))
+    path.chmod(0o755)
+    return str(path)
+
+
+def runs(llvm_mc, flag):
+    with Path(llvm_mc).with_name("runs.log").open() as log:
+        return sum(flag in line.split() for line in log)
+
+
+def test_invalid_words_keep_the_others_aligned(llvm_mc, monkeypatch):
+    monkeypatch.setattr(mc, "MC_BATCH", 3)
+    words = [0x1, 0x0, 0x2, 0xFFFFFFFF, 0x0, 0x3, 0xFFFFFFFF]
+    texts = MC(llvm_mc=llvm_mc).disassemble_many(words)
+    assert texts == {0x1: "insn\t#0x1", 0x0: "", 0x2: "insn\t#0x2", 0xFFFFFFFF: "", 0x3: "insn\t#0x3"}
+    # The five distinct words take two batches
+    assert runs(llvm_mc, "-disassemble") == 2
+
+
+def test_disassembly_cache(llvm_mc, tmp_path):
+    words = [0x1, 0x0, 0x2]
+    cache = MCCache(tmp_path / "mc.sqlite")
+    first = MC(cache=cache, llvm_mc=llvm_mc).disassemble_many(words)
+    cache.close()
+
+    # Another process, invalid words included, is answered from the database
+    cache = MCCache(tmp_path / "mc.sqlite")
+    assert MC(cache=cache, llvm_mc=llvm_mc).disassemble_many(words) == first
+    assert runs(llvm_mc, "-disassemble") == 1
+    assert MC(cache=cache, llvm_mc=llvm_mc).disassemble_many([0x2, 0x3]) == {0x2: "insn\t#0x2", 0x3: "insn\t#0x3"}
+    assert runs(llvm_mc, "-disassemble") == 2
+    # Other target features have results of their own
+    MC("v8a", cache=cache, llvm_mc=llvm_mc).disassemble_many(words)
+    assert runs(llvm_mc, "-disassemble") == 3
+
+
+def test_assembly_cache(llvm_mc, tmp_path):
+    cache = MCCache(tmp_path / "mc.sqlite")
+    front = MC(cache=cache, llvm_mc=llvm_mc)
+    assert front.assemble_many(["bogus", " nop ", "bogus 2"]) == {"bogus": None, "nop": 0xD503201F, "bogus 2": None}
+    assert front.assemble("nop\nnop") == 0xD503201F_D503201F
+    with pytest.raises(Exception, match="bogus"):
+        front.assemble("nop\nbogus")
+    assert runs(llvm_mc, "-show-encoding") == 1
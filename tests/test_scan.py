@@ -0,0 +1,76 @@
+import pytest
+
+from disassegen import scan
+from disassegen.decoder import Decoder, build_decode_tree, flatten_tree
+from disassegen.scan import Scanner, compile_element, compile_pattern
+from disassegen.spec import MRSSpec
+
+from .specs import emulator_spec
+from .trees import feature_tree
+
+NOP = 0xD503201F
+# sub x1, x1, #1; add x0, x0, #2; cbnz x1, -8
+LOOP = [0xD1000421, 0x91000800, 0xB5FFFFC1]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def vectorized(request, monkeypatch):
+    """Scan with NumPy when it is installed, and with the pure-Python fallback."""
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(scan, "numpy", None)
+
+
+@pytest.fixture(scope="module")
+def instructions():
+    return flatten_tree(build_decode_tree(MRSSpec.from_dict(emulator_spec())))
+
+
+def found(patterns, words, **kwargs):
+    return [(match.pattern.text, match.index) for match in Scanner(patterns, **kwargs).scan(words)]
+
+
+def test_compile_element(instructions):
+    element = compile_element("add Rd=1", instructions)
+    assert element.names == {"ADD_64_addsub_imm"}
+    assert element.alternatives == {0xFF80001F: {0x91000001}}
+    assert element.matches(0x91000421) and not element.matches(0x91000420)
+    # Mnemonics and instruction names select the same encodings
+    assert compile_element("ADD_64_addsub_imm Rd=1", instructions).alternatives == element.alternatives
+    # A raw ternary pattern is not confirmed by decoding
+    assert compile_element("0xd503201f", instructions).names is None
+
+
+@pytest.mark.parametrize("text", ["add Rd", "add Rq=1", "add Rd=32", "ret", " ; "])
+def test_compile_errors(instructions, text):
+    with pytest.raises(ValueError):
+        compile_pattern(text, instructions)
+
+
+def test_scan(instructions, vectorized):
+    words = [NOP] + LOOP + [NOP] + LOOP[:2] + [NOP]
+    patterns = [compile_pattern(text, instructions) for text in ("sub Rd=1 ; add ; cbnz", "add Rd=0", "nop ; sub")]
+    assert found(patterns, words) == [
+        ("nop ; sub", 0),
+        ("sub Rd=1 ; add ; cbnz", 1),
+        ("add Rd=0", 2),
+        ("nop ; sub", 4),
+        ("add Rd=0", 6),
+    ]
+
+
+def test_scan_across_chunks(instructions, vectorized):
+    words = [NOP] * 5 + LOOP + [NOP] * 5
+    pattern = compile_pattern("sub ; add ; cbnz", instructions)
+    for chunk_words in (1, 2, 3, 4, 64):
+        assert found([pattern], words, chunk_words=chunk_words) == [("sub ; add ; cbnz", 5)]
+
+
+def test_decoder_confirms_matches(vectorized):
+    tree = feature_tree()
+    pattern = compile_pattern("foo_old", flatten_tree(tree))
+    # FOO_new shadows FOO_old unless Rn is 31
+    words = [0xD5100061, 0xD51003E1]
+    assert found([pattern], words) == [("foo_old", 0), ("foo_old", 1)]
+    assert found([pattern], words, decoder=Decoder(tree)) == [("foo_old", 1)]
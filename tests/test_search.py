@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from disassegen.decoder import DecodeNode, build_decode_tree, flatten_tree
+from disassegen.search import PatternIndex, format_pattern, parse_pattern
+from disassegen.spec import MRSSpec
+
+from .specs import emulator_spec
+from .trees import FIELDS, synthetic_tree
+
+
+def names(instructions):
+    return [instruction.name for instruction in instructions]
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        ("0xd503201f", (0xFFFFFFFF, 0xD503201F)),
+        ("0b1101_0101_0000_0011_xxxx_xxxx_xxx1_1111", (0xFFFF001F, 0xD503001F)),
+        # Any character but 0 and 1 is a free bit
+        ("1" * 16 + "?" * 8 + "." * 8, (0xFFFF0000, 0xFFFF0000)),
+    ],
+)
+def test_parse_pattern(pattern, expected):
+    assert parse_pattern(pattern) == expected
+    mask, value = expected
+    assert parse_pattern(format_pattern(mask, value)) == expected
+
+
+@pytest.mark.parametrize("pattern", ["0xd50320", "0b101", "x" * 33])
+def test_pattern_width(pattern):
+    with pytest.raises(ValueError):
+        parse_pattern(pattern)
+
+
+def test_match():
+    index = PatternIndex(flatten_tree(build_decode_tree(MRSSpec.from_dict(emulator_spec()))))
+    assert len(index) == 5
+    assert index.match("x" * 32) == index.instructions
+    # 64-bit add and subtract (immediate) differ in bit 30 only
+    assert names(index.match("0b1x_x100010" + "x" * 23)) == ["ADD_64_addsub_imm", "SUB_64_addsub_imm"]
+    assert names(index.match("0b10_0100010" + "x" * 23)) == ["ADD_64_addsub_imm"]
+    assert len(index.match("x" * 31 + "0")) == 4
+    assert index.match("0b0" + "x" * 31) == []
+
+
+def test_should_be_bits():
+    (hint,) = flatten_tree([DecodeNode("HINT", 0xFFFF0000, 0xD5000000, FIELDS, sbo=0x8000, leaf=True)])
+    pattern = "0xd5000000"
+    assert names(PatternIndex([hint]).match(pattern)) == []
+    assert names(PatternIndex([hint], strict=False).match(pattern)) == ["HINT"]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_query_agrees_with_a_scan(seed):
+    instructions = flatten_tree(synthetic_tree(seed))
+    index = PatternIndex(instructions)
+    rng = random.Random(seed)
+    for _ in range(200):
+        mask = rng.getrandbits(32) & rng.getrandbits(32)
+        value = rng.getrandbits(32) & mask
+        expected = [
+            instruction
+            for instruction in instructions
+            if (value ^ instruction.fixed_value) & mask & instruction.fixed_mask == 0
+        ]
+        assert index.query(mask, value) == expected
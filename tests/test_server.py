@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from disassegen.client import DecodeClient, DecodeError
+from disassegen.decoder import Decoder
+from disassegen.server import HEADER, MAX_PAYLOAD, OP_DECODE, STATUS_ERROR, DecodeServer
+
+from .trees import feature_tree
+
+WORDS = [0xD5100061, 0xD51003E1, 0xD5200000, 0xD5300000]
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    """Serve the feature tree on a Unix socket from a background event loop."""
+    path = tmp_path / "decode.sock"
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(DecodeServer(Decoder(feature_tree(), cache_size=16)).serve(path))
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not path.exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    yield path
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join()
+    loop.close()
+
+
+def test_requests(socket_path):
+    with DecodeClient(socket_path) as client:
+        assert client.decode(WORDS) == ["FOO_new", "FOO_old", "BAR", None]
+        assert client.disassemble(WORDS, 0x1000) == Decoder(feature_tree()).disassemble_words(WORDS, 0x1000)
+        assert client.decode([]) == [] and client.disassemble([]) == []
+        assert client.lookup("BAR")["value"] == 0xD5200000
+        assert client.lookup("BAZ") is None
+
+
+def test_errors_keep_the_connection(socket_path):
+    with DecodeClient(socket_path) as client:
+        with pytest.raises(DecodeError, match="multiple of 4"):
+            client.request(OP_DECODE, b"\x00\x00\x00")
+        with pytest.raises(DecodeError, match="unknown op"):
+            client.request(42, b"")
+        assert client.decode(WORDS[:1]) == ["FOO_new"]
+
+
+def test_oversized_payloads_close_the_connection(socket_path):
+    with DecodeClient(socket_path) as client:
+        client.sock.sendall(HEADER.pack(OP_DECODE, MAX_PAYLOAD + 1))
+        status, length = HEADER.unpack(client._recv_exactly(HEADER.size))
+        assert status == STATUS_ERROR and b"too large" in client._recv_exactly(length)
+        assert client.sock.recv(1) == b""
+
+
+def test_connections_are_served_concurrently(socket_path):
+    with DecodeClient(socket_path) as first, DecodeClient(socket_path) as second:
+        assert second.decode(WORDS[2:3]) == ["BAR"]
+        assert first.decode(WORDS[:1]) == ["FOO_new"]
+
+
+def test_never_replaces_other_files(tmp_path):
+    path = tmp_path / "decode.sock"
+    path.write_text("not a socket")
+    with pytest.raises(FileExistsError):
+        asyncio.run(DecodeServer(Decoder(feature_tree())).serve(path))
+    assert path.read_text() == "not a socket"
@@ -0,0 +1,42 @@
+import struct
+
+import pytest
+
+from disassegen.decoder import REPORT, Decoder
+from disassegen.shard import plan_shards, sharded_disassemble
+from disassegen.snapshot import save_snapshot
+
+from .trees import sample_words, synthetic_tree
+
+
+def test_plan_shards():
+    # The region drops its trailing partial word and the last shard is short
+    shards = plan_shards(100, offset=8, length=54, base=0x1000, shard_words=4)
+    assert shards == [(8, 16, 0x1000), (24, 16, 0x1010), (40, 16, 0x1020), (56, 4, 0x1030)]
+    assert plan_shards(10, shard_words=4) == [(0, 8, 0)]
+
+
+@pytest.mark.parametrize("cache_size", [0, 64])
+def test_sharded_disassemble_matches_decoder(tmp_path, cache_size):
+    tree = synthetic_tree(0)
+    words = sample_words(tree, 0, 500)
+    binary = tmp_path / "code.bin"
+    binary.write_bytes(struct.pack(f"<{len(words)}I", *words))
+    snapshot = tmp_path / "tree.snap"
+    save_snapshot(tree, snapshot)
+
+    shards = list(
+        sharded_disassemble(
+            binary, snapshot, base=0x4000, shard_words=64, jobs=2, should_be=REPORT, cache_size=cache_size
+        )
+    )
+    expected = Decoder(tree, REPORT, cache_size=cache_size)
+    lines = expected.disassemble_words(words, 0x4000)
+    assert [line for shard, _ in shards for line in shard] == lines
+
+    # Every shard reports what it added to the counters of its worker's decoder
+    counters = {name: sum(shard[name] for _, shard in shards) for name in shards[0][1]}
+    assert counters["words"] == len(words)
+    assert counters["undefined"] == expected.counters["undefined"]
+    assert counters["unpredictable"] == expected.counters["unpredictable"]
+    assert counters["hits"] + counters["misses"] == (len(words) if cache_size else 0)
@@ -0,0 +1,82 @@
+import io
+import os
+import shutil
+import tarfile
+
+import pytest
+
+from disassegen import snapshot
+from disassegen.decoder import build_decode_tree, decoder_snapshot
+from disassegen.snapshot import SNAPSHOT_MAGIC, SNAPSHOT_VERSION, load_snapshot, save_snapshot, snapshot_path
+from disassegen.spec import MRSSpec
+from disassegen.utils.archive import has_member, read_member
+
+from .specs import feature_spec, write_spec
+from .trees import synthetic_tree
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "CACHE_DIR", tmp_path / "cache")
+    return tmp_path / "cache"
+
+
+def write_archive(path, data):
+    """Write a spec tarball holding Instructions.json below a release directory."""
+    with tarfile.open(path, "w:gz") as tar:
+        info = tarfile.TarInfo("AARCHMRS_BSD_A_profile/Instructions.json")
+        info.size = len(data)
+        tar.addfile(info, io.BytesIO(data))
+    return path
+
+
+def test_round_trip(tmp_path):
+    tree = synthetic_tree(0)
+    save_snapshot(tree, tmp_path / "tree.snap")
+    assert load_snapshot(tmp_path / "tree.snap") == tree
+    assert os.listdir(tmp_path) == ["tree.snap"]
+
+
+@pytest.mark.parametrize("header", [SNAPSHOT_MAGIC + bytes([SNAPSHOT_VERSION - 1]), b"NOTASNAP"])
+def test_rejects_other_files(tmp_path, header):
+    path = tmp_path / "tree.snap"
+    save_snapshot([], path)
+    path.write_bytes(header + path.read_bytes()[len(header) :])
+    with pytest.raises(ValueError):
+        load_snapshot(path)
+
+
+def test_path_follows_the_source(tmp_path):
+    spec = write_spec(tmp_path, feature_spec())
+    first = snapshot_path(spec, "decoder-A64")
+    assert snapshot_path(spec, "decoder-A64") == first
+    assert snapshot_path(spec, "flat-A64") != first
+    spec.write_text(spec.read_text() + " ")
+    assert snapshot_path(spec, "decoder-A64") != first
+
+
+def test_archives_are_keyed_by_checksum(tmp_path):
+    data = write_spec(tmp_path, feature_spec()).read_bytes()
+    archive = write_archive(tmp_path / "AARCHMRS_BSD_A_profile.tar.gz", data)
+    # A copy elsewhere, with another modification time, shares the snapshots of the original
+    copy = tmp_path / "copy" / archive.name
+    copy.parent.mkdir()
+    shutil.copy(archive, copy)
+    os.utime(copy, ns=(0, 0))
+    assert snapshot_path(copy, "decoder-A64") == snapshot_path(archive, "decoder-A64")
+
+
+def test_spec_from_archive(tmp_path):
+    data = write_spec(tmp_path, feature_spec()).read_bytes()
+    archive = write_archive(tmp_path / "AARCHMRS_BSD_A_profile.tar.gz", data)
+    assert read_member(archive, "Instructions.json") == data
+    assert has_member(archive, "Instructions.json") and not has_member(archive, "Features.json")
+    with pytest.raises(FileNotFoundError):
+        read_member(archive, "Features.json")
+
+    expected = build_decode_tree(MRSSpec.from_dict(feature_spec()))
+    assert build_decode_tree(MRSSpec(archive)) == expected
+    path = decoder_snapshot(archive)
+    built = path.stat().st_mtime_ns
+    assert load_snapshot(decoder_snapshot(archive)) == expected
+    assert path.stat().st_mtime_ns == built
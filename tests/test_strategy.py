@@ -0,0 +1,83 @@
+import pytest
+
+from disassegen.decoder import PERMISSIVE, STRICT, DecodeNode, Decoder
+from disassegen.strategy import ReferenceDecoder, SplitDecoder, compare_decoders, evaluate_condition, profile_weights
+
+from .trees import FIELDS, both, feature_test, feature_tree, negate, pattern, rn_test, sample_words, synthetic_tree
+
+NOT_LOW = {"_type": "Values.Value", "value": "!'0000x'"}
+
+
+def names(decoder, words):
+    return [None if leaf is None else leaf.name for leaf in map(decoder.decode, words)]
+
+
+@pytest.mark.parametrize("should_be", [STRICT, PERMISSIVE])
+@pytest.mark.parametrize("seed", range(4))
+def test_decoders_agree_with_reference(seed, should_be):
+    tree = synthetic_tree(seed)
+    words = sample_words(tree, seed)
+    expected = names(ReferenceDecoder(tree, should_be), words)
+    assert any(expected) and None in expected
+
+    weights = profile_weights(tree, words[len(words) // 2 :])
+    assert names(Decoder(tree, should_be), words) == expected
+    assert names(SplitDecoder(tree, should_be), words) == expected
+    assert names(SplitDecoder(tree, should_be, weights=weights), words) == expected
+
+
+def test_split_decoder_takes_fewer_comparisons():
+    tree = synthetic_tree(0, depth=4)
+    words = sample_words(tree, 0)
+    spec = Decoder(tree)
+    split = SplitDecoder(tree)
+    assert sum(map(split.comparisons, words)) < sum(map(spec.comparisons, words))
+
+
+def test_compare_decoders_reports_disagreements():
+    tree = synthetic_tree(1)
+    words = sample_words(tree, 1)
+    # Dropping the first root changes what the words it decodes decode to
+    results = compare_decoders(ReferenceDecoder(tree), {"spec": Decoder(tree), "pruned": Decoder(tree[1:])}, words)
+    assert [result.name for result in results] == ["reference", "spec", "pruned"]
+    assert results[1].agreed == len(words) and results[1].disagreed == 0
+    assert results[2].disagreed > 0
+    assert results[2].agreed + results[2].disagreed == len(words)
+    assert results[2].mismatches
+
+
+@pytest.mark.parametrize(
+    "condition, expected",
+    [
+        (None, True),
+        (rn_test("==", pattern("000x1")), True),
+        (rn_test("==", pattern("1xxxx")), False),
+        (rn_test("!=", NOT_LOW), False),
+        (rn_test("IN", {"_type": "AST.Set", "values": [pattern("11111"), {"_type": "AST.Integer", "value": 3}]}), True),
+        (feature_test("FEAT_X"), None),
+        (negate(feature_test("FEAT_X")), None),
+        (both(feature_test("FEAT_X"), rn_test("==", pattern("1xxxx"))), False),
+        (both(negate(feature_test("FEAT_X")), rn_test("==", pattern("00011"))), None),
+    ],
+)
+def test_evaluate_condition(condition, expected):
+    # Rn is 3
+    assert evaluate_condition(condition, 0x61, {"Rn": (5, 5), "Rd": (0, 5)}) is expected
+
+
+def test_reference_decodes_feature_tests():
+    # Written out by hand: feature tests never reject a word without a profile
+    expected = {0xD5100061: "FOO_new", 0xD51003E1: "FOO_old", 0xD5200000: "BAR", 0xD5300000: None}
+    assert names(ReferenceDecoder(feature_tree()), list(expected)) == list(expected.values())
+    assert names(Decoder(feature_tree()), list(expected)) == list(expected.values())
+
+
+def test_negated_patterns():
+    # Rn != !'0000x' only holds where Rn is 0 or 1
+    tree = [
+        DecodeNode("LOW", 0xFFFF0000, 0xD5100000, FIELDS, condition=rn_test("!=", NOT_LOW), leaf=True),
+        DecodeNode("HIGH", 0xFFFF0000, 0xD5100000, FIELDS, leaf=True),
+    ]
+    expected = {0xD5100000: "LOW", 0xD5100020: "LOW", 0xD5100040: "HIGH", 0xD51003E0: "HIGH"}
+    assert names(ReferenceDecoder(tree), list(expected)) == list(expected.values())
+    assert names(Decoder(tree), list(expected)) == list(expected.values())
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from disassegen.decoder import PERMISSIVE, STRICT, Decoder
+from disassegen.table import HEADER, TABLE_MAGIC, TABLE_VERSION, DecodeTable, encode_table, write_table
+
+from .trees import feature_tree, synthetic_tree, sample_words
+
+
+@pytest.mark.parametrize("should_be", [STRICT, PERMISSIVE])
+@pytest.mark.parametrize("seed", range(3))
+def test_round_trip(tmp_path, seed, should_be):
+    tree = synthetic_tree(seed)
+    path = tmp_path / "tree.dtab"
+    write_table(tree, path)
+    decoder = Decoder(tree, should_be)
+
+    with DecodeTable(path) as table:
+        assert len(table) == sum(1 for root in tree for _ in root.walk())
+        for word in sample_words(tree, seed, 1000):
+            leaf = decoder.decode(word)
+            index = table.decode(word, strict=should_be == STRICT)
+            if leaf is None:
+                assert index is None
+                continue
+            assert index is not None
+            assert table.name(index) == leaf.name
+            assert table.template(index) == leaf.template
+            assert table.fields(index) == list(leaf.fields)
+
+
+def test_feature_tests_never_reject(tmp_path):
+    tree = feature_tree()
+    path = tmp_path / "features.dtab"
+    write_table(tree, path)
+    decoder = Decoder(tree)
+    rng = random.Random(0)
+    # Every Rn and Rd value under both opcodes, and some other words
+    words = [0xD5100000 | rng.getrandbits(10) for _ in range(500)] + [0xD5200000 | low for low in range(1024)]
+    words += [rng.getrandbits(32) for _ in range(500)]
+    with DecodeTable(path) as table:
+        for word in words:
+            leaf = decoder.decode(word)
+            index = table.decode(word)
+            assert (table.name(index) if index is not None else None) == (leaf.name if leaf else None)
+        assert table.name(table.decode(0xD5100061)) == "FOO_new"
+        assert table.name(table.decode(0xD51003E1)) == "FOO_old"
+
+
+def test_synthetic_trees_negate_feature_tests():
+    conditions = [str(node.condition) for root in synthetic_tree(0) for node in root.walk()]
+    assert any("'AST.UnaryOp'" in condition and "IsFeatureImplemented" in condition for condition in conditions)
+
+
+def test_bad_magic(tmp_path):
+    path = tmp_path / "bad.dtab"
+    data = bytearray(encode_table(synthetic_tree(0)))
+    data[: len(TABLE_MAGIC)] = b"NOTATABL"
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        DecodeTable(path)
+
+
+def test_bad_version(tmp_path):
+    path = tmp_path / "old.dtab"
+    data = bytearray(encode_table(synthetic_tree(0)))
+    # The version follows the magic
+    data[len(TABLE_MAGIC) : len(TABLE_MAGIC) + 2] = (TABLE_VERSION + 1).to_bytes(2, "little")
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        DecodeTable(path)
+
+
+def test_truncated(tmp_path):
+    path = tmp_path / "short.dtab"
+    path.write_bytes(random.Random(0).randbytes(HEADER.size - 1))
+    with pytest.raises(ValueError):
+        DecodeTable(path)
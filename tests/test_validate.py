@@ -0,0 +1,125 @@
+import copy
+
+import pytest
+
+from disassegen.mrs import validate
+from disassegen.mrs.validate import SchemaCompiler, SpecValidator
+
+from .specs import feature_spec
+
+SCHEMA = {
+    "anyOf": [{"$ref": "#/definitions/Value"}, {"$ref": "#/definitions/Pair"}],
+    "definitions": {
+        "Value": {
+            "title": "Value",
+            "type": "object",
+            "properties": {
+                "_type": {"enum": ["Value"]},
+                "bits": {"type": "string", "pattern": "^[01x]+$"},
+                "width": {"type": "integer", "minimum": 1, "maximum": 64},
+            },
+            "required": ["_type", "bits"],
+            "additionalProperties": False,
+        },
+        "Pair": {
+            "title": "Pair",
+            "type": "object",
+            "properties": {
+                "_type": {"enum": ["Pair"]},
+                "items": {"type": "array", "items": {"$ref": "#/definitions/Value"}, "minItems": 2, "maxItems": 2},
+            },
+            "required": ["_type", "items"],
+        },
+    },
+}
+
+
+def violations(value):
+    errors = []
+    SchemaCompiler(SCHEMA).root(value, "$", errors)
+    return [str(error) for error in errors]
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(validate, "CACHE_DIR", tmp_path)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ({"_type": "Value", "bits": "10x"}, []),
+        ({"_type": "Value", "bits": "10x", "width": None}, []),
+        ({"_type": "Value", "bits": "102"}, ["$.bits: '102' does not match ^[01x]+$"]),
+        ({"_type": "Value", "bits": "1", "width": 0}, ["$.width: 0 is less than 1"]),
+        ({"_type": "Value", "bits": "1", "width": True}, ["$.width: expected integer, got bool"]),
+        ({"_type": "Value", "size": 1}, ["$: missing required property 'bits'", "$: unexpected property 'size'"]),
+        # Tagged models are checked against their own schema only
+        (
+            {"_type": "Pair", "items": [{"_type": "Value", "bits": "2"}]},
+            ["$.items: expected at least 2 items, got 1", "$.items[0].bits: '2' does not match ^[01x]+$"],
+        ),
+        ({"_type": "Other"}, ["$: does not match any of Value, Pair"]),
+        ([], ["$: does not match any of Value, Pair"]),
+    ],
+)
+def test_compiled_schema(value, expected):
+    assert sorted(violations(value)) == sorted(expected)
+
+
+def test_schema_tags():
+    assert SchemaCompiler(SCHEMA).tags() == {"Value", "Pair"}
+
+
+def broken_spec():
+    data = feature_spec()
+    data["instructions"][0]["children"][0]["condition"]["right"]["op"] = 7
+    return data
+
+
+def test_validate_spec():
+    validator = SpecValidator()
+    report = validator.validate(feature_spec(), use_cache=False)
+    assert report.subtrees > report.unique > 0 and report.validated == report.unique
+    assert report.violations == []
+
+    report = validator.validate(broken_spec(), use_cache=False)
+    assert [v.path for v in report.violations] == ["$.instructions[0].children[0].condition.right.op"]
+
+
+def test_duplicate_subtrees_report_every_location():
+    data = broken_spec()
+    condition = data["instructions"][0]["children"][0]["condition"]
+    data["instructions"][0]["children"][2]["condition"] = copy.deepcopy(condition)
+    report = SpecValidator().validate(data, use_cache=False)
+    assert [v.path for v in report.violations] == [
+        "$.instructions[0].children[0].condition.right.op",
+        "$.instructions[0].children[2].condition.right.op",
+    ]
+
+
+def test_valid_subtrees_are_cached():
+    validator = SpecValidator()
+    first = validator.validate(broken_spec())
+    assert first.cached == 0 and len(first.violations) == 1
+    # Only the subtree that failed is validated again
+    second = validator.validate(broken_spec())
+    assert (second.cached, second.validated) == (first.unique - 1, 1)
+    assert second.violations == first.violations
+    assert validator.validate(feature_spec()).validated == 1
+
+
+def test_sample():
+    report = SpecValidator().validate(feature_spec(), sample=0.5, use_cache=False)
+    assert report.validated + report.skipped == report.unique
+    assert report.validated == round(report.unique * 0.5)
+
+
+def test_pydantic_engine():
+    pytest.importorskip("pydantic", exc_type=ImportError)
+    validator = SpecValidator(engine="pydantic")
+    assert validator.validate(feature_spec(), use_cache=False).violations == []
+    # pydantic reports why every model of the union rejects the broken condition
+    violations = validator.validate(broken_spec(), use_cache=False).violations
+    assert violations
+    assert all(v.path.startswith("$.instructions[0].children[0].condition") for v in violations)
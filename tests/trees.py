@@ -0,0 +1,104 @@
+import random
+from typing import Any, Dict, List, Optional
+
+from disassegen.corpus import CorpusSampler
+from disassegen.decoder import DecodeNode, flatten_tree
+
+# Operand fields of every node, and the bits groups and instructions select, which leave the fields and the
+# should-be bits below them free
+FIELDS = (("Rn", 5, 5), ("Rd", 0, 5))
+SELECT_BITS = list(range(12, 32))
+SHOULD_BE_BITS = (10, 11)
+
+
+def pattern(value: str) -> Dict[str, Any]:
+    """Build the bit pattern ``value``, where ``x`` bits match either value."""
+    return {"_type": "Values.Value", "value": f"'{value}'"}
+
+
+def rn_test(op: str, right: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the comparison ``Rn op right``."""
+    return {"_type": "AST.BinaryOp", "op": op, "left": {"_type": "AST.Identifier", "value": "Rn"}, "right": right}
+
+
+def feature_test(name: str) -> Dict[str, Any]:
+    """Build the condition ``IsFeatureImplemented(name)``."""
+    argument = {"_type": "AST.Identifier", "value": name}
+    return {"_type": "AST.Function", "name": "IsFeatureImplemented", "arguments": [argument]}
+
+
+def negate(condition: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the condition ``!condition``."""
+    return {"_type": "AST.UnaryOp", "op": "!", "expr": condition}
+
+
+def both(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the condition ``left && right``."""
+    return {"_type": "AST.BinaryOp", "op": "&&", "left": left, "right": right}
+
+
+def _condition(rng: random.Random) -> Optional[Dict[str, Any]]:
+    choice = rng.randrange(7)
+    if choice == 0:
+        return rn_test("!=", pattern("11111"))
+    if choice == 1:
+        return rn_test("IN", {"_type": "AST.Set", "values": [pattern("0000x"), pattern("11111")]})
+    # Feature tests, negated or not, never reject a word without a profile
+    if choice == 2:
+        return both(feature_test("FEAT_X"), rn_test("==", pattern("1xxxx")))
+    if choice == 3:
+        return both(negate(feature_test("FEAT_X")), rn_test("!=", pattern("11111")))
+    if choice == 4:
+        return negate(both(feature_test("FEAT_Y"), rn_test("==", pattern("0xxxx"))))
+    return None
+
+
+def feature_tree() -> List[DecodeNode]:
+    """
+    Build a tree whose instructions depend on a feature.
+
+    FOO_new replaces FOO_old where FEAT_X is not implemented and Rn is not 31, and BAR needs FEAT_X, so without a
+    profile 0xd5100061 decodes to FOO_new, 0xd51003e1 to FOO_old and 0xd5200000 to BAR.
+    """
+    foo_new = both(negate(feature_test("FEAT_X")), rn_test("!=", pattern("11111")))
+    return [
+        DecodeNode("FOO_new", 0xFFFF0000, 0xD5100000, FIELDS, condition=foo_new, leaf=True),
+        DecodeNode("FOO_old", 0xFFFF0000, 0xD5100000, FIELDS, leaf=True),
+        DecodeNode("BAR", 0xFFFF0000, 0xD5200000, FIELDS, condition=feature_test("FEAT_X"), leaf=True),
+    ]
+
+
+def synthetic_tree(seed: int, depth: int = 3, width: int = 6) -> List[DecodeNode]:
+    """Build a random decode tree whose groups and instructions overlap, with conditions and should-be bits."""
+    rng = random.Random(seed)
+    count = 0
+
+    def build(level: int, fixed: int) -> DecodeNode:
+        nonlocal count
+        count += 1
+        free = [bit for bit in SELECT_BITS if not fixed >> bit & 1]
+        mask = sum(1 << bit for bit in rng.sample(free, min(len(free), rng.randint(2, 5))))
+        value = rng.getrandbits(32) & mask
+        condition = _condition(rng)
+        if level == depth or rng.random() < 0.3:
+            sbo = sbz = 0
+            for bit in SHOULD_BE_BITS:
+                kind = rng.randrange(3)
+                sbo |= (kind == 1) << bit
+                sbz |= (kind == 2) << bit
+            return DecodeNode(
+                f"INST_{count}", mask, value, FIELDS, sbo, sbz, condition, leaf=True, template=f"INST{count} <Xd>"
+            )
+        node = DecodeNode(f"group_{count}", mask, value, FIELDS, condition=condition)
+        node.children = [build(level + 1, fixed | mask) for _ in range(rng.randint(2, width))]
+        return node
+
+    return [build(1, 0) for _ in range(width)]
+
+
+def sample_words(tree: List[DecodeNode], seed: int, count: int = 3000) -> List[int]:
+    """Draw uniformly random words and words sampled to decode to every instruction of a tree."""
+    rng = random.Random(seed)
+    words = [rng.getrandbits(32) for _ in range(count)]
+    words.extend(CorpusSampler(flatten_tree(tree), seed=seed).sample(count))
+    return words